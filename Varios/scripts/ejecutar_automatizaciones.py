@@ -6,6 +6,9 @@ Este script evita problemas de importación de módulos y proporciona
 una interfaz directa para ejecutar las automatizaciones.
 
 ejecutar_automatizaciones.py --companies allianz sura --parallel
+ejecutar_automatizaciones.py --companies allianz sura --record-har
+ejecutar_automatizaciones.py --companies allianz sura --replay-har --har-latency zero
+ejecutar_automatizaciones.py --serve  (host residente de la GUI, recibe órdenes por stdin)
 """
 
 import sys
@@ -54,6 +57,11 @@ from src.interfaces.cli_interface import CLIInterface
 
 async def main():
     """Función principal asíncrona."""
+    # Host residente de la GUI: atiende ejecuciones por stdin hasta que la GUI se cierre
+    if '--serve' in sys.argv[1:]:
+        from src.interfaces.automation_host import AutomationHost
+        return await AutomationHost().serve()
+    
     try:
         cli = CLIInterface()
         exit_code = await cli.run()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+"""
+Mide el tiempo de arranque de los puntos de entrada con `python -X importtime`.
+
+Cada punto de entrada se ejecuta en un intérprete nuevo (varias veces, se toma la mejor) y
+se compara con su presupuesto. Además se verifica que no se carguen módulos pesados que
+solo hacen falta al ejecutar (Playwright, pandas, openpyxl): es la regresión más común y
+no depende de qué tan rápido sea el equipo.
+
+medir_arranque.py                    (todos los puntos de entrada)
+medir_arranque.py --entrada cli      (solo uno)
+medir_arranque.py --detalle 15       (los 15 imports más lentos de cada uno)
+medir_arranque.py --factor 1.5       (presupuestos × 1.5, para equipos lentos)
+
+Sale con código 1 si algún punto de entrada se pasa del presupuesto o carga un módulo
+prohibido.
+"""
+
+import os
+import re
+import sys
+import time
+import argparse
+import subprocess
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+# Subir 2 niveles: scripts/ -> Varios/ -> raíz del proyecto
+PROJECT_DIR = Path(__file__).parent.parent.parent
+VARIOS_DIR = PROJECT_DIR / 'Varios'
+
+# Código a medir por punto de entrada. 'gui' es el tiempo hasta poder crear la ventana
+# (el módulo completo); 'cli' es el tiempo hasta la primera acción (parser listo).
+ENTRADAS: Dict[str, str] = {
+    'gui': "import src.interfaces.gui_interface",
+    'cli': (
+        "from src.interfaces.cli_interface import CLIInterface; "
+        "CLIInterface().create_parser()"
+    ),
+    'automatizaciones': (
+        "import runpy, sys; sys.argv = ['ejecutar_automatizaciones.py', '--help']; "
+        "runpy.run_path('scripts/ejecutar_automatizaciones.py', run_name='__main__')"
+    )
+}
+
+# Presupuesto de imports en milisegundos (la mejor de las repeticiones)
+PRESUPUESTO_MS: Dict[str, float] = {
+    'gui': 400,
+    'cli': 250,
+    'automatizaciones': 250
+}
+
+# Módulos que ningún punto de entrada debe cargar al arrancar
+MODULOS_PROHIBIDOS = ('playwright', 'pandas', 'openpyxl', 'numpy')
+
+_LINEA_IMPORTTIME = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+
+def medir(codigo: str) -> Tuple[float, List[Tuple[str, float]], List[str], str]:
+    """
+    Ejecuta el código en un intérprete nuevo con -X importtime.
+
+    Args:
+        codigo: Código a ejecutar (desde Varios/)
+
+    Returns:
+        (total en ms, [(módulo de primer nivel, ms acumulados)], módulos cargados, error)
+    """
+    env = os.environ.copy()
+    env['PYTHONDONTWRITEBYTECODE'] = '1'
+    env['PYTHONIOENCODING'] = 'utf-8'
+    proceso = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', codigo],
+        cwd=str(VARIOS_DIR),
+        env=env,
+        capture_output=True,
+        text=True,
+        encoding='utf-8',
+        errors='replace'
+    )
+
+    total_us = 0
+    primer_nivel: List[Tuple[str, float]] = []
+    modulos: List[str] = []
+    otras_lineas: List[str] = []
+    for linea in proceso.stderr.splitlines():
+        coincidencia = _LINEA_IMPORTTIME.match(linea)
+        if not coincidencia:
+            if not linea.startswith('import time:'):
+                otras_lineas.append(linea)
+            continue
+        acumulado, sangria, modulo = int(coincidencia.group(2)), coincidencia.group(3), coincidencia.group(4)
+        modulos.append(modulo)
+        # Solo los imports sin sangría suman al total (los anidados ya están en su acumulado)
+        if len(sangria) <= 1:
+            total_us += acumulado
+            primer_nivel.append((modulo, acumulado / 1000))
+
+    # --help termina con SystemExit(0); cualquier otro código es un fallo del punto de entrada
+    error = '\n'.join(otras_lineas[-5:]) if proceso.returncode != 0 else ''
+    return total_us / 1000, primer_nivel, modulos, error
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Tiempo de arranque de los puntos de entrada')
+    parser.add_argument('--entrada', choices=list(ENTRADAS), action='append',
+                        help='Punto de entrada a medir (se puede repetir; por defecto todos)')
+    parser.add_argument('--repeticiones', type=int, default=5,
+                        help='Ejecuciones por punto de entrada; se toma la más rápida (por defecto 5)')
+    parser.add_argument('--factor', type=float, default=1.0,
+                        help='Multiplicador de los presupuestos (por defecto 1.0)')
+    parser.add_argument('--detalle', type=int, default=8,
+                        help='Imports de primer nivel más lentos a mostrar (por defecto 8)')
+    args = parser.parse_args()
+
+    fallos = 0
+    for nombre in args.entrada or list(ENTRADAS):
+        mejor = None
+        inicio = time.perf_counter()
+        for _ in range(max(1, args.repeticiones)):
+            resultado = medir(ENTRADAS[nombre])
+            if mejor is None or resultado[0] < mejor[0]:
+                mejor = resultado
+        pared = (time.perf_counter() - inicio) / max(1, args.repeticiones) * 1000
+
+        total, primer_nivel, modulos, error = mejor
+        presupuesto = PRESUPUESTO_MS[nombre] * args.factor
+        prohibidos = sorted({m.split('.')[0] for m in modulos if m.split('.')[0] in MODULOS_PROHIBIDOS})
+
+        estado = '✅'
+        if error or prohibidos or total > presupuesto:
+            estado = '❌'
+            fallos += 1
+
+        print(f"{estado} {nombre}: imports {total:.0f} ms (presupuesto {presupuesto:.0f} ms), "
+              f"proceso completo ~{pared:.0f} ms")
+        for modulo, ms in sorted(primer_nivel, key=lambda item: -item[1])[:args.detalle]:
+            print(f"     {ms:8.1f} ms  {modulo}")
+        if prohibidos:
+            print(f"   🚫 Carga módulos que deben ser diferidos: {', '.join(prohibidos)}")
+        if error:
+            print(f"   ⚠️ El punto de entrada falló:\n{error}")
+
+    return 1 if fallos else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
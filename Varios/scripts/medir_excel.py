@@ -0,0 +1,190 @@
+#!/usr/bin/env python
+"""
+Compara los backends de escritura de Excel de los consolidados (EXCEL_BACKEND).
+
+Cada plantilla se llena con TemplateHandler (cliente de la configuración actual y planes
+de ejemplo) con ambos backends, varias veces, y se mide abrir, llenar y guardar. También
+se mide el reporte estándar (pandas vs write-only) y se verifica que los dos backends
+dejen los mismos valores en la hoja (leídos de nuevo con openpyxl).
+
+medir_excel.py                      (todas las plantillas)
+medir_excel.py --fondo EPM          (solo las plantillas de un fondo)
+medir_excel.py --repeticiones 10    (se toma la más rápida de cada medición)
+medir_excel.py --conservar          (deja los archivos generados para abrirlos en Excel)
+
+Sale con código 1 si algún backend produce valores distintos.
+"""
+
+import os
+import sys
+import time
+import logging
+import argparse
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+# Subir 2 niveles: scripts/ -> Varios/ -> raíz del proyecto
+PROJECT_DIR = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(PROJECT_DIR / 'Varios'))
+
+from src.consolidation.excel_backend import ExcelBackend
+from src.consolidation.template_handler import TemplateHandler
+from src.consolidation.template_registry import TemplateRegistry
+from src.consolidation.cotizacion_consolidator import CotizacionConsolidator
+
+BACKENDS = ('openpyxl', 'patch')
+
+# Planes de ejemplo (mismas claves que extraen los logs de cada aseguradora)
+PLANES_SURA = {'Global Franquicia': '1.850.000', 'Autos Global': '2.340.500', 'Autos Clásico': '1.520.300'}
+PLANES_ALLIANZ = {
+    'Autos Esencial': '1.400.000',
+    'Autos Esencial + Totales': '1.610.000',
+    'Autos Plus': '2.150.000',
+    'Autos Llave en Mano': '2.900.000'
+}
+
+
+def llenar_plantilla(handler: TemplateHandler, ruta: str, fondo: str, backend: str, salida: str,
+                     sura_data: Dict[str, Any], bolivar_solidaria: Dict[str, str]) -> Tuple[float, float, float]:
+    """
+    Llena y guarda una plantilla con un backend.
+
+    Returns:
+        (ms abrir, ms llenar, ms guardar)
+    """
+    inicio = time.perf_counter()
+    workbook = ExcelBackend.open_template(ruta, backend=backend)
+    worksheet = workbook.active
+    abierto = time.perf_counter()
+
+    handler.fill_base_data(worksheet, fondo, sura_data, bolivar_solidaria)
+    handler.fill_company_values(worksheet, fondo, 'sura', PLANES_SURA)
+    handler.fill_company_values(worksheet, fondo, 'allianz', PLANES_ALLIANZ)
+    handler.finish_template_data(worksheet)
+    lleno = time.perf_counter()
+
+    try:
+        workbook.save(salida)
+    finally:
+        workbook.close()
+    guardado = time.perf_counter()
+    return (abierto - inicio) * 1000, (lleno - abierto) * 1000, (guardado - lleno) * 1000
+
+
+def leer_valores(ruta: str) -> Dict[str, Any]:
+    """Valores de la hoja activa ('' y None cuentan igual)."""
+    import openpyxl
+    workbook = openpyxl.load_workbook(ruta)
+    try:
+        return {
+            cell.coordinate: cell.value
+            for row in workbook.active.iter_rows()
+            for cell in row
+            if cell.value not in (None, '')
+        }
+    finally:
+        workbook.close()
+
+
+def medir_reporte_estandar(carpeta: str, repeticiones: int) -> Dict[str, float]:
+    """Mejor tiempo (ms) del reporte estándar con cada backend."""
+    columnas = ['Categoría', 'Campo', 'Valor']
+    filas: List[Dict[str, str]] = [
+        {'Categoría': 'SECCIÓN' if i % 10 == 0 else '', 'Campo': f'Campo {i}', 'Valor': f'${i * 1000:,}'}
+        for i in range(60)
+    ]
+    tiempos = {}
+    for backend in BACKENDS:
+        mejor = None
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            ExcelBackend.write_table(os.path.join(carpeta, f'estandar_{backend}.xlsx'),
+                                     'COTIZACION_CONSOLIDADA', columnas, filas, backend=backend)
+            transcurrido = (time.perf_counter() - inicio) * 1000
+            mejor = transcurrido if mejor is None else min(mejor, transcurrido)
+        tiempos[backend] = mejor
+    return tiempos
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Tiempos de los backends de Excel de los consolidados')
+    parser.add_argument('--fondo', action='append', help='Fondo a medir (se puede repetir; por defecto todos)')
+    parser.add_argument('--repeticiones', type=int, default=5,
+                        help='Ejecuciones por plantilla y backend; se toma la más rápida (por defecto 5)')
+    parser.add_argument('--conservar', action='store_true', help='No borrar los archivos generados')
+    args = parser.parse_args()
+    repeticiones = max(1, args.repeticiones)
+
+    # Los logs de llenado no deben entrar en la medición
+    logging.disable(logging.WARNING)
+
+    handler = TemplateHandler()
+    consolidator = CotizacionConsolidator()
+    sura_data = consolidator.extract_sura_data()
+    bolivar_solidaria = consolidator.calculate_bolivar_solidaria_plans()
+
+    plantillas = [
+        (key, info) for key, info in TemplateRegistry.templates().items()
+        if not args.fondo or info['fondo'] in args.fondo
+    ]
+    if not plantillas:
+        print(f"❌ No hay plantillas en {TemplateRegistry.TEMPLATES_DIR}")
+        return 1
+
+    carpeta = tempfile.mkdtemp(prefix='medir_excel_')
+    diferencias = 0
+    totales = {backend: 0.0 for backend in BACKENDS}
+
+    # Importar openpyxl antes de medir (ambos backends lo pueden usar); su costo se informa aparte
+    inicio = time.perf_counter()
+    import openpyxl
+    print(f"openpyxl {openpyxl.__version__} importado en {time.perf_counter() - inicio:.2f}s (fuera de las mediciones)")
+
+    print(f"{'Plantilla':<16}" + ''.join(f"{b + ' abrir/llenar/guardar':>34}" for b in BACKENDS) + f"{'mejora':>9}")
+    for key, info in plantillas:
+        mejores = {}
+        for backend in BACKENDS:
+            salida = os.path.join(carpeta, f"{key}_{backend}.xlsx")
+            mejor = None
+            for _ in range(repeticiones):
+                tiempos = llenar_plantilla(handler, info['path'], info['fondo'], backend, salida,
+                                           sura_data, bolivar_solidaria)
+                if mejor is None or sum(tiempos) < sum(mejor):
+                    mejor = tiempos
+            mejores[backend] = mejor
+            totales[backend] += sum(mejor)
+
+        columnas = ''.join(
+            f"{'/'.join(f'{t:.0f}' for t in mejores[b]):>24} = {sum(mejores[b]):5.0f} ms" for b in BACKENDS
+        )
+        mejora = sum(mejores['openpyxl']) / max(sum(mejores['patch']), 0.001)
+
+        # Los dos consolidados deben tener exactamente los mismos valores
+        esperado = leer_valores(os.path.join(carpeta, f"{key}_openpyxl.xlsx"))
+        obtenido = leer_valores(os.path.join(carpeta, f"{key}_patch.xlsx"))
+        distintas = sorted(c for c in set(esperado) | set(obtenido) if esperado.get(c) != obtenido.get(c))
+        estado = '✅' if not distintas else '❌'
+        print(f"{estado} {key:<14}{columnas}{mejora:8.1f}x")
+        if distintas:
+            diferencias += 1
+            for coordenada in distintas[:5]:
+                print(f"     {coordenada}: openpyxl={esperado.get(coordenada)!r} patch={obtenido.get(coordenada)!r}")
+
+    print(f"\nTotal: openpyxl {totales['openpyxl']:.0f} ms, patch {totales['patch']:.0f} ms "
+          f"({totales['openpyxl'] / max(totales['patch'], 0.001):.1f}x)")
+
+    estandar = medir_reporte_estandar(carpeta, repeticiones)
+    print(f"Reporte estándar: pandas {estandar['openpyxl']:.0f} ms, write-only {estandar['patch']:.0f} ms")
+
+    if args.conservar:
+        print(f"📁 Archivos generados en: {carpeta}")
+    else:
+        import shutil
+        shutil.rmtree(carpeta, ignore_errors=True)
+
+    return 1 if diferencias else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
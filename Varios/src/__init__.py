@@ -1,20 +1,29 @@
 """Sistema de automatización de cotizaciones de seguros."""
 
+import importlib
+
 # Versión del sistema
 __version__ = "2.0.0"
 
-# Módulos principales
-from .core import BaseAutomation, AutomationManager, LoggerFactory, Constants
-from .shared import BasePage, Utils
-from .factory import AutomationFactory, ConfigFactory
+# Módulos principales: se importan al pedirlos (from src import X) y no al importar
+# cualquier submódulo, para que los puntos de entrada no carguen Playwright de entrada
+_LAZY_EXPORTS = {
+    'BaseAutomation': '.core',
+    'AutomationManager': '.core',
+    'LoggerFactory': '.core',
+    'Constants': '.core',
+    'BasePage': '.shared',
+    'Utils': '.shared',
+    'AutomationFactory': '.factory',
+    'ConfigFactory': '.factory'
+}
+
+__all__ = list(_LAZY_EXPORTS)
+
 
-__all__ = [
-    'BaseAutomation', 
-    'AutomationManager', 
-    'LoggerFactory', 
-    'Constants',
-    'BasePage', 
-    'Utils',
-    'AutomationFactory', 
-    'ConfigFactory'
-]
+def __getattr__(name):
+    if name in _LAZY_EXPORTS:
+        value = getattr(importlib.import_module(_LAZY_EXPORTS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -3,8 +3,10 @@
 import asyncio
 import os
 from typing import Optional
+from playwright.async_api import Page
 
 from ...core.base_automation import BaseAutomation
+from ...core.flow_runner import FlowStep
 from ...config.allianz_config import AllianzConfig
 from ...shared.global_pause_coordinator import wait_for_global_resume
 from .pages import LoginPage, DashboardPage, FlotasPage, PlacaPage, FasecoldaPage
@@ -12,6 +14,9 @@ from .pages import LoginPage, DashboardPage, FlotasPage, PlacaPage, FasecoldaPag
 class AllianzAutomation(BaseAutomation):
     """Automatización específica para Allianz."""
     
+    # El PDF de 'Estudio de Seguro' se abre en el visor de Chrome de una pestaña nueva
+    REQUIRES_HEAD = True
+    
     def __init__(
         self, 
         usuario: Optional[str] = None, 
@@ -64,9 +69,10 @@ class AllianzAutomation(BaseAutomation):
         self.logger.info("🔐 Ejecutando flujo de login Allianz...")
         return await self.login_page.login(self.usuario, self.contrasena)
 
-    async def execute_navigation_flow(self) -> bool:
-        """Ejecuta el flujo de navegación específico de Allianz con reintentos."""
+    async def execute_navigation_flow(self, page: Optional[Page] = None, client=None) -> bool:
+        """Ejecuta el flujo de navegación específico de Allianz con reintentos (en `page` o en la página principal)."""
         self.logger.info("🧭 Ejecutando flujo de navegación Allianz...")
+        dashboard_page = DashboardPage(page, client) if page else self.dashboard_page
         
         # Intentar navegación con reintentos
         for attempt in range(1, 4):
@@ -76,7 +82,7 @@ class AllianzAutomation(BaseAutomation):
                     await asyncio.sleep(2)  # Pausa entre reintentos
                 
                 # Navegar a flotas
-                if not await self.dashboard_page.navigate_to_flotas():
+                if not await dashboard_page.navigate_to_flotas():
                     if attempt == 3:
                         self.logger.error("❌ Error navegando a flotas")
                         return False
@@ -85,7 +91,7 @@ class AllianzAutomation(BaseAutomation):
                         continue
                 
                 # Enviar formulario si existe
-                await self.dashboard_page.submit_application_form()
+                await dashboard_page.submit_application_form()
                 self.logger.info("✅ Flujo de navegación completado exitosamente")
                 return True
                 
@@ -99,59 +105,66 @@ class AllianzAutomation(BaseAutomation):
         
         return False
 
-    async def execute_quote_flow(self) -> bool:
-        """Ejecuta el flujo de cotización específico de Allianz."""
+    async def execute_quote_flow(self, page: Optional[Page] = None, client=None) -> bool:
+        """Ejecuta el flujo de cotización específico de Allianz (en `page` con los datos de `client`, o en la página principal)."""
         self.logger.info("💰 Ejecutando flujo de cotización Allianz...")
         
+        if page:
+            fasecolda_page, flotas_page, placa_page = FasecoldaPage(page, client), FlotasPage(page, client), PlacaPage(page, client)
+        else:
+            fasecolda_page, flotas_page, placa_page = self.fasecolda_page, self.flotas_page, self.placa_page
+        
         # Obtener códigos FASECOLDA si están disponibles
-        fasecolda_codes = await self.fasecolda_page.get_fasecolda_code()
+        fasecolda_codes = await fasecolda_page.get_fasecolda_code()
         if fasecolda_codes:
             self.logger.info("📋 Códigos FASECOLDA disponibles para Allianz")
-            await self.fasecolda_page.use_fasecolda_codes_in_flow(fasecolda_codes)
+            await fasecolda_page.use_fasecolda_codes_in_flow(fasecolda_codes)
         
         # Paso 1: Flujo de flotas
-        if not await self.flotas_page.execute_flotas_flow():
+        if not await flotas_page.execute_flotas_flow():
             self.logger.error("❌ Falló el flujo de flotas")
             return False
         
         # Paso 2: Flujo de placa
-        if not await self.placa_page.execute_placa_flow():
+        if not await placa_page.execute_placa_flow():
             self.logger.error("❌ Falló el flujo de placa")
             return False
         
         return True
 
+    async def execute_quote_in_page(self, page: Page, client) -> bool:
+        """Cotiza el cliente `client` en una pestaña del contexto autenticado."""
+        # Reutiliza la sesión del contexto: el login detecta la sesión activa y se omite
+        await wait_for_global_resume('allianz')
+        if not await LoginPage(page, client).login(self.usuario, self.contrasena):
+            self.logger.error("❌ La pestaña no pudo reutilizar la sesión de Allianz")
+            return False
+        
+        await wait_for_global_resume('allianz')
+        if not await self.execute_navigation_flow(page, client):
+            return False
+        
+        await wait_for_global_resume('allianz')
+        return await self.execute_quote_flow(page, client)
+
     async def run_complete_flow(self) -> bool:
-        """Ejecuta el flujo completo de automatización de Allianz con soporte de pausas globales."""
+        """Ejecuta el flujo completo de automatización de Allianz por pasos reanudables."""
         self.logger.info("🚀 Iniciando flujo completo de Allianz...")
         
         # CRÍTICO: Cargar datos de GUI al inicio del flujo completo
         from ...config.client_config import ClientConfig
         ClientConfig._load_gui_overrides()
         
+        # Reanudar desde el login es barato: con la sesión activa solo vuelve al dashboard
+        steps = [
+            FlowStep('login', self.execute_login_flow, max_attempts=2),
+            FlowStep('navegacion', self.execute_navigation_flow),
+            FlowStep('cotizacion', self.execute_quote_flow, max_attempts=3, restart_from='login', persistent=True)
+        ]
+        
         try:
-            # Verificar pausa global antes de iniciar
-            await wait_for_global_resume('allianz')
-            
-            # 1. Ejecutar login
-            self.logger.info("🔐 Iniciando flujo de login...")
-            await wait_for_global_resume('allianz')
-            if not await self.execute_login_flow():
-                self.logger.error("❌ Error en el flujo de login")
-                return False
-            
-            # 2. Ejecutar navegación
-            self.logger.info("🧭 Iniciando flujo de navegación...")
-            await wait_for_global_resume('allianz')
-            if not await self.execute_navigation_flow():
-                self.logger.error("❌ Error en el flujo de navegación")
-                return False
-            
-            # 3. Ejecutar cotización
-            self.logger.info("💰 Iniciando flujo de cotización...")
-            await wait_for_global_resume('allianz')
-            if not await self.execute_quote_flow():
-                self.logger.error("❌ Error en el flujo de cotización")
+            if not await self.run_steps(steps):
+                self.logger.error("❌ El flujo de Allianz no se pudo completar")
                 return False
             
             self.logger.info("🎉 ¡Flujo completo de Allianz completado exitosamente!")
@@ -14,8 +14,8 @@ class DashboardPage(BasePage):
     EXPANSION_CONTENT = '.nx-expansion-panel__content'
     BOX_SELECTOR = "app-box .box"
     
-    def __init__(self, page: Page):
-        super().__init__(page, 'allianz')
+    def __init__(self, page: Page, client=None):
+        super().__init__(page, 'allianz', client)
 
     async def navigate_to_flotas(self) -> bool:
         """Navega directamente a Flotas Autos y envía el formulario con reintentos."""
@@ -46,13 +46,13 @@ class DashboardPage(BasePage):
             
             # Esperar contenido expandido
             self.logger.info("⏳ Esperando contenido expandido...")
-            if not await self.wait_for_selector_safe(self.EXPANSION_CONTENT, timeout=15000):
+            if not await self.wait_for_selector_safe(self.EXPANSION_CONTENT, operation='contenido_autos'):
                 self.logger.error("❌ Error esperando contenido expandido")
                 return False
             
             # Esperar las cajas de opciones
             self.logger.info("⏳ Esperando cajas de opciones...")
-            if not await self.wait_for_selector_safe(self.BOX_SELECTOR, timeout=15000):
+            if not await self.wait_for_selector_safe(self.BOX_SELECTOR, operation='cajas_opciones'):
                 self.logger.error("❌ Error esperando cajas de opciones")
                 return False
             
@@ -5,15 +5,14 @@ from typing import Optional, Dict
 from playwright.async_api import Page
 from ....shared.base_page import BasePage
 from ....config.allianz_config import AllianzConfig
-from ....config.client_config import ClientConfig
 from ....shared.fasecolda_extractor import get_global_fasecolda_codes
 
 
 class FasecoldaPage(BasePage):
     """Página de manejo de código Fasecolda para Allianz."""
     
-    def __init__(self, page: Page):
-        super().__init__(page, 'allianz')
+    def __init__(self, page: Page, client=None):
+        super().__init__(page, 'allianz', client)
         self.config = AllianzConfig()
 
     async def get_fasecolda_code(self) -> Optional[dict]:
@@ -22,23 +21,23 @@ class FasecoldaPage(BasePage):
         
         try:
             # Verificar si Fasecolda está habilitado globalmente
-            if not ClientConfig.is_fasecolda_enabled():
-                manual_codes = ClientConfig.get_manual_fasecolda_codes()
+            if not self.client.is_fasecolda_enabled():
+                manual_codes = self.client.get_manual_fasecolda_codes()
                 self.logger.info(f"📋 Fasecolda deshabilitado - usando códigos manuales - CF: {manual_codes['cf_code']}, CH: {manual_codes['ch_code']}")
                 return manual_codes
             
             # Verificar configuración específica de Allianz
-            if not ClientConfig.should_use_fasecolda_for_company('allianz'):
-                manual_codes = ClientConfig.get_manual_fasecolda_codes()
+            if not self.client.should_use_fasecolda_for_company('allianz'):
+                manual_codes = self.client.get_manual_fasecolda_codes()
                 self.logger.info(f"⏭️ Búsqueda automática de Fasecolda deshabilitada para Allianz - usando códigos manuales - CF: {manual_codes['cf_code']}, CH: {manual_codes['ch_code']}")
                 return manual_codes
             
-            if ClientConfig.VEHICLE_STATE != 'Nuevo':
-                self.logger.info(f"⏭️ Vehículo '{ClientConfig.VEHICLE_STATE}' - no requiere código Fasecolda")
+            if self.client.VEHICLE_STATE != 'Nuevo':
+                self.logger.info(f"⏭️ Vehículo '{self.client.VEHICLE_STATE}' - no requiere código Fasecolda")
                 return None
             
             # Obtener códigos del extractor global
-            codes = await get_global_fasecolda_codes(timeout=30)
+            codes = await get_global_fasecolda_codes(timeout=30, client=self.client)
             
             if codes and codes.get('cf_code'):
                 ch_info = f" - CH: {codes.get('ch_code')}" if codes.get('ch_code') else ""
@@ -46,13 +45,13 @@ class FasecoldaPage(BasePage):
                 return codes
             else:
                 # Fallback: usar códigos manuales cuando la búsqueda automática falla
-                manual_codes = ClientConfig.get_manual_fasecolda_codes()
+                manual_codes = self.client.get_manual_fasecolda_codes()
                 self.logger.warning(f"⚠️ No se pudieron obtener códigos Fasecolda del extractor global - usando códigos manuales como fallback - CF: {manual_codes['cf_code']}, CH: {manual_codes['ch_code']}")
                 return manual_codes
                 
         except Exception as e:
             # Fallback: usar códigos manuales cuando hay errores
-            manual_codes = ClientConfig.get_manual_fasecolda_codes()
+            manual_codes = self.client.get_manual_fasecolda_codes()
             self.logger.error(f"❌ Error obteniendo códigos Fasecolda: {e} - usando códigos manuales como fallback - CF: {manual_codes['cf_code']}, CH: {manual_codes['ch_code']}")
             return manual_codes
 
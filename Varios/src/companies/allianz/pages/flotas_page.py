@@ -2,7 +2,6 @@
 
 from playwright.async_api import Page
 from ....shared.base_page import BasePage
-from ....config.client_config import ClientConfig
 
 class FlotasPage(BasePage):
     """Página de Flotas con funciones específicas para el flujo de cotización de Allianz."""
@@ -17,24 +16,26 @@ class FlotasPage(BasePage):
     SELECTOR_CAT_RIESGO         = "#CategoriaRiesgoBean\\$catRiesgo"
     SELECTOR_BTN_ACEPTAR_FINAL  = "#btnAceptar"
 
-    def __init__(self, page: Page):
-        super().__init__(page, 'allianz')
+    def __init__(self, page: Page, client=None):
+        super().__init__(page, 'allianz', client)
 
     async def click_policy_cell(self) -> bool:
         """Hace clic en la celda con el número de póliza configurado."""
-        self.logger.info(f"🔲 Haciendo clic en celda {ClientConfig.get_policy_number('allianz')}...")
+        self.logger.info(f"🔲 Haciendo clic en celda {self.client.get_policy_number('allianz')}...")
         return await self.click_in_frame(
-            f"{self.SELECTOR_CELL_BASE}:has-text('{ClientConfig.get_policy_number('allianz')}')",
-            f"celda {ClientConfig.get_policy_number('allianz')}"
+            f"{self.SELECTOR_CELL_BASE}:has-text('{self.client.get_policy_number('allianz')}')",
+            f"celda {self.client.get_policy_number('allianz')}",
+            operation='celda_poliza'
         )
 
     async def click_ramos_asociados(self) -> bool:
         """Hace clic en el ramo de seguro configurado."""
-        ramo_seguro = ClientConfig.get_company_specific_config('allianz').get('ramo_seguro', 'Livianos Particulares')
+        ramo_seguro = self.client.get_company_specific_config('allianz').get('ramo_seguro', 'Livianos Particulares')
         self.logger.info(f"🚗 Haciendo clic en '{ramo_seguro}'...")
         return await self.click_in_frame(
             f"text={ramo_seguro}",
-            f"'{ramo_seguro}'"
+            f"'{ramo_seguro}'",
+            operation='ramo_seguro'
         )
 
     async def click_aceptar(self) -> bool:
@@ -42,7 +43,8 @@ class FlotasPage(BasePage):
         self.logger.info("✅ Haciendo clic en botón 'Aceptar'...")
         return await self.click_in_frame(
             f"{self.SELECTOR_ACEPTAR}:has-text('Aceptar')",
-            "botón Aceptar"
+            "botón Aceptar",
+            operation='aceptar'
         )
 
     async def click_radio_no_asegurado(self) -> bool:
@@ -51,13 +53,14 @@ class FlotasPage(BasePage):
         max_attempts = 3
         for intento in range(1, max_attempts + 1):
             self.logger.info(f"🔘 Intento {intento} de seleccionar radio 'No' (asegurado)...")
-            # Intentar primer selector
-            clicked = await self.click_in_frame(self.SELECTOR_RADIO_NO, "radio 'No' (asegurado)")
+            # Intentar primer selector (timeout explícito: es un sondeo, no alimenta los timeouts adaptativos)
+            clicked = await self.click_in_frame(self.SELECTOR_RADIO_NO, "radio 'No' (asegurado)", timeout=15000)
             if not clicked:
                 # Intentar selector alternativo
                 clicked = await self.click_in_frame(
                     "input[name='IntervinientesBean$esAsegurado'][value='N']",
-                    "radio 'No' (asegurado)"
+                    "radio 'No' (asegurado)",
+                    operation='radio_no_asegurado'
                 )
             if not clicked:
                 self.logger.warning(f"❌ No se pudo hacer clic en el radio 'No' (intento {intento})")
@@ -90,7 +93,7 @@ class FlotasPage(BasePage):
         """Selecciona el tipo de documento en el dropdown."""
         # Usar el valor del config si no se proporciona uno específico
         if tipo_documento is None:
-            tipo_documento = ClientConfig.get_client_document_type('allianz')
+            tipo_documento = self.client.get_client_document_type('allianz')
             
         tipo_map = {
             "NIT": " ", "REG_CIVIL_NACIMIENTO": "I", "NUIP": "J",
@@ -104,19 +107,21 @@ class FlotasPage(BasePage):
         return await self.select_in_frame(
             self.SELECTOR_DOC_TYPE,
             tipo_map[tipo_documento],
-            f"tipo de documento '{tipo_documento}'"
+            f"tipo de documento '{tipo_documento}'",
+            operation='tipo_documento'
         )
 
     async def fill_numero_documento(self, numero_documento: str = None) -> bool:
         """Llena el campo de número de documento."""
         # Usar el valor del config si no se proporciona uno específico
         if numero_documento is None:
-            numero_documento = ClientConfig.CLIENT_DOCUMENT_NUMBER
+            numero_documento = self.client.CLIENT_DOCUMENT_NUMBER
             
         return await self.fill_in_frame(
             self.SELECTOR_DOC_NUM,
             numero_documento,
-            "número de documento"
+            "número de documento",
+            operation='numero_documento'
         )
 
     async def select_categoria_riesgo_liviano(self) -> bool:
@@ -124,14 +129,16 @@ class FlotasPage(BasePage):
         return await self.select_in_frame(
             self.SELECTOR_CAT_RIESGO,
             "L0008",
-            "categoría de riesgo 'Liviano Particulares'"
+            "categoría de riesgo 'Liviano Particulares'",
+            operation='categoria_riesgo'
         )
 
     async def click_btn_aceptar_final(self) -> bool:
         """Hace clic en el botón final de Aceptar."""
         return await self.click_in_frame(
             f"{self.SELECTOR_BTN_ACEPTAR_FINAL}:has-text('Aceptar')",
-            "botón Aceptar final"
+            "botón Aceptar final",
+            operation='aceptar_final'
         )
 
     async def execute_flotas_flow(self) -> bool:
@@ -14,8 +14,8 @@ class LoginPage(BasePage):
     PASSWORD_INPUT = "input[name='password']"
     SUBMIT_BUTTON = "button[type='submit']"
     
-    def __init__(self, page: Page):
-        super().__init__(page, 'allianz')
+    def __init__(self, page: Page, client=None):
+        super().__init__(page, 'allianz', client)
         self.config = AllianzConfig()
 
     async def navigate_to_login(self):
@@ -6,7 +6,8 @@ from playwright.async_api import Page
 from ....shared.base_page import BasePage
 from ....shared.utils import Utils
 from ....config.allianz_config import AllianzConfig
-from ....config.client_config import ClientConfig
+from ....core.run_metrics import get_run_metrics
+from ....core.quote_results import QuoteResults
 from .fasecolda_page import FasecoldaPage
 
 class PlacaPage(BasePage):
@@ -186,16 +187,16 @@ class PlacaPage(BasePage):
     SELECTOR_BTN_ARCHIVAR_SEGUNDO = "#o_2"
     SELECTOR_ESTUDIO_SEGURO = "#doc0"
 
-    def __init__(self, page: Page):
-        super().__init__(page, 'allianz')
+    def __init__(self, page: Page, client=None):
+        super().__init__(page, 'allianz', client)
         self.config = AllianzConfig()
-        self.fasecolda_page = FasecoldaPage(page)
+        self.fasecolda_page = FasecoldaPage(page, client)
 
     async def esperar_y_llenar_placa(self, placa: str = None) -> bool:
         """Espera el input de placa y lo llena."""
         # Usar el valor del config si no se proporciona uno específico
         if placa is None:
-            placa = ClientConfig.VEHICLE_PLATE
+            placa = self.client.VEHICLE_PLATE
             
         self.logger.info(f"📝 Esperando y llenando input de placa con '{placa}'...")
         # Pausa antes de llenar el campo
@@ -204,7 +205,8 @@ class PlacaPage(BasePage):
         result = await self.fill_in_frame(
             self.SELECTOR_INPUT_PLACA,
             placa,
-            "input de placa"
+            "input de placa",
+            operation='placa'
         )
         
         # Pausa después de llenar el campo
@@ -227,7 +229,7 @@ class PlacaPage(BasePage):
         self.logger.info("🖱️ Haciendo clic en botón 'Comprobar'...")
         if not await self.verificar_input_ready():
             return False
-        if not await self.click_in_frame(self.SELECTOR_BTN_COMPROBAR, "botón 'Comprobar'"):
+        if not await self.click_in_frame(self.SELECTOR_BTN_COMPROBAR, "botón 'Comprobar'", operation='comprobar_placa'):
             return False
         # Pausa breve para que se procese
         await self.page.wait_for_timeout(2000)
@@ -250,30 +252,28 @@ class PlacaPage(BasePage):
         NOTA: El valor asegurado se maneja en llenar_valor_asegurado_paso_final()
         """
         # CRÍTICO: Cargar datos de GUI antes de usar ClientConfig
-        ClientConfig._load_gui_overrides()
+        self.client._load_gui_overrides()
         
         if fecha_nacimiento is None:
-            fecha_nacimiento = ClientConfig.get_client_birth_date('allianz')
+            fecha_nacimiento = self.client.get_client_birth_date('allianz')
         if genero is None:
-            genero = ClientConfig.CLIENT_GENDER
+            genero = self.client.CLIENT_GENDER
         fecha_limpia = Utils.clean_date(fecha_nacimiento)
         self.logger.info(f"👤 Llenando datos del asegurado - Fecha: {fecha_limpia}, Género: {genero}")
         try:
-            # Llenar fecha de nacimiento
-            if not await self.fill_in_frame(
-                self.SELECTOR_FECHA_NACIMIENTO,
-                fecha_limpia,
-                "fecha de nacimiento"
-            ):
-                self.logger.error("❌ Error al llenar fecha de nacimiento")
-                return False
-            # Seleccionar género
-            if not await self.select_in_frame(
-                self.SELECTOR_GENERO,
-                genero,
-                "género"
+            # Esperar que el formulario del asegurado esté en el iframe antes del llenado por lote
+            await self._frame.locator(self.SELECTOR_FECHA_NACIMIENTO).wait_for(timeout=15000)
+
+            # Fecha de nacimiento y género en un solo evaluate dentro del iframe
+            if not await self.fill_fields_batch(
+                field_map={
+                    self.SELECTOR_FECHA_NACIMIENTO: fecha_limpia,
+                    self.SELECTOR_GENERO: genero,
+                },
+                description="datos del asegurado",
+                in_frame=True
             ):
-                self.logger.error("❌ Error al seleccionar género")
+                self.logger.error("❌ Error al llenar datos del asegurado")
                 return False
             
             return True
@@ -288,12 +288,12 @@ class PlacaPage(BasePage):
         """
         try:
             # Manejar valor asegurado según el estado del vehículo
-            vehicle_state = ClientConfig.get_vehicle_state()
+            vehicle_state = self.client.get_vehicle_state()
             self.logger.info(f"🔍 DEBUG - Estado del vehículo: {vehicle_state}")
             
             if vehicle_state == "Nuevo":
                 # Para vehículos nuevos: usar valor del ClientConfig y llenarlo
-                valor_asegurado = ClientConfig.get_vehicle_insured_value()
+                valor_asegurado = self.client.get_vehicle_insured_value()
                 self.logger.info(f"🔍 DEBUG - Valor asegurado obtenido: '{valor_asegurado}'")
                 
                 if valor_asegurado:
@@ -306,7 +306,7 @@ class PlacaPage(BasePage):
                     return False
             else:
                 # Para vehículos usados: verificar si ya hay valor manual, si no, extraer automáticamente
-                valor_actual = ClientConfig.VEHICLE_INSURED_VALUE
+                valor_actual = self.client.VEHICLE_INSURED_VALUE
                 if valor_actual and valor_actual.strip():
                     self.logger.info(f"💰 Usando valor asegurado ya configurado para vehículo usado: {valor_actual}")
                 else:
@@ -314,7 +314,7 @@ class PlacaPage(BasePage):
                     valor_prellenado = await self.get_valor_asegurado_from_iframe()
                     if valor_prellenado:
                         self.logger.info(f"💰 Valor asegurado extraído automáticamente para vehículo usado: {valor_prellenado}")
-                        ClientConfig.VEHICLE_INSURED_VALUE = valor_prellenado
+                        self.client.VEHICLE_INSURED_VALUE = valor_prellenado
                     else:
                         self.logger.warning("⚠️ No se pudo extraer valor asegurado para vehículo usado")
             
@@ -336,9 +336,9 @@ class PlacaPage(BasePage):
         """
         # Usar valores del config si no se proporcionan específicos
         if departamento is None:
-            departamento = ClientConfig.CLIENT_DEPARTMENT
+            departamento = self.client.CLIENT_DEPARTMENT
         if ciudad is None:
-            ciudad = ClientConfig.get_client_city('allianz')
+            ciudad = self.client.get_client_city('allianz')
             
         # Mapeo de departamentos comunes para normalizar nombres
         departamento_mapping = {
@@ -388,7 +388,8 @@ class PlacaPage(BasePage):
                 if await self.select_by_text_in_frame(
                     self.SELECTOR_DEPARTAMENTO,
                     dept_intento,
-                    f"departamento ({dept_intento})"
+                    "departamento",
+                    operation='departamento'
                 ):
                     self.logger.info(f"✅ Departamento seleccionado exitosamente: {dept_intento}")
                     departamento_seleccionado = True
@@ -406,7 +407,8 @@ class PlacaPage(BasePage):
             # Paso 2: Hacer clic en el botón de búsqueda
             if not await self.click_in_frame(
                 self.SELECTOR_BTN_BUSCAR_CIUDAD,
-                "botón de búsqueda de ciudad"
+                "botón de búsqueda de ciudad",
+                operation='buscar_ciudad'
             ):
                 self.logger.error("❌ Error al hacer clic en botón de búsqueda")
                 return False
@@ -415,7 +417,8 @@ class PlacaPage(BasePage):
             if not await self.fill_in_frame(
                 self.SELECTOR_INPUT_CIUDAD,
                 ciudad,
-                f"campo de ciudad ({ciudad})"
+                f"campo de ciudad ({ciudad})",
+                operation='ciudad'
             ):
                 self.logger.error("❌ Error al llenar campo de ciudad")
                 return False
@@ -426,7 +429,8 @@ class PlacaPage(BasePage):
             # Paso 4: Buscar y hacer clic en la ciudad en la lista desplegable
             if not await self.click_by_text_in_frame(
                 ciudad,
-                f"ciudad '{ciudad}' en la lista"
+                f"ciudad '{ciudad}' en la lista",
+                operation='ciudad_lista'
             ):
                 self.logger.error(f"❌ No se pudo encontrar la ciudad '{ciudad}' en la lista")
                 return False
@@ -468,7 +472,8 @@ class PlacaPage(BasePage):
             # Paso 1: Hacer clic en "Consultar Dto"
             if not await self.click_in_frame(
                 self.SELECTOR_BTN_CONSULTAR_DTO,
-                "botón 'Consultar Dto'"
+                "botón 'Consultar Dto'",
+                operation='consultar_dto'
             ):
                 self.logger.error("❌ Error al hacer clic en 'Consultar Dto'")
                 return False
@@ -489,11 +494,11 @@ class PlacaPage(BasePage):
                 return False
             
             # Paso 3: Clic en "Siguiente" (solo una vez si es vehículo nuevo)
-            from ....config.client_config import ClientConfig
-            if ClientConfig.VEHICLE_STATE.lower() == 'nuevo':
+            if self.client.VEHICLE_STATE.lower() == 'nuevo':
                 if not await self.click_in_frame(
                     self.SELECTOR_BTN_ACEPTAR,
-                    "botón 'Siguiente' (único clic para nuevo)"
+                    "botón 'Siguiente' (único clic para nuevo)",
+                    operation='siguiente'
                 ):
                     self.logger.error("❌ Error al hacer clic en 'Siguiente' (vehículo nuevo)")
                     return False
@@ -504,7 +509,8 @@ class PlacaPage(BasePage):
                 # Primer clic en Siguiente
                 if not await self.click_in_frame(
                     self.SELECTOR_BTN_ACEPTAR,
-                    "botón 'Siguiente' (primera vez)"
+                    "botón 'Siguiente' (primera vez)",
+                    operation='siguiente'
                 ):
                     self.logger.error("❌ Error al hacer clic en primer 'Siguiente'")
                     return False
@@ -513,7 +519,8 @@ class PlacaPage(BasePage):
                 # Segundo clic en Siguiente
                 if not await self.click_in_frame(
                     self.SELECTOR_BTN_ACEPTAR,
-                    "botón 'Siguiente' (segunda vez)"
+                    "botón 'Siguiente' (segunda vez)",
+                    operation='siguiente'
                 ):
                     self.logger.error("❌ Error al hacer clic en segundo 'Siguiente'")
                     return False
@@ -535,7 +542,8 @@ class PlacaPage(BasePage):
             # Paso 6: Hacer clic en el primer botón "Archivar"
             if not await self.click_in_frame(
                 self.SELECTOR_BTN_ARCHIVAR,
-                "primer botón 'Archivar'"
+                "primer botón 'Archivar'",
+                operation='archivar'
             ):
                 self.logger.error("❌ Error al hacer clic en primer botón 'Archivar'")
                 return False
@@ -557,7 +565,8 @@ class PlacaPage(BasePage):
             
             if not await self.click_in_frame(
                 self.SELECTOR_BTN_ARCHIVAR_SEGUNDO,
-                "segundo botón 'Archivar'"
+                "segundo botón 'Archivar'",
+                operation='archivar_segundo'
             ):
                 self.logger.error("❌ Error al hacer clic en segundo botón 'Archivar'")
                 return False
@@ -616,6 +625,13 @@ class PlacaPage(BasePage):
                 
                 if valid_values:
                     self.logger.info(f"✅ Extracción exitosa: {len(valid_values)}/4 valores obtenidos")
+                    from ....consolidation.cotizacion_consolidator import CotizacionConsolidator
+                    QuoteResults.record_plans('allianz', {
+                        'Autos Esencial': CotizacionConsolidator.format_allianz_prima(autos_esencial),
+                        'Autos Esencial + Totales': CotizacionConsolidator.format_allianz_prima(autos_esencial_totales),
+                        'Autos Plus': CotizacionConsolidator.format_allianz_prima(autos_plus),
+                        'Autos Llave en Mano': CotizacionConsolidator.format_allianz_prima(autos_llave)
+                    })
                 else:
                     self.logger.warning("⚠️ No se pudo extraer ningún valor de los planes de Allianz")
                     
@@ -635,14 +651,15 @@ class PlacaPage(BasePage):
                 return False
             if not await self.click_in_frame(
                 self.SELECTOR_ESTUDIO_SEGURO,
-                "enlace 'Estudio de Seguro'"
+                "enlace 'Estudio de Seguro'",
+                operation='estudio_seguro'
             ):
                 self.logger.error("❌ Error al hacer clic en 'Estudio de Seguro'")
                 return False
             
             # Paso 10: Descargar PDF directamente desde la URL
             self.logger.info("🌐 Detectando nueva pestaña con el PDF...")
-            nuevo_popup = await self.page.context.wait_for_event("page")
+            nuevo_popup = await self.page.wait_for_event("popup")
             await nuevo_popup.wait_for_load_state("networkidle")
 
             pdf_url = nuevo_popup.url
@@ -666,6 +683,8 @@ class PlacaPage(BasePage):
             with open(ruta, "wb") as f:
                 f.write(await response.body())
             self.logger.info(f"✅ PDF de Allianz guardado en {ruta}")
+            get_run_metrics().record_output('pdf', ruta, 'allianz')
+            QuoteResults.record_pdf('allianz', ruta)
 
             return True
             
@@ -768,8 +787,7 @@ class PlacaPage(BasePage):
                         self.logger.info(f"✅ ¡Marca disponible tras {intento} clic(s)! Opciones: {opciones_validas[:5]}...")
                         
                         # Si el vehículo es nuevo, llenar la placa con 'XXX123' en el mismo iframe
-                        from ....config.client_config import ClientConfig
-                        if ClientConfig.VEHICLE_STATE.lower() == 'nuevo':
+                        if self.client.VEHICLE_STATE.lower() == 'nuevo':
                             try:
                                 # Pausa antes de llenar la placa
                                 await self.page.wait_for_timeout(500)
@@ -817,7 +835,7 @@ class PlacaPage(BasePage):
     
     async def llenar_ano_modelo(self) -> bool:
         """Llena el año del modelo del vehículo dentro del iframe 'appArea'."""
-        ano_modelo = ClientConfig.VEHICLE_MODEL_YEAR
+        ano_modelo = self.client.VEHICLE_MODEL_YEAR
         self.logger.info(f"📅 Llenando año del modelo: {ano_modelo}")
         
         # Pausa antes de llenar el campo
@@ -853,10 +871,10 @@ class PlacaPage(BasePage):
         """Ejecuta el flujo completo desde placa hasta finalización en Allianz."""
         
         # CRÍTICO: Cargar datos de GUI antes de usar ClientConfig
-        ClientConfig._load_gui_overrides()
+        self.client._load_gui_overrides()
         
         # Decidir qué flujo usar según el estado del vehículo
-        if ClientConfig.VEHICLE_STATE == 'Nuevo':
+        if self.client.VEHICLE_STATE == 'Nuevo':
             self.logger.info("🆕 Vehículo NUEVO detectado - usando flujo con código FASECOLDA")
             return await self.execute_vehiculo_nuevo_flow(fecha_nacimiento, genero, departamento, ciudad)
         else:
@@ -867,15 +885,15 @@ class PlacaPage(BasePage):
         """Ejecuta el flujo para vehículos usados (flujo tradicional con placa)."""
         # Usar valores del config si no se proporcionan específicos
         if placa is None:
-            placa = ClientConfig.VEHICLE_PLATE
+            placa = self.client.VEHICLE_PLATE
         if fecha_nacimiento is None:
-            fecha_nacimiento = ClientConfig.get_client_birth_date('allianz')
+            fecha_nacimiento = self.client.get_client_birth_date('allianz')
         if genero is None:
-            genero = ClientConfig.CLIENT_GENDER
+            genero = self.client.CLIENT_GENDER
         if departamento is None:
-            departamento = ClientConfig.CLIENT_DEPARTMENT
+            departamento = self.client.CLIENT_DEPARTMENT
         if ciudad is None:
-            ciudad = ClientConfig.get_client_city('allianz')
+            ciudad = self.client.get_client_city('allianz')
             
         self.logger.info(f"🚗 Iniciando flujo de vehículo USADO con placa '{placa}', ciudad '{ciudad}'...")
         steps = [
@@ -902,13 +920,13 @@ class PlacaPage(BasePage):
         """Ejecuta el flujo para vehículos nuevos (con código FASECOLDA)."""
         # Usar valores del config si no se proporcionan específicos
         if fecha_nacimiento is None:
-            fecha_nacimiento = ClientConfig.get_client_birth_date('allianz')
+            fecha_nacimiento = self.client.get_client_birth_date('allianz')
         if genero is None:
-            genero = ClientConfig.CLIENT_GENDER
+            genero = self.client.CLIENT_GENDER
         if departamento is None:
-            departamento = ClientConfig.CLIENT_DEPARTMENT
+            departamento = self.client.CLIENT_DEPARTMENT
         if ciudad is None:
-            ciudad = ClientConfig.get_client_city('allianz')
+            ciudad = self.client.get_client_city('allianz')
             
         self.logger.info(f"🆕 Iniciando flujo de vehículo NUEVO con código FASECOLDA, ciudad '{ciudad}'...")
         steps = [
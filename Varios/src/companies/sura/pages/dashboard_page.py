@@ -65,8 +65,8 @@ class DashboardPage(BasePage):
     # Mensaje de error cuando no hay delegación seleccionada
     ERROR_MESSAGE_SELECTOR = 'div.content-snack-bar'
 
-    def __init__(self, page: Page):
-        super().__init__(page, 'sura')
+    def __init__(self, page: Page, client=None):
+        super().__init__(page, 'sura', client)
 
     async def _find_and_click(
         self,
@@ -115,8 +115,8 @@ class DashboardPage(BasePage):
                         # Esperar un poco para asegurar que el elemento esté completamente interactivo
                         await asyncio.sleep(1)
                         
-                        # Configurar el listener antes del clic
-                        new_page_promise = self.page.context.wait_for_event("page")
+                        # Configurar el listener antes del clic (popup de esta pestaña, no de todo el contexto)
+                        new_page_promise = self.page.wait_for_event("popup")
                         await self.safe_click(sel)
                         
                         # Esperar la nueva pestaña
@@ -249,9 +249,8 @@ class DashboardPage(BasePage):
         """Selecciona el tipo de documento usando Material Design dropdown."""
         # Si no se proporciona tipo de documento, usar la configuración del cliente
         if document_type is None:
-            from ....config.client_config import ClientConfig
-            ClientConfig._load_gui_overrides()
-            document_type = ClientConfig.CLIENT_DOCUMENT_TYPE_SURA
+            self.client._load_gui_overrides()
+            document_type = self.client.CLIENT_DOCUMENT_TYPE_SURA
         
         self.logger.info(f"📄 Seleccionando tipo de documento: {document_type}")
         
@@ -377,9 +376,8 @@ class DashboardPage(BasePage):
         """Ingresa el número de documento en el campo correspondiente."""
         # Si no se proporciona número de documento, usar la configuración del cliente
         if document_number is None:
-            from ....config.client_config import ClientConfig
-            ClientConfig._load_gui_overrides()
-            document_number = ClientConfig.CLIENT_DOCUMENT_NUMBER
+            self.client._load_gui_overrides()
+            document_number = self.client.CLIENT_DOCUMENT_NUMBER
         
         self.logger.info(f"📄 Ingresando número de documento: {document_number}")
         
@@ -425,13 +423,12 @@ class DashboardPage(BasePage):
     ) -> tuple[bool, Optional['Page']]:
         """Completa el flujo completo de navegación en Sura."""
         from playwright.async_api import Page
-        from ....config.client_config import ClientConfig
         
         # Cargar configuración del cliente desde GUI si no se especifican parámetros
         if document_number is None or document_type is None:
-            ClientConfig._load_gui_overrides()
-            document_number = document_number or ClientConfig.CLIENT_DOCUMENT_NUMBER
-            document_type = document_type or ClientConfig.CLIENT_DOCUMENT_TYPE_SURA
+            self.client._load_gui_overrides()
+            document_number = document_number or self.client.CLIENT_DOCUMENT_NUMBER
+            document_type = document_type or self.client.CLIENT_DOCUMENT_TYPE_SURA
         
         self.logger.info(f"🚀 Iniciando flujo completo de navegación Sura con documento: {document_number}")
         steps = [
@@ -1,16 +1,19 @@
 """Página de manejo de código Fasecolda específica para Sura"""
 
 import os
+import time
 import base64
 import asyncio
 from typing import Optional, Dict, List
 from playwright.async_api import Page
 from ....shared.base_page import BasePage
 from ....config.sura_config import SuraConfig
-from ....config.client_config import ClientConfig
 from ....shared.fasecolda_service import FasecoldaService
 from ....shared.fasecolda_extractor import get_global_fasecolda_codes
 from ....shared.utils import Utils
+from ....core.run_metrics import get_run_metrics
+from ....core.quote_results import QuoteResults
+from ....core.adaptive_timeouts import AdaptiveTimeouts
 
 class FasecoldaPage(BasePage):
     async def select_10_1_smlmv_in_dropdowns(self) -> bool:
@@ -184,8 +187,8 @@ class FasecoldaPage(BasePage):
             plate_selector = self.SELECTORS['form_fields']['plate']
             lupa_selector = "#placa + paper-icon-button, #placa ~ paper-icon-button, #placa img[src*='ico-buscar'], #placa .style-scope.iron-icon, #placa ~ * img[src*='ico-buscar']"
             # Llenar placa
-            await self.page.fill(plate_selector, ClientConfig.VEHICLE_PLATE)
-            self.logger.info(f"✅ Placa '{ClientConfig.VEHICLE_PLATE}' ingresada")
+            await self.page.fill(plate_selector, self.client.VEHICLE_PLATE)
+            self.logger.info(f"✅ Placa '{self.client.VEHICLE_PLATE}' ingresada")
             # Buscar y dar clic en la lupa
             lupa_clicked = False
             for sel in lupa_selector.split(","):
@@ -284,8 +287,8 @@ class FasecoldaPage(BasePage):
         'limite': "paper-item:has-text('3.040.000.000')"
     }
 
-    def __init__(self, page: Page):
-        super().__init__(page, 'sura')
+    def __init__(self, page: Page, client=None):
+        super().__init__(page, 'sura', client)
         self.config = SuraConfig()
 
     async def get_fasecolda_code(self) -> Optional[dict]:
@@ -294,23 +297,23 @@ class FasecoldaPage(BasePage):
         
         try:
             # Verificar si Fasecolda está habilitado globalmente
-            if not ClientConfig.is_fasecolda_enabled():
-                manual_codes = ClientConfig.get_manual_fasecolda_codes()
+            if not self.client.is_fasecolda_enabled():
+                manual_codes = self.client.get_manual_fasecolda_codes()
                 self.logger.info(f"📋 Fasecolda deshabilitado - usando códigos manuales - CF: {manual_codes['cf_code']}, CH: {manual_codes['ch_code']}")
                 return manual_codes
             
             # Verificar configuración específica de Sura
-            if not ClientConfig.should_use_fasecolda_for_company('sura'):
-                manual_codes = ClientConfig.get_manual_fasecolda_codes()
+            if not self.client.should_use_fasecolda_for_company('sura'):
+                manual_codes = self.client.get_manual_fasecolda_codes()
                 self.logger.info(f"⏭️ Búsqueda automática de Fasecolda deshabilitada para Sura - usando códigos manuales - CF: {manual_codes['cf_code']}, CH: {manual_codes['ch_code']}")
                 return manual_codes
             
-            if ClientConfig.VEHICLE_STATE != 'Nuevo':
-                self.logger.info(f"⏭️ Vehículo '{ClientConfig.VEHICLE_STATE}' - no requiere código Fasecolda")
+            if self.client.VEHICLE_STATE != 'Nuevo':
+                self.logger.info(f"⏭️ Vehículo '{self.client.VEHICLE_STATE}' - no requiere código Fasecolda")
                 return None
             
             # Obtener códigos del extractor global
-            codes = await get_global_fasecolda_codes(timeout=30)
+            codes = await get_global_fasecolda_codes(timeout=30, client=self.client)
             
             if codes and codes.get('cf_code'):
                 ch_info = f" - CH: {codes.get('ch_code')}" if codes.get('ch_code') else ""
@@ -318,13 +321,13 @@ class FasecoldaPage(BasePage):
                 return codes
             else:
                 # Fallback: usar códigos manuales cuando la búsqueda automática falla
-                manual_codes = ClientConfig.get_manual_fasecolda_codes()
+                manual_codes = self.client.get_manual_fasecolda_codes()
                 self.logger.warning(f"⚠️ No se pudieron obtener códigos Fasecolda del extractor global - usando códigos manuales como fallback - CF: {manual_codes['cf_code']}, CH: {manual_codes['ch_code']}")
                 return manual_codes
                 
         except Exception as e:
             # Fallback: usar códigos manuales cuando hay errores
-            manual_codes = ClientConfig.get_manual_fasecolda_codes()
+            manual_codes = self.client.get_manual_fasecolda_codes()
             self.logger.error(f"❌ Error obteniendo códigos Fasecolda: {e} - usando códigos manuales como fallback - CF: {manual_codes['cf_code']}, CH: {manual_codes['ch_code']}")
             return manual_codes
 
@@ -474,8 +477,8 @@ class FasecoldaPage(BasePage):
             },
             'model_year': {
                 'dropdown': self.SELECTORS['dropdowns']['model_year'],
-                'option': self.OPTIONS['model_year_template'].format(year=ClientConfig.VEHICLE_MODEL_YEAR),
-                'description': f"año del modelo: {ClientConfig.VEHICLE_MODEL_YEAR}"
+                'option': self.OPTIONS['model_year_template'].format(year=self.client.VEHICLE_MODEL_YEAR),
+                'description': f"año del modelo: {self.client.VEHICLE_MODEL_YEAR}"
             },
             'service_type': {
                 'dropdown': self.SELECTORS['dropdowns']['service_type'],
@@ -517,7 +520,7 @@ class FasecoldaPage(BasePage):
 
     async def fill_city(self) -> bool:
         """Llena el campo de ciudad y selecciona la opción correspondiente."""
-        client_city = ClientConfig.get_client_city('sura')
+        client_city = self.client.get_client_city('sura')
         self.logger.info(f"🏙️ Llenando ciudad: {client_city}...")
         
         try:
@@ -571,16 +574,16 @@ class FasecoldaPage(BasePage):
             bool: True si se llenó exitosamente, False en caso contrario
         """
         if valor is None:
-            valor = ClientConfig.get_vehicle_insured_value()
+            valor = self.client.get_vehicle_insured_value()
             
         # Debug logging
-        vehicle_state = ClientConfig.get_vehicle_state()
+        vehicle_state = self.client.get_vehicle_state()
         self.logger.info(f"🔍 DEBUG - Estado del vehículo: {vehicle_state}")
         self.logger.info(f"🔍 DEBUG - Valor asegurado obtenido: '{valor}'")
         
         if not valor:
             # Para vehículos nuevos, el valor es obligatorio
-            if ClientConfig.get_vehicle_state() == "Nuevo":
+            if self.client.get_vehicle_state() == "Nuevo":
                 self.logger.error("❌ Valor asegurado es obligatorio para vehículos nuevos")
                 return False
             else:
@@ -769,12 +772,28 @@ class FasecoldaPage(BasePage):
         
         return True
 
-    async def extract_prima_anual_value(self, max_wait_seconds: int = 20) -> Optional[float]:
-        """Extrae el valor numérico de la prima anual esperando hasta que aparezca."""
-        self.logger.info(f"💰 Esperando y extrayendo valor de prima anual (máximo {max_wait_seconds} segundos)...")
+    async def extract_prima_anual_value(self, max_wait_seconds: Optional[float] = None) -> Optional[float]:
+        """
+        Extrae el valor numérico de la prima anual esperando hasta que aparezca.
+
+        Sin max_wait_seconds se espera lo aprendido de cotizaciones anteriores (20s sin historial),
+        y el sondeo se acorta cuando la prima suele aparecer rápido. Con max_wait_seconds
+        explícito la espera no se registra.
+        """
+        operation = 'prima_anual'
+        default_ms = 20000
+        learn = max_wait_seconds is None
+        if learn:
+            max_wait_seconds = AdaptiveTimeouts.timeout_ms(self.company, operation, default_ms) / 1000
+        poll_ms = int(AdaptiveTimeouts.poll_interval(self.company, operation, 1.0) * 1000)
+        self.logger.info(f"💰 Esperando y extrayendo valor de prima anual (máximo {max_wait_seconds:g} segundos)...")
         
         try:
-            for attempt in range(max_wait_seconds):
+            started = time.perf_counter()
+            detected = False
+            attempt = 0
+            while time.perf_counter() - started < max_wait_seconds:
+                attempt += 1
                 try:
                     element = await self.page.query_selector(self.SELECTORS['plans']['prima_anual'])
                     if element:
@@ -788,7 +807,12 @@ class FasecoldaPage(BasePage):
                             # Obtener valor inicial
                             initial_numbers = re.sub(r'[^\d]', '', text_content)
                             if not initial_numbers:
+                                await self.page.wait_for_timeout(poll_ms)
                                 continue
+                            if not detected:
+                                detected = True
+                                if learn:
+                                    AdaptiveTimeouts.observe(self.company, operation, time.perf_counter() - started)
                             
                             stable_value = None
                             
@@ -824,12 +848,14 @@ class FasecoldaPage(BasePage):
                             else:
                                 self.logger.warning("⚠️ No se pudo estabilizar el valor de prima anual")
                     
-                    await self.page.wait_for_timeout(1000)
+                    await self.page.wait_for_timeout(poll_ms)
                     
                 except Exception as e:
-                    self.logger.debug(f"Intento {attempt + 1} fallido: {e}")
-                    await self.page.wait_for_timeout(1000)
+                    self.logger.debug(f"Intento {attempt} fallido: {e}")
+                    await self.page.wait_for_timeout(poll_ms)
             
+            if not detected and learn:
+                AdaptiveTimeouts.observe_timeout(self.company, operation, max_wait_seconds * 1000, default_ms)
             self.logger.warning("⚠️ No se pudo extraer el valor de prima anual después de esperar")
             return None
             
@@ -1123,7 +1149,7 @@ class FasecoldaPage(BasePage):
                     await self._handle_optional_pdf_modal()
                     await asyncio.sleep(1)
                 
-                async with self.page.context.expect_page(timeout=5000) as new_page_info:
+                async with self.page.expect_popup(timeout=5000) as new_page_info:
                     if not await self.safe_click(self.SELECTORS['actions']['pdf_download'], timeout=10000):
                         self.logger.error("❌ No se pudo hacer clic en el botón de descarga PDF")
                         return False
@@ -1147,7 +1173,7 @@ class FasecoldaPage(BasePage):
                         await self._handle_optional_pdf_modal()
                         await asyncio.sleep(1)
                     
-                    async with self.page.context.expect_page(timeout=5000) as new_page_info_retry:
+                    async with self.page.expect_popup(timeout=5000) as new_page_info_retry:
                         if not await self.safe_click(self.SELECTORS['actions']['pdf_download'], timeout=10000):
                             self.logger.error("❌ No se pudo hacer clic en el botón de descarga PDF en segundo intento")
                             return False
@@ -1214,6 +1240,8 @@ class FasecoldaPage(BasePage):
                     with open(ruta, 'wb') as f:
                         f.write(pdf_bytes)
                     self.logger.info(f"✅ PDF guardado en: {ruta} ({len(pdf_bytes)} bytes)")
+                    get_run_metrics().record_output('pdf', ruta, 'sura')
+                    QuoteResults.record_pdf('sura', ruta)
                     return True
                 else:
                     self.logger.error(f"❌ Error en conversión blob: {blob_data}")
@@ -1250,7 +1278,7 @@ class FasecoldaPage(BasePage):
         try:
             # 1. Extraer prima "Global Franquicia" (la primera que aparece por defecto)
             self.logger.info("📊 Extrayendo prima 'Global Franquicia' (prima anual inicial)...")
-            prima_global_franquicia = await self.extract_prima_anual_value(max_wait_seconds=20)
+            prima_global_franquicia = await self.extract_prima_anual_value()
             if prima_global_franquicia is None:
                 self.logger.error("❌ No se pudo extraer la prima 'Global Franquicia'")
                 return results
@@ -1265,7 +1293,7 @@ class FasecoldaPage(BasePage):
                 
             # Esperar y extraer prima "Autos Global" tras los cambios de desplegables
             self.logger.info("📊 Extrayendo prima 'Autos Global' tras seleccionar 1 SMLMV...")
-            prima_autos_global = await self.extract_prima_anual_value(max_wait_seconds=20)
+            prima_autos_global = await self.extract_prima_anual_value()
             results['autos_global'] = prima_autos_global
             if prima_autos_global:
                 self.logger.info(f"✅ Prima Autos Global: ${prima_autos_global:,.0f}")
@@ -1284,7 +1312,7 @@ class FasecoldaPage(BasePage):
             
             # Extraer prima "Autos Clásico"
             self.logger.info("📊 Extrayendo prima 'Autos Clásico'...")
-            prima_autos_clasico = await self.extract_prima_anual_value(max_wait_seconds=20)
+            prima_autos_clasico = await self.extract_prima_anual_value()
             results['autos_clasico'] = prima_autos_clasico
             if prima_autos_clasico is None:
                 self.logger.error("❌ No se pudo extraer la prima 'Autos Clásico'")
@@ -1318,7 +1346,7 @@ class FasecoldaPage(BasePage):
         }
         try:
             # Para usados, NO volver a llenar la placa (ya se hizo en el flujo especial)
-            if ClientConfig.VEHICLE_STATE == 'Usado':
+            if self.client.VEHICLE_STATE == 'Usado':
                 vehicle_steps = [
                     (self._select_dropdown_option, ['service_type'], "tipo de servicio"),
                     (self.fill_city, [], "ciudad"),  # CIUDAD PRIMERO en usados
@@ -1363,7 +1391,7 @@ class FasecoldaPage(BasePage):
             'pdf_downloaded': False
         }
         try:
-            if ClientConfig.VEHICLE_STATE == 'Usado':
+            if self.client.VEHICLE_STATE == 'Usado':
                 self.logger.info("🚗 Vehículo USADO: solo se ingresa placa y lupa, sin fasecolda/modelo/clase...")
                 if not await self.process_used_vehicle_plate():
                     self.logger.error("❌ No se pudo completar el flujo de placa usada")
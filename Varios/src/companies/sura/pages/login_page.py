@@ -3,7 +3,6 @@
 from playwright.async_api import Page
 from ....shared.base_page import BasePage
 from ....config.sura_config import SuraConfig
-from ....config.client_config import ClientConfig
 from ....core.constants import Constants
 
 class LoginPage(BasePage):
@@ -52,8 +51,8 @@ class LoginPage(BasePage):
     }
     """
 
-    def __init__(self, page: Page):
-        super().__init__(page, 'sura')
+    def __init__(self, page: Page, client=None):
+        super().__init__(page, 'sura', client)
         self.config = SuraConfig()    
         
     # ────────────────────────────────────────────────
@@ -116,7 +115,7 @@ class LoginPage(BasePage):
 
     async def select_tipo_documento(self, tipo: str = None) -> bool:
         """Selecciona el tipo de documento con reintentos automáticos."""
-        tipo_doc = tipo or ClientConfig.SURA_LOGIN_DOCUMENT_TYPE
+        tipo_doc = tipo or self.client.SURA_LOGIN_DOCUMENT_TYPE
         self.logger.info(f"📋 Seleccionando tipo de documento: {tipo_doc}")
         max_intentos = 3  # Reducido de 5 a 3
 
@@ -5,7 +5,6 @@ from typing import Optional
 from playwright.async_api import Page
 from ....shared.base_page import BasePage
 from ....config.sura_config import SuraConfig
-from ....config.client_config import ClientConfig
 from ....shared.utils import Utils
 
 class PolicyPage(BasePage):
@@ -28,8 +27,8 @@ class PolicyPage(BasePage):
     PLAN_SELECTOR_TEMPLATE = "div.nombre-plan:has-text('{plan_name}')"  # Selector correcto basado en HTML real
     VIGENCIA_FECHA_INPUT = "input[aria-labelledby='paper-input-label-27']"  # Selector específico para fecha de vigencia
 
-    def __init__(self, page: Page):
-        super().__init__(page, 'sura')
+    def __init__(self, page: Page, client=None):
+        super().__init__(page, 'sura', client)
         self.config = SuraConfig()
 
     async def wait_for_page_ready(self) -> bool:
@@ -78,7 +77,7 @@ class PolicyPage(BasePage):
         self.logger.info("📋 Llenando datos de póliza...")
         
         # CRÍTICO: Cargar datos de GUI antes de usar ClientConfig en policy
-        ClientConfig._load_gui_overrides()
+        self.client._load_gui_overrides()
         
         try:
             # Generar fecha actual y limpiarla
@@ -86,29 +85,23 @@ class PolicyPage(BasePage):
             fecha_formateada = today.strftime("%d/%m/%Y")
             fecha_limpia = Utils.clean_date(fecha_formateada)
             
-            self.logger.info(f"📄 Póliza: {ClientConfig.get_policy_number('sura')}")
+            self.logger.info(f"📄 Póliza: {self.client.get_policy_number('sura')}")
             self.logger.info(f"📅 Fecha: {fecha_formateada} -> {fecha_limpia}")
             
             # Llenar ambos campos usando la función base
             field_map = {
-                self.POLIZA_INPUT: ClientConfig.get_policy_number('sura'),
+                self.POLIZA_INPUT: self.client.get_policy_number('sura'),
                 self.FECHA_INPUT: fecha_limpia
             }
             
-            # Usar fill_multiple_fields de la clase base
-            if not await self.fill_multiple_fields(
+            # Llenado y verificación en lote (la fecha se valida en formato flexible)
+            if not await self.fill_fields_batch(
                 field_map=field_map,
-                description="datos de póliza",
-                timeout=5000,
-                delay_between_fields=0.5
+                description="datos de póliza"
             ):
                 self.logger.error("❌ No se pudieron llenar los campos de póliza")
                 return False
             
-            # Verificar que los valores se establecieron correctamente
-            if not await self._verify_policy_fields(fecha_limpia):
-                self.logger.warning("⚠️ Verificación de campos falló, pero continuando...")
-            
             self.logger.info("✅ Campos de póliza llenados correctamente")
             return True
             
@@ -116,28 +109,6 @@ class PolicyPage(BasePage):
             self.logger.error(f"❌ Error llenando datos de póliza: {e}")
             return False
 
-    async def _verify_policy_fields(self, expected_date: str) -> bool:
-        """Verifica que los campos de póliza se llenaron correctamente."""
-        try:
-            # Verificar campo de póliza
-            poliza_value = await self.page.input_value(self.POLIZA_INPUT)
-            if poliza_value != ClientConfig.get_policy_number('sura'):
-                self.logger.warning(f"⚠️ Póliza - Esperado: '{ClientConfig.get_policy_number('sura')}', Actual: '{poliza_value}'")
-                return False
-            
-            # Verificar campo de fecha (con validación flexible)
-            fecha_value = await self.page.input_value(self.FECHA_INPUT)
-            if not self._validate_date_field(expected_date, fecha_value):
-                self.logger.warning(f"⚠️ Fecha - Esperado: '{expected_date}', Actual: '{fecha_value}'")
-                return False
-            
-            self.logger.info("✅ Verificación de campos exitosa")
-            return True
-            
-        except Exception as e:
-            self.logger.error(f"❌ Error verificando campos: {e}")
-            return False
-
     def _validate_date_field(self, expected: str, actual: str) -> bool:
         """Valida campos de fecha con múltiples formatos aceptados."""
         # Usar la función de validación de la clase base
@@ -269,7 +240,7 @@ class PolicyPage(BasePage):
                 return False
             
             # 2. Seleccionar el plan configurado (por defecto "Plan Autos Global")
-            selected_plan = ClientConfig.get_company_specific_config('sura').get('selected_plan', 'Plan Autos Global')
+            selected_plan = self.client.get_company_specific_config('sura').get('selected_plan', 'Plan Autos Global')
             if not await self.select_plan(selected_plan):
                 self.logger.error(f"❌ No se pudo seleccionar el plan: {selected_plan}")
                 return False
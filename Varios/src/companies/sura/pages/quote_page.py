@@ -3,7 +3,6 @@
 from playwright.async_api import Page
 from ....shared.base_page import BasePage
 from ....config.sura_config import SuraConfig
-from ....config.client_config import ClientConfig
 
 class QuotePage(BasePage):
     """Página de cotización para Sura."""
@@ -25,8 +24,8 @@ class QuotePage(BasePage):
     
     CONTINUAR_BUTTON       = "button:has-text('Continuar')"
 
-    def __init__(self, page: Page):
-        super().__init__(page, 'sura')
+    def __init__(self, page: Page, client=None):
+        super().__init__(page, 'sura', client)
         self.config = SuraConfig()
 
     async def wait_for_page_ready(self) -> bool:
@@ -66,13 +65,13 @@ class QuotePage(BasePage):
         self.logger.info("🔍 Verificando datos...")
         
         # CRÍTICO: Cargar datos de GUI antes de usar ClientConfig en verificación
-        ClientConfig._load_gui_overrides()
+        self.client._load_gui_overrides()
         
         try:
             expected_data = {
-                "Nombre": ClientConfig.CLIENT_FIRST_NAME,
-                "Apellido": ClientConfig.CLIENT_FIRST_LASTNAME,
-                "Documento": ClientConfig.CLIENT_DOCUMENT_NUMBER,
+                "Nombre": self.client.CLIENT_FIRST_NAME,
+                "Apellido": self.client.CLIENT_FIRST_LASTNAME,
+                "Documento": self.client.CLIENT_DOCUMENT_NUMBER,
             }
             self.logger.info("📋 COMPARACIÓN CONFIG vs PÁGINA:")
             self.logger.info("=" * 50)            
@@ -100,7 +99,7 @@ class QuotePage(BasePage):
 
             # Verificar sexo
             try:
-                expected_gender = ClientConfig.CLIENT_GENDER.upper()  # 'M' o 'F'
+                expected_gender = self.client.CLIENT_GENDER.upper()  # 'M' o 'F'
                 # Apuntamos al input interno de cada mat-radio-button
                 masc_input = f"{self.SEXO_MASCULINO} input[type='radio']"
                 fem_input  = f"{self.SEXO_FEMENINO} input[type='radio']"
@@ -129,7 +128,7 @@ class QuotePage(BasePage):
         self.logger.info("🚀 Procesando página de cotización...")
         
         # CRÍTICO: Cargar datos de GUI antes de usar ClientConfig
-        ClientConfig._load_gui_overrides()
+        self.client._load_gui_overrides()
         
         try:
             # 1. Verificar que la página esté lista
@@ -174,7 +173,7 @@ class QuotePage(BasePage):
         """Selecciona la ocupación del cliente desde el config."""
         self.logger.info("👔 Verificando y seleccionando ocupación...")
         try:
-            ocupacion_esperada = ClientConfig.CLIENT_OCCUPATION
+            ocupacion_esperada = self.client.CLIENT_OCCUPATION
             self.logger.info(f"📋 Ocupación esperada desde config: {ocupacion_esperada}")
             
             # Buscar específicamente el mat-select de ocupación
@@ -294,21 +293,21 @@ class QuotePage(BasePage):
         self.logger.info("🏠 Llenando dirección...")
         
         # CRÍTICO: Cargar datos de GUI antes de usar ClientConfig en dirección
-        ClientConfig._load_gui_overrides()
+        self.client._load_gui_overrides()
         
         try:
             # Corregir los selectores para evitar errores de sintaxis
             field_map = {
-                self.DIRECCION_TRABAJO_INPUT: ClientConfig.CLIENT_ADDRESS,
-                self.TELEFONO_TRABAJO_INPUT: ClientConfig.CLIENT_PHONE_WORK,
-                self.CIUDAD_TRABAJO_INPUT: ClientConfig.get_client_city('sura'),
+                self.DIRECCION_TRABAJO_INPUT: self.client.CLIENT_ADDRESS,
+                self.TELEFONO_TRABAJO_INPUT: self.client.CLIENT_PHONE_WORK,
+                self.CIUDAD_TRABAJO_INPUT: self.client.get_client_city('sura'),
             }
             
-            success = await self.fill_multiple_fields(
+            # Sin blur para que el autocompletado de ciudad quede abierto
+            success = await self.fill_fields_batch(
                 field_map=field_map,
                 description="datos de dirección",
-                timeout=5000,
-                delay_between_fields=0.3
+                dispatch_blur=False
             )
             
             if success:
@@ -318,7 +317,7 @@ class QuotePage(BasePage):
                 except:
                     pass
                 
-                self.logger.info(f"✅ Dirección llenada: {ClientConfig.CLIENT_ADDRESS}, {ClientConfig.CLIENT_PHONE_WORK}, {ClientConfig.get_client_city('sura')}")
+                self.logger.info(f"✅ Dirección llenada: {self.client.CLIENT_ADDRESS}, {self.client.CLIENT_PHONE_WORK}, {self.client.get_client_city('sura')}")
             
             return success
         except Exception as e:
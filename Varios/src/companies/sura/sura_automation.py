@@ -3,8 +3,10 @@
 import asyncio
 import os
 from typing import Optional
+from playwright.async_api import Page
 
 from ...core.base_automation import BaseAutomation
+from ...core.flow_runner import FlowStep
 from ...config.sura_config import SuraConfig
 from ...shared.global_pause_coordinator import wait_for_global_resume
 from .pages import LoginPage, DashboardPage, QuotePage, PolicyPage, FasecoldaPage
@@ -124,13 +126,13 @@ class SuraAutomation(BaseAutomation):
         self.logger.error(f"❌ Navegación falló después de {max_intentos} intentos")
         return False
 
-    async def execute_quote_flow(self) -> bool:
-        """Ejecuta el flujo de cotización específico de Sura."""
+    async def execute_quote_flow(self, page: Optional[Page] = None, client=None) -> bool:
+        """Ejecuta el flujo de cotización específico de Sura (en `page` con los datos de `client`, o en la página principal)."""
         self.logger.info("💰 Ejecutando flujo de cotización Sura...")
         
         try:
             self.logger.info("📊 Procesando página de cotización...")
-            quote_page = QuotePage(self.page)
+            quote_page = QuotePage(page or self.page, client)
             
             if not await quote_page.process_quote_page():
                 self.logger.error("❌ Error procesando página de cotización")
@@ -143,14 +145,15 @@ class SuraAutomation(BaseAutomation):
             self.logger.exception(f"❌ Error ejecutando cotización Sura: {e}")
             return False
 
-    async def execute_policy_flow(self) -> bool:
-        """Ejecuta el flujo de consulta de póliza específico de Sura."""
+    async def execute_policy_flow(self, page: Optional[Page] = None, client=None) -> bool:
+        """Ejecuta el flujo de consulta de póliza específico de Sura (en `page` con los datos de `client`, o en la página principal)."""
         self.logger.info("📄 Ejecutando flujo completo de Sura...")
+        page = page or self.page
         
         try:
             # 1. Procesar página de póliza hasta fecha de vigencia
             self.logger.info("🔍 Procesando página de consulta de póliza...")
-            policy_page = PolicyPage(self.page)
+            policy_page = PolicyPage(page, client)
             
             if not await policy_page.process_policy_page():
                 self.logger.error("❌ Error procesando página de consulta de póliza")
@@ -158,7 +161,7 @@ class SuraAutomation(BaseAutomation):
             
             # 2. Procesar código Fasecolda y extraer primas
             self.logger.info("🔍 Procesando código Fasecolda, extrayendo primas y descargando PDF...")
-            fasecolda_page = FasecoldaPage(self.page)
+            fasecolda_page = FasecoldaPage(page, client)
             
             results = await fasecolda_page.process_fasecolda_filling()
             
@@ -176,6 +179,22 @@ class SuraAutomation(BaseAutomation):
                 if autos_clasico:
                     self.logger.info(f"   📈 Autos Clásico: ${autos_clasico:,.0f}")
                 
+                from ...core.quote_results import QuoteResults
+                from ...consolidation.cotizacion_consolidator import CotizacionConsolidator
+                QuoteResults.record_plans('sura', {
+                    'Global Franquicia': CotizacionConsolidator.format_sura_prima(global_franquicia),
+                    'Autos Global': CotizacionConsolidator.format_sura_prima(autos_global),
+                    'Autos Clásico': CotizacionConsolidator.format_sura_prima(autos_clasico)
+                })
+                
+                if self.flow:
+                    self.flow.record(
+                        global_franquicia=global_franquicia,
+                        autos_global=autos_global,
+                        autos_clasico=autos_clasico,
+                        pdf_downloaded=results.get('pdf_downloaded', False)
+                    )
+                
                 if results.get('pdf_downloaded', False):
                     self.logger.info("📥 PDF descargado exitosamente")
                 else:
@@ -191,44 +210,64 @@ class SuraAutomation(BaseAutomation):
             self.logger.exception(f"❌ Error ejecutando flujo completo de Sura: {e}")
             return False
 
+    async def execute_quote_in_page(self, page: Page, client) -> bool:
+        """Cotiza el cliente `client` en una pestaña del contexto autenticado."""
+        # Reutiliza la sesión del contexto: el login detecta la sesión activa y se omite
+        await wait_for_global_resume('sura')
+        if not await LoginPage(page, client).login(self.usuario, self.contrasena):
+            self.logger.error("❌ La pestaña no pudo reutilizar la sesión de Sura")
+            return False
+        
+        await wait_for_global_resume('sura')
+        success, quote_tab = await DashboardPage(page, client).complete_navigation_flow()
+        if not success or not quote_tab:
+            self.logger.error("❌ Error en la navegación de la pestaña")
+            return False
+        
+        try:
+            await wait_for_global_resume('sura')
+            if not await self.execute_quote_flow(quote_tab, client):
+                return False
+            
+            await wait_for_global_resume('sura')
+            return await self.execute_policy_flow(quote_tab, client)
+        finally:
+            # El cotizador se abre en una pestaña propia; cerrarla libera memoria para la siguiente
+            if quote_tab is not page:
+                try:
+                    await quote_tab.close()
+                except Exception:
+                    pass
+
+    async def _navigation_step(self) -> bool:
+        """Paso de navegación; al reanudar cierra la pestaña de cotización anterior y vuelve al dashboard."""
+        if self.dashboard_page and self.page is not self.dashboard_page.page:
+            try:
+                await self.page.close()
+            except Exception:
+                pass
+            self.page = self.dashboard_page.page
+        return await self.execute_navigation_flow()
+
     async def run_complete_flow(self) -> bool:
-        """Ejecuta el flujo completo de automatización de Sura con soporte de pausas globales."""
+        """Ejecuta el flujo completo de automatización de Sura por pasos reanudables."""
         self.logger.info("🚀 Iniciando flujo completo de Sura...")
         
         # CRÍTICO: Cargar datos de GUI al inicio del flujo completo
         from ...config.client_config import ClientConfig
         ClientConfig._load_gui_overrides()
         
+        # Un fallo tardío reanuda desde la navegación (sesión ya iniciada), no desde el login
+        steps = [
+            FlowStep('login', self.execute_login_flow),
+            FlowStep('navegacion', self._navigation_step, max_attempts=2),
+            FlowStep('cotizacion', self.execute_quote_flow, max_attempts=2, restart_from='navegacion'),
+            FlowStep('poliza', self.execute_policy_flow, max_attempts=3, restart_from='navegacion', persistent=True)
+        ]
+        
         try:
-            # Verificar pausa global antes de iniciar
-            await wait_for_global_resume('sura')
-            
-            # 1. Ejecutar login
-            self.logger.info("🔐 Iniciando flujo de login...")
-            await wait_for_global_resume('sura')
-            if not await self.execute_login_flow():
-                self.logger.error("❌ Error en el flujo de login")
-                return False
-            
-            # 2. Ejecutar navegación
-            self.logger.info("🧭 Iniciando flujo de navegación...")
-            await wait_for_global_resume('sura')
-            if not await self.execute_navigation_flow():
-                self.logger.error("❌ Error en el flujo de navegación")
-                return False
-            
-            # 3. Ejecutar cotización
-            self.logger.info("💰 Iniciando flujo de cotización...")
-            await wait_for_global_resume('sura')
-            if not await self.execute_quote_flow():
-                self.logger.error("❌ Error en el flujo de cotización")
-                return False
-            
-            # 4. Ejecutar consulta de póliza
-            self.logger.info("📋 Iniciando flujo de consulta de póliza...")
-            await wait_for_global_resume('sura')
-            if not await self.execute_policy_flow():
-                self.logger.error("❌ Error en el flujo de consulta de póliza")
+            if not await self.run_steps(steps):
+                self.logger.error("❌ El flujo de Sura no se pudo completar")
                 return False
             
             self.logger.info("🎉 ¡Flujo completo de Sura completado exitosamente!")
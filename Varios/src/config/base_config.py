@@ -15,11 +15,59 @@ class BaseConfig:
     MINIMIZED: bool = os.getenv('MINIMIZED', 'True').lower() == 'true'
     TIMEOUT: int = int(os.getenv('TIMEOUT', '30000'))
     
+    # Modo servidor: headless real (se activa solo en Linux sin pantalla)
+    SERVER_MODE: bool = os.getenv('SERVER_MODE', 'False').lower() == 'true'
+    # Compañías que requieren navegador con cabeza en modo servidor (usan Xvfb)
+    HEADFUL_COMPANIES: list = [c.strip().lower() for c in os.getenv('HEADFUL_COMPANIES', '').split(',') if c.strip()]
+    # UA fijo para headless (vacío = el del Chromium instalado sin "HeadlessChrome")
+    HEADLESS_USER_AGENT: str = os.getenv('HEADLESS_USER_AGENT', '')
+    
     # Directorio base del proyecto (subir 4 niveles: config -> src -> Varios -> raíz)
     BASE_DIR: str = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
     # Directorios
     DOWNLOADS_DIR: str = os.path.join(BASE_DIR, 'Descargas')
     LOGS_DIR: str = os.path.join(BASE_DIR, 'Varios', 'LOGS')
+    CHECKPOINTS_DIR: str = os.path.join(BASE_DIR, 'Varios', 'checkpoints')
+    # Datos aprendidos/cacheados entre ejecuciones (no versionados)
+    CACHE_DIR: str = os.path.join(BASE_DIR, 'Varios', 'cache')
+    
+    # Reintentos por paso y circuit breaker por aseguradora
+    FLOW_BACKOFF_BASE: float = float(os.getenv('FLOW_BACKOFF_BASE', '2'))
+    FLOW_BACKOFF_MAX: float = float(os.getenv('FLOW_BACKOFF_MAX', '30'))
+    CIRCUIT_BREAKER_THRESHOLD: int = int(os.getenv('CIRCUIT_BREAKER_THRESHOLD', '4'))
+    CIRCUIT_BREAKER_COOLDOWN: int = int(os.getenv('CIRCUIT_BREAKER_COOLDOWN', '120'))
+    # Vigencia de un checkpoint para reanudar el mismo cliente
+    CHECKPOINT_TTL_MINUTES: int = int(os.getenv('CHECKPOINT_TTL_MINUTES', '30'))
+    
+    # Planificador de la ejecución paralela (0 = sin límite de compañías / presupuesto = mitad de la RAM)
+    MAX_PARALLEL_AUTOMATIONS: int = int(os.getenv('MAX_PARALLEL_AUTOMATIONS', '0'))
+    SCHEDULER_MEMORY_BUDGET_MB: int = int(os.getenv('SCHEDULER_MEMORY_BUDGET_MB', '0'))
+    # Memoria libre mínima del equipo y CPU máxima de nuestros navegadores para admitir otra compañía
+    SCHEDULER_MIN_FREE_MB: int = int(os.getenv('SCHEDULER_MIN_FREE_MB', '1024'))
+    SCHEDULER_MAX_CPU_PERCENT: float = float(os.getenv('SCHEDULER_MAX_CPU_PERCENT', '85'))
+    
+    # Prefetch de FASECOLDA desde el editor de clientes (segundos sin cambios antes de buscar)
+    FASECOLDA_PREFETCH: bool = os.getenv('FASECOLDA_PREFETCH', 'True').lower() == 'true'
+    FASECOLDA_PREFETCH_DEBOUNCE: float = float(os.getenv('FASECOLDA_PREFETCH_DEBOUNCE', '1.5'))
+    # Vigencia de las opciones FASECOLDA guardadas (la tabla se actualiza mensualmente)
+    FASECOLDA_CANDIDATES_TTL_HOURS: int = int(os.getenv('FASECOLDA_CANDIDATES_TTL_HOURS', '24'))
+    # Confianza mínima para elegir la opción FASECOLDA sin preguntar (0 = desactivado)
+    FASECOLDA_MIN_CONFIDENCE: float = float(os.getenv('FASECOLDA_MIN_CONFIDENCE', '0.85'))
+    # Ejecución desatendida: con poca confianza se usa la mejor opción y se deja para revisión
+    FASECOLDA_UNATTENDED: bool = os.getenv('FASECOLDA_UNATTENDED', 'False').lower() == 'true'
+    # Reutilizar la opción FASECOLDA que una persona ya eligió para el mismo vehículo
+    FASECOLDA_LEARNED_MAPPINGS: bool = os.getenv('FASECOLDA_LEARNED_MAPPINGS', 'True').lower() == 'true'
+    
+    # Escritura de los consolidados: 'patch' edita solo las celdas dentro del xlsx, 'openpyxl' carga el libro completo
+    EXCEL_BACKEND: str = os.getenv('EXCEL_BACKEND', 'patch').strip().lower()
+    
+    # Endpoint local de métricas en vivo (http://127.0.0.1:<puerto>/, 0 = desactivado)
+    METRICS_PORT: int = int(os.getenv('METRICS_PORT', '9464'))
+    
+    # Timeouts aprendidos de las latencias observadas: percentil × margen, entre piso y techo del valor fijo
+    ADAPTIVE_TIMEOUTS: bool = os.getenv('ADAPTIVE_TIMEOUTS', 'True').lower() == 'true'
+    ADAPTIVE_TIMEOUT_PERCENTILE: float = float(os.getenv('ADAPTIVE_TIMEOUT_PERCENTILE', '95'))
+    ADAPTIVE_TIMEOUT_MARGIN: float = float(os.getenv('ADAPTIVE_TIMEOUT_MARGIN', '1.5'))
     
     @classmethod
     def get_company_config(cls, company: str) -> dict:
@@ -30,14 +78,20 @@ class BaseConfig:
                 'contrasena': os.getenv('ALLIANZ_CONTRASENA', ''),
                 'base_url': os.getenv('ALLIANZ_BASE_URL', ''),
                 'downloads_dir': os.path.join(cls.DOWNLOADS_DIR, 'allianz'),
-                'logs_dir': os.path.join(cls.LOGS_DIR, 'allianz')
+                'logs_dir': os.path.join(cls.LOGS_DIR, 'allianz'),
+                # Pestañas simultáneas dentro del mismo contexto autenticado (límite del portal)
+                'max_concurrent_tabs': int(os.getenv('ALLIANZ_MAX_TABS', '3')),
+                # Horas en que se reutiliza una cotización del mismo cliente/vehículo (0 = nunca)
+                'quote_cache_hours': float(os.getenv('ALLIANZ_QUOTE_CACHE_HOURS', '12'))
             },
             'sura': {
                 'usuario': os.getenv('SURA_USUARIO', ''),
                 'contrasena': os.getenv('SURA_CONTRASENA', ''),
                 'base_url': os.getenv('SURA_BASE_URL', ''),
                 'downloads_dir': os.path.join(cls.DOWNLOADS_DIR, 'sura'),
-                'logs_dir': os.path.join(cls.LOGS_DIR, 'sura')
+                'logs_dir': os.path.join(cls.LOGS_DIR, 'sura'),
+                'max_concurrent_tabs': int(os.getenv('SURA_MAX_TABS', '2')),
+                'quote_cache_hours': float(os.getenv('SURA_QUOTE_CACHE_HOURS', '12'))
             }
         }
         
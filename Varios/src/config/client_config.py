@@ -1,7 +1,40 @@
 """Configuración unificada del cliente para todas las aseguradoras."""
 
 from typing import Dict
-import os
+
+# Atributos de clase que dependen del cliente -> key en el diccionario de datos
+_CLIENT_FIELD_ATTRS = {
+    'CLIENT_DOCUMENT_NUMBER': 'client_document_number',
+    'CLIENT_FIRST_NAME': 'client_first_name',
+    'CLIENT_SECOND_NAME': 'client_second_name',
+    'CLIENT_FIRST_LASTNAME': 'client_first_lastname',
+    'CLIENT_SECOND_LASTNAME': 'client_second_lastname',
+    'CLIENT_BIRTH_DATE': 'client_birth_date',
+    'CLIENT_GENDER': 'client_gender',
+    'CLIENT_CITY': 'client_city',
+    'CLIENT_DEPARTMENT': 'client_department',
+    'VEHICLE_PLATE': 'vehicle_plate',
+    'VEHICLE_MODEL_YEAR': 'vehicle_model_year',
+    'VEHICLE_BRAND': 'vehicle_brand',
+    'VEHICLE_REFERENCE': 'vehicle_reference',
+    'VEHICLE_FULL_REFERENCE': 'vehicle_full_reference',
+    'VEHICLE_STATE': 'vehicle_state',
+    'VEHICLE_INSURED_VALUE': 'vehicle_insured_value',
+    'MANUAL_CF_CODE': 'manual_cf_code',
+    'MANUAL_CH_CODE': 'manual_ch_code',
+    'POLICY_NUMBER': 'policy_number',
+    'POLICY_NUMBER_ALLIANZ': 'policy_number_allianz',
+    'SELECTED_FONDO': 'selected_fondo',
+    'ENABLE_FASECOLDA_SEARCH': 'fasecolda_enabled',
+}
+
+# Campos que se normalizan a mayúsculas al cargarse
+_UPPERCASE_FIELDS = (
+    'client_first_name', 'client_second_name', 'client_first_lastname',
+    'client_second_lastname', 'client_city', 'client_department',
+    'vehicle_brand', 'vehicle_reference', 'vehicle_full_reference'
+)
+
 
 class ClientConfig:
     """Configuración común del cliente que se usa en todas las aseguradoras."""
@@ -43,6 +76,9 @@ class ClientConfig:
     # CONFIGURACIÓN DE FASECOLDA
     ENABLE_FASECOLDA_SEARCH: bool = True  # Habilitar/deshabilitar búsqueda automática de códigos Fasecolda
     
+    # True en las configuraciones por cliente de for_client() (no leen overrides GUI_*)
+    _isolated: bool = False
+    
     # ==========================================
     # MÉTODOS PARA ACCEDER A DATOS DINÁMICOS
     # ==========================================
@@ -68,6 +104,38 @@ class ClientConfig:
         """Limpia los datos del cliente (vuelve a valores por defecto)."""
         cls._current_client_data = None
         cls._update_class_variables()
+
+    @classmethod
+    def for_client(cls, client_data: Dict[str, str]) -> type:
+        """
+        Crea una configuración aislada para un cliente (cotización multi-pestaña).
+        
+        Devuelve una subclase de ClientConfig con sus propias variables de clase, que se
+        pasa a las páginas de la pestaña; no toca ClientConfig ni las variables de entorno GUI_*.
+        Si el cliente no trae 'fasecolda_enabled' se usa la configuración global; los códigos
+        se resuelven por cliente (resolve_client_fasecolda_codes).
+        
+        Args:
+            client_data: Datos del cliente (mismas keys que _DEFAULT_CLIENT_DATA)
+            
+        Returns:
+            type: Configuración del cliente con la misma interfaz que ClientConfig
+        """
+        data = dict(cls._DEFAULT_CLIENT_DATA)
+        for key, value in client_data.items():
+            if key in _UPPERCASE_FIELDS and isinstance(value, str):
+                value = value.upper()
+            data[key] = value
+        enabled = data.get('fasecolda_enabled', cls.ENABLE_FASECOLDA_SEARCH)
+        data['fasecolda_enabled'] = enabled.strip().lower() == 'true' if isinstance(enabled, str) else bool(enabled)
+        
+        client_config = type(f"ClientConfig_{data['client_document_number']}", (cls,), {
+            '_current_client_data': data,
+            '_isolated': True,
+            'ENABLE_FASECOLDA_SEARCH': data['fasecolda_enabled'],
+        })
+        client_config._update_class_variables()
+        return client_config
     
     # Propiedades dinámicas para mantener compatibilidad (usando variables de clase que se actualizan)
     CLIENT_DOCUMENT_NUMBER = '71750823'
@@ -386,6 +454,10 @@ class ClientConfig:
         """Carga configuraciones desde variables de entorno (GUI tiene prioridad)."""
         import os
         
+        # Una configuración de for_client() ya trae los datos del cliente de su pestaña
+        if cls._isolated:
+            return
+        
         # Override del estado del vehículo desde la GUI
         gui_vehicle_state = os.environ.get('GUI_VEHICLE_STATE')
         if gui_vehicle_state and gui_vehicle_state in ['Nuevo', 'Usado']:
@@ -430,9 +502,7 @@ class ClientConfig:
             if value is not None:  # Solo aplicar si la variable existe (incluso si está vacía)
                 print(f"🔍 DEBUG ClientConfig - Cargando {env_var}={value} -> {data_key}")
                 # Normalizar ciertos campos a mayúsculas para consistencia
-                if data_key in ['client_first_name', 'client_second_name', 'client_first_lastname', 
-                               'client_second_lastname', 'client_city', 'client_department', 
-                               'vehicle_brand', 'vehicle_reference', 'vehicle_full_reference']:
+                if data_key in _UPPERCASE_FIELDS:
                     value = value.upper()
                 gui_client_data[data_key] = value
         
@@ -488,6 +558,18 @@ class ClientConfig:
         print(f"🔍 DEBUG ClientConfig - Valor asegurado actual: '{cls.VEHICLE_INSURED_VALUE}'")
         return cls.VEHICLE_INSURED_VALUE
     
+    @classmethod
+    def get_client_fingerprint(cls) -> str:
+        """
+        Huella de los datos del cliente activo (cambia si se edita cualquier campo).
+        
+        Returns:
+            str: Hash corto de los campos del cliente
+        """
+        import hashlib
+        values = '|'.join(f"{attr}={getattr(cls, attr, '')}" for attr in sorted(_CLIENT_FIELD_ATTRS))
+        return hashlib.sha1(values.encode('utf-8')).hexdigest()[:16]
+    
     @classmethod
     def get_selected_fondo(cls) -> str:
         """
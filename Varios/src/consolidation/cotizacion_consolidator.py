@@ -11,11 +11,11 @@ import logging
 from datetime import datetime
 from typing import Dict, Any, Optional, List, Tuple
 from pathlib import Path
-import pandas as pd
 
 from ..config.client_config import ClientConfig
 from ..config.formulas_config import FormulasConfig
 from ..core.logger_factory import LoggerFactory
+from .excel_backend import ExcelBackend
 from .template_handler import TemplateHandler
 
 
@@ -53,14 +53,8 @@ class CotizacionConsolidator:
                 for line in reversed(recent_lines):
                     match = re.search(pattern, line)
                     if match:
-                        value = match.group(1).replace('.', '').replace(',', '.')
-                        try:
-                            numeric_value = float(value)
-                            plans[plan_name] = f"{numeric_value:,.2f}".replace(",", "_").replace(".", ",").replace("_", ".")
-                            self.logger.info(f"✅ Encontrado {plan_name}: {plans[plan_name]} (línea: {match.group(1)})")
-                        except Exception:
-                            plans[plan_name] = match.group(1)
-                            self.logger.info(f"✅ Encontrado {plan_name}: {plans[plan_name]} (valor original)")
+                        plans[plan_name] = self.format_allianz_prima(match.group(1))
+                        self.logger.info(f"✅ Encontrado {plan_name}: {plans[plan_name]} (línea: {match.group(1)})")
                         break
             return plans
         except Exception as e:
@@ -68,6 +62,25 @@ class CotizacionConsolidator:
             return plans
     """Consolidador de cotizaciones de Sura y Allianz."""
     
+    @staticmethod
+    def format_sura_prima(value: Any) -> str:
+        """Prima de Sura con el formato del consolidado ('1.850.000'); '' si no hay valor."""
+        if value in (None, ''):
+            return ''
+        digits = str(int(value)) if isinstance(value, (int, float)) else re.sub(r'[^\d]', '', str(value))
+        return f"{int(digits):,}".replace(",", ".") if digits else ''
+    
+    @staticmethod
+    def format_allianz_prima(raw: Optional[str]) -> str:
+        """Prima de Allianz ('1.400.000' / '1.400.000,50') con el formato del consolidado ('1.400.000,00')."""
+        if not raw or not str(raw).strip():
+            return ''
+        value = str(raw).strip().replace('.', '').replace(',', '.')
+        try:
+            return f"{float(value):,.2f}".replace(",", "_").replace(".", ",").replace("_", ".")
+        except ValueError:
+            return str(raw).strip()
+    
     def __init__(self):
         self.logger = LoggerFactory.create_logger('consolidator')
         # Subir 4 niveles: consolidation -> src -> Varios -> raíz del proyecto
@@ -320,7 +333,7 @@ class CotizacionConsolidator:
                         if match:
                             value = match.group(1).replace(',', '').replace('.', '')
                             if value.isdigit():
-                                plans[plan_name] = f"{int(value):,}".replace(",", ".")
+                                plans[plan_name] = self.format_sura_prima(value)
                                 self.logger.info(f"✅ Encontrado {plan_name}: ${plans[plan_name]}")
                                 break
                     if plans[plan_name] != 'No encontrado':
@@ -493,16 +506,45 @@ class CotizacionConsolidator:
         formatted_solidaria_prorrateado = f"${solidaria_prorrateado_value}" if solidaria_prorrateado_value != 'No calculado' else solidaria_prorrateado_value
         rows.append({'Categoría': '', 'Campo': 'Valor Prorrateado', 'Valor': formatted_solidaria_prorrateado})
         
-        # Crear DataFrame
-        df = pd.DataFrame(rows)
-        
         # Escribir a Excel con una sola hoja
-        with pd.ExcelWriter(file_path, engine='openpyxl') as writer:
-            df.to_excel(writer, sheet_name='COTIZACION_CONSOLIDADA', index=False)
+        ExcelBackend.write_table(file_path, 'COTIZACION_CONSOLIDADA', ['Categoría', 'Campo', 'Valor'], rows)
         
         self.logger.info(f"📊 Reporte Excel consolidado creado exitosamente: {filename}")
         return str(file_path)
     
+    def get_company_plans(self, company: str, success: bool) -> Dict[str, str]:
+        """
+        Planes de una aseguradora con navegador: desde sus logs si terminó bien, 'FALLÓ' si no.
+        
+        Args:
+            company: 'sura' o 'allianz'
+            success: Resultado de la automatización
+        """
+        if company == 'sura':
+            if success:
+                return self.extract_sura_plans_from_logs()
+            # Sura falló: llenar con "FALLÓ" usando nueva nomenclatura
+            self.logger.warning("❌ Sura falló, llenando planes con 'FALLÓ'")
+            return {
+                'Global Franquicia': 'FALLÓ',
+                'Autos Global': 'FALLÓ',
+                'Autos Clásico': 'FALLÓ'
+            }
+        
+        if company == 'allianz':
+            if success:
+                return self.extract_allianz_plans_from_logs()
+            # Allianz falló: llenar con "FALLÓ"
+            self.logger.warning("❌ Allianz falló, llenando planes con 'FALLÓ'")
+            return {
+                'Autos Esencial': 'FALLÓ',
+                'Autos Plus': 'FALLÓ',
+                'Autos Llave en Mano': 'FALLÓ',
+                'Autos Esencial + Totales': 'FALLÓ'
+            }
+        
+        return {}
+    
     def consolidate_with_failures(self, automation_results: Dict[str, bool]) -> bool:
         """
         Ejecuta el proceso de consolidación incluso si algunas automatizaciones fallaron.
@@ -518,30 +560,8 @@ class CotizacionConsolidator:
             sura_data = self.extract_sura_data()
             
             # 2. Extraer planes según el éxito de cada automatización
-            if automation_results.get('sura', False):
-                # Sura exitosa: extraer desde logs
-                sura_plans = self.extract_sura_plans_from_logs()
-            else:
-                # Sura falló: llenar con "FALLÓ" usando nueva nomenclatura
-                self.logger.warning("❌ Sura falló, llenando planes con 'FALLÓ'")
-                sura_plans = {
-                    'Global Franquicia': 'FALLÓ',
-                    'Autos Global': 'FALLÓ',
-                    'Autos Clásico': 'FALLÓ'
-                }
-            
-            if automation_results.get('allianz', False):
-                # Allianz exitosa: extraer normalmente
-                allianz_plans = self.extract_allianz_plans_from_logs()
-            else:
-                # Allianz falló: llenar con "FALLÓ"
-                self.logger.warning("❌ Allianz falló, llenando planes con 'FALLÓ'")
-                allianz_plans = {
-                    'Autos Esencial': 'FALLÓ',
-                    'Autos Plus': 'FALLÓ',
-                    'Autos Llave en Mano': 'FALLÓ',
-                    'Autos Esencial + Totales': 'FALLÓ'
-                }
+            sura_plans = self.get_company_plans('sura', automation_results.get('sura', False))
+            allianz_plans = self.get_company_plans('allianz', automation_results.get('allianz', False))
             
             self.logger.info(f"Planes de Sura: {sura_plans}")
             self.logger.info(f"Planes de Allianz: {allianz_plans}")
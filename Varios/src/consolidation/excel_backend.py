@@ -0,0 +1,539 @@
+"""
+Backends de escritura de Excel para los consolidados.
+
+- 'patch' (por defecto): la plantilla no se carga en openpyxl. Se leen los valores de la
+  hoja activa una vez, las escrituras se acumulan y al guardar solo se reescribe el XML de
+  esa hoja dentro del zip; el resto de partes (estilos, celdas fusionadas, dibujos,
+  propiedades) se copia tal cual. El reporte estándar se escribe con openpyxl en modo
+  write-only, sin pandas.
+- 'openpyxl': el camino anterior (libro completo en memoria y pandas para el reporte
+  estándar). Se usa también como respaldo si una plantilla no se puede parchear.
+
+Ambos libros exponen lo que usa TemplateHandler: active, save(), close() y en la hoja
+cell(row, column).value y merged_cells.ranges.
+"""
+
+import os
+import re
+import shutil
+import zipfile
+import posixpath
+import xml.etree.ElementTree as ET
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from xml.sax.saxutils import escape
+
+from ..config.base_config import BaseConfig
+
+
+_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+_NS_REL = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+_NS_PKG_REL = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+
+_COORDINATE = re.compile(r'^\$?([A-Z]{1,3})\$?(\d+)$')
+_ROW = re.compile(r'<row\b[^>]*?(?:/>|>.*?</row>)', re.S)
+_CELL = re.compile(r'<c\b[^>]*?(?:/>|>.*?</c>)', re.S)
+_OPEN_TAG = re.compile(r'<\w+\b[^>]*?/?>')
+_ATTR_R = re.compile(r'\sr="([^"]+)"')
+_ATTR_S = re.compile(r'\ss="(\d+)"')
+_SHARED_MASTER = re.compile(r'<f\b[^>]*\bt="shared"[^>]*\bref="')
+_ILLEGAL_CHARS = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+# Formatos de número incorporados de Excel que son fechas u horas
+_DATE_FORMAT_IDS = set(range(14, 23)) | set(range(27, 37)) | set(range(45, 48)) | set(range(50, 59))
+
+
+class XlsxPatchError(Exception):
+    """La plantilla no se puede editar parcheando el XML (se usa openpyxl)."""
+
+
+def _column_letter(column: int) -> str:
+    letters = ''
+    while column:
+        column, remainder = divmod(column - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def _split_coordinate(coordinate: str) -> Tuple[int, int]:
+    match = _COORDINATE.match(coordinate)
+    if not match:
+        raise XlsxPatchError(f"Coordenada no válida: {coordinate}")
+    column = 0
+    for letter in match.group(1):
+        column = column * 26 + ord(letter) - 64
+    return int(match.group(2)), column
+
+
+def _is_date_format(format_code: str) -> bool:
+    # Quitar textos entre comillas, secciones [..] y caracteres escapados/de relleno
+    code = re.sub(r'"[^"]*"|\[[^\]]*\]|[\\_*].', '', format_code)
+    return bool(re.search(r'[dmyhs]', code, re.I))
+
+
+class _MergedRange:
+    """Rango de celdas fusionadas (mismos atributos que usa TemplateHandler de openpyxl)."""
+
+    def __init__(self, ref: str):
+        start, _, end = ref.partition(':')
+        self.min_row, self.min_col = _split_coordinate(start)
+        self.max_row, self.max_col = _split_coordinate(end or start)
+        self.coord = ref
+
+    def __contains__(self, coordinate: str) -> bool:
+        row, column = _split_coordinate(coordinate)
+        return self.min_row <= row <= self.max_row and self.min_col <= column <= self.max_col
+
+    def __str__(self) -> str:
+        return self.coord
+
+
+class _MergedCells:
+    def __init__(self, ranges: List[_MergedRange]):
+        self.ranges = ranges
+
+
+class _PatchCell:
+    """Vista de una celda: leer devuelve el valor vigente, asignar registra la escritura."""
+
+    __slots__ = ('_sheet', 'row', 'column')
+
+    def __init__(self, sheet: 'XlsxPatchSheet', row: int, column: int):
+        self._sheet = sheet
+        self.row = row
+        self.column = column
+
+    @property
+    def coordinate(self) -> str:
+        return f"{_column_letter(self.column)}{self.row}"
+
+    @property
+    def value(self) -> Any:
+        key = (self.row, self.column)
+        if key in self._sheet.writes:
+            return self._sheet.writes[key]
+        return self._sheet.values.get(key)
+
+    @value.setter
+    def value(self, value: Any) -> None:
+        self._sheet.writes[(self.row, self.column)] = value
+
+
+class XlsxPatchSheet:
+    """Hoja de una plantilla abierta con XlsxPatchWorkbook."""
+
+    def __init__(self, title: str, values: Dict[Tuple[int, int], Any], merged: List[_MergedRange]):
+        self.title = title
+        self.values = values
+        self.merged_cells = _MergedCells(merged)
+        # Escrituras pendientes {(fila, columna): valor}; se aplican al guardar
+        self.writes: Dict[Tuple[int, int], Any] = {}
+
+    def cell(self, row: int, column: int) -> _PatchCell:
+        return _PatchCell(self, row, column)
+
+
+class XlsxPatchWorkbook:
+    """Plantilla xlsx que se guarda reescribiendo solo el XML de la hoja activa."""
+
+    def __init__(self, path: str):
+        self.path = str(path)
+        with zipfile.ZipFile(self.path) as archive:
+            self._names = set(archive.namelist())
+            workbook_xml = ET.fromstring(archive.read('xl/workbook.xml'))
+            relations = self._read_relations(archive, 'xl/_rels/workbook.xml.rels')
+
+            sheets = workbook_xml.find(f'{_NS}sheets')
+            if sheets is None or not len(sheets):
+                raise XlsxPatchError("El libro no tiene hojas")
+            view = workbook_xml.find(f'{_NS}bookViews/{_NS}workbookView')
+            active_index = int(view.get('activeTab', 0)) if view is not None else 0
+            sheet = list(sheets)[min(active_index, len(sheets) - 1)]
+            self._active_index = min(active_index, len(sheets) - 1)
+
+            target = relations.get(sheet.get(f'{_NS_REL}id'))
+            if not target:
+                raise XlsxPatchError("No se encontró la parte XML de la hoja activa")
+            self.sheet_part = target.lstrip('/') if target.startswith('/') else posixpath.normpath(f'xl/{target}')
+
+            properties = workbook_xml.find(f'{_NS}workbookPr')
+            date1904 = properties is not None and properties.get('date1904') in ('1', 'true')
+            self._epoch = datetime(1904, 1, 1) if date1904 else datetime(1899, 12, 30)
+
+            shared_strings = self._read_shared_strings(archive, relations)
+            date_styles = self._read_date_styles(archive, relations)
+            self._sheet_xml = archive.read(self.sheet_part).decode('utf-8')
+
+        values, merged = self._read_sheet(self._sheet_xml, shared_strings, date_styles)
+        self.active = XlsxPatchSheet(sheet.get('name', ''), values, merged)
+
+    # --- Lectura ------------------------------------------------------------------------
+
+    @staticmethod
+    def _read_relations(archive: zipfile.ZipFile, part: str) -> Dict[str, str]:
+        if part not in archive.namelist():
+            return {}
+        root = ET.fromstring(archive.read(part))
+        return {rel.get('Id'): rel.get('Target', '') for rel in root.iter(f'{_NS_PKG_REL}Relationship')}
+
+    def _part_for(self, relations: Dict[str, str], suffix: str, default: str) -> Optional[str]:
+        for target in relations.values():
+            if target.endswith(suffix):
+                return target.lstrip('/') if target.startswith('/') else posixpath.normpath(f'xl/{target}')
+        return default if default in self._names else None
+
+    def _read_shared_strings(self, archive: zipfile.ZipFile, relations: Dict[str, str]) -> List[str]:
+        part = self._part_for(relations, 'sharedStrings.xml', 'xl/sharedStrings.xml')
+        if not part:
+            return []
+        root = ET.fromstring(archive.read(part))
+        strings = []
+        for item in root.iter(f'{_NS}si'):
+            # Texto simple o con formato (varios <r><t>); los <rPh> fonéticos no cuentan
+            parts = [t.text or '' for t in item.findall(f'{_NS}t')]
+            parts += [t.text or '' for run in item.findall(f'{_NS}r') for t in run.findall(f'{_NS}t')]
+            strings.append(''.join(parts))
+        return strings
+
+    def _read_date_styles(self, archive: zipfile.ZipFile, relations: Dict[str, str]) -> set:
+        part = self._part_for(relations, 'styles.xml', 'xl/styles.xml')
+        if not part:
+            return set()
+        root = ET.fromstring(archive.read(part))
+        custom = {
+            int(fmt.get('numFmtId')): fmt.get('formatCode', '')
+            for fmt in root.iter(f'{_NS}numFmt')
+        }
+        date_styles = set()
+        cell_xfs = root.find(f'{_NS}cellXfs')
+        for index, xf in enumerate(cell_xfs if cell_xfs is not None else []):
+            fmt_id = int(xf.get('numFmtId', 0))
+            if fmt_id in _DATE_FORMAT_IDS or (fmt_id in custom and _is_date_format(custom[fmt_id])):
+                date_styles.add(index)
+        return date_styles
+
+    def _read_sheet(self, sheet_xml: str, shared_strings: List[str], date_styles: set):
+        root = ET.fromstring(sheet_xml.encode('utf-8'))
+        values: Dict[Tuple[int, int], Any] = {}
+        masters: Dict[str, Tuple[str, str]] = {}
+        dependents: List[Tuple[Tuple[int, int], str, str]] = []
+
+        for cell in root.iter(f'{_NS}c'):
+            ref = cell.get('r')
+            if not ref:
+                raise XlsxPatchError("Celda sin referencia en la hoja")
+            key = _split_coordinate(ref)
+            kind = cell.get('t', 'n')
+            formula = cell.find(f'{_NS}f')
+            raw = cell.find(f'{_NS}v')
+            raw = raw.text if raw is not None else None
+
+            if formula is not None:
+                # Igual que openpyxl: las fórmulas se leen como texto '=...'
+                if formula.get('t') == 'shared':
+                    if formula.get('ref') is not None:
+                        masters[formula.get('si')] = (ref, formula.text or '')
+                    if not formula.text:
+                        dependents.append((key, ref, formula.get('si')))
+                        continue
+                value = f"={formula.text or ''}"
+            elif kind == 's':
+                value = shared_strings[int(raw)] if raw is not None else None
+            elif kind == 'inlineStr':
+                value = ''.join(t.text or '' for t in cell.iter(f'{_NS}t'))
+            elif kind == 'b':
+                value = raw == '1' if raw is not None else None
+            elif kind in ('str', 'e'):
+                value = raw
+            elif raw is None:
+                continue
+            else:
+                value = float(raw) if any(ch in raw for ch in '.Ee') else int(raw)
+                if int(cell.get('s', 0)) in date_styles:
+                    value = self._epoch + timedelta(days=value)
+            values[key] = value
+
+        for key, ref, si in dependents:
+            values[key] = self._translate_shared(masters.get(si), ref)
+
+        merged = [_MergedRange(node.get('ref')) for node in root.iter(f'{_NS}mergeCell') if node.get('ref')]
+        return values, merged
+
+    @staticmethod
+    def _translate_shared(master: Optional[Tuple[str, str]], ref: str) -> str:
+        if not master:
+            return '='
+        # Poco frecuente (fórmulas arrastradas); el traductor de openpyxl solo se carga aquí
+        from openpyxl.formula.translate import Translator
+        return Translator(f"={master[1]}", origin=master[0]).translate_formula(ref)
+
+    # --- Escritura ----------------------------------------------------------------------
+
+    def save(self, path) -> None:
+        """
+        Guarda una copia con las celdas modificadas.
+
+        Args:
+            path: Ruta del archivo de salida (la plantilla de origen no se modifica)
+        """
+        try:
+            parts = self._patched_parts()
+        except XlsxPatchError as e:
+            from ..core.logger_factory import LoggerFactory
+            LoggerFactory.create_logger('template_handler').warning(
+                f"⚠️ No se pudo parchear {os.path.basename(self.path)} ({e}); guardando con openpyxl"
+            )
+            self._save_with_openpyxl(path)
+            return
+
+        with zipfile.ZipFile(self.path) as source, zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as target:
+            for info in source.infolist():
+                entry = zipfile.ZipInfo(info.filename, info.date_time)
+                entry.compress_type = zipfile.ZIP_DEFLATED
+                entry.external_attr = info.external_attr
+                if info.filename in parts:
+                    if parts[info.filename] is not None:
+                        target.writestr(entry, parts[info.filename])
+                    continue
+                # Sin cambios: copiar en streaming
+                entry.file_size = info.file_size
+                with source.open(info) as src, target.open(entry, 'w') as dst:
+                    shutil.copyfileobj(src, dst)
+
+    def close(self) -> None:
+        self._sheet_xml = ''
+
+    def _patched_parts(self) -> Dict[str, Optional[bytes]]:
+        """Partes del zip que cambian ({nombre: contenido}, None = se elimina)."""
+        with zipfile.ZipFile(self.path) as archive:
+            workbook_xml = archive.read('xl/workbook.xml').decode('utf-8')
+            content_types = archive.read('[Content_Types].xml').decode('utf-8')
+            relations = archive.read('xl/_rels/workbook.xml.rels').decode('utf-8')
+
+        parts: Dict[str, Optional[bytes]] = {
+            self.sheet_part: self._patch_sheet(self._sheet_xml, self.active.writes).encode('utf-8')
+        }
+
+        # Las fórmulas se recalculan al abrir (sus valores guardados quedaron viejos) y la cadena
+        # de cálculo se descarta: Excel la reconstruye y podría apuntar a celdas que ya no son fórmula
+        parts['xl/workbook.xml'] = self._force_recalculation(workbook_xml).encode('utf-8')
+        if 'xl/calcChain.xml' in self._names:
+            parts['xl/calcChain.xml'] = None
+            parts['[Content_Types].xml'] = re.sub(
+                r'<Override\b[^>]*PartName="/xl/calcChain\.xml"[^>]*/>', '', content_types
+            ).encode('utf-8')
+            parts['xl/_rels/workbook.xml.rels'] = re.sub(
+                r'<Relationship\b[^>]*/calcChain"[^>]*/>', '', relations
+            ).encode('utf-8')
+        return parts
+
+    @staticmethod
+    def _force_recalculation(workbook_xml: str) -> str:
+        calc = re.search(r'<calcPr\b[^>]*?/?>', workbook_xml)
+        if calc:
+            if 'fullCalcOnLoad=' in calc.group(0):
+                return workbook_xml
+            tag = calc.group(0)
+            end = -2 if tag.endswith('/>') else -1
+            return workbook_xml.replace(tag, f'{tag[:end]} fullCalcOnLoad="1"{tag[end:]}', 1)
+        for anchor in ('</definedNames>', '</sheets>'):
+            if anchor in workbook_xml:
+                return workbook_xml.replace(anchor, f'{anchor}<calcPr fullCalcOnLoad="1"/>', 1)
+        raise XlsxPatchError("workbook.xml sin <sheets>")
+
+    def _patch_sheet(self, sheet_xml: str, writes: Dict[Tuple[int, int], Any]) -> str:
+        if not writes:
+            return sheet_xml
+
+        data = re.search(r'<sheetData\s*/>|<sheetData>(.*?)</sheetData>', sheet_xml, re.S)
+        if not data:
+            raise XlsxPatchError("La hoja no tiene <sheetData>")
+        body = data.group(1) or ''
+
+        by_row: Dict[int, Dict[int, Any]] = {}
+        for (row, column), value in writes.items():
+            by_row.setdefault(row, {})[column] = value
+        pending = sorted(by_row)
+
+        out = []
+        position = 0
+        for match in _ROW.finditer(body):
+            row_xml = match.group(0)
+            row_ref = _ATTR_R.search(_OPEN_TAG.match(row_xml).group(0))
+            if not row_ref:
+                raise XlsxPatchError("Fila sin referencia en la hoja")
+            row = int(row_ref.group(1))
+
+            out.append(body[position:match.start()])
+            position = match.end()
+            while pending and pending[0] < row:
+                new_row = pending.pop(0)
+                out.append(self._patch_row(f'<row r="{new_row}"/>', new_row, by_row[new_row]))
+            if pending and pending[0] == row:
+                out.append(self._patch_row(row_xml, row, by_row[pending.pop(0)]))
+            else:
+                out.append(row_xml)
+        out.append(body[position:])
+        for new_row in pending:
+            out.append(self._patch_row(f'<row r="{new_row}"/>', new_row, by_row[new_row]))
+
+        patched = f"{sheet_xml[:data.start()]}<sheetData>{''.join(out)}</sheetData>{sheet_xml[data.end():]}"
+        return self._extend_dimension(patched, writes)
+
+    def _patch_row(self, row_xml: str, row: int, columns: Dict[int, Any]) -> str:
+        open_tag = _OPEN_TAG.match(row_xml).group(0)
+        inner = '' if open_tag.endswith('/>') else row_xml[len(open_tag):-len('</row>')]
+        # 'spans' es solo una pista de optimización y puede quedar desactualizada
+        tag = re.sub(r'\sspans="[^"]*"', '', open_tag)
+        if tag.endswith('/>'):
+            tag = f"{tag[:-2].rstrip()}>"
+        # Celdas nuevas en filas con formato propio heredan el estilo de la fila
+        row_style = _ATTR_S.search(open_tag) if 'customFormat="1"' in open_tag else None
+        row_style = row_style.group(1) if row_style else None
+
+        pending = sorted(columns)
+        out = []
+        position = 0
+        for match in _CELL.finditer(inner):
+            cell_xml = match.group(0)
+            cell_tag = _OPEN_TAG.match(cell_xml).group(0)
+            _, column = _split_coordinate(_ATTR_R.search(cell_tag).group(1))
+
+            out.append(inner[position:match.start()])
+            position = match.end()
+            while pending and pending[0] < column:
+                new_column = pending.pop(0)
+                out.append(self._cell_xml(row, new_column, row_style, columns[new_column]))
+            if pending and pending[0] == column:
+                if _SHARED_MASTER.search(cell_xml):
+                    # Otras celdas copian esta fórmula; openpyxl sabe expandirlas
+                    raise XlsxPatchError(f"{_column_letter(column)}{row} es origen de una fórmula compartida")
+                style = _ATTR_S.search(cell_tag)
+                out.append(self._cell_xml(row, column, style.group(1) if style else None, columns[pending.pop(0)]))
+            else:
+                out.append(cell_xml)
+        # Lo que sigue a la última celda (p. ej. extLst) va después de las celdas nuevas
+        tail = inner[position:]
+        for new_column in pending:
+            out.append(self._cell_xml(row, new_column, row_style, columns[new_column]))
+        out.append(tail)
+        return f"{tag}{''.join(out)}</row>"
+
+    def _cell_xml(self, row: int, column: int, style: Optional[str], value: Any) -> str:
+        attributes = f'r="{_column_letter(column)}{row}"' + (f' s="{style}"' if style else '')
+        if value is None or value == '':
+            return f'<c {attributes}/>'
+        if isinstance(value, bool):
+            return f'<c {attributes} t="b"><v>{int(value)}</v></c>'
+        if isinstance(value, (int, float)):
+            return f'<c {attributes}><v>{value!r}</v></c>'
+        if isinstance(value, (datetime, date)):
+            if not isinstance(value, datetime):
+                value = datetime.combine(value, time())
+            serial = (value - self._epoch) / timedelta(days=1)
+            return f'<c {attributes}><v>{serial!r}</v></c>'
+        text = _ILLEGAL_CHARS.sub('', str(value))
+        if text.startswith('=') and len(text) > 1:
+            return f'<c {attributes}><f>{escape(text[1:])}</f></c>'
+        return f'<c {attributes} t="inlineStr"><is><t xml:space="preserve">{escape(text)}</t></is></c>'
+
+    @staticmethod
+    def _extend_dimension(sheet_xml: str, writes: Dict[Tuple[int, int], Any]) -> str:
+        dimension = re.search(r'<dimension ref="([^"]+)"\s*/>', sheet_xml)
+        if not dimension:
+            return sheet_xml
+        start, _, end = dimension.group(1).partition(':')
+        min_row, min_col = _split_coordinate(start)
+        max_row, max_col = _split_coordinate(end or start)
+        rows = [row for row, _ in writes] + [min_row, max_row]
+        columns = [column for _, column in writes] + [min_col, max_col]
+        ref = f"{_column_letter(min(columns))}{min(rows)}:{_column_letter(max(columns))}{max(rows)}"
+        return sheet_xml.replace(dimension.group(0), f'<dimension ref="{ref}"/>', 1)
+
+    def _save_with_openpyxl(self, path) -> None:
+        import openpyxl
+        workbook = openpyxl.load_workbook(self.path)
+        try:
+            worksheet = workbook.worksheets[self._active_index]
+            for (row, column), value in self.active.writes.items():
+                worksheet.cell(row=row, column=column).value = value
+            workbook.save(path)
+        finally:
+            workbook.close()
+
+
+class ExcelBackend:
+    """Punto único para abrir plantillas y escribir reportes según EXCEL_BACKEND."""
+
+    BACKENDS = ('patch', 'openpyxl')
+
+    @classmethod
+    def get_backend(cls) -> str:
+        backend = BaseConfig.EXCEL_BACKEND
+        return backend if backend in cls.BACKENDS else 'patch'
+
+    @classmethod
+    def open_template(cls, path, backend: Optional[str] = None):
+        """
+        Abre una plantilla para llenarla y guardarla como un archivo nuevo.
+
+        Args:
+            path: Ruta de la plantilla .xlsx
+            backend: 'patch' u 'openpyxl' (por defecto EXCEL_BACKEND)
+
+        Returns:
+            Libro con active, save(ruta) y close()
+        """
+        if (backend or cls.get_backend()) == 'patch':
+            try:
+                return XlsxPatchWorkbook(path)
+            except (XlsxPatchError, KeyError, ValueError, ET.ParseError, zipfile.BadZipFile) as e:
+                from ..core.logger_factory import LoggerFactory
+                LoggerFactory.create_logger('template_handler').warning(
+                    f"⚠️ {os.path.basename(str(path))} no se puede abrir sin openpyxl ({e}); usando openpyxl"
+                )
+
+        import openpyxl
+        return openpyxl.load_workbook(path)
+
+    @classmethod
+    def write_table(cls, path, sheet_name: str, columns: Sequence[str], rows: List[Dict[str, Any]],
+                    backend: Optional[str] = None) -> None:
+        """
+        Escribe una tabla simple (encabezado + filas) en un Excel nuevo.
+
+        Args:
+            path: Ruta del archivo de salida
+            sheet_name: Nombre de la hoja
+            columns: Encabezados, en orden
+            rows: Filas como diccionarios {encabezado: valor}
+            backend: 'patch' (write-only) u 'openpyxl' (pandas); por defecto EXCEL_BACKEND
+        """
+        if (backend or cls.get_backend()) == 'openpyxl':
+            import pandas as pd
+            df = pd.DataFrame(rows, columns=list(columns))
+            with pd.ExcelWriter(path, engine='openpyxl') as writer:
+                df.to_excel(writer, sheet_name=sheet_name, index=False)
+            return
+
+        from openpyxl import Workbook
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.styles import Alignment, Border, Font, Side
+
+        workbook = Workbook(write_only=True)
+        worksheet = workbook.create_sheet(sheet_name)
+
+        # Mismo estilo de encabezado que pone pandas
+        thin = Side(style='thin')
+        header = []
+        for column in columns:
+            cell = WriteOnlyCell(worksheet, value=column)
+            cell.font = Font(bold=True)
+            cell.border = Border(left=thin, right=thin, top=thin, bottom=thin)
+            cell.alignment = Alignment(horizontal='center', vertical='top')
+            header.append(cell)
+        worksheet.append(header)
+
+        for row in rows:
+            worksheet.append([row.get(column) for column in columns])
+        workbook.save(path)
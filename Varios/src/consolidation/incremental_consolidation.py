@@ -0,0 +1,184 @@
+"""
+Consolidación incremental: el Excel se arma mientras corren las automatizaciones.
+
+Apenas termina la extracción FASECOLDA se abre la plantilla del fondo y se llenan los
+datos del cliente, los códigos FASECOLDA y Bolívar/Solidaria (no dependen de los
+navegadores). Cada aseguradora escribe sus columnas en cuanto llega su resultado y al
+final solo quedan la vigencia, la prima anual y el guardado.
+
+Todo el trabajo sobre el libro corre en un único hilo propio, en orden, para no bloquear
+el loop de las automatizaciones.
+"""
+
+import time
+import asyncio
+import contextvars
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from ..config.client_config import ClientConfig
+from ..core.logger_factory import LoggerFactory
+from ..core.run_metrics import get_run_metrics
+from .cotizacion_consolidator import CotizacionConsolidator
+
+
+class IncrementalConsolidation:
+    """Consolidado que se llena por etapas a medida que terminan las compañías."""
+
+    # Compañías cuyas columnas salen de una automatización con navegador
+    BROWSER_COMPANIES = ('sura', 'allianz')
+
+    def __init__(self):
+        self.logger = LoggerFactory.create_logger('consolidator')
+        self.consolidator = CotizacionConsolidator()
+        self.handler = self.consolidator.template_handler
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='consolidacion')
+        self._started = False
+        self._closed = False
+        self._last_result_at: Optional[float] = None
+
+        self._fondo: Optional[str] = None
+        self._workbook = None
+        self._worksheet = None
+        self._valor_pagar_row: Optional[int] = None
+        self._valor_asegurado: Optional[str] = None
+        self._sura_data: Dict[str, Any] = {}
+        self._bolivar_solidaria_plans: Dict[str, str] = {}
+        self._plans: Dict[str, Dict[str, str]] = {}
+
+    def _submit(self, fn: Callable, *args) -> Future:
+        # El trabajo corre con las contextvars de la tarea que lo encola (p. ej. QuoteResults.scope)
+        context = contextvars.copy_context()
+        return self._executor.submit(context.run, fn, *args)
+
+    def _submit_step(self, fn: Callable, *args) -> None:
+        """Etapa intermedia: un error se registra y el final rehace lo que falte."""
+        def step():
+            try:
+                fn(*args)
+            except Exception as e:
+                self.logger.error(f"❌ Error en consolidación incremental ({fn.__name__}): {e}")
+        self._submit(step)
+
+    # --- Etapas (llamadas desde el loop; el trabajo corre en el hilo de consolidación) ---
+
+    def start(self) -> None:
+        """Abre la plantilla y llena lo que no depende de los navegadores."""
+        if not self._started:
+            self._started = True
+            self._submit_step(self._prepare)
+
+    def company_finished(self, company: str, success: bool, plans: Optional[Dict[str, str]] = None) -> None:
+        """
+        Escribe las columnas de una compañía en cuanto termina.
+
+        Args:
+            company: Compañía que terminó
+            success: Resultado de la automatización
+            plans: Planes ya conocidos (registrados por la cotización o reutilizados de la caché);
+                   si no, se leen de sus logs
+        """
+        if company in self.BROWSER_COMPANIES:
+            self._last_result_at = time.perf_counter()
+            self.start()
+            self._submit_step(self._add_company, company, success, plans)
+
+    async def finish(self, results: Dict[str, bool]) -> str:
+        """
+        Completa y guarda el consolidado.
+
+        Args:
+            results: Resultados finales por compañía (las que no se reportaron quedan como 'FALLÓ')
+
+        Returns:
+            Ruta del archivo Excel creado
+        """
+        self.start()
+        future = self._submit(self._finalize, results)
+        self._closed = True
+        try:
+            # Un solo hilo: cuando termina el final ya terminaron todas las etapas anteriores
+            path = await asyncio.wrap_future(future)
+            if self._last_result_at is not None:
+                elapsed = time.perf_counter() - self._last_result_at
+                self.logger.info(f"⏱️ Consolidado listo {elapsed:.1f}s después de la última cotización")
+            return path
+        finally:
+            self._executor.shutdown(wait=False)
+
+    def discard(self) -> None:
+        """Descarta el consolidado en curso (no se guarda nada). No hace nada si ya se guardó."""
+        if self._closed:
+            return
+        self._closed = True
+
+        def close():
+            if self._workbook is not None:
+                self._workbook.close()
+                self._workbook = None
+        self._submit(close)
+        self._executor.shutdown(wait=False)
+
+    # --- Trabajo sobre el libro -------------------------------------------------------
+
+    def _prepare(self) -> None:
+        self.logger.info("📋 Preparando consolidado mientras corren las cotizaciones...")
+        self._sura_data = self.consolidator.extract_sura_data()
+        self._valor_asegurado = self.consolidator.get_valor_asegurado()
+        self._bolivar_solidaria_plans = self.consolidator.calculate_bolivar_solidaria_plans()
+
+        fondo = ClientConfig.get_selected_fondo()
+        if not fondo or fondo not in self.handler.get_available_fondos():
+            # Formato estándar: se genera al final con todos los planes
+            return
+
+        try:
+            self._workbook, self._worksheet = self.handler.open_template(fondo)
+            self._fondo = fondo
+            self.handler.fill_base_data(self._worksheet, fondo, self._sura_data, self._bolivar_solidaria_plans)
+            self._valor_pagar_row = self.handler._find_cell_with_text_in_any_column(
+                self._worksheet, 'valor a pagar', 'iva incluido'
+            )
+            self.logger.info(f"✅ Plantilla de {fondo} prellenada (cliente, FASECOLDA, Bolívar/Solidaria)")
+        except Exception as e:
+            # Sin plantilla abierta se arma todo al final (create_excel_report)
+            self.logger.warning(f"⚠️ No se pudo prellenar la plantilla de {fondo}: {e}")
+            if self._workbook is not None:
+                self._workbook.close()
+            self._workbook = self._worksheet = None
+            self._fondo = None
+
+    def _add_company(self, company: str, success: bool, plans: Optional[Dict[str, str]] = None) -> None:
+        if company in self._plans:
+            return
+        plans = plans or self.consolidator.get_company_plans(company, success)
+        self.logger.info(f"📥 Planes de {company.upper()}: {plans}")
+        if self._worksheet is not None and self._valor_pagar_row:
+            self.handler.fill_company_values(self._worksheet, self._fondo, company, plans, self._valor_pagar_row)
+        # Se registra al final: si la escritura falló, el cierre la reintenta
+        self._plans[company] = plans
+        get_run_metrics().record_prices(company, plans)
+
+    def _finalize(self, results: Dict[str, bool]) -> str:
+        if not self._sura_data:
+            self._sura_data = self.consolidator.extract_sura_data()
+        for company in self.BROWSER_COMPANIES:
+            self._add_company(company, results.get(company, False))
+
+        # El valor asegurado pudo llegar después (Allianz en usados o ingresado a mano)
+        valor_asegurado = self.consolidator.get_valor_asegurado()
+        if valor_asegurado != self._valor_asegurado:
+            self.logger.info("🔁 Valor asegurado actualizado: recalculando Bolívar/Solidaria")
+            self._valor_asegurado = valor_asegurado
+            self._bolivar_solidaria_plans = self.consolidator.calculate_bolivar_solidaria_plans()
+            if self._worksheet is not None:
+                self.handler.fill_base_data(self._worksheet, self._fondo, self._sura_data, self._bolivar_solidaria_plans)
+
+        if self._worksheet is None:
+            return self.consolidator.create_excel_report(
+                self._sura_data, self._plans['sura'], self._plans['allianz'], self._bolivar_solidaria_plans
+            )
+
+        self.handler.finish_template_data(self._worksheet)
+        workbook, self._workbook, self._worksheet = self._workbook, None, None
+        return self.handler.save_consolidado(workbook)
@@ -10,12 +10,12 @@ import logging
 from datetime import datetime
 from typing import Dict, Any, Optional, List
 from pathlib import Path
-import openpyxl
-import shutil
 import unicodedata
 
 from ..config.client_config import ClientConfig
 from ..core.logger_factory import LoggerFactory
+from .excel_backend import ExcelBackend
+from .template_registry import TemplateRegistry
 
 
 class TemplateHandler:
@@ -25,54 +25,13 @@ class TemplateHandler:
         self.logger = LoggerFactory.create_logger('template_handler')
         # base_path apunta a la raíz del proyecto (fuera de Varios/)
         self.base_path = Path(__file__).parent.parent.parent.parent
-        self.templates_path = self.base_path / "Plantillas"
+        self.templates_path = TemplateRegistry.TEMPLATES_DIR
         self.consolidados_path = self.base_path / "Consolidados"
-        
-        # Mapeo de fondos a archivos de plantilla (dinámico)
-        self.template_files = self._discover_template_files()
-        
-        # Mapeo de fondos a aseguradoras que cotizan
-        self.fondo_aseguradoras_map = {
-            'FEPEP': ['SURA', 'ALLIANZ', 'BOLIVAR'],
-            'CHEC': ['SURA', 'ALLIANZ', 'BOLIVAR'], 
-            'EMVARIAS': ['SURA', 'BOLIVAR'],
-            'EPM': ['SURA', 'ALLIANZ', 'BOLIVAR'],
-            'CONFAMILIA': ['SURA', 'SOLIDARIA', 'BOLIVAR'],
-            'FECORA': ['ALLIANZ', 'SOLIDARIA'],
-            'FEMFUTURO': ['SBS', 'SOLIDARIA'],
-            'FODELSA': ['SOLIDARIA'],
-            'MANPOWER': ['SOLIDARIA', 'ALLIANZ', 'BOLIVAR']
-        }
-        
-        # Crear directorio si no existe
-        self.consolidados_path.mkdir(exist_ok=True)
     
-    def _discover_template_files(self) -> Dict[str, str]:
-        """Descubre automáticamente las plantillas disponibles."""
-        templates = {}
-        try:
-            if self.templates_path.exists():
-                # Buscar archivos que empiecen con "PANTILLA" o "PLANTILLA"
-                for file_path in self.templates_path.glob("*ANTILLA*.xlsx"):
-                    file_name = file_path.name
-                    
-                    # Filtrar archivos temporales de Excel (que empiecen con ~$)
-                    if file_name.startswith("~$"):
-                        continue
-                    
-                    # Extraer nombre del fondo del nombre del archivo
-                    # Formato esperado: "PANTILLA FONDO N.xlsx" o "PLANTILLA FONDO U.xlsx"
-                    if "PANTILLA" in file_name or "PLANTILLA" in file_name:
-                        # Dividir por espacios y tomar la parte después de PANTILLA/PLANTILLA
-                        parts = file_name.replace("PANTILLA", "").replace("PLANTILLA", "").strip()
-                        fondo_name = parts.replace(".xlsx", "").strip()
-                        if fondo_name:
-                            templates[fondo_name] = file_name
-                            self.logger.info(f"📋 Plantilla encontrada: {fondo_name} -> {file_name}")
-        except Exception as e:
-            self.logger.error(f"Error descubriendo plantillas: {e}")
-        
-        return templates
+    @property
+    def template_files(self) -> Dict[str, str]:
+        """Mapeo de plantillas a archivos ('EPM N' -> nombre del archivo), desde el registro compartido."""
+        return {key: info['file'] for key, info in TemplateRegistry.templates().items()}
     
     def _normalize_text(self, text: str) -> str:
         """
@@ -228,24 +187,7 @@ class TemplateHandler:
     
     def get_available_fondos(self) -> List[str]:
         """Obtiene la lista de fondos disponibles basada en las plantillas existentes."""
-        available_fondos = []
-        processed_fondos = set()
-        
-        for fondo, template_file in self.template_files.items():
-            template_path = self.templates_path / template_file
-            if template_path.exists():
-                # Extraer el fondo base (sin N o U)
-                base_fondo = fondo
-                if fondo.endswith(' N') or fondo.endswith(' U'):
-                    base_fondo = fondo[:-2].strip()
-                
-                if base_fondo not in processed_fondos:
-                    available_fondos.append(base_fondo)
-                    processed_fondos.add(base_fondo)
-            else:
-                self.logger.warning(f"Plantilla no encontrada para {fondo}: {template_path}")
-        
-        return available_fondos
+        return TemplateRegistry.get_fondos()
     
     def get_fondo_aseguradoras(self, fondo: str) -> List[str]:
         """
@@ -257,7 +199,7 @@ class TemplateHandler:
         Returns:
             List[str]: Lista de aseguradoras que cotiza el fondo
         """
-        return self.fondo_aseguradoras_map.get(fondo, ['SURA', 'ALLIANZ', 'BOLIVAR'])  # Default para fondos no mapeados
+        return TemplateRegistry.get_aseguradoras(fondo)
     
     def generate_filename(self) -> str:
         """Genera un nombre único para el archivo basado en la fecha actual."""
@@ -295,58 +237,59 @@ class TemplateHandler:
         """
         self.logger.info(f"📊 Creando consolidado usando plantilla de {fondo}")
         
+        workbook, worksheet = self.open_template(fondo)
+        try:
+            # Llenar datos según la estructura de la plantilla
+            self._fill_template_data(worksheet, fondo, sura_data, sura_plans, allianz_plans, bolivar_solidaria_plans)
+            return self.save_consolidado(workbook)
+        except Exception as e:
+            self.logger.error(f"❌ Error creando consolidado desde plantilla: {e}")
+            workbook.close()
+            raise
+    
+    def open_template(self, fondo: str):
+        """
+        Abre en memoria la plantilla del fondo según el estado del vehículo.
+        
+        Args:
+            fondo: Nombre del fondo (EPM, FEPEP, etc.)
+            
+        Returns:
+            (workbook, worksheet) del backend de Excel configurado; la plantilla original no se modifica
+        """
         # Determinar la plantilla correcta según el estado del vehículo
         vehicle_state = ClientConfig.VEHICLE_STATE.lower()
-        template_key = None
-        
-        if vehicle_state == 'nuevo':
-            template_key = f"{fondo} N"  # EPM N para nuevos
-        elif vehicle_state == 'usado':
-            template_key = f"{fondo} U"  # EPM U para usados
-        else:
-            # Fallback: buscar plantilla sin sufijo
-            template_key = fondo
-        
-        # Verificar que la plantilla existe
-        if template_key not in self.template_files:
-            # Intentar fallback
-            if fondo in self.template_files:
-                template_key = fondo
-                self.logger.warning(f"Plantilla específica '{template_key}' no encontrada, usando '{fondo}'")
-            else:
-                raise ValueError(f"Plantilla no encontrada para fondo: {fondo} (estado: {vehicle_state})")
-        
-        template_file = self.template_files[template_key]
-        template_path = self.templates_path / template_file
+        template = TemplateRegistry.get_template(fondo, vehicle_state)
+        if not template:
+            raise ValueError(f"Plantilla no encontrada para fondo: {fondo} (estado: {vehicle_state})")
+        if template['key'] == fondo and vehicle_state in ('nuevo', 'usado'):
+            self.logger.warning(f"Plantilla específica para '{fondo}' ({vehicle_state}) no encontrada, usando '{fondo}'")
         
+        template_path = Path(template['path'])
         if not template_path.exists():
             raise FileNotFoundError(f"Plantilla no encontrada: {template_path}")
         
+        workbook = ExcelBackend.open_template(template_path)
+        self.logger.info(f"📋 Plantilla abierta: {template['file']}")
+        return workbook, workbook.active  # Usar la primera hoja
+    
+    def save_consolidado(self, workbook) -> str:
+        """
+        Guarda el libro como un consolidado nuevo en Consolidados/ y lo cierra.
+        
+        Returns:
+            str: Ruta del archivo Excel creado
+        """
+        # Crear directorio si no existe
+        self.consolidados_path.mkdir(exist_ok=True)
+        
         # Generar nombre del archivo de salida
         output_filename = self.generate_filename()
         output_path = self.consolidados_path / output_filename
         
-        # Copiar plantilla como base
-        shutil.copy2(template_path, output_path)
-        self.logger.info(f"📋 Plantilla copiada a: {output_path}")
-        
-        # Abrir el archivo Excel
         try:
-            workbook = openpyxl.load_workbook(output_path)
-            worksheet = workbook.active  # Usar la primera hoja
-            
-            # Llenar datos según la estructura de la plantilla
-            self._fill_template_data(worksheet, fondo, sura_data, sura_plans, allianz_plans, bolivar_solidaria_plans)
-            
-            # Guardar el archivo
             workbook.save(output_path)
-            workbook.close()
-            
-            self.logger.info(f"✅ Consolidado creado exitosamente: {output_filename}")
-            return str(output_path)
-            
-        except Exception as e:
-            self.logger.error(f"❌ Error creando consolidado desde plantilla: {e}")
+        except Exception:
             # Si hay error, intentar limpiar el archivo parcial
             try:
                 if output_path.exists():
@@ -354,6 +297,76 @@ class TemplateHandler:
             except:
                 pass
             raise
+        finally:
+            workbook.close()
+        
+        self.logger.info(f"✅ Consolidado creado exitosamente: {output_filename}")
+        return str(output_path)
+    
+    def fill_base_data(self, worksheet, fondo: str, sura_data: Dict[str, Any], 
+                       bolivar_solidaria_plans: Dict[str, str]):
+        """
+        Llena lo que no depende de los navegadores: datos del cliente y Bolívar/Solidaria/SBS.
+        
+        Se puede volver a llamar (por ejemplo si cambió el valor asegurado): sobrescribe las
+        mismas celdas.
+        """
+        self._fill_client_data(worksheet, sura_data)
+        
+        valor_pagar_row = self._find_cell_with_text_in_any_column(worksheet, 'valor a pagar', 'iva incluido')
+        if not valor_pagar_row:
+            self.logger.warning("❌ No se encontró la fila 'VALOR A PAGAR (IVA INCLUIDO)'")
+            return
+        self._fill_other_values(worksheet, valor_pagar_row, bolivar_solidaria_plans,
+                                self.get_fondo_aseguradoras(fondo), fondo)
+    
+    def fill_company_values(self, worksheet, fondo: str, company: str, plans: Dict[str, str],
+                            valor_pagar_row: Optional[int] = None):
+        """
+        Llena las columnas de una aseguradora con navegador (SURA o ALLIANZ).
+        
+        Args:
+            worksheet: Hoja de la plantilla
+            fondo: Nombre del fondo
+            company: 'sura' o 'allianz'
+            plans: Planes extraídos de esa compañía {nombre del plan: valor}
+            valor_pagar_row: Fila "VALOR A PAGAR" si ya se conoce
+        """
+        company_upper = company.upper()
+        if company_upper not in self.get_fondo_aseguradoras(fondo):
+            self.logger.info(f"⚠️ {company_upper} omitida para fondo {fondo} (no permitida)")
+            return
+        
+        if valor_pagar_row is None:
+            valor_pagar_row = self._find_cell_with_text_in_any_column(worksheet, 'valor a pagar', 'iva incluido')
+            if not valor_pagar_row:
+                self.logger.warning("❌ No se encontró la fila 'VALOR A PAGAR (IVA INCLUIDO)'")
+                return
+        
+        # SIEMPRE usar los 3 planes de Sura (nueva nomenclatura: Global Franquicia, Autos Global, Autos Clásico)
+        plan_mapping = {
+            'sura': ['Global Franquicia', 'Autos Global', 'Autos Clásico'],
+            'allianz': ['Autos Esencial', 'Autos Esencial + Total', 'Autos Plus', 'Autos llave en mano']
+        }
+        
+        if company == 'sura':
+            sura_plan_map = {
+                'Global Franquicia': plans.get('Global Franquicia', 'No encontrado'),
+                'Autos Global': plans.get('Autos Global', 'No encontrado'),
+                'Autos Clásico': plans.get('Autos Clásico', 'No encontrado')
+            }
+            self._fill_sura_values(worksheet, valor_pagar_row, sura_plan_map, plan_mapping['sura'])
+        elif company == 'allianz':
+            self._fill_allianz_values(worksheet, valor_pagar_row, plans, plan_mapping['allianz'])
+    
+    def finish_template_data(self, worksheet):
+        """Pasos que dependen de todos los valores: vigencia, días de cobertura y prima anual."""
+        # Configurar fechas de vigencia y calcular días automáticamente
+        self.logger.info("🔄 Iniciando configuración de fechas y días de cobertura...")
+        self._setup_vigencia_dates_and_coverage(worksheet)
+        
+        # Buscar y reemplazar todas las celdas que contengan "VALOR ASEGURADO AUTO"
+        self._replace_valor_asegurado_cells(worksheet)
     
     def _fill_template_data(self, worksheet, fondo: str, sura_data: Dict[str, Any], 
                           sura_plans: Dict[str, str], allianz_plans: Dict[str, str], 
@@ -376,14 +389,8 @@ class TemplateHandler:
             # Usar sistema de intersección para valores cotizados
             self._fill_quoted_values(worksheet, fondo, sura_plans, allianz_plans, bolivar_solidaria_plans)
             
-            # === PARTE 3: CONFIGURAR FECHAS Y CALCULAR DÍAS DE COBERTURA ===
-            # Configurar fechas de vigencia y calcular días automáticamente
-            self.logger.info("🔄 Iniciando configuración de fechas y días de cobertura...")
-            self._setup_vigencia_dates_and_coverage(worksheet)
-            
-            # === PARTE 4: REEMPLAZAR CELDAS "VALOR ASEGURADO AUTO" ===
-            # Buscar y reemplazar todas las celdas que contengan "VALOR ASEGURADO AUTO"
-            self._replace_valor_asegurado_cells(worksheet)
+            # === PARTE 3 Y 4: FECHAS, DÍAS DE COBERTURA Y CELDAS "VALOR ASEGURADO AUTO" ===
+            self.finish_template_data(worksheet)
             
             self.logger.info(f"✅ Datos llenados en plantilla de {fondo}")
             
@@ -535,33 +542,11 @@ class TemplateHandler:
         
         self.logger.info(f"✅ Fila 'VALOR A PAGAR' encontrada: {valor_pagar_row}")
         
-        # 2. Determinar mapeo de planes - SIEMPRE usar los 3 planes de Sura
-        # Nueva nomenclatura: Global Franquicia, Autos Global, Autos Clásico
-        plan_mapping = {
-            'sura': ['Global Franquicia', 'Autos Global', 'Autos Clásico'],
-            'allianz': ['Autos Esencial', 'Autos Esencial + Total', 'Autos Plus', 'Autos llave en mano']
-        }
-        
-        # Mapeo de planes de Sura con nueva nomenclatura
-        sura_plan_map = {
-            'Global Franquicia': sura_plans.get('Global Franquicia', 'No encontrado'),
-            'Autos Global': sura_plans.get('Autos Global', 'No encontrado'),
-            'Autos Clásico': sura_plans.get('Autos Clásico', 'No encontrado')
-        }
-        
-        # 3. Buscar columnas de SURA y llenar valores (si está permitida)
-        if 'SURA' in aseguradoras_permitidas:
-            self._fill_sura_values(worksheet, valor_pagar_row, sura_plan_map, plan_mapping['sura'])
-        else:
-            self.logger.info(f"⚠️ SURA omitida para fondo {fondo} (no permitida)")
-        
-        # 4. Buscar columnas de ALLIANZ y llenar valores (si está permitida)
-        if 'ALLIANZ' in aseguradoras_permitidas:
-            self._fill_allianz_values(worksheet, valor_pagar_row, allianz_plans, plan_mapping['allianz'])
-        else:
-            self.logger.info(f"⚠️ ALLIANZ omitida para fondo {fondo} (no permitida)")
+        # 2. SURA y ALLIANZ (solo si están permitidas)
+        self.fill_company_values(worksheet, fondo, 'sura', sura_plans, valor_pagar_row)
+        self.fill_company_values(worksheet, fondo, 'allianz', allianz_plans, valor_pagar_row)
         
-        # 5. Llenar Bolívar y Solidaria si están permitidas
+        # 3. Llenar Bolívar y Solidaria si están permitidas
         self._fill_other_values(worksheet, valor_pagar_row, bolivar_solidaria_plans, aseguradoras_permitidas, fondo)
         
         # Nota: Los valores anualizados se calculan en _setup_vigencia_dates_and_coverage()
@@ -0,0 +1,266 @@
+"""
+Registro compartido de plantillas de consolidado por fondo.
+
+Escanea Plantillas/ una sola vez por proceso (y de nuevo solo si la carpeta cambia) y
+guarda para cada plantilla su fondo, su variante (N = nuevo, U = usado) y las aseguradoras
+que cotiza, detectadas de los encabezados de la hoja. Los metadatos leídos de los Excel se
+guardan en cache/template_registry.json con el tamaño y la fecha de cada archivo, así que
+una plantilla solo se vuelve a abrir cuando se modifica.
+"""
+
+import os
+import json
+import time
+import threading
+import unicodedata
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from ..config.base_config import BaseConfig
+
+
+class TemplateRegistry:
+    """Catálogo de plantillas y mapa fondo → aseguradoras, compartido por toda la aplicación."""
+
+    # raíz del proyecto (fuera de Varios/)
+    TEMPLATES_DIR = Path(__file__).parent.parent.parent.parent / "Plantillas"
+    CACHE_PATH = os.path.join(BaseConfig.CACHE_DIR, 'template_registry.json')
+
+    # Aseguradoras que se reconocen como encabezado de columna en las plantillas
+    KNOWN_ASEGURADORAS = ('SURA', 'ALLIANZ', 'BOLIVAR', 'SOLIDARIA', 'SBS')
+    # Filas y columnas donde se buscan los encabezados
+    HEADER_ROWS = 50
+    HEADER_COLUMNS = 20
+
+    # Respaldo si una plantilla no se puede leer (o para fondos sin plantilla)
+    DEFAULT_FONDO_ASEGURADORAS: Dict[str, List[str]] = {
+        'FEPEP': ['SURA', 'ALLIANZ', 'BOLIVAR'],
+        'CHEC': ['SURA', 'ALLIANZ', 'BOLIVAR'],
+        'EMVARIAS': ['SURA', 'BOLIVAR'],
+        'EPM': ['SURA', 'ALLIANZ', 'BOLIVAR'],
+        'CONFAMILIA': ['SURA', 'SOLIDARIA', 'BOLIVAR'],
+        'FECORA': ['ALLIANZ', 'SOLIDARIA'],
+        'FEMFUTURO': ['SBS', 'SOLIDARIA'],
+        'FODELSA': ['SOLIDARIA'],
+        'MANPOWER': ['SOLIDARIA', 'ALLIANZ', 'BOLIVAR']
+    }
+    DEFAULT_ASEGURADORAS = ['SURA', 'ALLIANZ', 'BOLIVAR']
+
+    # Cada cuánto se revisa si la carpeta cambió (segundos)
+    CHECK_INTERVAL = 2.0
+
+    _lock = threading.RLock()
+    _templates: Optional[Dict[str, Dict[str, Any]]] = None
+    _dir_signature: Optional[float] = None
+    _last_check = 0.0
+    _metadata: Dict[str, Dict[str, Any]] = {}
+    _logger = None
+
+    @classmethod
+    def _get_logger(cls):
+        if cls._logger is None:
+            from ..core.logger_factory import LoggerFactory
+            cls._logger = LoggerFactory.create_logger('template_handler')
+        return cls._logger
+
+    # --- Catálogo -----------------------------------------------------------------------
+
+    @classmethod
+    def templates(cls) -> Dict[str, Dict[str, Any]]:
+        """
+        Plantillas disponibles.
+
+        Returns:
+            {clave ('EPM N'): {'fondo', 'variant', 'file', 'path', 'size', 'mtime'}}
+        """
+        with cls._lock:
+            now = time.monotonic()
+            if cls._templates is None or now - cls._last_check >= cls.CHECK_INTERVAL:
+                cls._last_check = now
+                signature = cls._directory_signature()
+                if cls._templates is None or signature != cls._dir_signature:
+                    cls._templates = cls._scan()
+                    cls._dir_signature = signature
+            return cls._templates
+
+    @classmethod
+    def refresh(cls) -> None:
+        """Descarta el catálogo en memoria (se vuelve a escanear en la próxima consulta)."""
+        with cls._lock:
+            cls._templates = None
+
+    @classmethod
+    def _directory_signature(cls) -> Optional[float]:
+        try:
+            return os.stat(cls.TEMPLATES_DIR).st_mtime
+        except OSError:
+            return None
+
+    @classmethod
+    def _scan(cls) -> Dict[str, Dict[str, Any]]:
+        templates: Dict[str, Dict[str, Any]] = {}
+        if not cls.TEMPLATES_DIR.exists():
+            return templates
+
+        try:
+            for file_path in sorted(cls.TEMPLATES_DIR.glob("*ANTILLA*.xlsx")):
+                file_name = file_path.name
+                # Filtrar archivos temporales de Excel (que empiecen con ~$)
+                if file_name.startswith("~$"):
+                    continue
+
+                # Formato esperado: "PANTILLA FONDO N.xlsx" o "PLANTILLA FONDO U.xlsx"
+                key = file_name.replace("PANTILLA", "").replace("PLANTILLA", "").replace(".xlsx", "").strip()
+                if not key:
+                    continue
+
+                fondo, variant = key, None
+                if key.endswith(' N') or key.endswith(' U'):
+                    fondo, variant = key[:-2].strip(), key[-1]
+
+                stat = file_path.stat()
+                templates[key] = {
+                    'fondo': fondo,
+                    'variant': variant,
+                    'file': file_name,
+                    'path': str(file_path),
+                    'size': stat.st_size,
+                    'mtime': stat.st_mtime
+                }
+        except OSError as e:
+            cls._get_logger().error(f"Error descubriendo plantillas: {e}")
+
+        cls._get_logger().info(f"📋 {len(templates)} plantillas en catálogo: {', '.join(templates)}")
+        return templates
+
+    @classmethod
+    def get_fondos(cls) -> List[str]:
+        """Fondos con al menos una plantilla, en orden alfabético."""
+        return sorted({info['fondo'] for info in cls.templates().values()})
+
+    @classmethod
+    def get_template(cls, fondo: str, vehicle_state: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Plantilla a usar para un fondo y estado del vehículo.
+
+        Args:
+            fondo: Nombre del fondo
+            vehicle_state: 'nuevo' o 'usado' (otro valor = plantilla sin sufijo)
+
+        Returns:
+            Metadatos de la plantilla (con 'key'), o None si el fondo no tiene plantilla
+        """
+        templates = cls.templates()
+        suffix = {'nuevo': 'N', 'usado': 'U'}.get((vehicle_state or '').lower())
+        for key in ([f"{fondo} {suffix}"] if suffix else []) + [fondo]:
+            if key in templates:
+                return dict(templates[key], key=key)
+        return None
+
+    # --- Aseguradoras por fondo -----------------------------------------------------------
+
+    @classmethod
+    def get_aseguradoras(cls, fondo: str) -> List[str]:
+        """
+        Aseguradoras que cotiza un fondo, según las columnas de sus plantillas.
+
+        Args:
+            fondo: Nombre del fondo
+
+        Returns:
+            Nombres en mayúsculas, en el orden de las columnas de la plantilla
+        """
+        detected: List[str] = []
+        for key, info in cls.templates().items():
+            if info['fondo'] != fondo:
+                continue
+            for aseguradora in cls.get_metadata(key).get('aseguradoras', []):
+                if aseguradora not in detected:
+                    detected.append(aseguradora)
+
+        if detected:
+            return detected
+        return list(cls.DEFAULT_FONDO_ASEGURADORAS.get(fondo, cls.DEFAULT_ASEGURADORAS))
+
+    @classmethod
+    def get_metadata(cls, key: str) -> Dict[str, Any]:
+        """
+        Metadatos leídos de la hoja de una plantilla (usa la caché en disco si no cambió).
+
+        Returns:
+            {'aseguradoras': [...], 'columns': {aseguradora: [columnas]}} o {} si no se pudo leer
+        """
+        info = cls.templates().get(key)
+        if not info:
+            return {}
+
+        def is_current(entry):
+            return bool(entry) and entry.get('size') == info['size'] and entry.get('mtime') == info['mtime']
+
+        with cls._lock:
+            entry = cls._metadata.get(info['file'])
+            if not is_current(entry):
+                cache = cls._read_cache()
+                entry = cache.get(info['file'])
+                if not is_current(entry):
+                    metadata = cls._parse_template(info['path'])
+                    entry = {'size': info['size'], 'mtime': info['mtime'], 'metadata': metadata}
+                    # Si no se pudo leer, no se reintenta hasta que el archivo cambie (solo en memoria)
+                    if metadata:
+                        cache[info['file']] = entry
+                        cls._write_cache(cache)
+                cls._metadata[info['file']] = entry
+            return entry['metadata']
+
+    @classmethod
+    def _parse_template(cls, path: str) -> Dict[str, Any]:
+        """Busca los encabezados de aseguradoras en la primera hoja."""
+        try:
+            import openpyxl
+            workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+        except Exception as e:
+            cls._get_logger().warning(f"⚠️ No se pudo leer la plantilla {os.path.basename(path)}: {e}")
+            return {}
+
+        columns: Dict[str, List[int]] = {}
+        try:
+            worksheet = workbook.worksheets[0]
+            rows = worksheet.iter_rows(min_row=1, max_row=cls.HEADER_ROWS, max_col=cls.HEADER_COLUMNS, values_only=True)
+            for row in rows:
+                for col, value in enumerate(row, start=1):
+                    name = cls._normalize(value)
+                    if name in cls.KNOWN_ASEGURADORAS:
+                        columns.setdefault(name, [])
+                        if col not in columns[name]:
+                            columns[name].append(col)
+        finally:
+            workbook.close()
+
+        ordered = sorted(columns, key=lambda name: min(columns[name]))
+        return {'aseguradoras': ordered, 'columns': columns}
+
+    @staticmethod
+    def _normalize(value: Any) -> str:
+        if not isinstance(value, str):
+            return ''
+        text = unicodedata.normalize('NFD', value.strip())
+        return ''.join(c for c in text if unicodedata.category(c) != 'Mn').upper()
+
+    @classmethod
+    def _read_cache(cls) -> Dict[str, Any]:
+        try:
+            with open(cls.CACHE_PATH, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    @classmethod
+    def _write_cache(cls, cache: Dict[str, Any]) -> None:
+        try:
+            os.makedirs(os.path.dirname(cls.CACHE_PATH), exist_ok=True)
+            tmp_path = f"{cls.CACHE_PATH}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(cache, f, indent=2)
+            os.replace(tmp_path, cls.CACHE_PATH)
+        except OSError:
+            pass
@@ -1,8 +1,29 @@
 """Módulo core del sistema de automatización de seguros."""
 
-from .base_automation import BaseAutomation
-from .automation_manager import AutomationManager
-from .logger_factory import LoggerFactory
-from .constants import Constants
+import importlib
 
-__all__ = ['BaseAutomation', 'AutomationManager', 'LoggerFactory', 'Constants']
+# Importación lazy: BaseAutomation y AutomationManager cargan Playwright
+_LAZY_EXPORTS = {
+    'BaseAutomation': '.base_automation',
+    'AutomationManager': '.automation_manager',
+    'LoggerFactory': '.logger_factory',
+    'Constants': '.constants',
+    'BrowserOptions': '.browser_options',
+    'HarArchive': '.har_archive',
+    'FlowRunner': '.flow_runner',
+    'FlowStep': '.flow_runner',
+    'FlowCheckpoint': '.flow_runner',
+    'CircuitBreaker': '.flow_runner',
+    'ResourceScheduler': '.resource_scheduler',
+    'RunMetrics': '.run_metrics'
+}
+
+__all__ = list(_LAZY_EXPORTS)
+
+
+def __getattr__(name):
+    if name in _LAZY_EXPORTS:
+        value = getattr(importlib.import_module(_LAZY_EXPORTS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,190 @@
+"""
+Timeouts adaptativos por aseguradora y operación.
+
+Cada espera instrumentada (navegaciones críticas, selectores, carga de FASECOLDA, prima
+anual de Sura) registra cuánto tardó. Con suficientes esperas exitosas, el timeout de la
+siguiente sale de un percentil alto de esas latencias por un margen, acotado entre un
+piso y un techo derivados del valor fijo que se usaba antes. Las esperas que vencen se
+registran aparte (muestra censurada, con el menor entre su timeout y el fijo) y no entran
+al percentil: mientras haya alguna en la ventana el timeout no baja del fijo, así que un
+portal que se vuelve lento no encoge el timeout y solo las esperas exitosas lo suben por
+encima del fijo. Solo aprenden las esperas sin timeout explícito del llamador.
+
+Las muestras se guardan en cache/adaptive_timeouts.json (últimas MAX_SAMPLES por clave).
+"""
+
+import os
+import json
+import time
+import atexit
+import threading
+from typing import Dict, List, Optional
+
+from .logger_factory import LoggerFactory
+from ..config.base_config import BaseConfig
+
+
+class AdaptiveTimeouts:
+    """Latencias observadas por 'compañía|operación' y los timeouts que se derivan de ellas."""
+
+    PATH = os.path.join(BaseConfig.CACHE_DIR, 'adaptive_timeouts.json')
+
+    MAX_SAMPLES = 50            # Muestras que se conservan por operación
+    MIN_SAMPLES = 5             # Por debajo se usa el timeout fijo
+    FLOOR_RATIO = 0.25          # Piso: fracción del timeout fijo...
+    FLOOR_MIN_MS = 2000         # ...pero nunca menos de esto
+    CEILING_RATIO = 2.0         # Techo: múltiplo del timeout fijo
+    MIN_POLL_SECONDS = 0.2
+    SAVE_EVERY_SECONDS = 10.0
+
+    _samples: Dict[str, List[List[float]]] = {}
+    _loaded = False
+    _dirty = False
+    _last_save = 0.0
+    _lock = threading.Lock()
+    _logger = None
+
+    @classmethod
+    def _log(cls):
+        if cls._logger is None:
+            cls._logger = LoggerFactory.create_logger('metrics')
+        return cls._logger
+
+    @staticmethod
+    def enabled() -> bool:
+        """Con HAR en reproducción las latencias no son las del portal: no se aprende ni se aplica."""
+        if not BaseConfig.ADAPTIVE_TIMEOUTS:
+            return False
+        from .har_archive import HarArchive
+        return HarArchive.mode() != HarArchive.REPLAY
+
+    @staticmethod
+    def key(company: str, operation: str) -> str:
+        return f"{(company or 'generic').lower()}|{operation}"
+
+    # --- Persistencia -------------------------------------------------------------------
+
+    @classmethod
+    def _ensure_loaded(cls) -> None:
+        if cls._loaded:
+            return
+        try:
+            with open(cls.PATH, 'r', encoding='utf-8') as f:
+                cls._samples = json.load(f)
+        except (OSError, ValueError):
+            cls._samples = {}
+        cls._loaded = True
+        atexit.register(cls.flush)
+
+    @classmethod
+    def flush(cls) -> None:
+        """Guarda las muestras pendientes (escritura atómica)."""
+        with cls._lock:
+            if not cls._dirty:
+                return
+            data = json.dumps(cls._samples, ensure_ascii=False)
+            cls._dirty = False
+            cls._last_save = time.monotonic()
+        try:
+            os.makedirs(os.path.dirname(cls.PATH), exist_ok=True)
+            tmp_path = f"{cls.PATH}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(data)
+            os.replace(tmp_path, cls.PATH)
+        except OSError as e:
+            cls._log().warning(f"⚠️ No se pudieron guardar los timeouts adaptativos: {e}")
+
+    # --- Registro -----------------------------------------------------------------------
+
+    @classmethod
+    def observe(cls, company: str, operation: str, seconds: float, ok: bool = True) -> None:
+        """
+        Registra la duración de una espera.
+
+        Args:
+            company: Compañía dueña de la espera ('sura', 'allianz', 'fasecolda')
+            operation: Operación (p. ej. 'navegacion:login', 'frame:placa'); nombre estable, sin selectores ni datos del cliente
+            seconds: Lo que tardó; si venció, el timeout que tenía
+            ok: False si la espera venció (la muestra queda como cota inferior)
+        """
+        if not cls.enabled() or seconds is None or seconds < 0:
+            return
+        with cls._lock:
+            cls._ensure_loaded()
+            samples = cls._samples.setdefault(cls.key(company, operation), [])
+            samples.append([round(float(seconds), 3), 1 if ok else 0])
+            del samples[:-cls.MAX_SAMPLES]
+            cls._dirty = True
+            due = time.monotonic() - cls._last_save >= cls.SAVE_EVERY_SECONDS
+        if due:
+            cls.flush()
+
+    @classmethod
+    def observe_timeout(cls, company: str, operation: str, timeout_ms: float, default_ms: float) -> None:
+        """
+        Registra una espera que venció.
+
+        La muestra se acota al timeout fijo: si se registrara el timeout aprendido, cada
+        vencimiento subiría el siguiente timeout hasta llegar al techo.
+        """
+        cls.observe(company, operation, min(timeout_ms, default_ms) / 1000, ok=False)
+
+    @classmethod
+    def _durations(cls, company: str, operation: str, ok: bool = True) -> List[float]:
+        """Duraciones de las esperas exitosas (ok=True) o de las que vencieron (ok=False)."""
+        with cls._lock:
+            cls._ensure_loaded()
+            return [sample[0] for sample in cls._samples.get(cls.key(company, operation), [])
+                    if bool(sample[1]) == ok]
+
+    # --- Consulta -----------------------------------------------------------------------
+
+    @classmethod
+    def timeout_ms(cls, company: str, operation: str, default_ms: int,
+                   floor_ms: Optional[int] = None, ceiling_ms: Optional[int] = None) -> int:
+        """
+        Timeout para la próxima espera de la operación.
+
+        Args:
+            company: Compañía dueña de la espera
+            operation: Operación
+            default_ms: Timeout fijo (se usa mientras no haya MIN_SAMPLES esperas exitosas)
+            floor_ms: Mínimo (por defecto FLOOR_RATIO del fijo, no menos de FLOOR_MIN_MS)
+            ceiling_ms: Máximo (por defecto CEILING_RATIO del fijo)
+
+        Returns:
+            Timeout en milisegundos
+        """
+        if not cls.enabled():
+            return default_ms
+        durations = cls._durations(company, operation)
+        if len(durations) < cls.MIN_SAMPLES:
+            return default_ms
+
+        from .run_ledger import RunLedger
+        learned = RunLedger.percentile(durations, BaseConfig.ADAPTIVE_TIMEOUT_PERCENTILE) \
+            * BaseConfig.ADAPTIVE_TIMEOUT_MARGIN * 1000
+        # Mientras haya esperas vencidas en la ventana no se baja del fijo (tampoco lo suben)
+        if cls._durations(company, operation, ok=False):
+            learned = max(learned, default_ms)
+        floor_ms = floor_ms if floor_ms is not None else min(default_ms, max(default_ms * cls.FLOOR_RATIO, cls.FLOOR_MIN_MS))
+        ceiling_ms = ceiling_ms if ceiling_ms is not None else default_ms * cls.CEILING_RATIO
+        return int(min(max(learned, floor_ms), ceiling_ms))
+
+    @classmethod
+    def poll_interval(cls, company: str, operation: str, default_seconds: float) -> float:
+        """
+        Intervalo de sondeo: una décima de la mediana de las esperas exitosas, entre MIN_POLL_SECONDS y el fijo.
+
+        Las operaciones que suelen resolverse rápido se revisan más seguido; nunca más
+        espaciado que el intervalo fijo.
+        """
+        if not cls.enabled():
+            return default_seconds
+        durations = cls._durations(company, operation)
+        if len(durations) < cls.MIN_SAMPLES:
+            return default_seconds
+
+        from .run_ledger import RunLedger
+        median = RunLedger.percentile(durations, 50)
+        return round(min(max(median / 10, cls.MIN_POLL_SECONDS), default_seconds), 2)
@@ -1,9 +1,12 @@
 """Orquestador principal para manejar múltiples automatizaciones."""
 
-import asyncio
 import logging
 from typing import List, Dict, Any, Optional
 from .logger_factory import LoggerFactory
+from .flow_runner import CircuitBreaker, FlowCheckpoint
+from .quote_results import QuoteResults
+from .resource_scheduler import ResourceScheduler
+from .run_metrics import get_run_metrics
 from ..shared.fasecolda_extractor import start_global_fasecolda_extraction, cleanup_global_fasecolda_extractor
 from ..shared.global_pause_coordinator import wait_for_global_resume
 
@@ -13,13 +16,23 @@ class AutomationManager:
     def __init__(self):
         self.logger = LoggerFactory.create_logger('manager')
         self.active_automations: Dict[str, Any] = {}
+        # Planificador de la ejecución paralela en curso (estado de cola y recursos)
+        self.scheduler: Optional[ResourceScheduler] = None
     
-    async def run_sequential(self, companies: List[str], **kwargs) -> Dict[str, bool]:
+    async def run_sequential(
+        self,
+        companies: List[str],
+        consolidation=None,
+        refresh_quotes: bool = False,
+        **kwargs
+    ) -> Dict[str, bool]:
         """
         Ejecuta automatizaciones de forma secuencial.
         
         Args:
             companies: Lista de compañías a ejecutar
+            consolidation: IncrementalConsolidation opcional que arma el Excel mientras corren
+            refresh_quotes: Cotizar de nuevo aunque haya una cotización vigente en caché
             **kwargs: Argumentos adicionales para las automatizaciones
             
         Returns:
@@ -32,29 +45,46 @@ class AutomationManager:
         if len(filtered_companies) != len(companies):
             self.logger.info(f"🔍 Compañías filtradas por fondo: {companies} → {filtered_companies}")
         
+        metrics = get_run_metrics()
+        metrics.start_run(filtered_companies, 'secuencial')
+        # Los fallos de una ejecución anterior no deben dejar el circuito abierto en esta
+        CircuitBreaker.reset()
+        
+        # Cotizaciones vigentes del mismo cliente: esas compañías no abren navegador
+        cached = self._cached_quotes(filtered_companies, refresh_quotes)
+        pending_companies = [c for c in filtered_companies if c not in cached]
+        
         # Detectar si se debe ejecutar en modo headless
         headless_mode = kwargs.get('headless', False)
         
-        # Iniciar extracción de códigos FASECOLDA en paralelo
-        fasecolda_task = await start_global_fasecolda_extraction(headless=headless_mode)
+        # Iniciar extracción de códigos FASECOLDA en paralelo (no hace falta si todo sale de la caché)
+        fasecolda_task = None
+        if pending_companies:
+            fasecolda_task = await start_global_fasecolda_extraction(headless=headless_mode)
         
         results = {}
         
         # Esperar que termine la extracción de Fasecolda antes de proceder
         try:
             from ..shared.fasecolda_service import FasecoldaReferenceNotFoundError
-            self.logger.info("🔍 Esperando resultado de extracción Fasecolda...")
-            await fasecolda_task  # Esto puede lanzar FasecoldaReferenceNotFoundError
-            self.logger.info("✅ Extracción Fasecolda completada - Iniciando cotizaciones")
+            if fasecolda_task:
+                self.logger.info("🔍 Esperando resultado de extracción Fasecolda...")
+                await fasecolda_task  # Esto puede lanzar FasecoldaReferenceNotFoundError
+                self.logger.info("✅ Extracción Fasecolda completada - Iniciando cotizaciones")
+            if consolidation:
+                consolidation.start()
         except FasecoldaReferenceNotFoundError as e:
             # Si falla Fasecolda, marcar todas las compañías como fallidas y salir
             self.logger.error(f"🚫 PROCESO COMPLETAMENTE DETENIDO - Error en Fasecolda: {e}")
             self.logger.info("🚫 Los navegadores de Allianz y Sura NO se abrirán")
             self.logger.info("📝 Verifique y actualice la referencia del vehículo en la edición del cliente")
+            metrics.finish_run(status='detenida')
             return {company: False for company in filtered_companies}
         
+        results.update(self._report_cached_quotes(cached, consolidation))
+        
         try:
-            for company in filtered_companies:
+            for company in pending_companies:
                 self.logger.info(f"📋 Procesando {company.upper()}...")
                 try:
                     # Importar dinámicamente la factory
@@ -62,11 +92,18 @@ class AutomationManager:
                     from ..shared.fasecolda_service import FasecoldaReferenceNotFoundError
                     
                     automation = AutomationFactory.create(company, **kwargs)
+                    metrics.company_started(company)
+                    QuoteResults.start(company)
                     await automation.launch()
                     
                     self.active_automations[company] = automation
                     result = await automation.run_complete_flow()
                     results[company] = result
+                    metrics.company_finished(company, result is True)
+                    if result is True:
+                        self._remember_quote(company)
+                    if consolidation:
+                        consolidation.company_finished(company, result is True, QuoteResults.plans(company))
                     
                     await automation.close()
                     del self.active_automations[company]
@@ -91,19 +128,31 @@ class AutomationManager:
                 except Exception as e:
                     self.logger.error(f"❌ Error en {company.upper()}: {e}")
                     results[company] = False
+                    metrics.failure(company, f"{type(e).__name__}: {e}")
+                    metrics.company_finished(company, False)
         
         finally:
             # Limpiar extractor global
             await cleanup_global_fasecolda_extractor()
+            metrics.finish_run()
         
+        self._clear_checkpoints_if_complete(results)
         return results
     
-    async def run_parallel(self, companies: List[str], **kwargs) -> Dict[str, bool]:
+    async def run_parallel(
+        self,
+        companies: List[str],
+        consolidation=None,
+        refresh_quotes: bool = False,
+        **kwargs
+    ) -> Dict[str, bool]:
         """
         Ejecuta automatizaciones en paralelo.
         
         Args:
             companies: Lista de compañías a ejecutar
+            consolidation: IncrementalConsolidation opcional que arma el Excel mientras corren
+            refresh_quotes: Cotizar de nuevo aunque haya una cotización vigente en caché
             **kwargs: Argumentos adicionales para las automatizaciones
             
         Returns:
@@ -116,48 +165,62 @@ class AutomationManager:
         if len(filtered_companies) != len(companies):
             self.logger.info(f"🔍 Compañías filtradas por fondo: {companies} → {filtered_companies}")
         
+        metrics = get_run_metrics()
+        metrics.start_run(filtered_companies, 'paralelo')
+        CircuitBreaker.reset()
+        
+        # Cotizaciones vigentes del mismo cliente: esas compañías no abren navegador
+        cached = self._cached_quotes(filtered_companies, refresh_quotes)
+        pending_companies = [c for c in filtered_companies if c not in cached]
+        
         # Detectar si se debe ejecutar en modo headless
         headless_mode = kwargs.get('headless', False)
         
-        # Iniciar extracción de códigos FASECOLDA en paralelo
-        fasecolda_task = await start_global_fasecolda_extraction(headless=headless_mode)
+        # Iniciar extracción de códigos FASECOLDA en paralelo (no hace falta si todo sale de la caché)
+        fasecolda_task = None
+        if pending_companies:
+            fasecolda_task = await start_global_fasecolda_extraction(headless=headless_mode)
         
         # Esperar que termine la extracción de Fasecolda antes de proceder
         try:
             from ..shared.fasecolda_service import FasecoldaReferenceNotFoundError
-            self.logger.info("🔍 Esperando resultado de extracción Fasecolda...")
-            await fasecolda_task  # Esto puede lanzar FasecoldaReferenceNotFoundError
-            self.logger.info("✅ Extracción Fasecolda completada - Iniciando cotizaciones paralelas")
+            if fasecolda_task:
+                self.logger.info("🔍 Esperando resultado de extracción Fasecolda...")
+                await fasecolda_task  # Esto puede lanzar FasecoldaReferenceNotFoundError
+                self.logger.info("✅ Extracción Fasecolda completada - Iniciando cotizaciones paralelas")
+            if consolidation:
+                consolidation.start()
         except FasecoldaReferenceNotFoundError as e:
             # Si falla Fasecolda, marcar todas las compañías como fallidas y salir
             self.logger.error(f"🚫 PROCESO COMPLETAMENTE DETENIDO - Error en Fasecolda: {e}")
             self.logger.info("🚫 Los navegadores de Allianz y Sura NO se abrirán")
             self.logger.info("📝 Verifique y actualice la referencia del vehículo en la edición del cliente")
+            metrics.finish_run(status='detenida')
             return {company: False for company in filtered_companies}
         
-        # Crear tasks
-        tasks = []
+        # Trabajos por compañía; el planificador los admite según los recursos disponibles
+        jobs = {}
         automations = {}
+        self.scheduler = ResourceScheduler(self.logger)
         
         try:
             # Importar dinámicamente la factory
             from ..factory.automation_factory import AutomationFactory
             
-            for company in filtered_companies:
+            for company in pending_companies:
                 automation = AutomationFactory.create(company, **kwargs)
                 automations[company] = automation
-                task = self._run_single_automation(company, automation)
-                tasks.append(task)
+                jobs[company] = lambda c=company, a=automation: self._run_and_report(c, a, consolidation)
             
-            # Ejecutar en paralelo
-            results_list = await asyncio.gather(*tasks, return_exceptions=True)
+            # Ejecutar en paralelo (las que no caben esperan en cola)
+            results_by_company = await self.scheduler.run(jobs, abort_on=(FasecoldaReferenceNotFoundError,)) if jobs else {}
             
             # Procesar resultados
-            results = {}
+            results = self._report_cached_quotes(cached, consolidation)
             fasecolda_error_found = False
             
-            for i, company in enumerate(filtered_companies):
-                result = results_list[i]
+            for company in pending_companies:
+                result = results_by_company.get(company, False)
                 if isinstance(result, Exception):
                     # Verificar si es una excepción específica de Fasecolda
                     from ..shared.fasecolda_service import FasecoldaReferenceNotFoundError
@@ -178,6 +241,7 @@ class AutomationManager:
                     else:
                         self.logger.error(f"❌ {company.upper()} falló")
             
+            self._clear_checkpoints_if_complete(results)
             return results
             
         except Exception as e:
@@ -193,6 +257,148 @@ class AutomationManager:
             
             # Limpiar extractor global
             await cleanup_global_fasecolda_extractor()
+            metrics.finish_run()
+    
+    async def run_in_tabs(
+        self,
+        company: str,
+        clients: List[Dict[str, str]],
+        max_concurrent_tabs: Optional[int] = None,
+        **kwargs
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Cotiza varios clientes de una misma compañía en pestañas de un solo navegador autenticado.
+        
+        Args:
+            company: Compañía a ejecutar ('sura', 'allianz')
+            clients: Lista de diccionarios de datos de cliente
+            max_concurrent_tabs: Límite de pestañas simultáneas (por defecto el de la compañía)
+            **kwargs: Argumentos adicionales para la automatización
+            
+        Returns:
+            Diccionario {documento del cliente: {'success', 'plans', 'pdf', 'fasecolda', 'error'}}
+        """
+        from ..factory.automation_factory import AutomationFactory
+        from .base_automation import BaseAutomation
+        
+        self.logger.info(f"🗂️ Ejecutando {len(clients)} cotizaciones de {company.upper()} en pestañas")
+        automation = AutomationFactory.create(company, **kwargs)
+        if not isinstance(automation, BaseAutomation):
+            # Bolívar/Solidaria no usan navegador: no tienen cotización multi-pestaña
+            self.logger.error(f"❌ {company.upper()} no soporta cotización multi-pestaña")
+            return BaseAutomation._tab_results(
+                clients, [BaseAutomation._tab_result(error='cotización multi-pestaña no soportada')] * len(clients)
+            )
+        metrics = get_run_metrics()
+        metrics.start_run([company], 'pestañas')
+        metrics.company_started(company)
+        CircuitBreaker.reset()
+        
+        results: Dict[str, Dict[str, Any]] = {}
+        try:
+            if not await automation.launch():
+                results = automation._tab_results(
+                    clients, [automation._tab_result(error='no se pudo abrir el navegador')] * len(clients)
+                )
+                return results
+            self.active_automations[company] = automation
+            results = await automation.run_quotes_in_tabs(clients, max_concurrent_tabs)
+            return results
+        finally:
+            try:
+                await automation.close()
+            except Exception as e:
+                self.logger.error(f"❌ Error cerrando {company}: {e}")
+            self.active_automations.pop(company, None)
+            failed = [key for key, result in results.items() if not result['success']]
+            if failed:
+                metrics.failure(company, f"{len(failed)}/{len(clients)} clientes fallidos: {', '.join(failed[:5])}")
+            metrics.company_finished(company, bool(results) and not failed)
+            metrics.finish_run()
+    
+    def _cached_quotes(self, companies: List[str], refresh_quotes: bool = False) -> Dict[str, Dict[str, Any]]:
+        """
+        Cotizaciones vigentes en caché para el cliente activo.
+        
+        Args:
+            companies: Compañías de la ejecución
+            refresh_quotes: Ignorar la caché y cotizar todo de nuevo
+            
+        Returns:
+            Diccionario {compañía: entrada de QuoteCache}
+        """
+        from ..shared.quote_cache import QuoteCache
+        
+        cached = {}
+        if refresh_quotes:
+            self.logger.info("🔄 Caché de cotizaciones ignorada - se cotiza todo de nuevo")
+        else:
+            for company in companies:
+                entry = QuoteCache.lookup(company)
+                if entry:
+                    cached[company] = entry
+                    self.logger.info(
+                        f"♻️ {company.upper()}: se reutiliza la cotización de hace "
+                        f"{QuoteCache.age_minutes(entry)} min (sin abrir el portal)"
+                    )
+        
+        # Si no queda ningún navegador no se abre FASECOLDA: el consolidado usa los códigos cacheados
+        codes = None
+        if cached and len(cached) == len(companies):
+            codes = next((e['fasecolda'] for e in cached.values() if e.get('fasecolda')), None)
+        QuoteCache.apply_fasecolda_codes(codes)
+        return cached
+    
+    def _report_cached_quotes(self, cached: Dict[str, Dict[str, Any]], consolidation=None) -> Dict[str, bool]:
+        """Da por terminadas las compañías cacheadas: PDF de nuevo en Descargas, métricas y consolidado."""
+        from ..shared.quote_cache import QuoteCache
+        
+        metrics = get_run_metrics()
+        for company, entry in cached.items():
+            metrics.company_started(company)
+            pdf_path = QuoteCache.reattach_pdf(company, entry)
+            if pdf_path:
+                metrics.record_output('pdf', pdf_path, company)
+                self.logger.info(f"📎 PDF de {company.upper()} copiado desde la caché: {pdf_path}")
+            metrics.record_prices(company, entry['plans'])
+            metrics.company_finished(company, True)
+            if consolidation:
+                consolidation.company_finished(company, True, entry['plans'])
+        return {company: True for company in cached}
+    
+    def _remember_quote(self, company: str) -> None:
+        """Guarda en caché una cotización exitosa recién terminada (primas y PDF que registró esta ejecución)."""
+        from .har_archive import HarArchive
+        if HarArchive.is_active():
+            return  # Con HAR las primas son las de la grabación, no las del cliente activo
+        produced = QuoteResults.get(company)
+        if not produced or not produced['plans']:
+            self.logger.info(f"ℹ️ {company.upper()} no registró primas en esta ejecución - no se guarda en caché")
+            return
+        try:
+            from ..shared import fasecolda_extractor
+            from ..shared.quote_cache import QuoteCache
+            
+            extractor = fasecolda_extractor._global_extractor
+            QuoteCache.store(company, produced['plans'], produced['pdf'], extractor.codes if extractor else None)
+        except Exception as e:
+            self.logger.warning(f"⚠️ No se pudo guardar la cotización de {company.upper()} en caché: {e}")
+    
+    async def _run_and_report(self, company: str, automation, consolidation=None) -> bool:
+        """Ejecuta una automatización y avisa al consolidado incremental apenas termina."""
+        metrics = get_run_metrics()
+        metrics.company_started(company)
+        QuoteResults.start(company)
+        result = False
+        try:
+            result = await self._run_single_automation(company, automation)
+        finally:
+            metrics.company_finished(company, result is True)
+        if result is True:
+            self._remember_quote(company)
+        if consolidation:
+            consolidation.company_finished(company, result is True, QuoteResults.plans(company))
+        return result
     
     async def _run_single_automation(self, company: str, automation) -> bool:
         """Ejecuta una sola automatización con manejo de pausas globales."""
@@ -224,6 +430,7 @@ class AutomationManager:
             
         except Exception as e:
             self.logger.error(f"❌ Error en automatización {company}: {e}")
+            get_run_metrics().failure(company, f"{type(e).__name__}: {e}")
             try:
                 await automation.close()
             except:
@@ -259,6 +466,17 @@ class AutomationManager:
         pause_aware_automation = PauseAwareAutomation(automation, company)
         return await pause_aware_automation.run_complete_flow()
     
+    def _clear_checkpoints_if_complete(self, results: Dict[str, bool]) -> None:
+        """
+        Con todas las compañías exitosas se borran los checkpoints; si alguna falló se conservan
+        para que al repetir se omitan las que ya terminaron para el mismo cliente.
+        """
+        if results and all(results.values()):
+            FlowCheckpoint.clear_companies(list(results.keys()))
+        elif results:
+            pending = [c.upper() for c, ok in results.items() if not ok]
+            self.logger.info(f"📌 Checkpoints conservados - al repetir se reanudan: {', '.join(pending)}")
+    
     async def stop_all(self):
         """Detiene todas las automatizaciones activas."""
         self.logger.info("🛑 Deteniendo todas las automatizaciones...")
@@ -4,15 +4,23 @@ import os
 import logging
 import asyncio
 from abc import ABC, abstractmethod
-from typing import Optional
-from playwright.async_api import async_playwright, Browser, Page, Playwright
+from typing import Any, Optional, List, Dict
+from playwright.async_api import Browser, Page, Playwright
 
 from .logger_factory import LoggerFactory
+from .browser_options import BrowserOptions
+from .har_archive import HarArchive
+from .playwright_runtime import get_playwright_runtime
+from .run_metrics import get_run_metrics
+from .flow_runner import FlowRunner, FlowStep, FlowCheckpoint
 from ..config.base_config import BaseConfig
 
 class BaseAutomation(ABC):
     """Clase base abstracta que define la interfaz común para todas las automatizaciones."""
     
+    # Si el flujo necesita navegador con cabeza (en servidores sin pantalla se usa Xvfb)
+    REQUIRES_HEAD: bool = False
+    
     def __init__(
         self, 
         company: str,
@@ -23,7 +31,9 @@ class BaseAutomation(ABC):
         self.company = company.lower()
         self.usuario = usuario
         self.contrasena = contrasena
-        self.headless = headless if headless is not None else False  # Por defecto False para evitar problemas
+        self.headless = headless if headless is not None else False  # Ocultar ventanas (no es headless real)
+        self.browser_mode: Optional[str] = None
+        self.flow: Optional[FlowRunner] = None
         
         # Playwright
         self.playwright: Optional[Playwright] = None
@@ -211,84 +221,44 @@ class BaseAutomation(ABC):
                 # 3. Pequeña pausa para asegurar que todo esté limpio
                 await asyncio.sleep(1)
                 
-            self.playwright = await async_playwright().start()
+            # Driver compartido por todas las compañías de la ejecución
+            self.playwright = await get_playwright_runtime().acquire()
+            
+            # Modo de lanzamiento: visible, oculto (fuera de pantalla) o headless real en servidores
+            self.browser_mode = BrowserOptions.resolve_mode(
+                self.company,
+                hidden=self.headless,
+                requires_head=self.REQUIRES_HEAD,
+                logger=self.logger
+            )
+            context_kwargs = await BrowserOptions.context_kwargs(self.browser_mode, self.playwright)
+            context_kwargs.update(HarArchive.context_kwargs(self.company))
             
             # Para Sura y Allianz, usar perfil persistente para mantener las cookies/sesiones
             if self.company in ['sura', 'allianz']:
                 # Crear contexto persistente en lugar de navegador temporal
-                # Usar ventanas minimizadas en lugar de headless para evitar problemas
-                browser_args = [
-                    '--disable-blink-features=AutomationControlled',
-                    '--disable-dev-shm-usage',
-                    '--no-sandbox'
-                ]
-                
-                # Si debe estar oculto, usar ventana minimizada en lugar de headless
-                if self.headless:
-                    browser_args.extend([
-                        '--start-minimized',
-                        '--window-position=-32000,-32000',  # Mover fuera de la pantalla
-                        '--window-size=1,1',  # Tamaño mínimo
-                        '--disable-background-timer-throttling',  # Evita que se ralenticen los timers
-                        '--disable-renderer-backgrounding',  # Evita que el renderer se pause
-                        '--disable-backgrounding-occluded-windows'  # No pausar ventanas ocultas
-                    ])
-                    headless_mode = False  # No usar headless real para evitar problemas
-                else:
-                    # Ventanas visibles: centrar en pantalla con tamaño razonable
-                    browser_args.extend([
-                        '--window-position=100,50',  # Posición centrada (primera ventana)
-                        '--window-size=1200,800',  # Tamaño razonable
-                        '--disable-background-timer-throttling',
-                        '--disable-renderer-backgrounding'
-                    ])
-                    headless_mode = False
-                
                 self.browser = await self.playwright.chromium.launch_persistent_context(
                     user_data_dir=user_data_dir,
-                    headless=headless_mode,
-                    args=browser_args
+                    **BrowserOptions.launch_kwargs(self.browser_mode, window_position='100,50'),
+                    **context_kwargs
                 )
                 # En contexto persistente, la página ya está disponible
                 if len(self.browser.pages) > 0:
                     self.page = self.browser.pages[0]
                 else:
                     self.page = await self.browser.new_page()
+                
+                await HarArchive.attach(self.browser, self.company, self.logger)
+                get_run_metrics().instrument_context(self.browser, self.company)
                     
             else:
-                # Para otras compañías, usar navegador temporal normal
-                browser_args = [
-                    '--disable-blink-features=AutomationControlled',
-                    '--disable-dev-shm-usage',
-                    '--no-sandbox'
-                ]
-                
-                # Si debe estar oculto, usar ventana minimizada en lugar de headless
-                if self.headless:
-                    browser_args.extend([
-                        '--start-minimized',
-                        '--window-position=-32000,-32000',  # Mover fuera de la pantalla
-                        '--window-size=1,1',  # Tamaño mínimo
-                        '--disable-background-timer-throttling',  # Evita que se ralenticen los timers
-                        '--disable-renderer-backgrounding',  # Evita que el renderer se pause
-                        '--disable-backgrounding-occluded-windows'  # No pausar ventanas ocultas
-                    ])
-                    headless_mode = False  # No usar headless real para evitar problemas
-                else:
-                    # Ventanas visibles: centrar en pantalla con tamaño razonable  
-                    browser_args.extend([
-                        '--window-position=350,100',  # Posición centrada (segunda ventana, más desplazada)
-                        '--window-size=1200,800',  # Tamaño razonable
-                        '--disable-background-timer-throttling',
-                        '--disable-renderer-backgrounding'
-                    ])
-                    headless_mode = False
-                
+                # Para otras compañías, usar navegador temporal normal (segunda ventana, más desplazada)
                 self.browser = await self.playwright.chromium.launch(
-                    headless=headless_mode,
-                    args=browser_args
+                    **BrowserOptions.launch_kwargs(self.browser_mode, window_position='350,100')
                 )
-                self.page = await self.browser.new_page()
+                self.page = await self.browser.new_page(**context_kwargs)
+                await HarArchive.attach(self.page, self.company, self.logger)
+                get_run_metrics().instrument_context(self.page.context, self.company)
             
             self.logger.info("✅ Navegador lanzado exitosamente")
             return True
@@ -322,7 +292,9 @@ class BaseAutomation(ABC):
                     await self.browser.close()
                     
             if self.playwright:
-                await self.playwright.stop()
+                # El driver es compartido: solo se devuelve
+                self.playwright = None
+                await get_playwright_runtime().release()
                 
             self.logger.info("✅ Recursos liberados completamente")
             
@@ -388,6 +360,174 @@ class BaseAutomation(ABC):
         """Ejecuta el flujo de cotización específico de la compañía."""
         pass
     
+    # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+    # COTIZACIÓN MULTI-PESTAÑA (un solo contexto autenticado)
+    # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+    def get_max_concurrent_tabs(self) -> int:
+        """Límite de pestañas simultáneas para la compañía (respeta límites del portal)."""
+        return max(1, BaseConfig.get_company_config(self.company).get('max_concurrent_tabs', 1))
+
+    @abstractmethod
+    async def execute_quote_in_page(self, page: Page, client) -> bool:
+        """
+        Ejecuta una cotización completa (dashboard → cotización → póliza → PDF) en una pestaña
+        del contexto ya autenticado.
+        
+        Args:
+            page: Pestaña de trabajo
+            client: Configuración del cliente de la pestaña (ClientConfig.for_client()), que
+                    reciben las páginas de la cotización
+        """
+        pass
+
+    async def run_steps(self, steps: List[FlowStep]) -> bool:
+        """
+        Ejecuta el flujo como pasos con checkpoint persistido, reintentos con backoff y circuit breaker.
+        
+        Args:
+            steps: Pasos del flujo en orden
+            
+        Returns:
+            True si todos los pasos terminaron bien
+        """
+        from ..config.client_config import ClientConfig
+        
+        checkpoint = FlowCheckpoint(self.company, ClientConfig.get_client_fingerprint())
+        self.flow = FlowRunner(
+            self.company,
+            steps,
+            self.logger,
+            checkpoint=checkpoint,
+            current_url=lambda: self.page.url if self.page else ''
+        )
+        return await self.flow.run()
+
+    async def run_quotes_in_tabs(
+        self,
+        clients: List[Dict[str, str]],
+        max_concurrent_tabs: Optional[int] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Cotiza varios clientes en paralelo abriendo pestañas dentro del mismo contexto.
+        
+        El login (y MFA) se hace una sola vez en la pestaña principal; las pestañas de trabajo
+        comparten cookies y solo se abren hasta el límite de concurrencia de la compañía. Cada
+        cliente resuelve sus propios códigos FASECOLDA y sus primas/PDF se registran aparte
+        (QuoteResults.scope), sin pasar por el log compartido de la compañía.
+        
+        Args:
+            clients: Lista de diccionarios de datos de cliente (mismo formato que ClientConfig)
+            max_concurrent_tabs: Límite de pestañas simultáneas (por defecto el de la compañía)
+            
+        Returns:
+            Diccionario {documento del cliente: {'success', 'plans', 'pdf', 'fasecolda', 'error'}}
+        """
+        from ..config.client_config import ClientConfig
+        from .quote_results import QuoteResults
+        from ..shared.fasecolda_extractor import resolve_client_fasecolda_codes
+        from ..shared.fasecolda_service import FasecoldaReferenceNotFoundError
+
+        if not self.page:
+            self.logger.error("❌ Navegador no inicializado - llame a launch() primero")
+            return {}
+
+        limit = max_concurrent_tabs or self.get_max_concurrent_tabs()
+        self.logger.info(f"🗂️ Cotizando {len(clients)} clientes en pestañas (máximo {limit} simultáneas)...")
+
+        if not await self.execute_login_flow():
+            self.logger.error("❌ Falló el login - no se abrirán pestañas de trabajo")
+            return self._tab_results(clients, [self._tab_result(error='login fallido')] * len(clients))
+
+        semaphore = asyncio.Semaphore(limit)
+        context = self.page.context
+        metrics = get_run_metrics()
+        queue_name = f"pestanas_{self.company}"
+        tabs = {'waiting': len(clients), 'active': 0}
+
+        def _update_queue(waiting: int, active: int) -> None:
+            tabs['waiting'] += waiting
+            tabs['active'] += active
+            metrics.set_queue(queue_name, tabs['waiting'], tabs['active'])
+
+        async def _run_client(index: int, client: Dict[str, str]) -> Dict[str, Any]:
+            key = self._client_key(client, index)
+            result = self._tab_result()
+            client_config = ClientConfig.for_client(client)
+            with QuoteResults.scope():
+                # Códigos del vehículo de este cliente (antes de ocupar una pestaña)
+                try:
+                    result['fasecolda'] = await resolve_client_fasecolda_codes(client_config, headless=self.headless)
+                except FasecoldaReferenceNotFoundError as e:
+                    self.logger.error(f"🚫 Cliente {key}: {e}")
+                    result['error'] = str(e)
+                    _update_queue(-1, 0)
+                    return result
+
+                async with semaphore:
+                    _update_queue(-1, 1)
+                    tab = await context.new_page()
+                    self.logger.info(f"🆕 Pestaña abierta para cliente {key}")
+                    try:
+                        ok = await self.execute_quote_in_page(tab, client_config) is True
+                    except Exception as e:
+                        self.logger.exception(f"❌ Error cotizando cliente {key}: {e}")
+                        ok = False
+                        result['error'] = f"{type(e).__name__}: {e}"
+                    finally:
+                        _update_queue(0, -1)
+                        try:
+                            await tab.close()
+                        except Exception:
+                            pass
+
+                produced = QuoteResults.get(self.company)
+                if produced:
+                    result['plans'], result['pdf'] = produced['plans'], produced['pdf']
+                result['success'] = ok and bool(result['plans'])
+                if ok and not result['plans']:
+                    result['error'] = 'la cotización terminó sin primas extraídas'
+
+            self.logger.info(f"{'✅' if result['success'] else '❌'} Cliente {key} "
+                             f"{'cotizado: ' + str(result['plans']) if result['success'] else 'falló'}")
+            return result
+
+        metrics.set_queue(queue_name, tabs['waiting'], tabs['active'])
+        results_list = await asyncio.gather(
+            *(_run_client(i, client) for i, client in enumerate(clients)),
+            return_exceptions=True
+        )
+        results_list = [
+            r if isinstance(r, dict) else self._tab_result(error=f"{type(r).__name__}: {r}")
+            for r in results_list
+        ]
+
+        results = self._tab_results(clients, results_list)
+        ok_count = sum(1 for r in results.values() if r['success'])
+        self.logger.info(f"🏁 Cotización multi-pestaña terminada: {ok_count}/{len(clients)} exitosas")
+        return results
+
+    @staticmethod
+    def _tab_result(error: Optional[str] = None) -> Dict[str, Any]:
+        """Resultado vacío (fallido) de una pestaña."""
+        return {'success': False, 'plans': {}, 'pdf': None, 'fasecolda': None, 'error': error}
+
+    @classmethod
+    def _tab_results(cls, clients: List[Dict[str, str]], results: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """Asocia cada resultado a su cliente (documentos repetidos llevan el número de fila)."""
+        keyed = {}
+        for i, (client, result) in enumerate(zip(clients, results)):
+            key = cls._client_key(client, i)
+            if key in keyed:
+                key = f"{key}_{i + 1}"
+            keyed[key] = dict(result)
+        return keyed
+
+    @staticmethod
+    def _client_key(client: Dict[str, str], index: int) -> str:
+        """Identificador legible de un cliente en los resultados multi-pestaña."""
+        return client.get('client_document_number') or f"cliente_{index + 1}"
+
     async def run_complete_flow(self) -> bool:
         """Ejecuta el flujo completo de automatización."""
         self.logger.info(f"🎬 Iniciando flujo completo para {self.company.upper()}...")
@@ -0,0 +1,267 @@
+"""Resolución del modo de navegador (visible, oculto o headless real) y opciones de lanzamiento."""
+
+import os
+import sys
+import time
+import shutil
+import atexit
+import logging
+import subprocess
+from typing import Optional, Dict, Any
+
+from ..config.base_config import BaseConfig
+
+
+class BrowserOptions:
+    """Centraliza cómo se lanza Chromium según el equipo (escritorio o servidor sin pantalla)."""
+
+    # Modos soportados
+    VISIBLE = 'visible'    # Ventana normal
+    HIDDEN = 'hidden'      # Ventana real fuera de pantalla (requiere display)
+    HEADLESS = 'headless'  # Chromium new-headless, sin display
+
+    # UA del Chromium instalado sin "HeadlessChrome" (se averigua una vez por proceso)
+    _headless_user_agent: Optional[str] = None
+    HEADLESS_VIEWPORT = {'width': 1366, 'height': 768}
+    LOCALE = 'es-CO'
+    TIMEZONE = 'America/Bogota'
+
+    BASE_ARGS = [
+        '--disable-blink-features=AutomationControlled',
+        '--disable-dev-shm-usage',
+        '--no-sandbox'
+    ]
+
+    # Display virtual compartido por todo el proceso
+    _xvfb_process: Optional[subprocess.Popen] = None
+    XVFB_DISPLAY = os.getenv('XVFB_DISPLAY', ':99')
+    _xvfb_display: Optional[str] = None
+    XVFB_DISPLAY_ATTEMPTS = 5        # Displays consecutivos a probar si el configurado está ocupado
+    XVFB_START_TIMEOUT = 5.0         # Segundos para que aparezca el socket del display
+
+    # Pantalla real al arrancar el proceso (antes de exportar el DISPLAY de Xvfb)
+    _REAL_DISPLAY: bool = (
+        not sys.platform.startswith('linux')
+        or bool(os.environ.get('DISPLAY') or os.environ.get('WAYLAND_DISPLAY'))
+    )
+
+    @classmethod
+    def has_display(cls) -> bool:
+        """Indica si hay una pantalla real (Windows/macOS siempre; Linux si había DISPLAY al iniciar)."""
+        return cls._REAL_DISPLAY
+
+    @classmethod
+    def is_server_mode(cls) -> bool:
+        """Modo servidor: forzado por SERVER_MODE o detectado en Linux sin pantalla."""
+        return BaseConfig.SERVER_MODE or not cls.has_display()
+
+    @classmethod
+    def resolve_mode(
+        cls,
+        company: str,
+        hidden: bool,
+        requires_head: bool = False,
+        logger: Optional[logging.Logger] = None
+    ) -> str:
+        """
+        Determina el modo de lanzamiento para una compañía.
+
+        Args:
+            company: Nombre de la compañía (o 'fasecolda')
+            hidden: Si la GUI pidió ocultar los navegadores
+            requires_head: Si el flujo de la compañía necesita un navegador con cabeza
+            logger: Logger para informar el modo elegido
+
+        Returns:
+            Uno de VISIBLE, HIDDEN o HEADLESS
+        """
+        logger = logger or logging.getLogger(company)
+
+        if not cls.is_server_mode():
+            return cls.HIDDEN if hidden else cls.VISIBLE
+
+        needs_head = requires_head or company.lower() in BaseConfig.HEADFUL_COMPANIES
+        if not needs_head:
+            logger.info(f"🖥️ Modo servidor: {company.upper()} se ejecuta en headless real")
+            return cls.HEADLESS
+
+        # El flujo necesita cabeza: usar display virtual si no hay uno real
+        if cls.has_display() or cls.ensure_virtual_display(logger):
+            logger.info(f"🖥️ Modo servidor: {company.upper()} requiere cabeza - usando display {os.environ.get('DISPLAY')}")
+            return cls.HIDDEN
+
+        logger.warning(f"⚠️ {company.upper()} requiere cabeza pero Xvfb no está disponible - intentando headless")
+        return cls.HEADLESS
+
+    @classmethod
+    def launch_kwargs(cls, mode: str, window_position: str = '100,50') -> Dict[str, Any]:
+        """Argumentos para chromium.launch / launch_persistent_context según el modo."""
+        args = list(cls.BASE_ARGS)
+
+        if mode == cls.HEADLESS:
+            args.extend([
+                '--headless=new',  # Nuevo headless: mismo motor que Chrome con cabeza
+                f"--window-size={cls.HEADLESS_VIEWPORT['width']},{cls.HEADLESS_VIEWPORT['height']}",
+                '--disable-gpu'
+            ])
+            return {'headless': True, 'args': args}
+
+        if mode == cls.HIDDEN:
+            args.extend([
+                '--start-minimized',
+                '--window-position=-32000,-32000',  # Mover fuera de la pantalla
+                '--window-size=1,1',  # Tamaño mínimo
+                '--disable-background-timer-throttling',  # Evita que se ralenticen los timers
+                '--disable-renderer-backgrounding',  # Evita que el renderer se pause
+                '--disable-backgrounding-occluded-windows'  # No pausar ventanas ocultas
+            ])
+        else:
+            # Ventanas visibles: posición dada con tamaño razonable
+            args.extend([
+                f'--window-position={window_position}',
+                '--window-size=1200,800',
+                '--disable-background-timer-throttling',
+                '--disable-renderer-backgrounding'
+            ])
+        return {'headless': False, 'args': args}
+
+    @classmethod
+    async def context_kwargs(cls, mode: str, playwright) -> Dict[str, Any]:
+        """Opciones de contexto/página: en headless fija UA, viewport, idioma y zona horaria."""
+        if mode != cls.HEADLESS:
+            return {}
+        kwargs = {
+            'viewport': dict(cls.HEADLESS_VIEWPORT),
+            'locale': cls.LOCALE,
+            'timezone_id': cls.TIMEZONE
+        }
+        user_agent = await cls.headless_user_agent(playwright)
+        if user_agent:
+            kwargs['user_agent'] = user_agent
+        return kwargs
+
+    @classmethod
+    async def headless_user_agent(cls, playwright) -> Optional[str]:
+        """
+        UA para headless: HEADLESS_USER_AGENT si está configurado o, si no, el del propio
+        Chromium con "HeadlessChrome" cambiado por "Chrome".
+
+        Se conserva la versión y la plataforma reales para que el UA no contradiga
+        navigator.platform ni las client hints del navegador.
+
+        Returns:
+            UA a usar, o None si no se pudo averiguar (se deja el del navegador)
+        """
+        if BaseConfig.HEADLESS_USER_AGENT:
+            return BaseConfig.HEADLESS_USER_AGENT
+        if cls._headless_user_agent is None:
+            browser = None
+            try:
+                browser = await playwright.chromium.launch(**cls.launch_kwargs(cls.HEADLESS))
+                page = await browser.new_page()
+                user_agent = await page.evaluate('navigator.userAgent')
+                cls._headless_user_agent = user_agent.replace('HeadlessChrome', 'Chrome')
+            except Exception as e:
+                logging.getLogger(__name__).warning(f"⚠️ No se pudo obtener el UA de Chromium: {e}")
+                return None
+            finally:
+                if browser:
+                    await browser.close()
+        return cls._headless_user_agent
+
+    @classmethod
+    def ensure_virtual_display(cls, logger: Optional[logging.Logger] = None) -> bool:
+        """
+        Arranca Xvfb una sola vez por proceso y exporta DISPLAY.
+
+        Si el display configurado ya está ocupado (otro Xvfb o servidor X) se prueban los
+        siguientes. Solo se da por iniciado cuando el proceso sigue vivo y existe su socket
+        en /tmp/.X11-unix, para que un Xvfb que no arrancó no termine en un error opaco
+        al lanzar Chromium.
+
+        Returns:
+            True si hay un Xvfb propio listo, False si no es posible
+        """
+        logger = logger or logging.getLogger(__name__)
+
+        if cls._xvfb_process and cls._xvfb_process.poll() is None:
+            os.environ['DISPLAY'] = cls._xvfb_display
+            return True
+
+        xvfb = shutil.which('Xvfb')
+        if not xvfb:
+            return False
+
+        try:
+            first = int(cls.XVFB_DISPLAY.lstrip(':').split('.')[0])
+        except ValueError:
+            logger.warning(f"⚠️ XVFB_DISPLAY inválido: {cls.XVFB_DISPLAY}")
+            return False
+
+        for number in range(first, first + cls.XVFB_DISPLAY_ATTEMPTS):
+            if cls._display_in_use(number):
+                logger.info(f"🖥️ Display :{number} ocupado - probando el siguiente")
+                continue
+            if cls._start_xvfb(xvfb, number, logger):
+                return True
+
+        logger.warning(f"⚠️ No se pudo iniciar Xvfb en :{first}-:{first + cls.XVFB_DISPLAY_ATTEMPTS - 1}")
+        return False
+
+    @staticmethod
+    def _display_socket(number: int) -> str:
+        return f"/tmp/.X11-unix/X{number}"
+
+    @classmethod
+    def _display_in_use(cls, number: int) -> bool:
+        """Un display está tomado si existe su socket o su archivo de bloqueo."""
+        return os.path.exists(cls._display_socket(number)) or os.path.exists(f"/tmp/.X{number}-lock")
+
+    @classmethod
+    def _start_xvfb(cls, xvfb: str, number: int, logger: logging.Logger) -> bool:
+        """Lanza Xvfb en el display dado y espera a que quede escuchando. Retorna True si está listo."""
+        display = f":{number}"
+        try:
+            process = subprocess.Popen(
+                [xvfb, display, '-screen', '0', '1366x768x24', '-nolisten', 'tcp'],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudo iniciar Xvfb: {e}")
+            return False
+
+        deadline = time.monotonic() + cls.XVFB_START_TIMEOUT
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                error = (process.stderr.read() or b'').decode(errors='replace').strip().splitlines()
+                logger.warning(f"⚠️ Xvfb terminó al iniciar en {display} (código {process.returncode})"
+                               f"{': ' + error[-1] if error else ''}")
+                return False
+            if os.path.exists(cls._display_socket(number)):
+                # Ya no se lee stderr: soltarlo para que Xvfb no se bloquee al escribir
+                process.stderr.close()
+                cls._xvfb_process = process
+                cls._xvfb_display = display
+                os.environ['DISPLAY'] = display
+                atexit.register(cls.stop_virtual_display)
+                logger.info(f"🖥️ Xvfb iniciado en {display}")
+                return True
+            time.sleep(0.05)
+
+        logger.warning(f"⚠️ Xvfb no abrió {display} en {cls.XVFB_START_TIMEOUT:.0f}s")
+        process.kill()
+        process.wait()
+        return False
+
+    @classmethod
+    def stop_virtual_display(cls) -> None:
+        """Detiene el Xvfb iniciado por este proceso."""
+        if cls._xvfb_process and cls._xvfb_process.poll() is None:
+            cls._xvfb_process.terminate()
+            try:
+                cls._xvfb_process.wait(timeout=5)
+            except Exception:
+                cls._xvfb_process.kill()
+        cls._xvfb_process = None
+        cls._xvfb_display = None
@@ -0,0 +1,316 @@
+"""Ejecución de flujos por pasos con checkpoints persistidos, reintentos con backoff y circuit breaker."""
+
+import os
+import json
+import time
+import asyncio
+import logging
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional, Any
+
+from .run_metrics import get_run_metrics
+from .quote_results import QuoteResults
+from ..config.base_config import BaseConfig
+from ..shared.global_pause_coordinator import wait_for_global_resume
+
+
+class FlowStep:
+    """Paso con nombre dentro del flujo de una aseguradora."""
+
+    def __init__(
+        self,
+        name: str,
+        action: Callable[[], Awaitable[bool]],
+        max_attempts: int = 1,
+        restart_from: Optional[str] = None,
+        persistent: bool = False
+    ):
+        """
+        Args:
+            name: Nombre del paso (clave del checkpoint)
+            action: Corrutina sin argumentos que retorna True si el paso terminó bien
+            max_attempts: Intentos del paso antes de dar el flujo por fallido
+            restart_from: Paso desde el cual reanudar al reintentar (None = el mismo paso)
+            persistent: Si su resultado sobrevive a un reinicio del proceso (ej. PDF descargado)
+                        y puede omitirse al reanudar con el mismo cliente
+        """
+        self.name = name
+        self.action = action
+        self.max_attempts = max(1, max_attempts)
+        self.restart_from = restart_from
+        self.persistent = persistent
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker por aseguradora, compartido por todo el proceso.
+
+    Tras CIRCUIT_BREAKER_THRESHOLD intentos fallidos seguidos el circuito se abre y los
+    pasos fallan de inmediato durante CIRCUIT_BREAKER_COOLDOWN segundos, en lugar de
+    seguir golpeando un portal caído (y de retrasar a las demás pestañas/clientes).
+    """
+
+    _failures: Dict[str, int] = {}
+    _opened_at: Dict[str, float] = {}
+
+    @classmethod
+    def is_open(cls, company: str) -> bool:
+        opened_at = cls._opened_at.get(company)
+        if opened_at is None:
+            return False
+        if time.monotonic() - opened_at >= BaseConfig.CIRCUIT_BREAKER_COOLDOWN:
+            # Medio abierto: se permite un intento; si falla vuelve a abrirse
+            del cls._opened_at[company]
+            cls._failures[company] = BaseConfig.CIRCUIT_BREAKER_THRESHOLD - 1
+            return False
+        return True
+
+    @classmethod
+    def record_success(cls, company: str) -> None:
+        cls._failures[company] = 0
+        cls._opened_at.pop(company, None)
+
+    @classmethod
+    def record_failure(cls, company: str) -> bool:
+        """Registra un intento fallido. Retorna True si el circuito quedó abierto."""
+        cls._failures[company] = cls._failures.get(company, 0) + 1
+        if cls._failures[company] >= BaseConfig.CIRCUIT_BREAKER_THRESHOLD:
+            cls._opened_at[company] = time.monotonic()
+            return True
+        return False
+
+    @classmethod
+    def reset(cls, company: Optional[str] = None) -> None:
+        if company is None:
+            cls._failures.clear()
+            cls._opened_at.clear()
+        else:
+            cls._failures.pop(company, None)
+            cls._opened_at.pop(company, None)
+
+
+class FlowCheckpoint:
+    """Checkpoint persistido en disco de un flujo (pasos completados, URL y valores extraídos)."""
+
+    def __init__(self, company: str, client_fingerprint: str):
+        self.company = company
+        self.client_fingerprint = client_fingerprint
+        self.path = os.path.join(BaseConfig.CHECKPOINTS_DIR, f"{company}.json")
+        self.completed: List[str] = []
+        self.url: str = ''
+        self.values: Dict[str, Any] = {}
+
+    def load(self) -> bool:
+        """Carga el checkpoint si es del mismo cliente y está vigente. Retorna True si se cargó."""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+
+        if data.get('client') != self.client_fingerprint:
+            return False
+
+        try:
+            age_minutes = (datetime.now() - datetime.fromisoformat(data['updated_at'])).total_seconds() / 60
+        except (KeyError, TypeError, ValueError):
+            return False
+        if age_minutes > BaseConfig.CHECKPOINT_TTL_MINUTES:
+            return False
+
+        self.completed = list(data.get('completed', []))
+        self.url = data.get('url', '')
+        self.values = dict(data.get('values', {}))
+        return True
+
+    def mark_completed(self, step: str, url: str = '') -> None:
+        if step not in self.completed:
+            self.completed.append(step)
+        if url:
+            self.url = url
+        self.save()
+
+    def discard_from(self, step_names: List[str]) -> None:
+        """Olvida los pasos indicados (se van a repetir)."""
+        self.completed = [s for s in self.completed if s not in step_names]
+        self.save()
+
+    def save(self) -> None:
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'client': self.client_fingerprint,
+                    'updated_at': datetime.now().isoformat(timespec='seconds'),
+                    'completed': self.completed,
+                    'url': self.url,
+                    'values': self.values
+                }, f, ensure_ascii=False, indent=2, default=str)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            pass
+
+    def clear(self) -> None:
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+    @classmethod
+    def clear_companies(cls, companies: List[str]) -> None:
+        """Elimina los checkpoints de las compañías indicadas (ejecución completada)."""
+        for company in companies:
+            cls(company.lower(), '').clear()
+
+
+class FlowRunner:
+    """Ejecuta una lista de FlowStep con checkpoints, reintentos con backoff exponencial y circuit breaker."""
+
+    def __init__(
+        self,
+        company: str,
+        steps: List[FlowStep],
+        logger: logging.Logger,
+        checkpoint: Optional[FlowCheckpoint] = None,
+        current_url: Optional[Callable[[], str]] = None
+    ):
+        self.company = company
+        self.steps = steps
+        self.logger = logger
+        self.checkpoint = checkpoint
+        self.current_url = current_url or (lambda: '')
+        self._index = {step.name: i for i, step in enumerate(steps)}
+
+    def record(self, **values) -> None:
+        """Guarda valores extraídos (primas, rutas de PDF...) en el checkpoint."""
+        if self.checkpoint:
+            self.checkpoint.values.update(values)
+            self.checkpoint.save()
+
+    @staticmethod
+    def backoff_delay(attempt: int) -> float:
+        """Espera antes del intento `attempt` (2, 3, ...): base * 2^(n-2), con tope."""
+        return min(BaseConfig.FLOW_BACKOFF_BASE * (2 ** (attempt - 2)), BaseConfig.FLOW_BACKOFF_MAX)
+
+    async def run(self) -> bool:
+        """
+        Ejecuta los pasos en orden.
+
+        Returns:
+            True si todos los pasos terminaron bien
+        """
+        resumed = self.checkpoint.load() if self.checkpoint else False
+        if resumed and self.checkpoint.completed:
+            self.logger.info(f"📌 Checkpoint encontrado: pasos completados {self.checkpoint.completed}")
+            if not self._restore_quote():
+                # Sin las primas y el PDF de esa cotización no hay qué consolidar: se repiten los pasos
+                skipped = [s.name for s in self.steps if s.persistent and s.name in self.checkpoint.completed]
+                if skipped:
+                    self.logger.info(f"🔁 El checkpoint no tiene los resultados de {skipped} - se repiten")
+                    self.checkpoint.discard_from(skipped)
+            if self.steps[-1].persistent and all(s.name in self.checkpoint.completed for s in self.steps):
+                self.logger.info(f"⏭️ Flujo de {self.company.upper()} ya completado para este cliente - omitido")
+                return True
+
+        metrics = get_run_metrics()
+        attempts: Dict[str, int] = {}
+        i = 0
+        while i < len(self.steps):
+            step = self.steps[i]
+
+            # Solo los pasos persistentes pueden omitirse entre procesos (el navegador es nuevo)
+            if resumed and step.persistent and step.name in self.checkpoint.completed:
+                self.logger.info(f"⏭️ Paso '{step.name}' ya completado para este cliente - omitido")
+                i += 1
+                continue
+
+            if CircuitBreaker.is_open(self.company):
+                self.logger.error(f"🔌 Circuito abierto para {self.company.upper()} - se omite '{step.name}'")
+                metrics.failure(self.company, f"{step.name}: circuito abierto")
+                return False
+
+            attempts[step.name] = attempts.get(step.name, 0) + 1
+            attempt = attempts[step.name]
+
+            await wait_for_global_resume(self.company)
+            self.logger.info(f"▶️ Paso '{step.name}'")
+            metrics.step_started(self.company, step.name, attempt)
+            started = time.perf_counter()
+            error = None
+
+            try:
+                ok = await step.action()
+            except Exception as e:
+                # Referencia FASECOLDA inexistente: reintentar no sirve, detener el proceso
+                from ..shared.fasecolda_service import FasecoldaReferenceNotFoundError
+                if isinstance(e, FasecoldaReferenceNotFoundError):
+                    metrics.step_finished(self.company, step.name, False, time.perf_counter() - started, str(e))
+                    metrics.failure(self.company, f"{step.name}: {e}")
+                    raise
+                self.logger.exception(f"❌ Excepción en el paso '{step.name}': {e}")
+                ok = False
+                error = f"{type(e).__name__}: {e}"
+
+            metrics.step_finished(self.company, step.name, ok, time.perf_counter() - started, error)
+            if ok:
+                CircuitBreaker.record_success(self.company)
+                if self.checkpoint and step.persistent:
+                    # Lo que produjo el paso, para entregarlo al consolidado si se omite al reanudar
+                    self.checkpoint.values['quote'] = QuoteResults.get(self.company)
+                if self.checkpoint:
+                    self.checkpoint.mark_completed(step.name, self._safe_url())
+                self.logger.info(f"✅ Paso '{step.name}' completado en {time.perf_counter() - started:.1f}s")
+                i += 1
+                continue
+
+            if CircuitBreaker.record_failure(self.company):
+                self.logger.error(
+                    f"🔌 Circuito abierto para {self.company.upper()} tras "
+                    f"{BaseConfig.CIRCUIT_BREAKER_THRESHOLD} fallos seguidos"
+                )
+
+            if attempt >= step.max_attempts:
+                self.logger.error(f"❌ Paso '{step.name}' falló tras {attempt} intento(s)")
+                metrics.failure(self.company, f"{step.name}: {error or 'el paso retornó False'} ({attempt} intento(s))")
+                return False
+
+            delay = self.backoff_delay(attempt + 1)
+            self.logger.info(f"🔄 Reintento {attempt + 1}/{step.max_attempts} del paso '{step.name}' en {delay:.0f}s")
+            metrics.retry(self.company, step.name, delay)
+            await asyncio.sleep(delay)
+
+            # Reanudar desde el paso ancla (sin repetir los anteriores, p.ej. el login).
+            # Los pasos intermedios se repiten como parte del reintento: no gastan sus propios intentos
+            restart_index = self._index.get(step.restart_from, i)
+            if restart_index != i:
+                self.logger.info(f"↩️ Reanudando desde el paso '{self.steps[restart_index].name}'")
+            for replayed in self.steps[restart_index:i]:
+                attempts[replayed.name] = 0
+            if self.checkpoint:
+                self.checkpoint.discard_from([s.name for s in self.steps[restart_index:]])
+            i = restart_index
+
+        return True
+
+    def _restore_quote(self) -> bool:
+        """
+        Vuelve a registrar en QuoteResults las primas y el PDF guardados en el checkpoint.
+
+        Returns:
+            True si el checkpoint tenía primas de la cotización
+        """
+        quote = self.checkpoint.values.get('quote') or {}
+        if not quote.get('plans'):
+            return False
+        QuoteResults.record_plans(self.company, quote['plans'])
+        if quote.get('pdf') and os.path.exists(quote['pdf']):
+            QuoteResults.record_pdf(self.company, quote['pdf'])
+            get_run_metrics().record_output('pdf', quote['pdf'], self.company)
+        return True
+
+    def _safe_url(self) -> str:
+        try:
+            return self.current_url() or ''
+        except Exception:
+            return ''
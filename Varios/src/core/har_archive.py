@@ -0,0 +1,207 @@
+"""Grabación y reproducción de tráfico de red (HAR) para ejecuciones deterministas y perfilado."""
+
+import os
+import json
+import asyncio
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, Dict, Any, List
+from urllib.parse import urlsplit
+
+from ..config.base_config import BaseConfig
+
+
+class HarArchive:
+    """
+    Gestiona los archivos HAR de una ejecución.
+
+    El modo se comunica por variables de entorno (igual que las opciones GUI_*),
+    así los navegadores de las aseguradoras y de FASECOLDA lo leen al lanzarse:
+        HAR_MODE:     '' | 'record' | 'replay'
+        HAR_RUN_DIR:  carpeta del archivo versionado de la ejecución
+        HAR_LATENCY:  'real' (respeta los tiempos grabados) | 'zero'
+    """
+
+    # Versión del formato del archivo (carpeta + manifest); subir si cambia la estructura
+    ARCHIVE_VERSION = 1
+    MANIFEST_NAME = 'manifest.json'
+
+    RECORD = 'record'
+    REPLAY = 'replay'
+
+    LATENCY_REAL = 'real'
+    LATENCY_ZERO = 'zero'
+
+    ARCHIVES_DIR = Path(BaseConfig.BASE_DIR) / 'Varios' / 'har_archives'
+
+    @classmethod
+    def mode(cls) -> str:
+        """Modo HAR activo ('' si está deshabilitado)."""
+        return os.getenv('HAR_MODE', '').lower()
+
+    @classmethod
+    def is_active(cls) -> bool:
+        return cls.mode() in (cls.RECORD, cls.REPLAY)
+
+    @classmethod
+    def run_dir(cls) -> Optional[Path]:
+        value = os.getenv('HAR_RUN_DIR')
+        return Path(value) if value else None
+
+    @classmethod
+    def start_recording(cls, companies: List[str]) -> Path:
+        """
+        Crea la carpeta versionada de una nueva grabación y activa el modo record.
+
+        Args:
+            companies: Compañías que participan en la ejecución
+
+        Returns:
+            Carpeta donde se guardarán los HAR
+        """
+        run_dir = cls.ARCHIVES_DIR / datetime.now().strftime('%Y%m%d_%H%M%S')
+        run_dir.mkdir(parents=True, exist_ok=True)
+
+        manifest = {
+            'archive_version': cls.ARCHIVE_VERSION,
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'companies': [c.lower() for c in companies]
+        }
+        (run_dir / cls.MANIFEST_NAME).write_text(json.dumps(manifest, indent=2), encoding='utf-8')
+
+        os.environ['HAR_MODE'] = cls.RECORD
+        os.environ['HAR_RUN_DIR'] = str(run_dir)
+        return run_dir
+
+    @classmethod
+    def start_replay(cls, archive: str = 'latest', latency: str = LATENCY_REAL) -> Path:
+        """
+        Activa el modo replay sobre una grabación existente.
+
+        Args:
+            archive: Carpeta de la grabación, su nombre dentro de har_archives o 'latest'
+            latency: 'real' para reproducir los tiempos grabados, 'zero' para responder de inmediato
+
+        Returns:
+            Carpeta de la grabación usada
+
+        Raises:
+            FileNotFoundError: Si no existe la grabación
+            ValueError: Si la grabación es de una versión de formato incompatible
+        """
+        run_dir = cls._resolve_archive(archive)
+
+        manifest_path = run_dir / cls.MANIFEST_NAME
+        if not manifest_path.exists():
+            raise FileNotFoundError(f"La grabación {run_dir} no tiene {cls.MANIFEST_NAME}")
+
+        manifest = json.loads(manifest_path.read_text(encoding='utf-8'))
+        if manifest.get('archive_version') != cls.ARCHIVE_VERSION:
+            raise ValueError(
+                f"Grabación {run_dir.name} en versión {manifest.get('archive_version')}, "
+                f"se esperaba {cls.ARCHIVE_VERSION}. Vuelva a grabar con --record-har"
+            )
+
+        os.environ['HAR_MODE'] = cls.REPLAY
+        os.environ['HAR_RUN_DIR'] = str(run_dir)
+        os.environ['HAR_LATENCY'] = latency
+        return run_dir
+
+    @classmethod
+    def _resolve_archive(cls, archive: str) -> Path:
+        if archive and archive != 'latest':
+            path = Path(archive)
+            if not path.is_absolute() and not path.exists():
+                path = cls.ARCHIVES_DIR / archive
+            if not path.is_dir():
+                raise FileNotFoundError(f"No existe la grabación HAR: {archive}")
+            return path
+
+        candidates = sorted(
+            (p for p in cls.ARCHIVES_DIR.glob('*') if (p / cls.MANIFEST_NAME).exists()),
+            key=lambda p: p.name
+        ) if cls.ARCHIVES_DIR.exists() else []
+        if not candidates:
+            raise FileNotFoundError(f"No hay grabaciones HAR en {cls.ARCHIVES_DIR}")
+        return candidates[-1]
+
+    @classmethod
+    def har_path(cls, name: str) -> Optional[Path]:
+        """Ruta del HAR de un navegador ('allianz', 'sura', 'fasecolda', ...) en la ejecución activa."""
+        run_dir = cls.run_dir()
+        if not cls.is_active() or not run_dir:
+            return None
+        return run_dir / f"{name.lower()}.har"
+
+    @classmethod
+    def context_kwargs(cls, name: str) -> Dict[str, Any]:
+        """Opciones de contexto para grabar (record_har_*); vacío en cualquier otro modo."""
+        if cls.mode() != cls.RECORD:
+            return {}
+        return {
+            'record_har_path': str(cls.har_path(name)),
+            'record_har_mode': 'full',
+            'record_har_content': 'embed'
+        }
+
+    @classmethod
+    async def attach(cls, target, name: str, logger: Optional[logging.Logger] = None) -> None:
+        """
+        Conecta el contexto o página al HAR grabado cuando el modo es replay.
+
+        Las peticiones no grabadas se abortan: en replay no sale nada a la red.
+
+        Args:
+            target: BrowserContext o Page de Playwright
+            name: Nombre del HAR (compañía o 'fasecolda')
+            logger: Logger para informar
+        """
+        logger = logger or logging.getLogger(name)
+        mode = cls.mode()
+
+        if mode == cls.RECORD:
+            logger.info(f"📼 Grabando tráfico de red en {cls.har_path(name)}")
+            return
+        if mode != cls.REPLAY:
+            return
+
+        har_file = cls.har_path(name)
+        if not har_file or not har_file.exists():
+            raise FileNotFoundError(f"No existe el HAR '{name}' en la grabación {cls.run_dir()}")
+
+        await target.route_from_har(str(har_file), not_found='abort')
+
+        if os.getenv('HAR_LATENCY', cls.LATENCY_REAL) == cls.LATENCY_REAL:
+            # Registrado después de route_from_har, así se ejecuta primero: espera y delega
+            latencies = cls._load_latencies(har_file)
+
+            async def _delay(route):
+                delay_ms = latencies.get(cls._latency_key(route.request.method, route.request.url))
+                if delay_ms:
+                    await asyncio.sleep(delay_ms / 1000)
+                await route.fallback()
+
+            await target.route('**/*', _delay)
+
+        logger.info(f"▶️ Reproduciendo {har_file.name} sin red (latencia: {os.getenv('HAR_LATENCY', cls.LATENCY_REAL)})")
+
+    @staticmethod
+    def _latency_key(method: str, url: str) -> str:
+        parts = urlsplit(url)
+        return f"{method.upper()} {parts.scheme}://{parts.netloc}{parts.path}"
+
+    @classmethod
+    def _load_latencies(cls, har_file: Path) -> Dict[str, float]:
+        """Tiempo total grabado por petición (método + URL sin query), primera aparición."""
+        try:
+            entries = json.loads(har_file.read_text(encoding='utf-8'))['log']['entries']
+        except Exception:
+            return {}
+
+        latencies: Dict[str, float] = {}
+        for entry in entries:
+            request = entry.get('request', {})
+            key = cls._latency_key(request.get('method', 'GET'), request.get('url', ''))
+            latencies.setdefault(key, max(float(entry.get('time') or 0), 0.0))
+        return latencies
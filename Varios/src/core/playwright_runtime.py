@@ -0,0 +1,113 @@
+"""Driver de Playwright compartido por todas las automatizaciones del proceso."""
+
+import asyncio
+from typing import Dict, Optional
+from playwright.async_api import async_playwright, Playwright
+
+from .logger_factory import LoggerFactory
+
+
+class PlaywrightRuntime:
+    """
+    Arranca el driver de Playwright (proceso Node) una sola vez y lo reparte.
+
+    Cada automatización, el navegador FASECOLDA residente y el cliente HTTP de FASECOLDA
+    piden el driver con acquire() y lo devuelven con release(); cada uno sigue lanzando y
+    cerrando sus propios navegadores/contextos. El driver se detiene cuando nadie lo usa
+    durante IDLE_SECONDS (así una ejecución secuencial no lo reinicia por compañía) o con
+    shutdown() al terminar la sesión.
+
+    Los objetos de Playwright pertenecen a un event loop, por eso hay un runtime por loop
+    (ver get_playwright_runtime).
+    """
+
+    IDLE_SECONDS = 10.0
+
+    def __init__(self):
+        self.logger = LoggerFactory.create_logger('playwright_runtime')
+        self._playwright: Optional[Playwright] = None
+        self._users = 0
+        self._lock = asyncio.Lock()
+        self._idle_stop: Optional[asyncio.Task] = None
+
+    @property
+    def users(self) -> int:
+        return self._users
+
+    async def acquire(self) -> Playwright:
+        """
+        Obtiene el driver compartido, arrancándolo si es el primer uso.
+
+        Returns:
+            Instancia de Playwright; se debe devolver con release()
+        """
+        async with self._lock:
+            self._cancel_idle_stop()
+            if self._playwright is None:
+                self.logger.info("🎭 Iniciando driver de Playwright compartido...")
+                self._playwright = await async_playwright().start()
+            self._users += 1
+            return self._playwright
+
+    async def release(self) -> None:
+        """Devuelve el driver; al quedar sin usuarios se programa su cierre."""
+        async with self._lock:
+            if self._users == 0:
+                return
+            self._users -= 1
+            if self._users == 0 and self._playwright is not None:
+                self._idle_stop = asyncio.create_task(self._stop_when_idle())
+
+    async def _stop_when_idle(self) -> None:
+        await asyncio.sleep(self.IDLE_SECONDS)
+        async with self._lock:
+            if self._users == 0:
+                await self._stop()
+
+    def _cancel_idle_stop(self) -> None:
+        if self._idle_stop and not self._idle_stop.done() and self._idle_stop is not asyncio.current_task():
+            self._idle_stop.cancel()
+        self._idle_stop = None
+
+    async def _stop(self) -> None:
+        if self._playwright is None:
+            return
+        try:
+            await self._playwright.stop()
+            self.logger.info("🎭 Driver de Playwright detenido")
+        except Exception as e:
+            self.logger.warning(f"⚠️ Error deteniendo el driver de Playwright: {e}")
+        self._playwright = None
+
+    async def shutdown(self) -> None:
+        """Detiene el driver aunque queden usuarios (fin de sesión o detención desde la GUI)."""
+        async with self._lock:
+            self._cancel_idle_stop()
+            if self._users:
+                self.logger.warning(f"⚠️ Deteniendo el driver de Playwright con {self._users} usuario(s) activo(s)")
+            self._users = 0
+            await self._stop()
+
+
+# Un runtime por event loop (la GUI corre el prefetch en su propio loop)
+_runtimes: Dict[asyncio.AbstractEventLoop, PlaywrightRuntime] = {}
+
+
+def get_playwright_runtime() -> PlaywrightRuntime:
+    """Obtiene (o crea) el runtime de Playwright del event loop actual."""
+    loop = asyncio.get_running_loop()
+
+    # Olvidar runtimes de loops ya cerrados (p. ej. asyncio.run anteriores)
+    for closed in [l for l in _runtimes if l.is_closed()]:
+        del _runtimes[closed]
+
+    if loop not in _runtimes:
+        _runtimes[loop] = PlaywrightRuntime()
+    return _runtimes[loop]
+
+
+async def shutdown_playwright_runtime() -> None:
+    """Detiene el driver de Playwright del event loop actual, si se inició."""
+    runtime = _runtimes.pop(asyncio.get_running_loop(), None)
+    if runtime:
+        await runtime.shutdown()
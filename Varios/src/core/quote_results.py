@@ -0,0 +1,79 @@
+"""
+Resultados de la cotización en curso (primas por plan y PDF) por compañía.
+
+Las páginas registran aquí lo que extraen en el momento de extraerlo, en lugar de que el
+consolidado lo busque después en la cola de los logs. En la cotización multi-pestaña cada
+pestaña abre su propio `scope()` (contextvars), así que los valores de un cliente no se
+mezclan con los de otro; fuera de un scope se usa el registro del proceso.
+"""
+
+import contextvars
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+# Resultados de la tarea asyncio actual (pestaña); None = registro del proceso
+_scoped_results: contextvars.ContextVar = contextvars.ContextVar('quote_results', default=None)
+_process_results: Dict[str, Dict[str, Any]] = {}
+
+
+class QuoteResults:
+    """Primas y PDF producidos por la cotización actual de cada compañía."""
+
+    @staticmethod
+    @contextmanager
+    def scope():
+        """Aísla los resultados para la tarea asyncio actual (una pestaña = un cliente)."""
+        token = _scoped_results.set({})
+        try:
+            yield
+        finally:
+            _scoped_results.reset(token)
+
+    @staticmethod
+    def _store() -> Dict[str, Dict[str, Any]]:
+        scoped = _scoped_results.get()
+        return scoped if scoped is not None else _process_results
+
+    @classmethod
+    def start(cls, company: str) -> None:
+        """Olvida los resultados anteriores de la compañía (inicio de una cotización)."""
+        cls._store().pop(company.lower(), None)
+
+    @classmethod
+    def _entry(cls, company: str) -> Dict[str, Any]:
+        return cls._store().setdefault(company.lower(), {'plans': {}, 'pdf': None})
+
+    @classmethod
+    def record_plans(cls, company: str, plans: Dict[str, str]) -> None:
+        """
+        Registra las primas extraídas.
+
+        Args:
+            company: 'sura' o 'allianz'
+            plans: {nombre del plan: prima con el formato del consolidado}
+        """
+        cls._entry(company)['plans'].update({name: value for name, value in plans.items() if value})
+
+    @classmethod
+    def record_pdf(cls, company: str, path: str) -> None:
+        """Registra el PDF descargado (las métricas de la ejecución lo registran aparte)."""
+        cls._entry(company)['pdf'] = path
+
+    @classmethod
+    def get(cls, company: str) -> Optional[Dict[str, Any]]:
+        """
+        Resultados registrados de la compañía.
+
+        Returns:
+            {'plans': {...}, 'pdf': ruta o None} o None si la cotización no registró nada
+        """
+        entry = cls._store().get(company.lower())
+        if not entry:
+            return None
+        return {'plans': dict(entry['plans']), 'pdf': entry['pdf']}
+
+    @classmethod
+    def plans(cls, company: str) -> Optional[Dict[str, str]]:
+        """Primas registradas de la compañía (None si no hay)."""
+        entry = cls.get(company)
+        return entry['plans'] if entry and entry['plans'] else None
@@ -0,0 +1,298 @@
+"""Planificador de la ejecución paralela según límites configurados y el consumo real de recursos."""
+
+import os
+import json
+import time
+import asyncio
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from .logger_factory import LoggerFactory
+from .run_metrics import get_run_metrics
+from ..config.base_config import BaseConfig
+
+
+MB = 1024 * 1024
+
+
+class ResourceMonitor:
+    """
+    Mide RSS y CPU de los procesos hijos de este proceso (driver de Playwright y navegadores).
+
+    Sin psutil no hay medición y el planificador solo aplica el límite de concurrencia.
+    """
+
+    def __init__(self):
+        self._procs: Dict[int, Any] = {}
+        try:
+            import psutil
+            self._psutil = psutil
+            self._root = psutil.Process(os.getpid())
+        except ImportError:
+            self._psutil = None
+            self._root = None
+
+    @property
+    def available(self) -> bool:
+        return self._psutil is not None
+
+    def total_memory_mb(self) -> float:
+        return self._psutil.virtual_memory().total / MB if self._psutil else 0.0
+
+    def sample(self) -> Dict[str, float]:
+        """
+        Toma una muestra del consumo actual.
+
+        Returns:
+            {'rss_mb', 'cpu_percent', 'free_mb', 'processes'} o {} si no hay psutil
+        """
+        if not self._psutil:
+            return {}
+        psutil = self._psutil
+
+        rss = 0
+        cpu = 0.0
+        seen = set()
+        try:
+            children = self._root.children(recursive=True)
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            children = []
+
+        for child in children:
+            # Se conservan los objetos Process: cpu_percent mide desde la llamada anterior
+            proc = self._procs.setdefault(child.pid, child)
+            try:
+                rss += proc.memory_info().rss
+                cpu += proc.cpu_percent(None)
+            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+                continue
+            seen.add(child.pid)
+
+        for pid in [pid for pid in self._procs if pid not in seen]:
+            del self._procs[pid]
+
+        return {
+            'rss_mb': round(rss / MB, 1),
+            # Porcentaje de la máquina completa (cpu_percent por proceso llega a 100 × núcleos)
+            'cpu_percent': round(cpu / (psutil.cpu_count() or 1), 1),
+            'free_mb': round(psutil.virtual_memory().available / MB, 1),
+            'processes': len(seen)
+        }
+
+
+class ResourceScheduler:
+    """
+    Admite automatizaciones de a una mientras quepan y deja el resto en cola.
+
+    Una compañía entra si hay cupo (MAX_PARALLEL_AUTOMATIONS) y si, sumando la memoria que
+    se espera que use, el RSS de nuestros navegadores no pasa del presupuesto, queda memoria
+    libre en el equipo y la CPU de nuestros procesos no está saturada. Siempre se admite al
+    menos una para no bloquearse. La cola se ordena por duración esperada, de mayor a menor,
+    para que la compañía más lenta empiece primero y el total se acerque a su duración.
+
+    Las duraciones se aprenden de ejecuciones exitosas (promedio móvil) y el estado de la
+    cola y los recursos se publica en STATE_PATH para la GUI.
+    """
+
+    PROFILE_PATH = os.path.join(BaseConfig.CACHE_DIR, 'scheduler_profile.json')
+    STATE_PATH = os.path.join(BaseConfig.CACHE_DIR, 'scheduler_state.json')
+
+    # Estimación inicial por compañía (las de cálculo no abren navegador)
+    DEFAULT_PROFILES: Dict[str, Dict[str, float]] = {
+        'allianz': {'memory_mb': 700, 'duration': 240},
+        'sura': {'memory_mb': 700, 'duration': 300},
+        'solidaria': {'memory_mb': 0, 'duration': 5},
+        'bolivar': {'memory_mb': 0, 'duration': 5}
+    }
+    DEFAULT_PROFILE: Dict[str, float] = {'memory_mb': 600, 'duration': 180}
+    # Peso de la última ejecución en el promedio de duración
+    DURATION_ALPHA = 0.3
+    # Segundos que tarda un navegador recién lanzado en reflejar su memoria en el RSS
+    RAMP_UP_SECONDS = 20.0
+    POLL_SECONDS = 1.0
+
+    def __init__(self, logger=None):
+        self.logger = logger or LoggerFactory.create_logger('scheduler')
+        self.monitor = ResourceMonitor()
+        self.max_concurrent = BaseConfig.MAX_PARALLEL_AUTOMATIONS
+        self.memory_budget_mb = BaseConfig.SCHEDULER_MEMORY_BUDGET_MB or self.monitor.total_memory_mb() / 2
+        self.min_free_mb = BaseConfig.SCHEDULER_MIN_FREE_MB
+        self.max_cpu_percent = BaseConfig.SCHEDULER_MAX_CPU_PERCENT
+        self._profiles = self._load_profiles()
+        self._pending: List[str] = []
+        self._started: Dict[str, float] = {}
+        self._waiting_reason: Optional[str] = None
+        self._last_sample: Dict[str, float] = {}
+
+    # --- Perfiles ---------------------------------------------------------------------
+
+    def _load_profiles(self) -> Dict[str, Dict[str, float]]:
+        try:
+            with open(self.PROFILE_PATH, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def profile(self, company: str) -> Dict[str, float]:
+        profile = dict(self.DEFAULT_PROFILES.get(company, self.DEFAULT_PROFILE))
+        profile.update(self._profiles.get(company, {}))
+        return profile
+
+    def _record_duration(self, company: str, seconds: float) -> None:
+        previous = self.profile(company)['duration']
+        learned = self._profiles.setdefault(company, {})
+        learned['duration'] = round(previous + self.DURATION_ALPHA * (seconds - previous), 1)
+        try:
+            os.makedirs(os.path.dirname(self.PROFILE_PATH), exist_ok=True)
+            tmp_path = f"{self.PROFILE_PATH}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._profiles, f, indent=2)
+            os.replace(tmp_path, self.PROFILE_PATH)
+        except OSError:
+            pass
+
+    # --- Ejecución --------------------------------------------------------------------
+
+    async def run(
+        self,
+        jobs: Dict[str, Callable[[], Awaitable[Any]]],
+        abort_on: Tuple[type, ...] = ()
+    ) -> Dict[str, Any]:
+        """
+        Ejecuta los trabajos respetando los límites.
+
+        Args:
+            jobs: {compañía: corrutina sin argumentos que ejecuta la automatización}
+            abort_on: Excepciones que detienen la admisión; las compañías aún en cola
+                      reciben la misma excepción como resultado
+
+        Returns:
+            {compañía: resultado o excepción} (como asyncio.gather con return_exceptions)
+        """
+        self._pending = sorted(jobs, key=lambda c: -self.profile(c)['duration'])
+        running: Dict[str, asyncio.Task] = {}
+        results: Dict[str, Any] = {}
+        self.logger.info(f"🧮 Orden de admisión (más lenta primero): {', '.join(c.upper() for c in self._pending)}")
+
+        try:
+            while self._pending or running:
+                # Una muestra por vuelta: cpu_percent mide el intervalo desde la anterior
+                self._last_sample = self.monitor.sample()
+                for company in list(self._pending):
+                    if not self._can_admit(company, running):
+                        continue  # Otra de la cola puede caber (p. ej. una sin navegador)
+                    self._pending.remove(company)
+                    self._started[company] = time.monotonic()
+                    running[company] = asyncio.create_task(self._timed(company, jobs[company]))
+                    self.logger.info(f"▶️ {company.upper()} admitida ({len(running)} en ejecución, {len(self._pending)} en cola)")
+
+                self._publish_state()
+                get_run_metrics().set_queue('companias', len(self._pending), len(running))
+                done, _ = await asyncio.wait(
+                    running.values(), timeout=self.POLL_SECONDS, return_when=asyncio.FIRST_COMPLETED
+                )
+
+                for company, task in list(running.items()):
+                    if task not in done:
+                        continue
+                    del running[company]
+                    self._started.pop(company, None)
+                    results[company] = False if task.cancelled() else (task.exception() or task.result())
+
+                    if abort_on and isinstance(results[company], abort_on) and self._pending:
+                        self.logger.error(f"🚫 Cancelando compañías en cola: {', '.join(c.upper() for c in self._pending)}")
+                        for queued in self._pending:
+                            results[queued] = results[company]
+                        self._pending = []
+            return results
+
+        finally:
+            for task in running.values():
+                task.cancel()
+            if running:
+                await asyncio.gather(*running.values(), return_exceptions=True)
+            self._pending = []
+            self._started.clear()
+            self._publish_state()
+            get_run_metrics().set_queue('companias', 0, 0)
+
+    async def _timed(self, company: str, job: Callable[[], Awaitable[Any]]) -> Any:
+        start = time.monotonic()
+        result = await job()
+        if result is True:
+            self._record_duration(company, time.monotonic() - start)
+        return result
+
+    def _can_admit(self, company: str, running: Dict[str, asyncio.Task]) -> bool:
+        """Decide si la compañía cabe ahora (y registra por qué no, una vez por motivo)."""
+        if not running:
+            return True
+
+        reason = None
+        if self.max_concurrent and len(running) >= self.max_concurrent:
+            reason = f"límite de {self.max_concurrent} en paralelo"
+        elif self._last_sample:
+            sample = self._last_sample
+            expected = self.profile(company)['memory_mb']
+            # Navegadores recién admitidos que aún no muestran toda su memoria
+            now = time.monotonic()
+            ramping = sum(
+                self.profile(c)['memory_mb'] for c, started in self._started.items()
+                if now - started < self.RAMP_UP_SECONDS
+            )
+            projected = sample['rss_mb'] + ramping + expected
+            if expected and projected > self.memory_budget_mb:
+                reason = f"memoria {projected:.0f} MB > presupuesto {self.memory_budget_mb:.0f} MB"
+            elif expected and sample['free_mb'] - ramping - expected < self.min_free_mb:
+                reason = f"memoria libre del equipo {sample['free_mb']:.0f} MB"
+            elif sample['cpu_percent'] > self.max_cpu_percent:
+                reason = f"CPU {sample['cpu_percent']:.0f}%"
+
+        if reason and reason != self._waiting_reason:
+            self.logger.info(f"⏸️ {company.upper()} en cola: {reason}")
+        self._waiting_reason = reason
+        return reason is None
+
+    # --- Estado para la GUI -----------------------------------------------------------
+
+    def get_state(self) -> Dict[str, Any]:
+        """Instantánea de la cola, las compañías en ejecución y los recursos medidos."""
+        now = time.monotonic()
+        return {
+            'updated_at': datetime.now().isoformat(timespec='seconds'),
+            'running': [
+                {'company': c, 'elapsed': round(now - started, 1)} for c, started in self._started.items()
+            ],
+            'queued': [
+                {'company': c, 'expected_duration': self.profile(c)['duration']} for c in self._pending
+            ],
+            'waiting_reason': self._waiting_reason if self._pending else None,
+            'resources': self._last_sample,
+            'limits': {
+                'max_concurrent': self.max_concurrent,
+                'memory_budget_mb': round(self.memory_budget_mb),
+                'min_free_mb': self.min_free_mb,
+                'max_cpu_percent': self.max_cpu_percent
+            }
+        }
+
+    def _publish_state(self) -> None:
+        try:
+            os.makedirs(os.path.dirname(self.STATE_PATH), exist_ok=True)
+            tmp_path = f"{self.STATE_PATH}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.get_state(), f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.STATE_PATH)
+        except OSError:
+            pass
+
+    @classmethod
+    def read_state(cls, max_age_seconds: float = 10.0) -> Optional[Dict[str, Any]]:
+        """Estado publicado por la ejecución en curso (otro proceso), o None si no es reciente."""
+        try:
+            with open(cls.STATE_PATH, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            age = (datetime.now() - datetime.fromisoformat(state['updated_at'])).total_seconds()
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        return state if age <= max_age_seconds else None
@@ -0,0 +1,269 @@
+"""
+Historial de ejecuciones en SQLite (LOGS/run_ledger.sqlite3).
+
+Cada ejecución cerrada por RunMetrics queda registrada con sus compañías (duración,
+resultado, reintentos, motivo de fallo, primas cotizadas), sus pasos (tiempos, intentos,
+fallos, último error) y los archivos generados (PDFs y consolidado). Sobre esos datos
+se arma el reporte de latencias p50/p95 por día, tasa de fallos por paso y volumen diario.
+"""
+
+import os
+import json
+import math
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from .logger_factory import LoggerFactory
+from ..config.base_config import BaseConfig
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id TEXT PRIMARY KEY,
+    day TEXT NOT NULL,
+    mode TEXT,
+    status TEXT,
+    started_at REAL,
+    finished_at REAL,
+    duration_seconds REAL
+);
+CREATE TABLE IF NOT EXISTS run_companies (
+    run_id TEXT NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    company TEXT NOT NULL,
+    status TEXT,
+    duration_seconds REAL,
+    retries INTEGER,
+    sleep_seconds REAL,
+    condition_seconds REAL,
+    failure_reason TEXT,
+    prices TEXT,
+    PRIMARY KEY (run_id, company)
+);
+CREATE TABLE IF NOT EXISTS run_steps (
+    run_id TEXT NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    company TEXT NOT NULL,
+    step TEXT NOT NULL,
+    runs INTEGER,
+    failures INTEGER,
+    attempts INTEGER,
+    retries INTEGER,
+    seconds REAL,
+    max_seconds REAL,
+    sleep_seconds REAL,
+    condition_seconds REAL,
+    last_error TEXT,
+    PRIMARY KEY (run_id, company, step)
+);
+CREATE TABLE IF NOT EXISTS run_outputs (
+    run_id TEXT NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    company TEXT,
+    kind TEXT NOT NULL,
+    path TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_runs_day ON runs(day);
+"""
+
+
+class RunLedger:
+    """Registro histórico de ejecuciones (una conexión por operación; se usa desde varios hilos)."""
+
+    DB_PATH = os.path.join(BaseConfig.LOGS_DIR, 'run_ledger.sqlite3')
+
+    _lock = threading.Lock()
+    _logger = None
+
+    @classmethod
+    def _log(cls):
+        if cls._logger is None:
+            cls._logger = LoggerFactory.create_logger('metrics')
+        return cls._logger
+
+    @classmethod
+    def _connect(cls) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(cls.DB_PATH), exist_ok=True)
+        connection = sqlite3.connect(cls.DB_PATH, timeout=10)
+        connection.row_factory = sqlite3.Row
+        connection.execute('PRAGMA foreign_keys = ON')
+        connection.executescript(SCHEMA)
+        return connection
+
+    @classmethod
+    def record_run(cls, run: Dict[str, Any]) -> bool:
+        """
+        Registra (o reemplaza) una ejecución terminada de RunMetrics.
+
+        Args:
+            run: Ejecución tal como la guarda RunMetrics en LOGS/metrics
+
+        Returns:
+            True si se registró
+        """
+        started_at = run.get('started_at') or 0.0
+        finished_at = run.get('finished_at') or started_at
+        try:
+            with cls._lock:
+                connection = cls._connect()
+                try:
+                    with connection:
+                        # Reemplazar: los datos tardíos (consolidado, primas) llegan después del cierre
+                        connection.execute('DELETE FROM runs WHERE id = ?', (run['id'],))
+                        connection.execute(
+                            'INSERT INTO runs VALUES (?, ?, ?, ?, ?, ?, ?)',
+                            (run['id'], datetime.fromtimestamp(started_at).strftime('%Y-%m-%d'), run.get('mode'),
+                             run.get('status'), started_at, finished_at, finished_at - started_at)
+                        )
+                        for entry in run.get('companies', {}).values():
+                            cls._insert_company(connection, run['id'], entry)
+                        for output in run.get('outputs', []):
+                            connection.execute(
+                                'INSERT INTO run_outputs VALUES (?, ?, ?, ?)',
+                                (run['id'], output.get('company'), output['kind'], output['path'])
+                            )
+                finally:
+                    connection.close()
+            return True
+        except (sqlite3.Error, OSError, KeyError) as e:
+            cls._log().warning(f"⚠️ No se pudo registrar la ejecución en el historial: {e}")
+            return False
+
+    @staticmethod
+    def _insert_company(connection: sqlite3.Connection, run_id: str, entry: Dict[str, Any]) -> None:
+        started = entry.get('started_at')
+        finished = entry.get('finished_at')
+        waits = entry.get('wait_seconds', {})
+        connection.execute(
+            'INSERT INTO run_companies VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (run_id, entry['company'], entry.get('status'),
+             finished - started if started and finished else None,
+             entry.get('retries', 0), waits.get('sleep', 0.0), waits.get('condition', 0.0),
+             entry.get('failure_reason'),
+             json.dumps(entry['prices'], ensure_ascii=False) if entry.get('prices') else None)
+        )
+        for step, stats in entry.get('steps', {}).items():
+            connection.execute(
+                'INSERT INTO run_steps VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (run_id, entry['company'], step, stats.get('runs', 0), stats.get('failures', 0),
+                 stats.get('attempts', 0), stats.get('retries', 0), stats.get('seconds', 0.0),
+                 stats.get('max_seconds', 0.0), stats.get('sleep_seconds', 0.0),
+                 stats.get('condition_seconds', 0.0), stats.get('last_error'))
+            )
+
+    # --- Consultas ----------------------------------------------------------------------
+
+    @staticmethod
+    def percentile(values: List[float], pct: float) -> Optional[float]:
+        """Percentil por rango más cercano (None si no hay valores)."""
+        if not values:
+            return None
+        ordered = sorted(values)
+        rank = math.ceil(pct / 100 * len(ordered))
+        return ordered[max(0, min(len(ordered), rank) - 1)]
+
+    @classmethod
+    def report(cls, days: int = 30, company: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Resume las ejecuciones de los últimos días.
+
+        Args:
+            days: Días hacia atrás (incluye hoy)
+            company: Limitar a una compañía
+
+        Returns:
+            {'latency': [...], 'steps': [...], 'throughput': [...], 'failures': [...]}; listas vacías
+            si todavía no hay historial
+        """
+        empty = {'latency': [], 'steps': [], 'throughput': [], 'failures': []}
+        if not os.path.exists(cls.DB_PATH):
+            return empty
+
+        since = (datetime.now() - timedelta(days=max(days, 1) - 1)).strftime('%Y-%m-%d')
+        company_filter = ' AND c.company = ?' if company else ''
+        params = (since, company) if company else (since,)
+
+        with cls._lock:
+            connection = cls._connect()
+            try:
+                companies = connection.execute(
+                    'SELECT r.day, c.company, c.status, c.duration_seconds, c.failure_reason '
+                    'FROM run_companies c JOIN runs r ON r.id = c.run_id '
+                    f'WHERE r.day >= ?{company_filter} ORDER BY r.day, c.company', params
+                ).fetchall()
+                steps = connection.execute(
+                    'SELECT c.company, c.step, r.day, c.runs, c.failures, c.retries, c.seconds, c.last_error '
+                    'FROM run_steps c JOIN runs r ON r.id = c.run_id '
+                    f'WHERE r.day >= ?{company_filter}', params
+                ).fetchall()
+                # Compañías agregadas por ejecución antes de unir: la duración de cada ejecución
+                # se suma una sola vez aunque haya cotizado varias compañías
+                throughput = connection.execute(
+                    'SELECT r.day, COUNT(r.id) AS runs, COALESCE(SUM(c.quotes), 0) AS quotes, '
+                    'SUM(c.successful) AS successful, SUM(r.duration_seconds) AS busy_seconds '
+                    f"FROM runs r {'' if company else 'LEFT '}JOIN ("
+                    "SELECT c.run_id, COUNT(*) AS quotes, SUM(c.status = 'exitosa') AS successful "
+                    f'FROM run_companies c WHERE 1 = 1{company_filter} GROUP BY c.run_id'
+                    ') c ON c.run_id = r.id '
+                    'WHERE r.day >= ? GROUP BY r.day ORDER BY r.day', params[::-1]
+                ).fetchall()
+            finally:
+                connection.close()
+
+        # Latencia por compañía y día (solo cotizaciones exitosas: los fallos cortan el flujo)
+        durations: Dict[tuple, List[float]] = {}
+        counts: Dict[tuple, List[int]] = {}
+        failures: Dict[tuple, int] = {}
+        for row in companies:
+            key = (row['company'], row['day'])
+            ok = row['status'] == 'exitosa'
+            count = counts.setdefault(key, [0, 0])
+            count[0] += 1
+            count[1] += 0 if ok else 1
+            if ok and row['duration_seconds'] is not None:
+                durations.setdefault(key, []).append(row['duration_seconds'])
+            if not ok:
+                reason = row['failure_reason'] or 'sin motivo registrado'
+                failures[(row['company'], reason)] = failures.get((row['company'], reason), 0) + 1
+
+        latency = [
+            {
+                'company': key[0], 'day': key[1], 'runs': total, 'failed': failed,
+                'p50': cls.percentile(durations.get(key, []), 50),
+                'p95': cls.percentile(durations.get(key, []), 95)
+            }
+            for key, (total, failed) in sorted(counts.items())
+        ]
+
+        # Fallos y latencia por paso (todo el período)
+        by_step: Dict[tuple, Dict[str, Any]] = {}
+        for row in steps:
+            stats = by_step.setdefault((row['company'], row['step']), {
+                'company': row['company'], 'step': row['step'], 'attempts': 0, 'failures': 0,
+                'retries': 0, 'seconds': [], 'last_error': None
+            })
+            stats['attempts'] += row['runs'] or 0
+            stats['failures'] += row['failures'] or 0
+            stats['retries'] += row['retries'] or 0
+            if row['runs']:
+                stats['seconds'].append(row['seconds'])
+            if row['last_error']:
+                stats['last_error'] = row['last_error']
+
+        step_report = []
+        for stats in by_step.values():
+            seconds = stats.pop('seconds')
+            stats['failure_rate'] = stats['failures'] / stats['attempts'] if stats['attempts'] else 0.0
+            stats['p50'] = cls.percentile(seconds, 50)
+            stats['p95'] = cls.percentile(seconds, 95)
+            step_report.append(stats)
+        step_report.sort(key=lambda s: (-s['failure_rate'], s['company'], s['step']))
+
+        return {
+            'latency': latency,
+            'steps': step_report,
+            'throughput': [dict(row) for row in throughput],
+            'failures': sorted(
+                ({'company': c, 'reason': r, 'count': n} for (c, r), n in failures.items()),
+                key=lambda f: -f['count']
+            )
+        }
@@ -0,0 +1,548 @@
+"""
+Métricas en vivo de la ejecución: paso actual por compañía, duración de los pasos,
+reintentos, tiempo de espera (pausas fijas vs condiciones reales del portal), memoria de
+los navegadores y cola de compañías/pestañas.
+
+Se sirven en un endpoint HTTP local (texto de Prometheus en /metrics, JSON en
+/metrics.json y una página HTML simple en /) y cada ejecución queda guardada en
+LOGS/metrics/run_<fecha>.json y en el historial SQLite (RunLedger).
+"""
+
+import os
+import json
+import time
+import asyncio
+import threading
+from datetime import datetime
+from html import escape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+from .logger_factory import LoggerFactory
+from ..config.base_config import BaseConfig
+
+
+# Métodos de Page que esperan un tiempo fijo o una condición del portal
+SLEEP_METHODS = ('wait_for_timeout',)
+CONDITION_METHODS = ('wait_for_selector', 'wait_for_load_state', 'wait_for_url', 'wait_for_function')
+
+
+class RunMetrics:
+    """Métricas de la ejecución en curso, compartidas por el loop y el hilo del servidor HTTP."""
+
+    METRICS_DIR = os.path.join(BaseConfig.LOGS_DIR, 'metrics')
+    # Ejecuciones anteriores que se muestran en la página HTML
+    HISTORY_SIZE = 10
+    SAMPLE_SECONDS = 2.0
+
+    def __init__(self):
+        self.logger = LoggerFactory.create_logger('metrics')
+        self._lock = threading.Lock()
+        self._run: Optional[Dict[str, Any]] = None
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._server_failed = False
+        self._sampler: Optional[asyncio.Task] = None
+
+    # --- Ciclo de la ejecución ------------------------------------------------------
+
+    def start_run(self, companies: List[str], mode: str) -> None:
+        """
+        Comienza una ejecución nueva (una anterior sin cerrar se guarda como cancelada).
+
+        Args:
+            companies: Compañías de la ejecución
+            mode: 'secuencial', 'paralelo' o 'pestañas'
+        """
+        if self._run is not None:
+            self.finish_run(status='cancelada')
+
+        now = time.time()
+        with self._lock:
+            self._run = {
+                'id': datetime.now().strftime('%Y%m%d_%H%M%S'),
+                'mode': mode,
+                'started_at': now,
+                'finished_at': None,
+                'status': 'en_curso',
+                'companies': {company: self._new_company(company) for company in companies},
+                'queues': {},
+                'outputs': [],
+                'resources': {'rss_mb': 0.0, 'peak_rss_mb': 0.0, 'processes': 0}
+            }
+
+        self._ensure_server()
+        self._start_sampler()
+
+    def finish_run(self, status: str = 'terminada') -> Optional[str]:
+        """
+        Cierra la ejecución en curso y la guarda en disco. No hace nada si no hay ninguna.
+
+        Returns:
+            Ruta del archivo JSON guardado, o None
+        """
+        if self._sampler and not self._sampler.done():
+            self._sampler.cancel()
+        self._sampler = None
+
+        with self._lock:
+            run = self._run
+            if run is None or run['finished_at'] is not None:
+                return None
+            run['finished_at'] = time.time()
+            run['status'] = status
+            for company in run['companies'].values():
+                if company['status'] in ('en_cola', 'ejecutando'):
+                    company['status'] = 'fallida' if status == 'terminada' else status
+                company['current_step'] = None
+            data = json.loads(json.dumps(run, default=str))
+
+        return self._save(data)
+
+    @staticmethod
+    def _new_company(company: str) -> Dict[str, Any]:
+        return {
+            'company': company,
+            'status': 'en_cola',
+            'started_at': None,
+            'finished_at': None,
+            'current_step': None,
+            'step_started_at': None,
+            'steps': {},
+            'retries': 0,
+            'retry_wait_seconds': 0.0,
+            'wait_seconds': {'sleep': 0.0, 'condition': 0.0},
+            'failure_reason': None,
+            'prices': {}
+        }
+
+    def _company(self, company: str) -> Optional[Dict[str, Any]]:
+        """Entrada de la compañía en la ejecución en curso (la crea si no estaba; llamar con el lock)."""
+        if self._run is None:
+            return None
+        return self._run['companies'].setdefault(company, self._new_company(company))
+
+    # --- Eventos ----------------------------------------------------------------------
+
+    def company_started(self, company: str) -> None:
+        with self._lock:
+            entry = self._company(company)
+            if entry:
+                entry.update(status='ejecutando', started_at=time.time(), current_step='lanzamiento')
+
+    def company_finished(self, company: str, ok: bool) -> None:
+        with self._lock:
+            entry = self._company(company)
+            if entry:
+                entry.update(status='exitosa' if ok else 'fallida', finished_at=time.time(), current_step=None)
+
+    def step_started(self, company: str, step: str, attempt: int = 1) -> None:
+        with self._lock:
+            entry = self._company(company)
+            if entry:
+                entry.update(current_step=step, step_started_at=time.time())
+                stats = entry['steps'].setdefault(step, self._new_step())
+                stats['attempts'] = max(stats['attempts'], attempt)
+                stats['_waits_at_start'] = dict(entry['wait_seconds'])
+
+    def step_finished(self, company: str, step: str, ok: bool, seconds: float, error: Optional[str] = None) -> None:
+        with self._lock:
+            entry = self._company(company)
+            if not entry:
+                return
+            stats = entry['steps'].setdefault(step, self._new_step())
+            stats['runs'] += 1
+            stats['failures'] += 0 if ok else 1
+            if not ok:
+                stats['last_error'] = error or 'el paso retornó False'
+            stats['seconds'] += seconds
+            stats['last_seconds'] = round(seconds, 3)
+            stats['max_seconds'] = max(stats['max_seconds'], round(seconds, 3))
+            # Espera atribuida al paso: lo que se acumuló entre su inicio y su fin
+            start = stats.pop('_waits_at_start', entry['wait_seconds'])
+            for kind in ('sleep', 'condition'):
+                stats[f'{kind}_seconds'] += entry['wait_seconds'][kind] - start.get(kind, 0.0)
+            entry['current_step'] = None
+            entry['step_started_at'] = None
+
+    def retry(self, company: str, step: str, delay: float) -> None:
+        """Reintento de un paso; el backoff cuenta como pausa fija."""
+        with self._lock:
+            entry = self._company(company)
+            if entry:
+                entry['retries'] += 1
+                entry['retry_wait_seconds'] += delay
+                entry['steps'].setdefault(step, self._new_step())['retries'] += 1
+                entry['wait_seconds']['sleep'] += delay
+
+    def failure(self, company: str, reason: str) -> None:
+        """Motivo por el que la compañía no terminó (el último registrado es el que queda)."""
+        with self._lock:
+            entry = self._company(company)
+            if entry:
+                entry['failure_reason'] = reason[:500]
+
+    def record_prices(self, company: str, prices: Dict[str, Any]) -> None:
+        """Primas cotizadas por plan (pueden llegar después del cierre, desde el consolidado)."""
+        with self._lock:
+            entry = self._company(company)
+            if not entry:
+                return
+            entry['prices'] = dict(prices)
+        self._save_if_finished()
+
+    def record_output(self, kind: str, path: str, company: Optional[str] = None) -> None:
+        """
+        Archivo generado por la ejecución.
+
+        Args:
+            kind: 'pdf' o 'consolidado'
+            path: Ruta del archivo
+            company: Compañía que lo generó (None para el consolidado)
+        """
+        with self._lock:
+            if self._run is None:
+                return
+            self._run['outputs'].append({'kind': kind, 'path': path, 'company': company})
+        self._save_if_finished()
+
+    def outputs(self, kind: str, company: Optional[str] = None) -> List[str]:
+        """Rutas registradas en la ejecución en curso de un tipo (y compañía)."""
+        with self._lock:
+            if self._run is None:
+                return []
+            return [o['path'] for o in self._run['outputs']
+                    if o['kind'] == kind and (company is None or o['company'] == company)]
+
+    def record_wait(self, company: str, kind: str, seconds: float) -> None:
+        """
+        Suma tiempo de espera de una compañía.
+
+        Args:
+            kind: 'sleep' (pausa fija) o 'condition' (esperar algo del portal)
+        """
+        with self._lock:
+            entry = self._company(company)
+            if entry and kind in entry['wait_seconds']:
+                entry['wait_seconds'][kind] += seconds
+
+    def set_queue(self, name: str, waiting: int, active: int) -> None:
+        """Profundidad de una cola (compañías del planificador, pestañas de una compañía)."""
+        with self._lock:
+            if self._run is not None:
+                self._run['queues'][name] = {'waiting': waiting, 'active': active}
+
+    def update_resources(self, sample: Dict[str, float]) -> None:
+        """Registra una muestra de ResourceMonitor (RSS de los navegadores)."""
+        if not sample:
+            return
+        with self._lock:
+            if self._run is None:
+                return
+            resources = self._run['resources']
+            resources['rss_mb'] = round(sample.get('rss_mb', 0.0), 1)
+            resources['peak_rss_mb'] = max(resources['peak_rss_mb'], resources['rss_mb'])
+            resources['processes'] = int(sample.get('processes', 0))
+
+    @staticmethod
+    def _new_step() -> Dict[str, Any]:
+        return {
+            'runs': 0, 'failures': 0, 'attempts': 0, 'retries': 0,
+            'seconds': 0.0, 'last_seconds': 0.0, 'max_seconds': 0.0,
+            'sleep_seconds': 0.0, 'condition_seconds': 0.0, 'last_error': None
+        }
+
+    # --- Instrumentación de páginas ---------------------------------------------------
+
+    def instrument_context(self, context, company: str) -> None:
+        """Mide las esperas de todas las páginas de un contexto (también las que se abran después)."""
+        try:
+            for page in context.pages:
+                self.instrument_page(page, company)
+            context.on('page', lambda page: self.instrument_page(page, company))
+        except Exception as e:
+            self.logger.debug(f"No se pudo instrumentar el contexto de {company}: {e}")
+
+    def instrument_page(self, page, company: str) -> None:
+        """Envuelve los métodos de espera de la página para separar pausas fijas de condiciones."""
+        if getattr(page, '_run_metrics_company', None):
+            return
+        try:
+            for name in SLEEP_METHODS + CONDITION_METHODS:
+                kind = 'sleep' if name in SLEEP_METHODS else 'condition'
+                setattr(page, name, self._timed_wait(getattr(page, name), company, kind))
+            page._run_metrics_company = company
+        except Exception as e:
+            self.logger.debug(f"No se pudo instrumentar una página de {company}: {e}")
+
+    def _timed_wait(self, method, company: str, kind: str):
+        async def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await method(*args, **kwargs)
+            finally:
+                self.record_wait(company, kind, time.perf_counter() - started)
+        return wrapper
+
+    # --- Muestreo de recursos ---------------------------------------------------------
+
+    def _start_sampler(self) -> None:
+        try:
+            self._sampler = asyncio.get_running_loop().create_task(self._sample_loop())
+        except RuntimeError:
+            self._sampler = None  # Sin loop (uso desde código síncrono): no se mide RSS
+
+    async def _sample_loop(self) -> None:
+        from .resource_scheduler import ResourceMonitor
+        monitor = ResourceMonitor()
+        if not monitor.available:
+            return
+        while True:
+            self.update_resources(monitor.sample())
+            await asyncio.sleep(self.SAMPLE_SECONDS)
+
+    # --- Salidas ----------------------------------------------------------------------
+
+    def snapshot(self) -> Optional[Dict[str, Any]]:
+        """Copia del estado de la ejecución en curso (o la última), con tiempos calculados."""
+        with self._lock:
+            if self._run is None:
+                return None
+            run = json.loads(json.dumps(self._run, default=str))
+
+        now = run['finished_at'] or time.time()
+        run['elapsed_seconds'] = round(now - run['started_at'], 1)
+        for entry in run['companies'].values():
+            entry['step_elapsed_seconds'] = (
+                round(now - entry['step_started_at'], 1) if entry['step_started_at'] else None
+            )
+            for stats in entry['steps'].values():
+                stats.pop('_waits_at_start', None)
+                stats['other_seconds'] = max(stats['seconds'] - stats['sleep_seconds'] - stats['condition_seconds'], 0.0)
+        return run
+
+    def prometheus_text(self) -> str:
+        """Métricas en formato de texto de Prometheus."""
+        run = self.snapshot()
+        lines: List[str] = []
+
+        def metric(name: str, kind: str, help_text: str, samples: List[tuple]) -> None:
+            lines.append(f"# HELP cotizador_{name} {help_text}")
+            lines.append(f"# TYPE cotizador_{name} {kind}")
+            for labels, value in samples:
+                label_text = ','.join(f'{k}="{self._escape_label(v)}"' for k, v in labels.items())
+                lines.append(f"cotizador_{name}{{{label_text}}} {value}" if label_text else f"cotizador_{name} {value}")
+
+        if run is None:
+            metric('run_active', 'gauge', 'Hay una ejecucion en curso', [({}, 0)])
+            return '\n'.join(lines) + '\n'
+
+        companies = run['companies'].values()
+        metric('run_active', 'gauge', 'Hay una ejecucion en curso', [({}, int(run['finished_at'] is None))])
+        metric('run_elapsed_seconds', 'gauge', 'Duracion de la ejecucion', [({'run': run['id']}, run['elapsed_seconds'])])
+        metric('company_running', 'gauge', 'Compania en ejecucion',
+               [({'company': c['company']}, int(c['status'] == 'ejecutando')) for c in companies])
+        metric('company_current_step', 'gauge', 'Paso actual de la compania (valor = segundos en el paso)',
+               [({'company': c['company'], 'step': c['current_step']}, c['step_elapsed_seconds'] or 0)
+                for c in companies if c['current_step']])
+        metric('step_duration_seconds_total', 'counter', 'Tiempo acumulado por paso',
+               [({'company': c['company'], 'step': s}, round(st['seconds'], 3))
+                for c in companies for s, st in c['steps'].items()])
+        metric('step_runs_total', 'counter', 'Ejecuciones terminadas por paso',
+               [({'company': c['company'], 'step': s}, st['runs']) for c in companies for s, st in c['steps'].items()])
+        metric('step_failures_total', 'counter', 'Intentos fallidos por paso',
+               [({'company': c['company'], 'step': s}, st['failures']) for c in companies for s, st in c['steps'].items()])
+        metric('step_retries_total', 'counter', 'Reintentos por compania',
+               [({'company': c['company']}, c['retries']) for c in companies])
+        metric('wait_seconds_total', 'counter', 'Tiempo de espera por tipo (sleep = pausa fija, condition = portal)',
+               [({'company': c['company'], 'kind': kind}, round(seconds, 3))
+                for c in companies for kind, seconds in c['wait_seconds'].items()])
+        metric('queue_waiting', 'gauge', 'Trabajos en cola',
+               [({'queue': name}, q['waiting']) for name, q in run['queues'].items()])
+        metric('queue_active', 'gauge', 'Trabajos en ejecucion',
+               [({'queue': name}, q['active']) for name, q in run['queues'].items()])
+        metric('browser_rss_megabytes', 'gauge', 'Memoria de los navegadores', [({}, run['resources']['rss_mb'])])
+        metric('browser_peak_rss_megabytes', 'gauge', 'Pico de memoria de los navegadores',
+               [({}, run['resources']['peak_rss_mb'])])
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def _escape_label(value: Any) -> str:
+        return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+    def html(self) -> str:
+        """Página simple con la ejecución en curso y las anteriores (se recarga sola)."""
+        run = self.snapshot()
+        parts = [
+            '<!DOCTYPE html><html><head><meta charset="utf-8"><meta http-equiv="refresh" content="2">',
+            '<title>Cotizador - métricas</title><style>body{font-family:sans-serif;margin:1.5em}'
+            'table{border-collapse:collapse;margin-bottom:1em}td,th{border:1px solid #ccc;padding:4px 8px;'
+            'text-align:right}td:first-child,th:first-child{text-align:left}</style></head><body>'
+        ]
+        if run is None:
+            parts.append('<h2>Sin ejecuciones desde que se abrió el proceso</h2>')
+        else:
+            resources = run['resources']
+            parts.append(
+                f"<h2>Ejecución {escape(run['id'])} ({escape(run['mode'])}) - {escape(run['status'])}, "
+                f"{run['elapsed_seconds']:.0f}s</h2>"
+                f"<p>Memoria navegadores: {resources['rss_mb']:.0f} MB (pico {resources['peak_rss_mb']:.0f} MB, "
+                f"{resources['processes']} procesos)</p>"
+            )
+            if run['queues']:
+                parts.append('<table><tr><th>Cola</th><th>En espera</th><th>Activos</th></tr>')
+                for name, queue in run['queues'].items():
+                    parts.append(f"<tr><td>{escape(name)}</td><td>{queue['waiting']}</td><td>{queue['active']}</td></tr>")
+                parts.append('</table>')
+
+            parts.append(
+                '<table><tr><th>Compañía / paso</th><th>Estado</th><th>Tiempo</th><th>Pausas fijas</th>'
+                '<th>Esperando portal</th><th>Resto</th><th>Intentos</th><th>Reintentos</th></tr>'
+            )
+            for entry in run['companies'].values():
+                current = entry['current_step']
+                state = escape(entry['status'] + (f" · {current} ({entry['step_elapsed_seconds']:.0f}s)" if current else ''))
+                waits = entry['wait_seconds']
+                parts.append(
+                    f"<tr><th>{escape(entry['company'].upper())}</th><td>{state}</td><td></td>"
+                    f"<td>{waits['sleep']:.1f}s</td><td>{waits['condition']:.1f}s</td><td></td><td></td>"
+                    f"<td>{entry['retries']}</td></tr>"
+                )
+                for name, stats in entry['steps'].items():
+                    parts.append(
+                        f"<tr><td>&nbsp;&nbsp;{escape(name)}</td><td>{stats['failures']} fallo(s)</td>"
+                        f"<td>{stats['seconds']:.1f}s</td><td>{stats['sleep_seconds']:.1f}s</td>"
+                        f"<td>{stats['condition_seconds']:.1f}s</td><td>{stats['other_seconds']:.1f}s</td>"
+                        f"<td>{stats['attempts']}</td><td>{stats['retries']}</td></tr>"
+                    )
+            parts.append('</table>')
+
+        history = self.load_history()
+        if history:
+            parts.append('<h3>Ejecuciones anteriores</h3><table><tr><th>Ejecución</th><th>Modo</th>'
+                         '<th>Estado</th><th>Duración</th><th>Compañías</th></tr>')
+            for past in history:
+                duration = (past.get('finished_at') or past['started_at']) - past['started_at']
+                companies = ', '.join(
+                    f"{c['company'].upper()} {'✅' if c['status'] == 'exitosa' else '❌'}"
+                    for c in past.get('companies', {}).values()
+                )
+                parts.append(
+                    f"<tr><td>{escape(past['id'])}</td><td>{escape(past.get('mode', ''))}</td>"
+                    f"<td>{escape(past.get('status', ''))}</td><td>{duration:.0f}s</td><td>{escape(companies)}</td></tr>"
+                )
+            parts.append('</table>')
+
+        parts.append('<p><a href="/metrics">/metrics</a> · <a href="/metrics.json">/metrics.json</a></p></body></html>')
+        return ''.join(parts)
+
+    # --- Persistencia -----------------------------------------------------------------
+
+    def _save_if_finished(self) -> None:
+        """Vuelve a guardar una ejecución ya cerrada que recibió datos tardíos."""
+        with self._lock:
+            if self._run is None or self._run['finished_at'] is None:
+                return
+            data = json.loads(json.dumps(self._run, default=str))
+        self._save(data, announce=False)
+
+    def _save(self, run: Dict[str, Any], announce: bool = True) -> Optional[str]:
+        from .run_ledger import RunLedger
+        path = self._persist(run, announce)
+        RunLedger.record_run(run)
+        return path
+
+    def _persist(self, run: Dict[str, Any], announce: bool = True) -> Optional[str]:
+        for entry in run['companies'].values():
+            for stats in entry['steps'].values():
+                stats.pop('_waits_at_start', None)
+        path = os.path.join(self.METRICS_DIR, f"run_{run['id']}.json")
+        try:
+            os.makedirs(self.METRICS_DIR, exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(run, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            self.logger.warning(f"⚠️ No se pudieron guardar las métricas de la ejecución: {e}")
+            return None
+        if announce:
+            self.logger.info(f"📈 Métricas de la ejecución guardadas en {path}")
+        return path
+
+    @classmethod
+    def load_history(cls, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Ejecuciones guardadas, de la más reciente a la más antigua."""
+        try:
+            names = sorted((n for n in os.listdir(cls.METRICS_DIR) if n.startswith('run_') and n.endswith('.json')),
+                           reverse=True)
+        except OSError:
+            return []
+        history = []
+        for name in names[:limit or cls.HISTORY_SIZE]:
+            try:
+                with open(os.path.join(cls.METRICS_DIR, name), 'r', encoding='utf-8') as f:
+                    history.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return history
+
+    # --- Servidor HTTP ----------------------------------------------------------------
+
+    def _ensure_server(self) -> None:
+        """Levanta el endpoint local la primera vez (METRICS_PORT=0 lo desactiva)."""
+        port = BaseConfig.METRICS_PORT
+        if self._server is not None or self._server_failed or not port:
+            return
+
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split('?', 1)[0]
+                if path == '/metrics':
+                    body, content_type = metrics.prometheus_text(), 'text/plain; version=0.0.4; charset=utf-8'
+                elif path == '/metrics.json':
+                    body, content_type = json.dumps(metrics.snapshot(), ensure_ascii=False), 'application/json'
+                elif path == '/':
+                    body, content_type = metrics.html(), 'text/html; charset=utf-8'
+                else:
+                    self.send_error(404)
+                    return
+                data = body.encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass  # Sin registro de accesos
+
+        try:
+            self._server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+        except OSError as e:
+            self._server_failed = True
+            self.logger.warning(f"⚠️ No se pudo abrir el endpoint de métricas en el puerto {port}: {e}")
+            return
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name='metricas-http', daemon=True).start()
+        self.logger.info(f"📈 Métricas en vivo: http://127.0.0.1:{port}/ (Prometheus en /metrics)")
+
+    def shutdown(self) -> None:
+        """Detiene el endpoint HTTP (si se levantó)."""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+# Instancia única del proceso (la GUI y el host residente reutilizan el mismo endpoint)
+_run_metrics: Optional[RunMetrics] = None
+
+
+def get_run_metrics() -> RunMetrics:
+    """Obtiene (o crea) las métricas de ejecución del proceso."""
+    global _run_metrics
+    if _run_metrics is None:
+        _run_metrics = RunMetrics()
+    return _run_metrics
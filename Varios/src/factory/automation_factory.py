@@ -1,9 +1,12 @@
 """Factory para crear automatizaciones específicas por compañía."""
 
-from typing import Optional, Any
-from ..core.base_automation import BaseAutomation
+from typing import Optional, Any, TYPE_CHECKING
 from ..shared.exceptions import ConfigurationError
 
+if TYPE_CHECKING:
+    # Solo para anotaciones: importar BaseAutomation carga Playwright
+    from ..core.base_automation import BaseAutomation
+
 class AutomationFactory:
     """Factory para crear automatizaciones específicas por compañía."""
     
@@ -15,7 +18,7 @@ class AutomationFactory:
         contrasena: Optional[str] = None,
         headless: Optional[bool] = None,
         **kwargs
-    ) -> BaseAutomation:
+    ) -> 'BaseAutomation':
         """
         Crea una instancia de automatización para la compañía especificada.
         
@@ -93,9 +96,8 @@ class AutomationFactory:
             return cls.get_supported_companies()
         
         try:
-            from ..consolidation.template_handler import TemplateHandler
-            template_handler = TemplateHandler()
-            allowed_companies = template_handler.get_fondo_aseguradoras(fondo)
+            from ..consolidation.template_registry import TemplateRegistry
+            allowed_companies = TemplateRegistry.get_aseguradoras(fondo)
             
             # Filtrar solo las compañías que están soportadas por el sistema
             supported_companies = cls.get_supported_companies()
@@ -0,0 +1,321 @@
+"""
+Host residente de automatizaciones para la GUI.
+
+En lugar de lanzar un intérprete nuevo por cada clic (re-importar Playwright, pandas y
+openpyxl, arrancar el driver y el navegador FASECOLDA), la GUI inicia este proceso una vez
+y le envía órdenes por stdin, una por línea en JSON:
+
+    {"cmd": "run", "args": ["--companies", "allianz", "sura", "--parallel"], "env": {"GUI_...": "..."}}
+    {"cmd": "stop"}
+    {"cmd": "shutdown"}
+
+Las líneas que no son JSON son respuestas para input(). La salida del host es la misma de
+ejecutar_automatizaciones.py, más eventos con el prefijo EVENT_PREFIX (ready, finished).
+
+Este módulo también se importa desde la GUI (como interfaces.automation_host): todo lo del
+lado del host importa el resto del sistema de forma perezosa.
+"""
+
+import os
+import sys
+import json
+import time
+import queue
+import asyncio
+import threading
+import subprocess
+from typing import Any, Dict, Iterator, List, Optional
+
+
+EVENT_PREFIX = '@@HOST '
+
+
+def _emit(event: str, **data) -> None:
+    print(EVENT_PREFIX + json.dumps({'event': event, **data}), flush=True)
+
+
+class _HostStdin:
+    """Reemplazo de sys.stdin en el host: input() lee las respuestas que reenvía la GUI."""
+
+    def __init__(self, answers: 'queue.Queue[str]'):
+        self._answers = answers
+
+    def readline(self) -> str:
+        return self._answers.get() + '\n'
+
+    def isatty(self) -> bool:
+        return False
+
+
+class AutomationHost:
+    """Proceso residente que atiende ejecuciones de la GUI, una a la vez."""
+
+    def __init__(self):
+        self._commands: Optional[asyncio.Queue] = None
+        self._answers: 'queue.Queue[str]' = queue.Queue()
+        self._run_task: Optional[asyncio.Task] = None
+
+    async def serve(self) -> int:
+        """
+        Atiende órdenes hasta recibir shutdown (o hasta que se cierre stdin).
+
+        Returns:
+            Código de salida del proceso
+        """
+        loop = asyncio.get_running_loop()
+        self._commands = asyncio.Queue()
+
+        stdin = sys.stdin
+        sys.stdin = _HostStdin(self._answers)
+        threading.Thread(target=self._read_stdin, args=(stdin, loop), name='host-stdin', daemon=True).start()
+
+        await self._warm_up()
+        _emit('ready', pid=os.getpid())
+
+        try:
+            while True:
+                command = await self._commands.get()
+                kind = command.get('cmd')
+
+                if kind == 'run':
+                    if self._run_task and not self._run_task.done():
+                        _emit('busy')
+                        continue
+                    self._run_task = asyncio.create_task(self._run(command))
+                elif kind == 'stop':
+                    if self._run_task and not self._run_task.done():
+                        print("⏹️ Deteniendo la ejecución en curso...", flush=True)
+                        self._run_task.cancel()
+                    else:
+                        _emit('finished', code=1)
+                elif kind == 'shutdown':
+                    break
+        finally:
+            await self._shutdown()
+        return 0
+
+    def _read_stdin(self, stdin, loop: asyncio.AbstractEventLoop) -> None:
+        """Hilo lector: órdenes JSON a la cola del loop, el resto a input()."""
+        for raw in stdin:
+            line = raw.strip()
+            if line.startswith('{'):
+                try:
+                    command = json.loads(line)
+                except ValueError:
+                    command = None
+                if isinstance(command, dict) and 'cmd' in command:
+                    loop.call_soon_threadsafe(self._commands.put_nowait, command)
+                    continue
+            self._answers.put(line)
+        # La GUI se cerró sin avisar
+        loop.call_soon_threadsafe(self._commands.put_nowait, {'cmd': 'shutdown'})
+
+    async def _warm_up(self) -> None:
+        """Importa los módulos pesados y deja el driver (y el navegador FASECOLDA) listos."""
+        started = time.perf_counter()
+        import openpyxl  # noqa: F401 (el CLI los importa al usarlos; aquí se pagan una sola vez)
+        from .cli_interface import CLIInterface  # noqa: F401
+        from ..core.automation_manager import AutomationManager  # noqa: F401
+        from ..consolidation.cotizacion_consolidator import CotizacionConsolidator  # noqa: F401
+        from ..consolidation.excel_backend import ExcelBackend
+        if ExcelBackend.get_backend() == 'openpyxl':
+            import pandas  # noqa: F401 (solo el reporte estándar del backend openpyxl lo usa)
+        from ..companies.allianz.allianz_automation import AllianzAutomation  # noqa: F401
+        from ..companies.sura.sura_automation import SuraAutomation  # noqa: F401
+        from ..core.playwright_runtime import get_playwright_runtime
+        from ..config.client_config import ClientConfig
+
+        # Referencia propia: el driver sigue vivo entre ejecuciones
+        await get_playwright_runtime().acquire()
+
+        if ClientConfig.is_fasecolda_enabled():
+            from ..shared.fasecolda_worker import get_fasecolda_worker
+            asyncio.create_task(self._warm_fasecolda(get_fasecolda_worker()))
+
+        print(f"🔥 Host de automatizaciones listo en {time.perf_counter() - started:.1f}s", flush=True)
+
+    @staticmethod
+    async def _warm_fasecolda(worker) -> None:
+        try:
+            await worker.warm_up()
+        except Exception as e:
+            print(f"⚠️ No se pudo precalentar el navegador FASECOLDA: {e}", flush=True)
+
+    async def _run(self, command: Dict[str, Any]) -> None:
+        from .cli_interface import CLIInterface
+
+        code = 1
+        try:
+            self._reset_run_state()
+            self._apply_environment(command.get('env') or {})
+            code = await CLIInterface(keep_warm=True).run(list(command.get('args') or []))
+        except asyncio.CancelledError:
+            print("⏹️ Ejecución detenida", flush=True)
+            # Libera un input() que quedó esperando en su hilo; si no había ninguno se descarta al iniciar la próxima
+            self._answers.put('')
+        except Exception as e:
+            print(f"❌ Error crítico: {e}", flush=True)
+        finally:
+            _emit('finished', code=code)
+
+    def _reset_run_state(self) -> None:
+        """
+        Deja los singletons del proceso como los encontraría un proceso nuevo.
+
+        Una ejecución detenida a mitad de un MFA o de la selección FASECOLDA puede dejar la
+        pausa global activa, el circuito de una aseguradora abierto o respuestas sin leer.
+        """
+        from ..core.flow_runner import CircuitBreaker
+        from ..shared.global_pause_coordinator import global_pause_coordinator
+
+        global_pause_coordinator.reset()
+        CircuitBreaker.reset()
+        while True:
+            try:
+                self._answers.get_nowait()
+            except queue.Empty:
+                break
+
+    @staticmethod
+    def _apply_environment(env: Dict[str, str]) -> None:
+        """Aplica las variables GUI_* de la ejecución como lo haría un proceso nuevo."""
+        from ..config.client_config import ClientConfig
+
+        for name in [n for n in os.environ if n.startswith('GUI_') and n not in env]:
+            del os.environ[name]
+        os.environ.update({name: str(value) for name, value in env.items()})
+        ClientConfig._load_gui_overrides()
+
+    async def _shutdown(self) -> None:
+        if self._run_task and not self._run_task.done():
+            self._run_task.cancel()
+            await asyncio.gather(self._run_task, return_exceptions=True)
+
+        from ..shared.fasecolda_worker import shutdown_fasecolda_worker
+        from ..core.playwright_runtime import shutdown_playwright_runtime
+        await shutdown_fasecolda_worker()
+        await shutdown_playwright_runtime()
+
+
+class AutomationHostProcess:
+    """
+    Lado GUI: inicia el host residente, le envía órdenes y reparte su salida.
+
+    Un hilo lee la salida del host todo el tiempo (para que la tubería nunca se llene) y la
+    deja en una cola; read_run_output() la consume hasta el evento 'finished'.
+    """
+
+    def __init__(self, script_path: str, cwd: str, env: Optional[Dict[str, str]] = None):
+        self.script_path = script_path
+        self.cwd = cwd
+        self.env = env
+        self.process: Optional[subprocess.Popen] = None
+        self.ready = threading.Event()
+        self.last_exit_code: Optional[int] = None
+        self._lines: 'queue.Queue[Optional[str]]' = queue.Queue()
+        self._finished = threading.Event()
+
+    def start(self) -> None:
+        env = dict(self.env or os.environ)
+        env['PYTHONIOENCODING'] = 'utf-8'
+        env['PYTHONUNBUFFERED'] = '1'
+        self.process = subprocess.Popen(
+            [sys.executable, self.script_path, '--serve'],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            stdin=subprocess.PIPE,
+            universal_newlines=True,
+            encoding='utf-8',
+            errors='replace',
+            cwd=self.cwd,
+            bufsize=1,
+            env=env
+        )
+        threading.Thread(target=self._read_output, name='host-output', daemon=True).start()
+
+    def is_alive(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    def _read_output(self) -> None:
+        for raw in self.process.stdout:
+            line = raw.rstrip('\n')
+            if line.startswith(EVENT_PREFIX):
+                try:
+                    event = json.loads(line[len(EVENT_PREFIX):])
+                except ValueError:
+                    continue
+                if event.get('event') == 'ready':
+                    self.ready.set()
+                elif event.get('event') == 'finished':
+                    self.last_exit_code = event.get('code', 1)
+                    self._finished.set()
+                    self._lines.put(None)
+                continue
+            self._lines.put(line)
+
+        # El host terminó: liberar a quien espere una ejecución
+        if not self._finished.is_set():
+            self.last_exit_code = 1
+            self._finished.set()
+        self._lines.put(None)
+
+    def _send(self, command: Dict[str, Any]) -> None:
+        self.process.stdin.write(json.dumps(command) + '\n')
+        self.process.stdin.flush()
+
+    def run(self, args: List[str], env: Dict[str, str]) -> None:
+        """Pide una ejecución (no espera a que termine)."""
+        # Descartar salida previa (precalentamiento, ejecuciones anteriores)
+        while True:
+            try:
+                self._lines.get_nowait()
+            except queue.Empty:
+                break
+        self._finished.clear()
+        self.last_exit_code = None
+        self._send({'cmd': 'run', 'args': args, 'env': env})
+
+    def read_run_output(self) -> Iterator[str]:
+        """Líneas de salida de la ejecución en curso, hasta que termine."""
+        while True:
+            line = self._lines.get()
+            if line is None:
+                return
+            yield line
+
+    def answer(self, text: str) -> None:
+        self.process.stdin.write(f"{text}\n")
+        self.process.stdin.flush()
+
+    def stop_run(self, timeout: float = 8.0) -> bool:
+        """
+        Cancela la ejecución en curso dejando el host vivo.
+
+        Returns:
+            True si la ejecución terminó dentro del tiempo
+        """
+        if not self.is_alive():
+            return False
+        try:
+            self._send({'cmd': 'stop'})
+        except (OSError, ValueError):
+            return False
+        return self._finished.wait(timeout)
+
+    def shutdown(self, timeout: float = 10.0) -> None:
+        """Cierra el host (navegadores y driver incluidos); si no responde, lo termina."""
+        if not self.is_alive():
+            return
+        try:
+            self._send({'cmd': 'shutdown'})
+            self.process.wait(timeout=timeout)
+        except (OSError, ValueError, subprocess.TimeoutExpired):
+            self.kill()
+
+    def kill(self) -> None:
+        if self.process and self.process.poll() is None:
+            self.process.kill()
+            try:
+                self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                pass
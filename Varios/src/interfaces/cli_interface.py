@@ -2,18 +2,39 @@
 
 import argparse
 import asyncio
+import json
+import os
+import signal
 import sys
-from typing import List, Optional
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
 
-from ..core.automation_manager import AutomationManager
 from ..factory.automation_factory import AutomationFactory
-from ..consolidation.cotizacion_consolidator import CotizacionConsolidator
+from ..core.har_archive import HarArchive
+
+# AutomationManager (Playwright) y CotizacionConsolidator (pandas, openpyxl) se importan
+# cuando se usan: --help, --review-fasecolda, --forget-fasecolda, --run-report o un error de argumentos no deben cargarlos
 
 class CLIInterface:
     """Interfaz de línea de comandos para ejecutar automatizaciones."""
     
-    def __init__(self):
-        self.manager = AutomationManager()
+    def __init__(self, keep_warm: bool = False):
+        """
+        Args:
+            keep_warm: Dejar el driver y el navegador FASECOLDA abiertos al terminar
+                       (host residente de la GUI, que atiende varias ejecuciones)
+        """
+        self._manager = None
+        self.keep_warm = keep_warm
+    
+    @property
+    def manager(self):
+        """AutomationManager, creado en el primer uso."""
+        if self._manager is None:
+            from ..core.automation_manager import AutomationManager
+            self._manager = AutomationManager()
+        return self._manager
     
     def create_parser(self) -> argparse.ArgumentParser:
         """Crea el parser de argumentos de línea de comandos."""
@@ -33,6 +54,22 @@ Ejemplos de uso:
   
   # Ejecutar con credenciales específicas
   python -m src.interfaces.cli_interface --companies sura --user mi_usuario --password mi_pass
+  
+  # Grabar el tráfico de red y reproducirlo sin red (perfilado)
+  python -m src.interfaces.cli_interface --companies allianz sura --record-har
+  python -m src.interfaces.cli_interface --companies allianz sura --replay-har --har-latency zero
+  
+  # Ignorar la cotización reutilizable del mismo cliente y volver a cotizar en los portales
+  python -m src.interfaces.cli_interface --companies allianz sura --parallel --refresh-quotes
+  
+  # Varios clientes en pestañas del mismo navegador autenticado (JSON: lista de clientes o historial de la GUI)
+  python -m src.interfaces.cli_interface --companies sura --clients-file clientes.json
+  
+  # Corregir una elección FASECOLDA aprendida (vuelve a preguntar en la próxima cotización)
+  python -m src.interfaces.cli_interface --forget-fasecolda "mazda cx 50"
+  
+  # Historial: latencias p50/p95, fallos por paso y volumen diario (últimos 7 días)
+  python -m src.interfaces.cli_interface --run-report 7
             """
         )
           # Compañías a ejecutar
@@ -69,6 +106,43 @@ Ejemplos de uso:
             help='Contraseña personalizada (sobrescribe configuración)'
         )
         
+        # Grabación / reproducción de tráfico de red
+        har_group = parser.add_mutually_exclusive_group()
+        har_group.add_argument(
+            '--record-har',
+            action='store_true',
+            help='Grabar todo el tráfico de red en un archivo HAR versionado (Varios/har_archives)'
+        )
+        har_group.add_argument(
+            '--replay-har',
+            nargs='?',
+            const='latest',
+            metavar='GRABACION',
+            help='Reproducir una grabación HAR sin red (por defecto la más reciente)'
+        )
+        
+        parser.add_argument(
+            '--har-latency',
+            choices=[HarArchive.LATENCY_REAL, HarArchive.LATENCY_ZERO],
+            default=HarArchive.LATENCY_REAL,
+            help='Latencia en replay: la grabada (real) o ninguna (zero)'
+        )
+        
+        # Caché de cotizaciones del mismo cliente/vehículo
+        parser.add_argument(
+            '--refresh-quotes',
+            action='store_true',
+            help='Cotizar de nuevo en los portales aunque haya una cotización vigente del mismo cliente'
+        )
+        
+        # Cotización multi-pestaña de varios clientes
+        parser.add_argument(
+            '--clients-file',
+            metavar='ARCHIVO',
+            help='Cotizar los clientes del archivo JSON en pestañas de un solo navegador por compañía '
+                 '(sin consolidado; resultados en LOGS/lotes)'
+        )
+        
         # Configuraciones de logging
         parser.add_argument(
             '--verbose', '-v',
@@ -83,8 +157,219 @@ Ejemplos de uso:
             help='Listar compañías disponibles y salir'
         )
         
+        # Revisión de decisiones FASECOLDA tomadas sin confianza suficiente
+        parser.add_argument(
+            '--review-fasecolda',
+            action='store_true',
+            help='Revisar las elecciones FASECOLDA pendientes de ejecuciones desatendidas y salir'
+        )
+        
+        # Corrección de elecciones FASECOLDA aprendidas (se vuelve a preguntar en la próxima búsqueda)
+        parser.add_argument(
+            '--forget-fasecolda',
+            nargs='?',
+            const='',
+            metavar='TEXTO',
+            help='Listar las elecciones FASECOLDA aprendidas (filtradas por marca/referencia/año) '
+                 'y olvidar las que se indiquen'
+        )
+        
+        # Reporte del historial de ejecuciones (LOGS/run_ledger.sqlite3)
+        parser.add_argument(
+            '--run-report',
+            nargs='?',
+            const=30,
+            type=int,
+            metavar='DIAS',
+            help='Mostrar latencias p50/p95, fallos por paso y volumen diario de los últimos DIAS (30) y salir'
+        )
+        
         return parser
     
+    def _review_fasecolda_decisions(self) -> int:
+        """
+        Recorre las decisiones FASECOLDA pendientes y pide confirmarlas o corregirlas.
+        
+        Returns:
+            Código de salida (0 = éxito)
+        """
+        from ..shared.fasecolda_resolver import FasecoldaReviewQueue
+        
+        pending = FasecoldaReviewQueue.pending()
+        if not pending:
+            print("✅ No hay decisiones FASECOLDA pendientes de revisión")
+            return 0
+        
+        print(f"📝 {len(pending)} decisión(es) FASECOLDA pendiente(s) de revisión")
+        for item in pending:
+            chosen = item['chosen']
+            print(f"\n[{item['id']}] {item['brand']} {item['reference']} {item.get('model_year') or ''}".rstrip())
+            if item.get('full_reference'):
+                print(f"    Referencia completa: {item['full_reference']}")
+            print(f"    Elegida: CF {chosen['cf_code']} - {chosen['description']} (confianza {item['confidence']:.2f})")
+            for number, option in enumerate(item['options'], 1):
+                marker = '→' if option['cf_code'] == chosen['cf_code'] else ' '
+                print(f"    {marker} {number}. CF {option['cf_code']} / CH {option.get('ch_code') or '-'} - "
+                      f"{option['description']} ({option.get('adjusted_score') or 0:.2f})")
+            
+            answer = input("    Número correcto, Enter para confirmar, 'd' para descartar: ").strip().lower()
+            if answer == 'd':
+                FasecoldaReviewQueue.mark_reviewed(item['id'])
+            elif answer.isdigit() and 1 <= int(answer) <= len(item['options']):
+                FasecoldaReviewQueue.mark_reviewed(item['id'], item['options'][int(answer) - 1])
+            else:
+                FasecoldaReviewQueue.mark_reviewed(item['id'], chosen)
+        return 0
+    
+    def _forget_fasecolda_mappings(self, text: str) -> int:
+        """
+        Muestra las elecciones FASECOLDA aprendidas que coinciden con el texto y olvida las elegidas.
+        
+        Args:
+            text: Filtro sobre marca, referencia y año ('' = todas)
+            
+        Returns:
+            Código de salida (0 = éxito)
+        """
+        from ..shared.fasecolda_resolver import FasecoldaMappingStore
+        
+        mappings = FasecoldaMappingStore.find(text)
+        if not mappings:
+            print(f"📭 No hay elecciones FASECOLDA aprendidas{f' para {text!r}' if text else ''}")
+            return 0
+        
+        print(f"🧠 {len(mappings)} elección(es) FASECOLDA aprendida(s)")
+        for number, mapping in enumerate(mappings, 1):
+            print(f"  {number}. {mapping['brand']} {mapping['reference']} {mapping.get('model_year') or ''}".rstrip())
+            print(f"     CF {mapping['cf_code']} / CH {mapping.get('ch_code') or '-'} - "
+                  f"{mapping.get('description', '')} ({mapping.get('chosen_at', '')})")
+        
+        answer = input("Números a olvidar (separados por coma), 't' para todas, Enter para salir: ").strip().lower()
+        if answer == 't':
+            selected = mappings
+        else:
+            numbers = [int(part) for part in answer.replace(' ', '').split(',') if part.isdigit()]
+            selected = [mappings[n - 1] for n in numbers if 1 <= n <= len(mappings)]
+        
+        for mapping in selected:
+            FasecoldaMappingStore.forget(mapping['brand'], mapping['reference'], mapping.get('model_year'))
+            print(f"🗑️ Olvidada: {mapping['brand']} {mapping['reference']} → CF {mapping['cf_code']}")
+        if selected:
+            print("ℹ️ La próxima cotización de esos vehículos vuelve a buscar y preguntar en FASECOLDA")
+        return 0
+    
+    @staticmethod
+    def _load_clients_file(path: str) -> List[Dict[str, Any]]:
+        """
+        Lee los clientes de un lote.
+        
+        Acepta una lista de diccionarios de cliente (claves de ClientConfig, p. ej.
+        'client_document_number') o el historial de la GUI ({'clients': [{'data': {...}}]}).
+        
+        Raises:
+            ValueError: Si el archivo no tiene clientes con ese formato
+        """
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        entries = data.get('clients', []) if isinstance(data, dict) else data
+        if not isinstance(entries, list):
+            raise ValueError("se esperaba una lista de clientes")
+        clients = [entry.get('data', entry) if isinstance(entry, dict) else None for entry in entries]
+        if not clients or any(not isinstance(c, dict) or not c.get('client_document_number') for c in clients):
+            raise ValueError("cada cliente debe ser un diccionario con 'client_document_number'")
+        return clients
+    
+    async def _run_clients_file(self, clients: List[Dict[str, Any]], companies: List[str],
+                                automation_kwargs: Dict[str, Any]) -> int:
+        """
+        Cotiza un lote de clientes en pestañas, compañía por compañía, y guarda los resultados.
+        
+        Returns:
+            Código de salida (0 = todos los clientes cotizados)
+        """
+        from ..config.base_config import BaseConfig
+        
+        print(f"🗂️ Lote de {len(clients)} clientes en pestañas: {', '.join(companies)}")
+        results = {}
+        for company in companies:
+            results[company] = await self.manager.run_in_tabs(company, clients, **automation_kwargs)
+        
+        print("\n" + "="*50)
+        print("📊 RESULTADOS DEL LOTE:")
+        print("="*50)
+        all_success = True
+        for company, by_client in results.items():
+            print(f"\n  {company.upper()}")
+            for client, result in by_client.items():
+                if result['success']:
+                    plans = ', '.join(f"{plan}: {value}" for plan, value in result['plans'].items())
+                    print(f"    ✅ {client}: {plans}")
+                    if result['pdf']:
+                        print(f"       📄 {result['pdf']}")
+                else:
+                    all_success = False
+                    print(f"    ❌ {client}: {result['error'] or 'falló'}")
+        
+        lotes_dir = os.path.join(BaseConfig.LOGS_DIR, 'lotes')
+        os.makedirs(lotes_dir, exist_ok=True)
+        path = os.path.join(lotes_dir, f"lote_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+        print(f"\n💾 Resultados guardados en: {path}")
+        return 0 if all_success else 1
+    
+    def _print_run_report(self, days: int, companies: Optional[List[str]] = None) -> int:
+        """
+        Imprime el reporte del historial de ejecuciones.
+        
+        Args:
+            days: Días hacia atrás
+            companies: Limitar a estas compañías (None = todas)
+            
+        Returns:
+            Código de salida (0 = éxito)
+        """
+        from ..core.run_ledger import RunLedger
+        
+        def seconds(value) -> str:
+            return f"{value:.0f}s" if value is not None else '-'
+        
+        for company in companies or [None]:
+            report = RunLedger.report(days, company)
+            title = f" de {company.upper()}" if company else ''
+            if not report['latency']:
+                print(f"📭 Sin ejecuciones registradas{title} en los últimos {days} días ({RunLedger.DB_PATH})")
+                continue
+            
+            print(f"\n📊 HISTORIAL{title.upper()} - ÚLTIMOS {days} DÍAS")
+            print("\n⏱️ Duración por compañía y día (cotizaciones exitosas)")
+            print(f"  {'Día':<12}{'Compañía':<10}{'Corridas':>9}{'Fallidas':>9}{'p50':>8}{'p95':>8}")
+            for row in report['latency']:
+                print(f"  {row['day']:<12}{row['company'].upper():<10}{row['runs']:>9}{row['failed']:>9}"
+                      f"{seconds(row['p50']):>8}{seconds(row['p95']):>8}")
+            
+            print("\n🧩 Pasos (ordenados por tasa de fallos)")
+            print(f"  {'Compañía':<10}{'Paso':<14}{'Intentos':>9}{'Fallos':>8}{'Tasa':>7}{'Reint.':>7}{'p50':>8}{'p95':>8}")
+            for step in report['steps']:
+                print(f"  {step['company'].upper():<10}{step['step']:<14}{step['attempts']:>9}{step['failures']:>8}"
+                      f"{step['failure_rate']:>7.0%}{step['retries']:>7}{seconds(step['p50']):>8}{seconds(step['p95']):>8}")
+                if step['failures'] and step['last_error']:
+                    print(f"      último error: {step['last_error'][:100]}")
+            
+            if report['failures']:
+                print("\n❌ Motivos de fallo más frecuentes")
+                for failure in report['failures'][:10]:
+                    print(f"  {failure['count']:>4} × {failure['company'].upper()}: {failure['reason'][:100]}")
+            
+            print("\n📅 Volumen por día")
+            print(f"  {'Día':<12}{'Ejecuciones':>12}{'Cotizaciones':>13}{'Exitosas':>10}{'Tiempo':>9}")
+            for row in report['throughput']:
+                print(f"  {row['day']:<12}{row['runs']:>12}{row['quotes']:>13}{row['successful'] or 0:>10}"
+                      f"{(row['busy_seconds'] or 0) / 60:>8.0f}m")
+        return 0
+    
     async def run(self, args: Optional[List[str]] = None) -> int:
         """
         Ejecuta la interfaz CLI.
@@ -109,6 +394,15 @@ Ejemplos de uso:
                 print(f"  - {company}")
             return 0
         
+        if parsed_args.review_fasecolda:
+            return self._review_fasecolda_decisions()
+        
+        if parsed_args.forget_fasecolda is not None:
+            return self._forget_fasecolda_mappings(parsed_args.forget_fasecolda)
+        
+        if parsed_args.run_report is not None:
+            return self._print_run_report(parsed_args.run_report, parsed_args.companies)
+        
         # Verificar que se especificaron compañías
         if not parsed_args.companies:
             parser.print_help()
@@ -126,10 +420,9 @@ Ejemplos de uso:
             
             if not filtered_companies:
                 from ..config.client_config import ClientConfig
-                from ..consolidation.template_handler import TemplateHandler
+                from ..consolidation.template_registry import TemplateRegistry
                 selected_fondo = ClientConfig.get_selected_fondo()
-                template_handler = TemplateHandler()
-                allowed_for_fondo = template_handler.get_fondo_aseguradoras(selected_fondo)
+                allowed_for_fondo = TemplateRegistry.get_aseguradoras(selected_fondo)
                 supported_companies = AutomationFactory.get_supported_companies()
                 
                 print(f"\n❌ Error: Ninguna compañía está permitida para el fondo seleccionado")
@@ -146,6 +439,14 @@ Ejemplos de uso:
         # Actualizar la lista de compañías a ejecutar
         companies_to_run = filtered_companies
         
+        clients = None
+        if parsed_args.clients_file:
+            try:
+                clients = self._load_clients_file(parsed_args.clients_file)
+            except (OSError, ValueError) as e:
+                print(f"❌ Error leyendo el lote de clientes {parsed_args.clients_file}: {e}")
+                return 1
+        
         # Preparar argumentos para las automatizaciones
         automation_kwargs = {}
         if parsed_args.user:
@@ -155,22 +456,56 @@ Ejemplos de uso:
         if parsed_args.headless:
             automation_kwargs['headless'] = True  # Modo oculto/minimizado, no verdadero headless
         
+        # Activar grabación o reproducción HAR antes de lanzar cualquier navegador
         try:
+            if parsed_args.record_har:
+                har_dir = HarArchive.start_recording(companies_to_run)
+                print(f"📼 Grabando tráfico de red en: {har_dir}")
+            elif parsed_args.replay_har:
+                har_dir = HarArchive.start_replay(parsed_args.replay_har, parsed_args.har_latency)
+                print(f"▶️ Reproduciendo grabación: {har_dir} (latencia: {parsed_args.har_latency})")
+        except (FileNotFoundError, ValueError) as e:
+            print(f"❌ Error con la grabación HAR: {e}")
+            return 1
+        
+        # Grabando o reproduciendo HAR siempre se recorre el portal
+        refresh_quotes = parsed_args.refresh_quotes or HarArchive.is_active()
+        
+        start_time = time.perf_counter()
+        if not self.keep_warm:
+            self._cancel_on_terminate()
+        
+        # Consolidado que se arma mientras corren las automatizaciones (si se pidieron ambas compañías;
+        # un lote de clientes no genera consolidado)
+        wants_consolidation = 'sura' in parsed_args.companies and 'allianz' in parsed_args.companies and not clients
+        consolidation = None
+        
+        try:
+            if clients:
+                return await self._run_clients_file(clients, companies_to_run, automation_kwargs)
+            
             print(f"🚀 Iniciando automatización para: {', '.join(companies_to_run)}")
             print(f"📋 Modo: {'Paralelo' if parsed_args.parallel else 'Secuencial'}")
             
             # NOTA: La verificación del valor asegurado se hace ahora solo antes del consolidado
             # ya que solo se necesita para Solidaria y Bolívar, no para navegadores (Allianz/Sura)
+            if wants_consolidation:
+                from ..consolidation.incremental_consolidation import IncrementalConsolidation
+                consolidation = IncrementalConsolidation()
             
             # Ejecutar automatizaciones
             if parsed_args.parallel:
                 results = await self.manager.run_parallel(
                     companies_to_run, 
+                    consolidation=consolidation,
+                    refresh_quotes=refresh_quotes,
                     **automation_kwargs
                 )
             else:
                 results = await self.manager.run_sequential(
                     companies_to_run, 
+                    consolidation=consolidation,
+                    refresh_quotes=refresh_quotes,
                     **automation_kwargs
                 )
             
@@ -186,13 +521,16 @@ Ejemplos de uso:
                 if not success:
                     all_success = False
             
+            if HarArchive.is_active():
+                print(f"⏱️ Tiempo de automatización: {time.perf_counter() - start_time:.1f}s ({HarArchive.mode()})")
+            
             if all_success:
                 print("\n🎉 ¡TODAS LAS AUTOMATIZACIONES COMPLETADAS EXITOSAMENTE!")
             else:
                 print("\n⚠️ Algunas automatizaciones fallaron. Revisa los logs para más detalles.")
                 
             # Ejecutar consolidación si se solicitaron ambas compañías (exitosas o no)
-            if len(parsed_args.companies) >= 2 and 'sura' in parsed_args.companies and 'allianz' in parsed_args.companies:
+            if wants_consolidation:
                 print("\n" + "="*50)
                 print("📋 INICIANDO CONSOLIDACIÓN DE COTIZACIONES...")
                 if not all_success:
@@ -211,10 +549,13 @@ Ejemplos de uso:
                 print("✅ Valor asegurado confirmado. Continuando con consolidado...\n")
                 
                 try:
-                    consolidator = CotizacionConsolidator()
-                    consolidation_success = consolidator.consolidate_with_failures(results)
+                    # La plantilla ya tiene los datos del cliente y las columnas de cada aseguradora;
+                    # solo falta lo que depende de todos los valores y guardar
+                    excel_path = await consolidation.finish(results)
                     
-                    if consolidation_success:
+                    if excel_path:
+                        from ..core.run_metrics import get_run_metrics
+                        get_run_metrics().record_output('consolidado', excel_path)
                         print("\n✅ ¡CONSOLIDACIÓN COMPLETADA EXITOSAMENTE!")
                         print("📄 El archivo Excel consolidado ha sido creado en la carpeta 'Consolidados'")
                         if not all_success:
@@ -231,10 +572,37 @@ Ejemplos de uso:
             print("\n⚠️ Proceso interrumpido por el usuario")
             await self.manager.stop_all()
             return 1
+        except asyncio.CancelledError:
+            # Detención desde la GUI (SIGTERM): cerrar navegadores antes de salir
+            print("\n⏹️ Automatización detenida")
+            await self.manager.stop_all()
+            return 1
         except Exception as e:
             print(f"\n❌ Error inesperado: {e}")
             await self.manager.stop_all()
             return 1
+        finally:
+            # Consolidado a medio armar (detenido, sin valor asegurado o con error): no se guarda
+            if consolidation is not None:
+                consolidation.discard()
+            
+            # Fin de la sesión: cerrar el navegador FASECOLDA residente (escribe el HAR si se graba)
+            # (sin manager no se lanzó ningún navegador y no hace falta cargar Playwright)
+            if not self.keep_warm and self._manager is not None:
+                from ..shared.fasecolda_worker import shutdown_fasecolda_worker
+                from ..core.playwright_runtime import shutdown_playwright_runtime
+                await shutdown_fasecolda_worker()
+                await shutdown_playwright_runtime()
+    
+    def _cancel_on_terminate(self) -> None:
+        """Convierte SIGTERM (botón detener de la GUI) en una cancelación de la ejecución."""
+        if sys.platform == 'win32':
+            return  # En Windows terminate() no se puede interceptar
+        task = asyncio.current_task()
+        try:
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, task.cancel)
+        except (NotImplementedError, RuntimeError):
+            pass
     
     def _filter_companies_by_fondo(self, companies: List[str]) -> List[str]:
         """
@@ -100,9 +100,35 @@ class ClientEditWindow:
         # Dejar campos vacíos por defecto (no cargar valores predeterminados)
         self.clear_all_fields()
         
+        # Buscar FASECOLDA en segundo plano cuando los datos del vehículo se estabilicen
+        self.setup_fasecolda_prefetch()
+        
         # Configurar cierre
         self.window.protocol("WM_DELETE_WINDOW", self.on_closing)
     
+    def setup_fasecolda_prefetch(self):
+        """Programa el prefetch de FASECOLDA cada vez que cambian estado, año, marca o referencia."""
+        for var in (self.vehicle_state, self.vehicle_model_year, self.vehicle_brand, self.vehicle_reference):
+            var.trace_add('write', lambda *args: self.schedule_fasecolda_prefetch())
+    
+    def schedule_fasecolda_prefetch(self):
+        """Envía el vehículo actual al prefetcher (con debounce; cancela el prefetch anterior)."""
+        try:
+            from src.shared.fasecolda_prefetch import get_fasecolda_prefetcher
+        except ImportError:
+            return  # Sin el paquete de automatización (ej. ventana abierta de forma aislada)
+        
+        try:
+            get_fasecolda_prefetcher().schedule(
+                category=ClientConfig.VEHICLE_CATEGORY,
+                state=self.vehicle_state.get(),
+                model_year=self.vehicle_model_year.get(),
+                brand=self.vehicle_brand.get(),
+                reference=self.vehicle_reference.get()
+            )
+        except Exception as e:
+            print(f"⚠️ No se pudo programar el prefetch de FASECOLDA: {e}")
+    
     def center_window(self):
         """Centra la ventana en la pantalla."""
         self.window.update_idletasks()
@@ -902,44 +928,9 @@ class ClientEditWindow:
     def _get_available_fondos_from_images(self) -> List[str]:
         """Obtiene los fondos disponibles desde las plantillas disponibles."""
         try:
-            # Obtener fondos directamente desde las plantillas para evitar problemas de importación
-            from pathlib import Path
-            
-            # Ruta a las plantillas (subir 4 niveles: interfaces -> src -> Varios -> raíz)
-            base_path = Path(__file__).parent.parent.parent.parent
-            templates_path = base_path / "Plantillas"
-            
-            available_fondos = []
-            processed_fondos = set()
-            
-            if templates_path.exists():
-                # Buscar archivos que empiecen con "PANTILLA" o "PLANTILLA"
-                for file_path in templates_path.glob("*ANTILLA*.xlsx"):
-                    file_name = file_path.name
-                    
-                    # Filtrar archivos temporales de Excel (que empiecen con ~$)
-                    if file_name.startswith("~$"):
-                        continue
-                    
-                    # Extraer nombre del fondo del nombre del archivo
-                    # Formato esperado: "PANTILLA FONDO N.xlsx" o "PLANTILLA FONDO U.xlsx"
-                    if "PANTILLA" in file_name or "PLANTILLA" in file_name:
-                        # Dividir por espacios y tomar la parte después de PANTILLA/PLANTILLA
-                        parts = file_name.replace("PANTILLA", "").replace("PLANTILLA", "").strip()
-                        fondo_name = parts.replace(".xlsx", "").strip()
-                        
-                        if fondo_name:
-                            # Extraer el fondo base (sin N o U)
-                            base_fondo = fondo_name
-                            if fondo_name.endswith(' N') or fondo_name.endswith(' U'):
-                                base_fondo = fondo_name[:-2].strip()
-                            
-                            if base_fondo not in processed_fondos:
-                                available_fondos.append(base_fondo)
-                                processed_fondos.add(base_fondo)
-            
-            # Ordenar alfabéticamente
-            fondos = sorted(available_fondos)
+            # Registro compartido de plantillas (escanea Plantillas/ una sola vez por proceso)
+            from src.consolidation.template_registry import TemplateRegistry
+            fondos = TemplateRegistry.get_fondos()
             
             print(f"[DEBUG] Fondos disponibles desde plantillas: {fondos}")
             return fondos
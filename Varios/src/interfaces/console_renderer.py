@@ -0,0 +1,112 @@
+"""
+Consola de estado de la GUI con escritura por lotes y tamaño acotado.
+
+Los mensajes se acumulan en memoria y se vuelcan al widget una vez por tick de la GUI con
+un solo insert. El widget conserva solo las últimas MAX_LINES líneas; el registro completo
+de la sesión queda en disco (LOGS/gui).
+"""
+
+import os
+import tkinter as tk
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+
+class ConsoleRenderer:
+    """Escribe en un Text de Tk por lotes, con un máximo de líneas y copia completa en disco."""
+
+    # Estilo de cada tipo de mensaje (se configura una sola vez)
+    TAGS = {
+        'error': {'foreground': 'red'},
+        'success': {'foreground': 'green'},
+        'warning': {'foreground': 'orange'},
+        'input_request': {'foreground': 'blue', 'background': 'lightyellow'},
+        'info': {'foreground': 'black'}
+    }
+    MAX_LINES = 3000
+
+    def __init__(self, text_widget: tk.Text, log_dir: Optional[str] = None, max_lines: int = MAX_LINES):
+        """
+        Args:
+            text_widget: Widget de la consola (se deja en estado DISABLED)
+            log_dir: Carpeta del registro completo de la sesión (None = sin registro en disco)
+            max_lines: Líneas que se conservan en el widget
+        """
+        self.text = text_widget
+        self.max_lines = max_lines
+        self._pending: List[Tuple[str, str]] = []
+        self._lines = 0
+        self._log_file = None
+        self.log_path: Optional[str] = None
+
+        for tag, style in self.TAGS.items():
+            self.text.tag_config(tag, **style)
+
+        if log_dir:
+            try:
+                os.makedirs(log_dir, exist_ok=True)
+                self.log_path = os.path.join(log_dir, f"consola_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log")
+                self._log_file = open(self.log_path, 'a', encoding='utf-8')
+            except OSError:
+                self._log_file = None
+                self.log_path = None
+
+    def add(self, mensaje: str, tipo: str = 'info') -> None:
+        """Agrega un mensaje (se muestra en el próximo flush)."""
+        linea = f"[{datetime.now().strftime('%H:%M:%S')}] {mensaje}\n"
+        self._pending.append((linea, tipo if tipo in self.TAGS else 'info'))
+        if self._log_file:
+            try:
+                self._log_file.write(f"{tipo.upper():<13} {linea}")
+            except (OSError, ValueError):
+                self._log_file = None
+
+    def flush(self) -> None:
+        """Vuelca los mensajes pendientes al widget con un solo insert y recorta lo más antiguo."""
+        if self._log_file:
+            try:
+                self._log_file.flush()
+            except (OSError, ValueError):
+                self._log_file = None
+
+        if not self._pending:
+            return
+
+        # Una ráfaga mayor que el máximo: solo hace falta mostrar su final (todo está en disco)
+        pending = self._pending[-self.max_lines:]
+        self._pending = []
+
+        # Seguir el final solo si el usuario no se desplazó hacia arriba para leer
+        at_bottom = self.text.yview()[1] >= 0.999
+
+        chunks = []
+        for linea, tag in pending:
+            chunks.extend((linea, tag))
+
+        self.text.config(state=tk.NORMAL)
+        self.text.insert(tk.END, *chunks)
+        self._lines += sum(linea.count('\n') for linea, _ in pending)  # Un mensaje puede tener varias líneas
+        if self._lines > self.max_lines:
+            excess = self._lines - self.max_lines
+            self.text.delete('1.0', f'{excess + 1}.0')
+            self._lines = self.max_lines
+        self.text.config(state=tk.DISABLED)
+
+        if at_bottom:
+            self.text.see(tk.END)
+
+    def clear(self) -> None:
+        """Vacía el widget (el registro en disco continúa)."""
+        self._pending = []
+        self._lines = 0
+        self.text.config(state=tk.NORMAL)
+        self.text.delete('1.0', tk.END)
+        self.text.config(state=tk.DISABLED)
+
+    def close(self) -> None:
+        if self._log_file:
+            try:
+                self._log_file.close()
+            except OSError:
+                pass
+            self._log_file = None
@@ -1,28 +1,51 @@
 """
 Diálogo de selección de opciones Fasecolda para la interfaz GUI.
 """
+import asyncio
 import tkinter as tk
 from tkinter import ttk
-from typing import List, Dict, Optional
+from typing import Callable, List, Dict, Optional
 
 
 class FasecoldaSelectionDialog:
     """Diálogo para seleccionar una opción de múltiples resultados Fasecolda."""
     
-    def __init__(self, options: List[Dict], brand: str, reference: str):
+    def __init__(
+        self,
+        options: List[Dict],
+        brand: str,
+        reference: str,
+        auto_accept_score: float = 0.0,
+        auto_resolve: Optional[Callable[[List[Dict]], Optional[Dict]]] = None
+    ):
         """
         Inicializa el diálogo de selección.
         
         Args:
-            options: Lista de opciones encontradas
+            options: Lista de opciones encontradas (con 'score' de similitud si se conoce)
             brand: Marca del vehículo
             reference: Referencia base del vehículo
+            auto_accept_score: Si es mayor que 0, el diálogo se cierra solo eligiendo la mejor
+                               opción en cuanto alguna alcance ese score (ejecuciones desatendidas)
+            auto_resolve: Se llama con todas las opciones al terminar la búsqueda; si retorna
+                          una opción, el diálogo se cierra eligiéndola
         """
-        self.options = options
+        self.options = list(options)
         self.brand = brand
         self.reference = reference
+        self.auto_accept_score = auto_accept_score
+        self.auto_resolve = auto_resolve
         self.selected_option = None
+        # True si la opción la eligió el diálogo (auto-aceptación/resolución) y no el usuario
+        self.auto_selected = False
         self.window = None
+        self.tree = None
+        self.info_label = None
+        # False mientras la búsqueda sigue agregando opciones (show_async)
+        self.search_complete = True
+        # Filas del árbol por grupo de referencia y por opción, para reordenar en vivo
+        self._group_headers: Dict[str, str] = {}
+        self._option_rows: Dict[int, str] = {}
         
     def show(self) -> Optional[Dict]:
         """
@@ -63,6 +86,85 @@ class FasecoldaSelectionDialog:
                 except:
                     pass
     
+    async def show_async(self, search_task: Optional[asyncio.Task] = None) -> Optional[Dict]:
+        """
+        Muestra el diálogo sin bloquear el event loop, para que la búsqueda siga llegando.
+        
+        Args:
+            search_task: Búsqueda en curso; mientras no termine se indica en el diálogo
+            
+        Returns:
+            Diccionario con la opción seleccionada o None si se cancela
+        """
+        root_created = False
+        if tk._default_root is None:
+            root = tk.Tk()
+            root.withdraw()
+            root_created = True
+        
+        self.search_complete = search_task is None or search_task.done()
+        
+        try:
+            self._create_window()
+            self._setup_ui()
+            self.window.grab_set()
+            self.window.focus_force()
+            
+            # Bombear eventos de Tk cediendo el control a la búsqueda entre iteraciones
+            while self._window_alive():
+                if not self.search_complete and search_task.done():
+                    # Puede cerrar el diálogo si la resolución automática elige una opción
+                    self.mark_search_complete()
+                    continue
+                self.window.update()
+                await asyncio.sleep(0.05)
+            
+            return self.selected_option
+            
+        finally:
+            if root_created:
+                try:
+                    root.destroy()
+                except:
+                    pass
+    
+    def add_options(self, new_options: List[Dict]):
+        """Agrega opciones que llegaron después de abrir el diálogo."""
+        self.options.extend(new_options)
+        if not self._window_alive():
+            return
+        for option in new_options:
+            self._insert_option(option)
+        self._rerank()
+        self._update_info_label()
+        self._check_auto_accept()
+    
+    def mark_search_complete(self):
+        """Indica que la búsqueda terminó (no llegarán más opciones)."""
+        self.search_complete = True
+        if not self._window_alive():
+            return
+        self._update_info_label()
+        
+        if self.auto_resolve:
+            choice = self.auto_resolve(list(self.options))
+            if choice:
+                self._select_automatically(choice)
+    
+    def _window_alive(self) -> bool:
+        try:
+            return bool(self.window and self.window.winfo_exists())
+        except tk.TclError:
+            return False
+    
+    def _info_text(self) -> str:
+        searching = "" if self.search_complete else " (buscando más...)"
+        return f"🎯 {len(self.options)} opciones disponibles{searching}. Doble clic para seleccionar:"
+    
+    def _update_info_label(self):
+        if self.info_label:
+            self.info_label.configure(text=self._info_text())
+    
     def _create_window(self):
         """Crea la ventana principal del diálogo con tamaño dinámico y centrada."""
         # Crear ventana independiente SIN crear root extra
@@ -117,19 +219,19 @@ class FasecoldaSelectionDialog:
         title_label.pack(pady=(0, 10))
         
         # Información más compacta
-        info_label = ttk.Label(
+        self.info_label = ttk.Label(
             main_frame,
-            text=f"🎯 {len(self.options)} opciones disponibles. Doble clic para seleccionar:",
+            text=self._info_text(),
             font=("Arial", 9)
         )
-        info_label.pack(pady=(0, 10))
+        self.info_label.pack(pady=(0, 10))
         
         # Frame para la lista y scrollbar
         list_frame = ttk.Frame(main_frame)
         list_frame.pack(fill=tk.BOTH, expand=True, pady=(0, 15))
         
         # Crear Treeview con columnas reordenadas
-        columns = ('Num', 'Referencia', 'Descripción', 'Valor', 'CF', 'CH')
+        columns = ('Num', 'Referencia', 'Descripción', 'Valor', 'CF', 'CH', 'Similitud')
         
         # Ajustar altura dinámicamente
         num_options = len(self.options)
@@ -144,6 +246,7 @@ class FasecoldaSelectionDialog:
         self.tree.heading('Valor', text='💰 Valor Asegurado')
         self.tree.heading('CF', text='🏷️ CF')
         self.tree.heading('CH', text='🏷️ CH')
+        self.tree.heading('Similitud', text='🎯 Similitud')
         
         # Anchos de columnas optimizados
         self.tree.column('Num', width=50, minwidth=40, anchor='center')
@@ -152,6 +255,7 @@ class FasecoldaSelectionDialog:
         self.tree.column('Valor', width=140, minwidth=120, anchor='e')
         self.tree.column('CF', width=90, minwidth=70, anchor='center')
         self.tree.column('CH', width=90, minwidth=70, anchor='center')
+        self.tree.column('Similitud', width=90, minwidth=70, anchor='center')
         
         # Scrollbar vertical
         v_scrollbar = ttk.Scrollbar(list_frame, orient=tk.VERTICAL, command=self.tree.yview)
@@ -190,46 +294,91 @@ class FasecoldaSelectionDialog:
     
     def _populate_tree(self):
         """Llena el TreeView con las opciones disponibles con mejor estilo y columnas reordenadas."""
-        current_reference = ""
-        
         for option in self.options:
-            # Verificar si es una nueva referencia
-            if option['reference_group'] != current_reference:
-                current_reference = option['reference_group']
-                # Insertar encabezado de referencia con estilo (SIN "REFERENCIA:")
-                header_id = self.tree.insert('', 'end', values=(
-                    '',
-                    f"📁 {current_reference}",  # Solo la referencia, sin prefijo
-                    '',
-                    '',
-                    '',
-                    ''
-                ), tags=('header',))
-            
-            # Insertar opción con columnas reordenadas: Num, Referencia, Descripción, Valor, CF, CH
-            option_id = self.tree.insert('', 'end', values=(
-                option['option_number'],
-                "",  # Referencia vacía para las opciones individuales
-                option['description'],
-                option['insured_value'],  # Valor asegurado en 4ta posición
-                option['cf_code'],        # CF en 5ta posición
-                option['ch_code'] or 'N/A'  # CH en 6ta posición
-            ), tags=('option',))
+            self._insert_option(option)
+        self._rerank()
         
         # Configurar estilos para las filas
         self.tree.tag_configure('header', background='#E8F4FD', foreground='#1f5582', font=('Arial', 10, 'bold'))
-        self.tree.tag_configure('option', background='white', foreground='black', font=('Arial', 9))
-        
-        # Configurar colores alternados para opciones
-        for i, child in enumerate(self.tree.get_children()):
-            if self.tree.item(child)['tags'] == ('option',):
-                if i % 2 == 0:
-                    self.tree.set(child, tags=('option_even',))
-                else:
-                    self.tree.set(child, tags=('option_odd',))
-        
         self.tree.tag_configure('option_even', background='#F8F9FA', font=('Arial', 9))
         self.tree.tag_configure('option_odd', background='white', font=('Arial', 9))
+        self.tree.tag_configure('best', background='#E6F4EA', foreground='#1e7e34', font=('Arial', 9, 'bold'))
+    
+    def _insert_option(self, option: Dict):
+        """Inserta una opción y el encabezado de su referencia si no existe (la posición la fija _rerank)."""
+        group = option.get('reference_group', '')
+        
+        if group not in self._group_headers:
+            # Insertar encabezado de referencia con estilo (SIN "REFERENCIA:")
+            self._group_headers[group] = self.tree.insert('', 'end', values=(
+                '',
+                f"📁 {group}",
+                '',
+                '',
+                '',
+                '',
+                ''
+            ), tags=('header',))
+        
+        score = option.get('score')
+        # Insertar opción con columnas reordenadas: Num, Referencia, Descripción, Valor, CF, CH, Similitud
+        self._option_rows[option['option_number']] = self.tree.insert('', 'end', values=(
+            option['option_number'],
+            "",  # Referencia vacía para las opciones individuales
+            option['description'],
+            option['insured_value'],  # Valor asegurado en 4ta posición
+            option['cf_code'],        # CF en 5ta posición
+            option['ch_code'] or 'N/A',  # CH en 6ta posición
+            f"{score:.0%}" if score is not None else ''
+        ))
+    
+    @staticmethod
+    def _score(option: Dict) -> float:
+        return option.get('score') or 0.0
+    
+    def _rerank(self):
+        """
+        Ordena el árbol por similitud: grupos según su mejor opción y opciones de mayor a menor
+        score dentro de cada grupo. La mejor opción general se resalta.
+        """
+        groups: Dict[str, List[Dict]] = {}
+        for option in self.options:
+            if option['option_number'] in self._option_rows:
+                groups.setdefault(option.get('reference_group', ''), []).append(option)
+        for group_options in groups.values():
+            group_options.sort(key=self._score, reverse=True)
+        ordered_groups = sorted(groups.items(), key=lambda item: self._score(item[1][0]), reverse=True)
+        
+        best = self._best_option()
+        position = 0
+        for group, group_options in ordered_groups:
+            self.tree.move(self._group_headers[group], '', position)
+            position += 1
+            for option in group_options:
+                row = self._option_rows[option['option_number']]
+                self.tree.move(row, '', position)
+                if option is best and self._score(best) > 0:
+                    tag = 'best'
+                else:
+                    tag = 'option_even' if position % 2 == 0 else 'option_odd'
+                self.tree.item(row, tags=(tag,))
+                position += 1
+    
+    def _best_option(self) -> Optional[Dict]:
+        return max(self.options, key=self._score) if self.options else None
+    
+    def _check_auto_accept(self):
+        """Elige sola la mejor opción si alcanza el score de auto-aceptación."""
+        if self.auto_accept_score <= 0 or not self._window_alive():
+            return
+        best = self._best_option()
+        if best and self._score(best) >= self.auto_accept_score:
+            self._select_automatically(best)
+    
+    def _select_automatically(self, option: Dict):
+        self.selected_option = option
+        self.auto_selected = True
+        self.window.destroy()
     
     def _on_double_click(self, event):
         """Maneja el doble clic para seleccionar automáticamente."""
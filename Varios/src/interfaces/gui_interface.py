@@ -22,31 +22,49 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 try:
     from config.client_config import ClientConfig
     from config.client_history_manager import ClientHistoryManager
-    from interfaces.client_edit_window import ClientEditWindow
-    from interfaces.formula_config_window import FormulaConfigWindow
-    from interfaces.solidaria_rates_window import SolidariaRatesWindow
+    from interfaces.console_renderer import ConsoleRenderer
+    _INTERFACES_PACKAGE = 'interfaces'
 except ImportError:
     # Intentar imports relativos si los absolutos fallan
     try:
         from ..config.client_config import ClientConfig
         from ..config.client_history_manager import ClientHistoryManager
-        from ..interfaces.client_edit_window import ClientEditWindow
-        from ..interfaces.formula_config_window import FormulaConfigWindow
-        from ..interfaces.solidaria_rates_window import SolidariaRatesWindow
+        from .console_renderer import ConsoleRenderer
+        _INTERFACES_PACKAGE = __package__
     except ImportError:
         # Como último recurso, imports desde la raíz del proyecto
         project_root = Path(__file__).parent.parent.parent
         sys.path.insert(0, str(project_root))
         from src.config.client_config import ClientConfig
         from src.config.client_history_manager import ClientHistoryManager
-        from src.interfaces.client_edit_window import ClientEditWindow
-        from src.interfaces.formula_config_window import FormulaConfigWindow
-        from src.interfaces.solidaria_rates_window import SolidariaRatesWindow
+        from src.interfaces.console_renderer import ConsoleRenderer
+        _INTERFACES_PACKAGE = 'src.interfaces'
+
+
+def _cargar_ventana(modulo: str, clase: str):
+    """
+    Importa una ventana secundaria al abrirla por primera vez.
+    
+    El editor de cliente, las fórmulas y las tasas son módulos Tk grandes que no hacen
+    falta para mostrar la ventana principal.
+    
+    Args:
+        modulo: Nombre del módulo dentro de interfaces (ej. 'client_edit_window')
+        clase: Nombre de la clase de la ventana
+        
+    Returns:
+        La clase de la ventana
+    """
+    import importlib
+    return getattr(importlib.import_module(f"{_INTERFACES_PACKAGE}.{modulo}"), clase)
 
 
 class AutomationGUI:
     """Interfaz gráfica principal para las automatizaciones."""
     
+    # Mensajes que se procesan por tick de 100 ms (el resto queda para el siguiente)
+    MAX_MESSAGES_PER_TICK = 2000
+    
     def __init__(self):
         self.root = tk.Tk()
         self.root.title("Sistema de Automatización de Cotizaciones")
@@ -76,6 +94,7 @@ class AutomationGUI:
         self.fasecolda_automatico = tk.BooleanVar(value=ClientConfig.ENABLE_FASECOLDA_SEARCH)
         self.mostrar_ventanas = tk.BooleanVar(value=False)
         self.modo_debug = tk.BooleanVar(value=False)
+        self.recotizar = tk.BooleanVar(value=False)
         
         # Variables de control
         self.proceso_activo = False
@@ -83,6 +102,7 @@ class AutomationGUI:
         self.loading_animation = None
         self.animation_frame = 0
         self.proceso_subprocess = None  # Referencia al proceso subprocess
+        self.automation_host = None  # Host residente de automatizaciones (ver automation_host.py)
         
         # Lista para rastrear procesos específicos de la aplicación
         self.app_processes = []  # PIDs de procesos creados por la app
@@ -103,6 +123,9 @@ class AutomationGUI:
         # Iniciar el monitoreo de mensajes
         self.check_message_queue()
         
+        # Host residente: la primera ejecución ya no paga el arranque del intérprete ni de Playwright
+        self.root.after(1000, self._iniciar_host_residente)
+        
         # Cargar automáticamente el último cliente editado del historial
         self.cargar_ultimo_cliente_editado()
     
@@ -197,9 +220,17 @@ class AutomationGUI:
         )
         debug_check.grid(row=2, column=0, columnspan=2, sticky=tk.W, pady=5)
         
+        # Opción: Ignorar la cotización reutilizable del mismo cliente (--refresh-quotes)
+        recotizar_check = ttk.Checkbutton(
+            config_frame,
+            text="🔄 Cotizar de nuevo en los portales (no reutilizar la cotización reciente del cliente)",
+            variable=self.recotizar
+        )
+        recotizar_check.grid(row=3, column=0, columnspan=2, sticky=tk.W, pady=5)
+        
         # Botones de configuración de fórmulas
         formulas_frame = ttk.Frame(config_frame)
-        formulas_frame.grid(row=3, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(10, 5))
+        formulas_frame.grid(row=4, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(10, 5))
         
         ttk.Label(formulas_frame, text="Configuración de Fórmulas:", font=("Arial", 9, "bold")).pack(anchor=tk.W, pady=(0, 5))
         
@@ -271,6 +302,8 @@ class AutomationGUI:
         
         self.loading_label = ttk.Label(self.loading_frame, text="Listo para ejecutar", font=("Arial", 10))
         self.loading_icon = ttk.Label(self.loading_frame, text="", font=("Arial", 16))
+        # Cola y recursos del planificador durante la ejecución paralela
+        self.scheduler_label = ttk.Label(self.loading_frame, text="", font=("Arial", 9), foreground="gray")
         
         # Frame de consola
         self.console_frame = ttk.LabelFrame(main_frame, text="Consola de Estado", padding="5")
@@ -289,6 +322,10 @@ class AutomationGUI:
         )
         self.console_text.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
         
+        # Escritura por lotes (una vez por tick) con copia completa en LOGS/gui
+        project_dir = Path(__file__).parent.parent.parent.parent
+        self.console = ConsoleRenderer(self.console_text, log_dir=str(project_dir / "Varios" / "LOGS" / "gui"))
+        
         # Input para respuestas (inicialmente oculto)
         self.input_frame = ttk.Frame(self.console_frame)
         self.input_var = tk.StringVar()
@@ -400,6 +437,7 @@ class AutomationGUI:
                 self.agregar_mensaje("✅ Datos del cliente actualizados desde el editor", "success")
             
             # Abrir ventana de edición
+            ClientEditWindow = _cargar_ventana('client_edit_window', 'ClientEditWindow')
             editor = ClientEditWindow(parent_window=self.root, callback=on_client_updated)
             
         except Exception as e:
@@ -460,6 +498,7 @@ class AutomationGUI:
     def abrir_formulas_bolivar(self):
         """Abre la ventana de configuración de fórmulas para Bolívar."""
         try:
+            FormulaConfigWindow = _cargar_ventana('formula_config_window', 'FormulaConfigWindow')
             FormulaConfigWindow(self.root, 'bolivar', self.on_formula_config_saved)
         except Exception as e:
             messagebox.showerror("Error", f"No se pudo abrir la configuración de Bolívar: {e}")
@@ -468,6 +507,7 @@ class AutomationGUI:
     def abrir_formulas_solidaria(self):
         """Abre la ventana de configuración de fórmulas para Solidaria."""
         try:
+            FormulaConfigWindow = _cargar_ventana('formula_config_window', 'FormulaConfigWindow')
             FormulaConfigWindow(self.root, 'solidaria', self.on_formula_config_saved)
         except Exception as e:
             messagebox.showerror("Error", f"No se pudo abrir la configuración de Solidaria: {e}")
@@ -476,6 +516,7 @@ class AutomationGUI:
     def abrir_tasas_solidaria(self):
         """Abre la ventana de configuración de tasas de Solidaria por departamento."""
         try:
+            SolidariaRatesWindow = _cargar_ventana('solidaria_rates_window', 'SolidariaRatesWindow')
             SolidariaRatesWindow(self.root, self.on_formula_config_saved)
         except Exception as e:
             messagebox.showerror("Error", f"No se pudo abrir la configuración de tasas de Solidaria: {e}")
@@ -606,33 +647,8 @@ class AutomationGUI:
             self.agregar_mensaje("💭 Modo normal - Solo se mostrarán opciones de Fasecolda", "info")
     
     def agregar_mensaje(self, mensaje: str, tipo: str = "info"):
-        """Agrega un mensaje a la consola."""
-        self.console_text.config(state=tk.NORMAL)
-        
-        # Configurar colores según el tipo
-        if tipo == "error":
-            tag = "error"
-            self.console_text.tag_config(tag, foreground="red")
-        elif tipo == "success":
-            tag = "success"
-            self.console_text.tag_config(tag, foreground="green")
-        elif tipo == "warning":
-            tag = "warning"
-            self.console_text.tag_config(tag, foreground="orange")
-        elif tipo == "input_request":
-            tag = "input_request"
-            self.console_text.tag_config(tag, foreground="blue", background="lightyellow")
-        else:
-            tag = "info"
-            self.console_text.tag_config(tag, foreground="black")
-        
-        # Agregar timestamp
-        from datetime import datetime
-        timestamp = datetime.now().strftime("%H:%M:%S")
-        
-        self.console_text.insert(tk.END, f"[{timestamp}] {mensaje}\n", tag)
-        self.console_text.see(tk.END)
-        self.console_text.config(state=tk.DISABLED)
+        """Agrega un mensaje a la consola (se muestra en el próximo tick de check_message_queue)."""
+        self.console.add(mensaje, tipo)
     
     def mostrar_input(self, prompt: str):
         """Muestra el campo de input para respuestas del usuario."""
@@ -686,6 +702,35 @@ class AutomationGUI:
         self.loading_icon.grid_remove()
         self.loading_label.config(text="Listo para ejecutar")
     
+    def actualizar_estado_planificador(self):
+        """Muestra la cola y el consumo de recursos que publica el planificador de la ejecución."""
+        if not self.proceso_activo:
+            self.scheduler_label.grid_remove()
+            return
+        
+        try:
+            from src.core.resource_scheduler import ResourceScheduler
+            state = ResourceScheduler.read_state()
+        except Exception:
+            state = None
+        
+        if state:
+            running = ', '.join(r['company'].upper() for r in state['running']) or '-'
+            texto = f"▶️ En ejecución: {running}"
+            if state['queued']:
+                texto += f"  ⏸️ En cola: {', '.join(q['company'].upper() for q in state['queued'])}"
+                if state.get('waiting_reason'):
+                    texto += f" ({state['waiting_reason']})"
+            resources = state.get('resources') or {}
+            if resources:
+                texto += f"  💾 {resources['rss_mb']:.0f} MB  🖥️ CPU {resources['cpu_percent']:.0f}%"
+            self.scheduler_label.config(text=texto)
+            self.scheduler_label.grid(row=2, column=0, pady=(5, 0))
+        else:
+            self.scheduler_label.grid_remove()
+        
+        self.root.after(2000, self.actualizar_estado_planificador)
+    
     def iniciar_animacion_carga(self):
         """Inicia la animación de carga."""
         if self.loading_animation is None:
@@ -747,12 +792,11 @@ class AutomationGUI:
         self.proceso_activo = True
         
         # Limpiar consola
-        self.console_text.config(state=tk.NORMAL)
-        self.console_text.delete(1.0, tk.END)
-        self.console_text.config(state=tk.DISABLED)
+        self.console.clear()
         
         # Mostrar indicador de carga
         self.mostrar_carga("Iniciando automatización...")
+        self.root.after(2000, self.actualizar_estado_planificador)
         
         # Agregar mensajes iniciales solo en modo debug
         if self.modo_debug.get():
@@ -805,67 +849,54 @@ class AutomationGUI:
             # Obtener el directorio del proyecto (raíz, fuera de Varios/)
             project_dir = Path(__file__).parent.parent.parent.parent
             
-            # Comando a ejecutar
-            cmd = [
-                sys.executable,
-                str(project_dir / "Varios" / "scripts" / "ejecutar_automatizaciones.py"),
-                "--companies", "allianz", "sura",
-                "--parallel"
-            ]
+            # Argumentos de la ejecución
+            args = ["--companies", "allianz", "sura", "--parallel"]
+            if self.recotizar.get():
+                args.append("--refresh-quotes")
             
             self.message_queue.put(("loading", "Iniciando procesos..."))
             
-            # Configurar el entorno para UTF-8 y pasar configuración de la GUI
-            env = os.environ.copy()
-            env['PYTHONIOENCODING'] = 'utf-8'
-            
             # Pasar configuración de la GUI como variables de entorno (prioridad sobre archivo)
-            env['GUI_FASECOLDA_ENABLED'] = str(self.fasecolda_automatico.get())
-            env['GUI_SHOW_BROWSER'] = str(self.mostrar_ventanas.get())
-            
-            # CRÍTICO: Pasar TODOS los datos del cliente actual como variables de entorno
-            current_client_data = ClientConfig._get_current_data()
-            if current_client_data:
-                env['GUI_CLIENT_DOCUMENT_NUMBER'] = current_client_data.get('client_document_number', '')
-                env['GUI_CLIENT_FIRST_NAME'] = current_client_data.get('client_first_name', '')
-                env['GUI_CLIENT_SECOND_NAME'] = current_client_data.get('client_second_name', '')
-                env['GUI_CLIENT_FIRST_LASTNAME'] = current_client_data.get('client_first_lastname', '')
-                env['GUI_CLIENT_SECOND_LASTNAME'] = current_client_data.get('client_second_lastname', '')
-                env['GUI_CLIENT_BIRTH_DATE'] = current_client_data.get('client_birth_date', '')
-                env['GUI_CLIENT_GENDER'] = current_client_data.get('client_gender', '')
-                env['GUI_CLIENT_CITY'] = current_client_data.get('client_city', '')
-                env['GUI_CLIENT_DEPARTMENT'] = current_client_data.get('client_department', '')
-                env['GUI_VEHICLE_PLATE'] = current_client_data.get('vehicle_plate', '')
-                env['GUI_VEHICLE_MODEL_YEAR'] = current_client_data.get('vehicle_model_year', '')
-                env['GUI_VEHICLE_BRAND'] = current_client_data.get('vehicle_brand', '')
-                env['GUI_VEHICLE_REFERENCE'] = current_client_data.get('vehicle_reference', '')
-                env['GUI_VEHICLE_FULL_REFERENCE'] = current_client_data.get('vehicle_full_reference', '')
-                env['GUI_VEHICLE_STATE'] = current_client_data.get('vehicle_state', '')
-                env['GUI_VEHICLE_INSURED_VALUE'] = current_client_data.get('vehicle_insured_value', '')
-                env['GUI_MANUAL_CF_CODE'] = current_client_data.get('manual_cf_code', '')
-                env['GUI_MANUAL_CH_CODE'] = current_client_data.get('manual_ch_code', '')
-                env['GUI_POLICY_NUMBER'] = current_client_data.get('policy_number', '')
-                env['GUI_POLICY_NUMBER_ALLIANZ'] = current_client_data.get('policy_number_allianz', '')
-            else:
-                self.message_queue.put(("message", ("warning", "⚠️ WARNING: No hay datos de cliente actuales, usando valores por defecto")))
+            variables = self._variables_ejecucion()
             
             # Mensaje de debug para confirmar valores
             self.message_queue.put(("message", ("info", f"🔧 Fasecolda (GUI): {self.fasecolda_automatico.get()}")))
             self.message_queue.put(("message", ("info", f"🔧 Mostrar ventanas (GUI): {self.mostrar_ventanas.get()}")))
-            
-            # Ejecutar el proceso con codificación UTF-8 y entrada habilitada
-            self.proceso_subprocess = subprocess.Popen(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                stdin=subprocess.PIPE,  # Habilitar entrada para respuestas
-                universal_newlines=True,
-                encoding='utf-8',
-                errors='replace',  # Reemplazar caracteres no válidos
-                cwd=str(project_dir),
-                bufsize=1,
-                env=env
-            )
+            self.message_queue.put(("message", ("info", f"🔧 Cotizar de nuevo (GUI): {self.recotizar.get()}")))
+            
+            host = self._host_listo()
+            if host:
+                # Host residente: módulos importados, driver y navegador FASECOLDA ya abiertos
+                self.proceso_subprocess = host.process
+                host.run(args, variables)
+                lineas = host.read_run_output()
+            else:
+                # Comando a ejecutar
+                cmd = [
+                    sys.executable,
+                    str(project_dir / "Varios" / "scripts" / "ejecutar_automatizaciones.py"),
+                    *args
+                ]
+                
+                # Configurar el entorno para UTF-8
+                env = os.environ.copy()
+                env['PYTHONIOENCODING'] = 'utf-8'
+                env.update(variables)
+                
+                # Ejecutar el proceso con codificación UTF-8 y entrada habilitada
+                self.proceso_subprocess = subprocess.Popen(
+                    cmd,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.STDOUT,
+                    stdin=subprocess.PIPE,  # Habilitar entrada para respuestas
+                    universal_newlines=True,
+                    encoding='utf-8',
+                    errors='replace',  # Reemplazar caracteres no válidos
+                    cwd=str(project_dir),
+                    bufsize=1,
+                    env=env
+                )
+                lineas = iter(self.proceso_subprocess.stdout.readline, '')
             
             # Iniciar rastreo de procesos de navegador después de un breve delay
             threading.Timer(3.0, self._start_browser_tracking).start()
@@ -873,55 +904,11 @@ class AutomationGUI:
             self.message_queue.put(("loading", "Procesos iniciados..."))
             
             # Leer output en tiempo real
-            for line in iter(self.proceso_subprocess.stdout.readline, ''):
-                line = line.strip()
-                if line:
-                    # Limpiar caracteres problemáticos antes de procesar
-                    line = self.limpiar_texto_unicode(line)
-                    
-                    # Mostrar mensajes según el modo
-                    if self.modo_debug.get():
-                        # Modo debug: mostrar todo
-                        self.message_queue.put(("message", ("info", line)))
-                    else:
-                        # Modo normal: filtrar mensajes importantes
-                        if self.es_mensaje_importante(line):
-                            self.message_queue.put(("message", ("info", line)))
-                    
-                    # Detectar solicitudes de input - Solo para Fasecolda específicamente
-                    # Excluir MFA que ya se maneja por separado
-                    input_patterns = [
-                        "Selecciona el código a usar",
-                        "� Seleccione una opción"
-                    ]
-                    
-                    # Verificar que no sea un contexto de MFA/login que se maneja por separado
-                    is_mfa_context = any(mfa_pattern in line for mfa_pattern in [
-                        "código MFA", "autenticación de dos factores", "Ingresa el código MFA",
-                        "Por favor, ingresa el código MFA", "login", "contraseña"
-                    ])
-                    
-                    if any(pattern in line for pattern in input_patterns) and not is_mfa_context:
-                        # Solo procesar inputs específicos de Fasecolda
-                        if "Selecciona el código a usar" in line or "👆 Seleccione una opción" in line:
-                            opciones = self.extraer_opciones_fasecolda(line)
-                            prompt = f"Selecciona una opción ({opciones}):"
-                            self.message_queue.put(("input_request", prompt))
-                    
-                    # Actualizar mensaje de carga basado en el contenido
-                    if "Iniciando" in line:
-                        self.message_queue.put(("loading", "Iniciando procesos..."))
-                    elif "navegación" in line:
-                        self.message_queue.put(("loading", "Navegando en sitios web..."))
-                    elif "Fasecolda" in line:
-                        self.message_queue.put(("loading", "Buscando códigos Fasecolda..."))
-                    elif "cotización" in line:
-                        self.message_queue.put(("loading", "Generando cotizaciones..."))
-                    elif "consolidación" in line:
-                        self.message_queue.put(("loading", "Consolidando resultados..."))
+            for line in lineas:
+                self._procesar_linea_salida(line)
             
             # Esperar a que termine el proceso
-            return_code = self.proceso_subprocess.wait()
+            return_code = host.last_exit_code if host else self.proceso_subprocess.wait()
             
             if return_code == 0:
                 self.message_queue.put(("loading", "¡Completado exitosamente!"))
@@ -938,6 +925,116 @@ class AutomationGUI:
         finally:
             self.message_queue.put(("process_finished", None))
     
+    def _variables_ejecucion(self) -> dict:
+        """Variables GUI_* con la configuración y el cliente actual para la ejecución."""
+        variables = {
+            'GUI_FASECOLDA_ENABLED': str(self.fasecolda_automatico.get()),
+            'GUI_SHOW_BROWSER': str(self.mostrar_ventanas.get())
+        }
+        
+        # CRÍTICO: Pasar TODOS los datos del cliente actual como variables de entorno
+        current_client_data = ClientConfig._get_current_data()
+        if current_client_data:
+            campos = [
+                'client_document_number', 'client_first_name', 'client_second_name',
+                'client_first_lastname', 'client_second_lastname', 'client_birth_date',
+                'client_gender', 'client_city', 'client_department', 'vehicle_plate',
+                'vehicle_model_year', 'vehicle_brand', 'vehicle_reference', 'vehicle_full_reference',
+                'vehicle_state', 'vehicle_insured_value', 'manual_cf_code', 'manual_ch_code',
+                'policy_number', 'policy_number_allianz'
+            ]
+            for campo in campos:
+                variables[f'GUI_{campo.upper()}'] = current_client_data.get(campo, '')
+        else:
+            self.message_queue.put(("message", ("warning", "⚠️ WARNING: No hay datos de cliente actuales, usando valores por defecto")))
+        
+        return variables
+    
+    def _procesar_linea_salida(self, line: str):
+        """Muestra una línea de salida de la automatización y detecta pedidos de entrada."""
+        line = line.strip()
+        if not line:
+            return
+        
+        # Limpiar caracteres problemáticos antes de procesar
+        line = self.limpiar_texto_unicode(line)
+        
+        # Mostrar mensajes según el modo
+        if self.modo_debug.get():
+            # Modo debug: mostrar todo
+            self.message_queue.put(("message", ("info", line)))
+        else:
+            # Modo normal: filtrar mensajes importantes
+            if self.es_mensaje_importante(line):
+                self.message_queue.put(("message", ("info", line)))
+        
+        # Detectar solicitudes de input - Solo para Fasecolda específicamente
+        # Excluir MFA que ya se maneja por separado
+        input_patterns = [
+            "Selecciona el código a usar",
+            "� Seleccione una opción"
+        ]
+        
+        # Verificar que no sea un contexto de MFA/login que se maneja por separado
+        is_mfa_context = any(mfa_pattern in line for mfa_pattern in [
+            "código MFA", "autenticación de dos factores", "Ingresa el código MFA",
+            "Por favor, ingresa el código MFA", "login", "contraseña"
+        ])
+        
+        if any(pattern in line for pattern in input_patterns) and not is_mfa_context:
+            # Solo procesar inputs específicos de Fasecolda
+            if "Selecciona el código a usar" in line or "👆 Seleccione una opción" in line:
+                opciones = self.extraer_opciones_fasecolda(line)
+                prompt = f"Selecciona una opción ({opciones}):"
+                self.message_queue.put(("input_request", prompt))
+        
+        # Actualizar mensaje de carga basado en el contenido
+        if "Iniciando" in line:
+            self.message_queue.put(("loading", "Iniciando procesos..."))
+        elif "navegación" in line:
+            self.message_queue.put(("loading", "Navegando en sitios web..."))
+        elif "Fasecolda" in line:
+            self.message_queue.put(("loading", "Buscando códigos Fasecolda..."))
+        elif "cotización" in line:
+            self.message_queue.put(("loading", "Generando cotizaciones..."))
+        elif "consolidación" in line:
+            self.message_queue.put(("loading", "Consolidando resultados..."))
+    
+    def _iniciar_host_residente(self):
+        """Inicia en segundo plano el host de automatizaciones (si está habilitado)."""
+        if os.getenv('RESIDENT_AUTOMATION_HOST', 'True').lower() != 'true':
+            return
+        if self.automation_host and self.automation_host.is_alive():
+            return
+        try:
+            from interfaces.automation_host import AutomationHostProcess
+        except ImportError:
+            from src.interfaces.automation_host import AutomationHostProcess
+        
+        project_dir = Path(__file__).parent.parent.parent.parent
+        env = os.environ.copy()
+        env.update(self._variables_ejecucion())  # Para decidir qué precalentar
+        try:
+            self.automation_host = AutomationHostProcess(
+                str(project_dir / "Varios" / "scripts" / "ejecutar_automatizaciones.py"),
+                cwd=str(project_dir),
+                env=env
+            )
+            self.automation_host.start()
+        except Exception as e:
+            self.automation_host = None
+            self.agregar_mensaje(f"⚠️ No se pudo iniciar el host residente ({e}) - se usará un proceso por ejecución", "warning")
+    
+    def _host_listo(self):
+        """Host residente listo para ejecutar, o None para usar un proceso nuevo."""
+        host = self.automation_host
+        if not host or not host.is_alive():
+            return None
+        # Si aún se está precalentando, esperar un poco: sigue siendo más rápido que otro proceso
+        if not host.ready.wait(timeout=30):
+            return None
+        return host
+    
     def limpiar_texto_unicode(self, texto: str) -> str:
         """Limpia el texto de caracteres Unicode problemáticos para Windows."""
         # Mapeo de emojis problemáticos a versiones compatibles
@@ -1034,9 +1131,10 @@ class AutomationGUI:
         return "1-3"  # Valor por defecto
     
     def check_message_queue(self):
-        """Verifica la cola de mensajes periódicamente."""
+        """Verifica la cola de mensajes periódicamente y vuelca a la consola todo lo del tick."""
+        loading = None
         try:
-            while True:
+            for _ in range(self.MAX_MESSAGES_PER_TICK):
                 msg_type, data = self.message_queue.get_nowait()
                 
                 if msg_type == "message":
@@ -1044,7 +1142,8 @@ class AutomationGUI:
                     self.agregar_mensaje(mensaje, tipo)
                 
                 elif msg_type == "loading":
-                    self.mostrar_carga(data)
+                    # Solo se ve el último texto de carga del tick
+                    loading = data
                 
                 elif msg_type == "input_request":
                     self.mostrar_input(data)
@@ -1055,11 +1154,18 @@ class AutomationGUI:
                     pass
                 
                 elif msg_type == "process_finished":
+                    if loading is not None:
+                        self.mostrar_carga(loading)
+                        loading = None
                     self.proceso_finalizado()
                 
         except queue.Empty:
             pass
         
+        if loading is not None:
+            self.mostrar_carga(loading)
+        self.console.flush()
+        
         # Programar la siguiente verificación
         self.root.after(100, self.check_message_queue)
     
@@ -1128,12 +1234,29 @@ class AutomationGUI:
             else:
                 return  # No cerrar si el usuario cancela
         
+        # Cerrar el host residente (sus navegadores y el driver de Playwright)
+        if self.automation_host:
+            self.automation_host.shutdown()
+            self.automation_host = None
+        
+        # Cerrar el navegador del prefetch de FASECOLDA (solo si se llegó a usar: importarlo carga Playwright)
+        if 'src.shared.fasecolda_prefetch' in sys.modules:
+            try:
+                from src.shared.fasecolda_prefetch import get_fasecolda_prefetcher
+                get_fasecolda_prefetcher().shutdown()
+            except Exception:
+                pass
+        
         # Cerrar todos los navegadores Chrome que puedan estar abiertos
         self._close_all_browsers()
         
         # Crear archivo de señal para indicar que la aplicación se está cerrando
         self._create_exit_signal()
         
+        # Cerrar el registro de la consola en disco
+        self.console.flush()
+        self.console.close()
+        
         # Destruir la ventana
         self.root.destroy()
         
@@ -1147,6 +1270,22 @@ class AutomationGUI:
             # Marcar como no activo inmediatamente
             self.proceso_activo = False
             
+            # Host residente: cancelar la ejecución sin matar el host (cierra sus navegadores)
+            host = self.automation_host
+            if host and self.proceso_subprocess is host.process and host.is_alive():
+                self.agregar_mensaje("🔄 Deteniendo la ejecución en el host residente...", "info")
+                if host.stop_run():
+                    self.proceso_subprocess = None
+                    self.ocultar_carga()
+                    self.agregar_mensaje("⏹️ Automatización detenida completamente", "success")
+                    return
+                # No respondió: terminarlo (se vuelve a iniciar al próximo clic)
+                self.agregar_mensaje("⚡ El host residente no respondió - se reinicia", "warning")
+                host.kill()
+                self.automation_host = None
+                self.proceso_subprocess = None
+                self.root.after(1000, self._iniciar_host_residente)
+            
             # Cerrar navegadores PRIMERO
             self.agregar_mensaje("🔒 Cerrando navegadores...", "info")
             self._close_all_browsers()
@@ -1,7 +1,23 @@
 """Recursos compartidos entre todas las aseguradoras."""
 
-from .base_page import BasePage
-from .utils import Utils
-from .exceptions import AutomationError, LoginError, NavigationError, QuoteError
+import importlib
 
-__all__ = ['BasePage', 'Utils', 'AutomationError', 'LoginError', 'NavigationError', 'QuoteError']
+# Importación lazy: BasePage carga Playwright
+_LAZY_EXPORTS = {
+    'BasePage': '.base_page',
+    'Utils': '.utils',
+    'AutomationError': '.exceptions',
+    'LoginError': '.exceptions',
+    'NavigationError': '.exceptions',
+    'QuoteError': '.exceptions'
+}
+
+__all__ = list(_LAZY_EXPORTS)
+
+
+def __getattr__(name):
+    if name in _LAZY_EXPORTS:
+        value = getattr(importlib.import_module(_LAZY_EXPORTS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,11 +1,14 @@
 """Clase base para todas las páginas de automatización."""
 
+import time
 import logging
 import asyncio
-from typing import Optional, Any, Callable, Dict, List, Union
+from typing import Optional, Any, Callable, Dict, List, Tuple, Union
 from playwright.async_api import Page, TimeoutError as PlaywrightTimeout
 
 from ..core.constants import Constants
+from ..core.adaptive_timeouts import AdaptiveTimeouts
+from ..config.client_config import ClientConfig
 
 class BasePage:
     """Clase base con métodos genéricos para interacciones con páginas."""
@@ -33,12 +36,55 @@ class BasePage:
         'TT': 'PERMISO POR PROTECCION TEMPORL',
     }
 
-    def __init__(self, page: Page, company: str = "generic"):
+    def __init__(self, page: Page, company: str = "generic", client=None):
         self.page: Page = page
         self.company = company
+        # Configuración del cliente de esta página (ClientConfig o la de su pestaña, ver for_client)
+        self.client = client or ClientConfig
         self._frame = self.page.frame_locator(self.IFRAME_SELECTOR)
         self.logger = logging.getLogger(company)    
     
+    # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+    # TIMEOUTS ADAPTATIVOS
+    # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+    def _timeout_for(self, operation: Optional[str], timeout: Optional[int], default: int) -> Tuple[int, Optional[int]]:
+        """
+        Timeout explícito del llamador o, si no lo hay, el aprendido para la operación de esta compañía.
+
+        Args:
+            operation: Nombre estable del paso (no el selector ni valores del cliente, para que
+                haya una sola clave por paso); None = espera sin nombre, usa el fijo
+
+        Returns:
+            (timeout en ms, timeout fijo de la operación). Con timeout explícito o sin operación
+            el segundo es None y la espera no se registra: así se excluyen los sondeos (selectores
+            de respaldo, comprobaciones cortas) que vencen por diseño
+        """
+        if timeout is not None:
+            return timeout, None
+        if operation is None:
+            return default, None
+        return AdaptiveTimeouts.timeout_ms(self.company, operation, default), default
+
+    async def _timed_wait(self, operation: str, timeout: int, default: Optional[int], wait: Callable[[], Any]) -> Any:
+        """
+        Ejecuta una espera de Playwright y registra cuánto tardó para los timeouts adaptativos.
+
+        Si vence, se registra como cota inferior (acotada al timeout fijo) y se relanza la
+        excepción. Sin default (timeout explícito del llamador) no se registra nada.
+        """
+        if default is None:
+            return await wait()
+        started = time.perf_counter()
+        try:
+            result = await wait()
+        except PlaywrightTimeout:
+            AdaptiveTimeouts.observe_timeout(self.company, operation, timeout, default)
+            raise
+        AdaptiveTimeouts.observe(self.company, operation, time.perf_counter() - started)
+        return result
+
     # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
     # FUNCIONES REUTILIZABLES EXTRAÍDAS DE LAS PÁGINAS DE SURA
     # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
@@ -259,10 +305,10 @@ class BasePage:
     async def wait_for_critical_navigation(
         self,
         expected_url_parts: List[str] = None,
-        timeout: int = 45000,  # 45 segundos para navegación crítica
+        timeout: Optional[int] = None,
         description: str = "navegación crítica",
         retry_attempts: int = 3,
-        check_interval: float = 0.5
+        check_interval: Optional[float] = None
     ) -> bool:
         """
         Espera navegación crítica con timeouts y reintentos extendidos.
@@ -270,15 +316,20 @@ class BasePage:
         
         Args:
             expected_url_parts: Partes que deberían estar en la nueva URL
-            timeout: Timeout en milisegundos por intento (por defecto 45s)
-            description: Descripción para logging
+            timeout: Timeout en milisegundos por intento (por defecto el aprendido de
+                ejecuciones anteriores, 45s mientras no haya historial)
+            description: Descripción para logging (también identifica la operación aprendida)
             retry_attempts: Número de intentos de navegación (por defecto 3)
-            check_interval: Intervalo entre verificaciones en segundos
+            check_interval: Intervalo entre verificaciones en segundos (por defecto el aprendido, máx. 0.5s)
             
         Returns:
             True si la navegación fue exitosa, False en caso contrario
         """
-        self.logger.info(f"🔥 Iniciando {description} con timeout extendido de {timeout/1000}s")
+        operation = f"navegacion:{description}"
+        timeout, default = self._timeout_for(operation, timeout, 45000)
+        if check_interval is None:
+            check_interval = AdaptiveTimeouts.poll_interval(self.company, operation, 0.5)
+        self.logger.info(f"🔥 Iniciando {description} con timeout de {timeout/1000}s")
         
         for attempt in range(retry_attempts):
             if attempt > 0:
@@ -298,6 +349,7 @@ class BasePage:
                 
                 # Verificación con intervalo configurable
                 max_checks = int(timeout // (check_interval * 1000))
+                started = time.perf_counter()
                 
                 for check in range(max_checks):
                     await asyncio.sleep(check_interval)
@@ -307,7 +359,9 @@ class BasePage:
                     # Verificar si cambió la URL
                     if new_url != current_url:
                         self.logger.info(f"📍 Nueva URL: {new_url}")
-                        elapsed_time = (check + 1) * check_interval
+                        elapsed_time = time.perf_counter() - started
+                        if default:
+                            AdaptiveTimeouts.observe(self.company, operation, elapsed_time)
                         self.logger.info(f"✅ {description} - URL cambió exitosamente en {elapsed_time:.1f}s")
                         
                         # Si se especificaron partes esperadas, verificarlas
@@ -323,6 +377,8 @@ class BasePage:
                         return True
                 
                 # Si llegamos aquí, no hubo cambio de URL en el tiempo especificado
+                if default:
+                    AdaptiveTimeouts.observe_timeout(self.company, operation, timeout, default)
                 final_url = self.page.url
                 self.logger.info(f"📍 URL final: {final_url}")
                 self.logger.warning(f"⚠️ {description} - No se detectó cambio de URL después de {timeout/1000}s")
@@ -492,6 +548,158 @@ class BasePage:
             self.logger.error(f"❌ Error llenando {description}: {e}")
             return False
 
+    # Script que asigna (write=true) o solo lee (write=false) un lote de campos en un único evaluate.
+    # Usa el setter nativo de `value` para que Angular/Polymer detecten el cambio y dispara
+    # input/change/blur como lo haría un usuario real. Los elementos llegan ya resueltos por
+    # Playwright (args.elements, alineado con args.fields) para que los selectores atraviesen
+    # shadow DOM igual que en el llenado campo por campo (paper-input de Sura).
+    _BATCH_FIELDS_SCRIPT = """
+    (args) => {
+        const results = {};
+        args.fields.forEach((field, i) => {
+            const el = args.elements[i];
+            if (!el) { results[field.selector] = null; return; }
+            const win = el.ownerDocument.defaultView || window;
+            if (args.write) {
+                const proto = el.tagName === 'SELECT' ? win.HTMLSelectElement.prototype
+                    : el.tagName === 'TEXTAREA' ? win.HTMLTextAreaElement.prototype
+                    : win.HTMLInputElement.prototype;
+                const setter = Object.getOwnPropertyDescriptor(proto, 'value').set;
+                el.focus();
+                setter.call(el, field.value);
+                el.dispatchEvent(new win.Event('input', { bubbles: true }));
+                el.dispatchEvent(new win.Event('change', { bubbles: true }));
+                if (args.blur) {
+                    el.dispatchEvent(new win.Event('blur'));
+                    el.blur();
+                }
+            }
+            results[field.selector] = { value: el.value, tag: el.tagName };
+        });
+        return results;
+    }
+    """
+
+    async def _evaluate_fields_batch(self, fields: List[Dict[str, str]], in_frame: bool, **options) -> Dict[str, Any]:
+        """
+        Resuelve los selectores con Playwright (atraviesa shadow DOM) y ejecuta el script de lote
+        en el frame de los elementos.
+
+        Returns:
+            {selector: {'value', 'tag'} o None si el elemento no existe}
+        """
+        root = self._frame if in_frame else self.page
+        matches = await asyncio.gather(*(root.locator(field["selector"]).element_handles() for field in fields))
+        elements = [found[0] if found else None for found in matches]
+        try:
+            resolved = next((element for element in elements if element is not None), None)
+            if resolved is None:
+                return {}
+            frame = await resolved.owner_frame() or self.page.main_frame
+            return await frame.evaluate(
+                self._BATCH_FIELDS_SCRIPT, {"fields": fields, "elements": elements, **options}
+            ) or {}
+        finally:
+            for found in matches:
+                for element in found:
+                    try:
+                        await element.dispose()
+                    except Exception:
+                        pass
+
+    async def fill_fields_batch(
+        self,
+        field_map: Dict[str, str],
+        description: str = "campos",
+        in_frame: bool = False,
+        settle_ms: int = 300,
+        dispatch_blur: bool = True,
+        max_attempts: int = 3
+    ) -> bool:
+        """
+        Llena un formulario completo en un solo evaluate y verifica todos los valores en una sola lectura.
+        Solo los campos que no coinciden se reintentan campo por campo.
+
+        Args:
+            field_map: Diccionario {selector CSS: valor} de campos a llenar
+            description: Descripción para logging
+            in_frame: Si los campos están dentro del iframe principal (Allianz)
+            settle_ms: Espera única tras la escritura para que el framework procese los eventos
+            dispatch_blur: Si se dispara blur después de cada campo (desactivar antes de autocompletados)
+            max_attempts: Intentos del llenado individual para los campos que no coincidan
+
+        Returns:
+            True si todos los campos quedaron con el valor esperado, False en caso contrario
+        """
+        self.logger.info(f"📝 Llenando {description} en lote ({len(field_map)} campos)...")
+
+        fields = [{"selector": selector, "value": str(value)} for selector, value in field_map.items()]
+
+        try:
+            await self._evaluate_fields_batch(fields, in_frame, write=True, blur=dispatch_blur)
+            if settle_ms:
+                await self.page.wait_for_timeout(settle_ms)
+            actual = await self._evaluate_fields_batch(fields, in_frame, write=False, blur=dispatch_blur)
+        except Exception as e:
+            self.logger.warning(f"⚠️ Error en llenado por lote de {description}: {e}")
+            actual = {}
+
+        # Verificación de todos los campos con la lectura única
+        mismatches = []
+        for field in fields:
+            selector, expected = field["selector"], field["value"]
+            info = actual.get(selector)
+            current = info.get("value", "") if info else None
+
+            if current is not None and self._field_value_matches(selector, expected, current):
+                self.logger.info(f"✅ Campo '{selector}' = '{current}'")
+            else:
+                self.logger.warning(f"⚠️ DIFF '{selector}': Esperado='{expected}' | Actual='{current}'")
+                mismatches.append((selector, expected, info.get("tag") if info else None))
+
+        if not mismatches:
+            self.logger.info(f"✅ {description} llenados y verificados en lote")
+            return True
+
+        # Fallback individual solo para los campos que no coincidieron
+        self.logger.info(f"🔄 Reintentando individualmente {len(mismatches)}/{len(fields)} campos de {description}...")
+        for selector, expected, tag in mismatches:
+            if in_frame:
+                if tag == "SELECT":
+                    ok = await self.select_in_frame(selector, expected, selector)
+                else:
+                    ok = await self.fill_in_frame(selector, expected, selector)
+            else:
+                ok = await self.fill_and_verify_field_flexible(
+                    selector=selector,
+                    value=expected,
+                    max_attempts=max_attempts
+                )
+            if not ok:
+                self.logger.error(f"❌ No se pudo llenar '{selector}' en {description}")
+                return False
+
+        self.logger.info(f"✅ {description} llenados exitosamente (con reintentos individuales)")
+        return True
+
+    def _field_value_matches(self, selector: str, expected: str, actual: str) -> bool:
+        """Compara el valor leído con el esperado, con validación flexible para fechas."""
+        if actual == expected:
+            return True
+        if self._is_date_field(selector) or "fecha" in selector.lower():
+            return self._validate_date_field(expected, actual)
+        return False
+
+    def _is_date_field(self, selector: str, field_name: str = "") -> bool:
+        """Detecta si un selector/campo corresponde a un campo de fecha."""
+        return (
+            "placeholder='DD/MM/YYYY'" in selector or
+            "aria-labelledby='paper-input-label-27'" in selector or
+            ("aria-labelledby" in selector and "fecha" in selector.lower()) or
+            "vigencia" in field_name.lower() or
+            "fecha" in field_name.lower()
+        )
+
     async def retry_action(
         self,
         action_func: Callable,
@@ -578,16 +786,9 @@ class BasePage:
                 
                 # Verificar el valor
                 actual_value = await self.page.input_value(selector)
-                  # Detectar si es campo de fecha
-                is_date_field = (
-                    "placeholder='DD/MM/YYYY'" in selector or 
-                    "aria-labelledby='paper-input-label-27'" in selector or
-                    ("aria-labelledby" in selector and "fecha" in selector.lower()) or
-                    "vigencia" in field_name.lower() or
-                    "fecha" in field_name.lower()
-                )
-                
-                if is_date_field:
+
+                # Detectar si es campo de fecha
+                if self._is_date_field(selector, field_name):
                     # Validación flexible para fechas
                     if self._validate_date_field(value, actual_value):
                         self.logger.info(f"✅ {field_desc} verificado: '{actual_value}' (formato de fecha aceptado)")
@@ -786,11 +987,20 @@ class BasePage:
             self.logger.error(f"❌ safe_fill('{selector}'): {e}")
             return False
 
-    async def wait_for_selector_safe(self, selector: str, state: str = "visible", timeout: int = 15000) -> bool:
-        """Wait for selector con manejo de error."""
+    async def wait_for_selector_safe(self, selector: str, state: str = "visible", timeout: Optional[int] = None,
+                                     operation: Optional[str] = None) -> bool:
+        """
+        Wait for selector con manejo de error.
+
+        Sin timeout explícito espera 15s, o el aprendido para `operation` (nombre estable del
+        paso) si el llamador lo indica.
+        """
+        operation = f"selector:{operation}" if operation else None
+        timeout, default = self._timeout_for(operation, timeout, 15000)
         self.logger.info(f"⏳ Esperando selector '{selector}' ({state}) <={timeout/1000}s...")
         try:
-            await self.page.wait_for_selector(selector, state=state, timeout=timeout)
+            await self._timed_wait(operation, timeout, default,
+                                   lambda: self.page.wait_for_selector(selector, state=state, timeout=timeout))
             self.logger.info(f"✅ Selector '{selector}' {state}")
             return True
         except Exception as e:
@@ -808,12 +1018,15 @@ class BasePage:
     # Métodos genéricos para iframe:
     # ————————————————
 
-    async def click_in_frame(self, selector: str, description: str, timeout: int = 15000) -> bool:
-        """Espera y hace clic en un selector dentro del iframe."""
+    async def click_in_frame(self, selector: str, description: str, timeout: Optional[int] = None,
+                             operation: Optional[str] = None) -> bool:
+        """Espera y hace clic en un selector dentro del iframe. Aprende el timeout si se indica `operation`."""
         self.logger.info(f"⏳ Esperando {description} en iframe...")
+        operation = f"frame:{operation}" if operation else None
+        timeout, default = self._timeout_for(operation, timeout, 15000)
         try:
             el = self._frame.locator(selector)
-            await el.wait_for(timeout=timeout)
+            await self._timed_wait(operation, timeout, default, lambda: el.wait_for(timeout=timeout))
             await el.click()
             self.logger.info(f"✅ Clic en {description} exitoso!")
             return True
@@ -821,12 +1034,15 @@ class BasePage:
             self.logger.error(f"❌ click_in_frame('{selector}'): {e}")
             return False
 
-    async def fill_in_frame(self, selector: str, value: str, description: str, timeout: int = 15000) -> bool:
-        """Espera y rellena un input dentro del iframe."""
+    async def fill_in_frame(self, selector: str, value: str, description: str, timeout: Optional[int] = None,
+                            operation: Optional[str] = None) -> bool:
+        """Espera y rellena un input dentro del iframe. Aprende el timeout si se indica `operation`."""
         self.logger.info(f"⏳ Esperando campo {description} en iframe...")
+        operation = f"frame:{operation}" if operation else None
+        timeout, default = self._timeout_for(operation, timeout, 15000)
         try:
             el = self._frame.locator(selector)
-            await el.wait_for(timeout=timeout)
+            await self._timed_wait(operation, timeout, default, lambda: el.wait_for(timeout=timeout))
             await el.fill(value)
             self.logger.info(f"✅ Campo {description} = '{value}'")
             return True
@@ -834,12 +1050,15 @@ class BasePage:
             self.logger.error(f"❌ fill_in_frame('{selector}'): {e}")
             return False
 
-    async def select_in_frame(self, selector: str, value: str, description: str, timeout: int = 15000) -> bool:
-        """Espera y selecciona un valor de dropdown dentro del iframe."""
+    async def select_in_frame(self, selector: str, value: str, description: str, timeout: Optional[int] = None,
+                              operation: Optional[str] = None) -> bool:
+        """Espera y selecciona un valor de dropdown dentro del iframe. Aprende el timeout si se indica `operation`."""
         self.logger.info(f"⏳ Esperando dropdown {description} en iframe...")
+        operation = f"frame:{operation}" if operation else None
+        timeout, default = self._timeout_for(operation, timeout, 15000)
         try:
             el = self._frame.locator(selector)
-            await el.wait_for(timeout=timeout)
+            await self._timed_wait(operation, timeout, default, lambda: el.wait_for(timeout=timeout))
             await el.select_option(value)
             # disparamos change
             await el.evaluate("e => e.dispatchEvent(new Event('change',{bubbles:true}))")
@@ -849,12 +1068,15 @@ class BasePage:
             self.logger.error(f"❌ select_in_frame('{selector}'): {e}")
             return False
 
-    async def select_by_text_in_frame(self, selector: str, text: str, description: str, timeout: int = 15000) -> bool:
-        """Espera y selecciona un valor de dropdown por texto dentro del iframe."""
+    async def select_by_text_in_frame(self, selector: str, text: str, description: str, timeout: Optional[int] = None,
+                                      operation: Optional[str] = None) -> bool:
+        """Espera y selecciona un valor de dropdown por texto dentro del iframe. Aprende el timeout si se indica `operation`."""
         self.logger.info(f"⏳ Esperando dropdown {description} en iframe...")
+        operation = f"frame:{operation}" if operation else None
+        timeout, default = self._timeout_for(operation, timeout, 15000)
         try:
             el = self._frame.locator(selector)
-            await el.wait_for(timeout=timeout)
+            await self._timed_wait(operation, timeout, default, lambda: el.wait_for(timeout=timeout))
             await el.select_option(label=text)
             # disparamos change
             await el.evaluate("e => e.dispatchEvent(new Event('change',{bubbles:true}))")
@@ -864,13 +1086,16 @@ class BasePage:
             self.logger.error(f"❌ select_by_text_in_frame('{selector}'): {e}")
             return False
 
-    async def click_by_text_in_frame(self, text: str, description: str, timeout: int = 15000) -> bool:
-        """Espera y hace clic en un elemento por texto exacto dentro del iframe."""
+    async def click_by_text_in_frame(self, text: str, description: str, timeout: Optional[int] = None,
+                                     operation: Optional[str] = None) -> bool:
+        """Espera y hace clic en un elemento por texto exacto dentro del iframe. Aprende el timeout si se indica `operation`."""
         self.logger.info(f"⏳ Esperando texto exacto '{text}' en iframe...")
+        operation = f"frame:{operation}" if operation else None
+        timeout, default = self._timeout_for(operation, timeout, 15000)
         try:
             # Usar exact=True para coincidir exactamente con el texto
             el = self._frame.get_by_text(text, exact=True)
-            await el.wait_for(timeout=timeout)
+            await self._timed_wait(operation, timeout, default, lambda: el.wait_for(timeout=timeout))
             await el.click()
             self.logger.info(f"✅ Clic en {description} exitoso!")
             return True
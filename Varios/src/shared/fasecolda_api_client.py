@@ -0,0 +1,616 @@
+"""Cliente HTTP directo para el backend JSON de FASECOLDA (sin manejar el formulario en el navegador)."""
+
+import os
+import re
+import json
+import asyncio
+import logging
+from datetime import datetime
+from typing import Optional, Dict, List, Any, Tuple
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode, quote, unquote
+
+from playwright.async_api import Page, Playwright, APIRequestContext
+
+from ..config.base_config import BaseConfig
+from ..core.playwright_runtime import get_playwright_runtime
+from .fasecolda_service import FasecoldaService, FASECOLDA_URL, SELECTORS
+from .fasecolda_resolver import FasecoldaMappingStore
+
+# Peticiones simultáneas en la búsqueda comprehensiva por HTTP
+API_CONCURRENCY = 6
+API_RETRIES = 3
+API_TIMEOUT_MS = 10000
+# Registros que deben coincidir en CF y CH con la página para dar por aprendida la búsqueda
+MIN_LEARN_RECORDS = 2
+
+# Parámetros del formulario que se convierten en marcadores {nombre} en las plantillas
+FORM_PARAMS = ('category', 'model', 'brand', 'reference', 'state')
+
+
+class FasecoldaApiError(Exception):
+    """El API no se pudo usar; el llamador debe volver al navegador."""
+
+    def __init__(self, message: str, shape_changed: bool = False):
+        # shape_changed: la respuesta ya no tiene la forma aprendida (hay que reaprender)
+        self.shape_changed = shape_changed
+        super().__init__(message)
+
+
+class FasecoldaApiSpec:
+    """
+    Endpoints del SPA de FASECOLDA aprendidos de una búsqueda real en el navegador.
+
+    El sitio no publica su API: el navegador registra las respuestas JSON mientras llena
+    el formulario y de ahí se deducen las plantillas de URL/cuerpo y qué llaves traen
+    CF, CH, descripción y valor. Si la forma cambia, el archivo se invalida y la próxima
+    búsqueda en navegador lo vuelve a aprender.
+    """
+
+    VERSION = 2
+    PATH = os.path.join(BaseConfig.CACHE_DIR, 'fasecolda_api.json')
+
+    @classmethod
+    def load(cls) -> Optional[dict]:
+        try:
+            with open(cls.PATH, 'r', encoding='utf-8') as f:
+                spec = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if spec.get('version') != cls.VERSION or 'search' not in spec:
+            return None
+        return spec
+
+    @classmethod
+    def save(cls, spec: dict) -> None:
+        spec = dict(spec, version=cls.VERSION, learned_at=datetime.now().isoformat(timespec='seconds'))
+        os.makedirs(os.path.dirname(cls.PATH), exist_ok=True)
+        tmp_path = f"{cls.PATH}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(spec, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, cls.PATH)
+
+    @classmethod
+    def invalidate(cls) -> None:
+        try:
+            os.remove(cls.PATH)
+        except OSError:
+            pass
+
+
+class FasecoldaApiLearner:
+    """Observa el tráfico del SPA durante una búsqueda en navegador y aprende sus endpoints."""
+
+    # Valores actuales del formulario y opciones de los selects (un solo evaluate)
+    _FORM_SNAPSHOT_SCRIPT = """
+        (selectors) => {
+            const read = (sel) => {
+                const el = document.querySelector(sel);
+                if (!el) return {value: null, options: []};
+                return {
+                    value: el.value,
+                    options: Array.from(el.options)
+                        .filter(o => o.value && o.value !== '')
+                        .map(o => ({text: o.text.trim(), value: o.value}))
+                };
+            };
+            const out = {};
+            for (const [name, sel] of Object.entries(selectors)) out[name] = read(sel);
+            return out;
+        }
+    """
+
+    def __init__(self, page: Page, logger: logging.Logger):
+        self.page = page
+        self.logger = logger
+        self._seq = 0
+        self._pending: List[asyncio.Task] = []
+        self._responses: List[dict] = []
+        self._notes: List[Tuple[int, dict]] = []
+        self._options: Dict[str, List[dict]] = {}
+        self.page.on('response', self._on_response)
+
+    def _on_response(self, response) -> None:
+        if response.request.resource_type not in ('xhr', 'fetch'):
+            return
+        self._seq += 1
+        self._pending.append(asyncio.create_task(self._capture(self._seq, response)))
+
+    async def _capture(self, seq: int, response) -> None:
+        try:
+            if 'json' not in (response.headers.get('content-type') or ''):
+                return
+            data = await response.json()
+            request = response.request
+            self._responses.append({
+                'seq': seq,
+                'method': request.method,
+                'url': request.url,
+                'body': request.post_data,
+                'content_type': request.headers.get('content-type'),
+                'json': data
+            })
+        except Exception:
+            pass
+
+    async def note_search(self, state: str) -> None:
+        """Registra el formulario justo antes de hacer clic en Buscar."""
+        try:
+            snapshot = await self.page.evaluate(self._FORM_SNAPSHOT_SCRIPT, {
+                'category': SELECTORS['category'],
+                'model': SELECTORS['model'],
+                'brand': SELECTORS['brand'],
+                'reference': SELECTORS['reference']
+            })
+        except Exception:
+            return
+        values = {name: data['value'] for name, data in snapshot.items()}
+        values['state'] = state
+        self._notes.append((self._seq, values))
+        for name, data in snapshot.items():
+            if data['options']:
+                self._options[name] = data['options']
+
+    async def learn(self, results: List[dict]) -> bool:
+        """
+        Deduce y guarda la especificación del API a partir de los resultados que mostró la página.
+
+        Args:
+            results: Resultados extraídos de las tarjetas ('cf_code' y 'ch_code')
+
+        Returns:
+            True si se aprendió el endpoint de búsqueda
+        """
+        try:
+            self.page.remove_listener('response', self._on_response)
+        except Exception:
+            pass
+        if self._pending:
+            await asyncio.gather(*self._pending, return_exceptions=True)
+
+        results = [r for r in results or [] if r.get('cf_code') and r.get('ch_code')]
+        if len(results) < MIN_LEARN_RECORDS or not self._notes:
+            return False
+
+        search = self._learn_search(results)
+        if not search:
+            self.logger.info("ℹ️ No se identificó un endpoint JSON de búsqueda en FASECOLDA - se mantiene el navegador")
+            return False
+
+        spec = {
+            'search': search,
+            'references': self._learn_references(),
+            'values': {
+                'category': self._notes[0][1].get('category'),
+                'model': {o['text']: o['value'] for o in self._options.get('model', [])},
+                'brand': {FasecoldaMappingStore.normalize(o['text']): o['value'] for o in self._options.get('brand', [])}
+            }
+        }
+        FasecoldaApiSpec.save(spec)
+        self.logger.info(f"🧠 API de FASECOLDA aprendido: {search['method']} {search['url']}")
+        return True
+
+    def _form_values_before(self, seq: int) -> dict:
+        values = self._notes[0][1]
+        for noted_seq, noted_values in self._notes:
+            if noted_seq < seq:
+                values = noted_values
+        return values
+
+    def _learn_search(self, results: List[dict]) -> Optional[dict]:
+        """
+        Busca la respuesta cuyos registros traen el CF y el CH de los resultados de la página.
+
+        Solo se acepta si MIN_LEARN_RECORDS registros coinciden en ambos códigos: con uno solo
+        cualquier llave con el mismo valor pasaría por CH (p. ej. el propio CF).
+        """
+        by_cf = {str(r['cf_code']): r for r in results}
+        for response in self._responses:
+            found = _find_record_list(response['json'], lambda rec: any(str(v) in by_cf for v in rec.values()))
+            if not found:
+                continue
+            path, records = found
+            sample = next(rec for rec in records if any(str(v) in by_cf for v in rec.values()))
+            cf_key = next(k for k, v in sample.items() if str(v) in by_cf)
+            result = by_cf[str(sample[cf_key])]
+            ch_key = _key_matching(sample, lambda v: str(v) == str(result['ch_code']), exclude=cf_key)
+            if not ch_key:
+                continue
+
+            matched = [
+                rec for rec in records
+                if str(rec.get(cf_key)) in by_cf and str(rec.get(ch_key)) == str(by_cf[str(rec.get(cf_key))]['ch_code'])
+            ]
+            if len(matched) < MIN_LEARN_RECORDS:
+                continue
+
+            fields = {'cf_code': cf_key, 'ch_code': ch_key}
+            if result.get('description'):
+                target = _normalize(result['description'])
+                fields['description'] = _key_matching(sample, lambda v: _normalize(str(v)) == target)
+            if result.get('insured_value'):
+                digits = re.sub(r'\D', '', str(result['insured_value']))
+                fields['insured_value'] = _key_matching(sample, lambda v: bool(digits) and re.sub(r'\D', '', str(v)) == digits)
+
+            endpoint = _templatize(response, self._form_values_before(response['seq']), FORM_PARAMS)
+            endpoint.update({'list_path': path, 'fields': fields})
+            return endpoint
+        return None
+
+    def _learn_references(self) -> Optional[dict]:
+        options = self._options.get('reference') or []
+        texts = {o['text']: o['value'] for o in options}
+        if not texts:
+            return None
+
+        for response in self._responses:
+            found = _find_record_list(response['json'], lambda rec: any(str(v).strip() in texts for v in rec.values()))
+            if not found:
+                continue
+            path, records = found
+            sample = next(rec for rec in records if any(str(v).strip() in texts for v in rec.values()))
+            text_key = next(k for k, v in sample.items() if str(v).strip() in texts)
+            expected_value = texts[str(sample[text_key]).strip()]
+            value_key = _key_matching(sample, lambda v: str(v) == str(expected_value), exclude=text_key) or text_key
+
+            # Las referencias dependen de año y marca, no de la referencia elegida
+            params = tuple(p for p in FORM_PARAMS if p != 'reference')
+            endpoint = _templatize(response, self._notes[0][1], params)
+            endpoint.update({'list_path': path, 'fields': {'text': text_key, 'value': value_key}})
+            return endpoint
+        return None
+
+
+class FasecoldaApiClient:
+    """
+    Consulta FASECOLDA por HTTP con el mismo contrato que FasecoldaService
+    (get_cf_code / get_cf_code_comprehensive).
+
+    Usa el APIRequestContext de Playwright: conexiones keep-alive reutilizadas sin abrir navegador.
+    Lanza FasecoldaApiError cuando no puede responder para que el llamador use el navegador.
+    """
+
+    def __init__(self, logger: Optional[logging.Logger] = None):
+        self.logger = logger or logging.getLogger(__name__)
+        self.spec = FasecoldaApiSpec.load()
+        self.playwright: Optional[Playwright] = None
+        self.request: Optional[APIRequestContext] = None
+        # Reutiliza puntaje, deduplicación y diálogo del servicio (no usan la página)
+        self._helper = FasecoldaService(None, self.logger)
+
+    @classmethod
+    def is_available(cls) -> bool:
+        return FasecoldaApiSpec.load() is not None
+
+    async def __aenter__(self) -> 'FasecoldaApiClient':
+        if not self.spec:
+            raise FasecoldaApiError("No hay endpoints de FASECOLDA aprendidos")
+        origin = FASECOLDA_URL.rstrip('/')
+        self.playwright = await get_playwright_runtime().acquire()
+        self.request = await self.playwright.request.new_context(
+            extra_http_headers={
+                'Accept': 'application/json, text/plain, */*',
+                'Origin': origin,
+                'Referer': FASECOLDA_URL
+            },
+            timeout=API_TIMEOUT_MS
+        )
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        if self.request:
+            await self.request.dispose()
+            self.request = None
+        if self.playwright:
+            self.playwright = None
+            await get_playwright_runtime().release()
+
+    async def get_cf_code(
+        self,
+        category: str,
+        state: str,
+        model_year: str,
+        brand: str,
+        reference: str,
+        full_reference: str = None
+    ) -> Optional[dict]:
+        """Mismo contrato que FasecoldaService.get_cf_code, en una o dos peticiones HTTP."""
+        self._helper._current_brand = brand
+        self._helper._current_reference = reference
+        self._helper._current_full_reference = full_reference
+        self._helper._current_model_year = model_year
+
+        references = await self.get_references(state, model_year, brand)
+        ref_value = FasecoldaService._pick_reference(references, reference, self.logger)
+        if not ref_value:
+            raise FasecoldaApiError(f"Sin referencias para {brand} {model_year} en el API")
+
+        ref_text = next((r['text'] for r in references if r['value'] == ref_value), reference)
+        results = await self.search(state, model_year, brand, {'text': ref_text, 'value': ref_value})
+        if not results:
+            raise FasecoldaApiError(f"El API no devolvió vehículos para {ref_text}")
+
+        if len(results) == 1:
+            return {'cf_code': results[0]['cf_code'], 'ch_code': results[0]['ch_code']}
+
+        options = self._number_unique(results)
+        selected = await self._helper._show_selection_dialog(options, brand, reference)
+        return {'cf_code': selected['cf_code'], 'ch_code': selected['ch_code']} if selected else None
+
+    async def get_cf_code_comprehensive(
+        self,
+        category: str,
+        state: str,
+        model_year: str,
+        brand: str,
+        reference: str,
+        full_reference: str = None
+    ) -> Optional[dict]:
+        """Mismo contrato que FasecoldaService.get_cf_code_comprehensive, con las referencias en paralelo."""
+        self._helper._current_brand = brand
+        self._helper._current_reference = reference
+        self._helper._current_full_reference = full_reference
+        self._helper._current_model_year = model_year
+
+        options = await self.collect_candidates(category, state, model_year, brand, reference)
+        if not options:
+            raise FasecoldaApiError("El API no devolvió vehículos en ninguna referencia")
+
+        selected = await self._helper._show_selection_dialog(options, brand, reference)
+        return {'cf_code': selected['cf_code'], 'ch_code': selected['ch_code']} if selected else None
+
+    async def collect_candidates(
+        self,
+        category: str,
+        state: str,
+        model_year: str,
+        brand: str,
+        reference: str
+    ) -> List[dict]:
+        """Mismo contrato que FasecoldaService.collect_candidates: opciones numeradas, sin diálogos."""
+        references = [
+            r for r in await self.get_references(state, model_year, brand)
+            if not reference or reference.lower() in r['text'].lower()
+        ]
+        if not references:
+            raise FasecoldaApiError(f"Sin referencias '{reference}' para {brand} en el API")
+
+        self.logger.info(f"🌐 Búsqueda comprehensiva por API en {len(references)} referencias")
+        semaphore = asyncio.Semaphore(API_CONCURRENCY)
+
+        async def search_one(ref: dict) -> List[dict]:
+            async with semaphore:
+                return await self.search(state, model_year, brand, ref)
+
+        per_reference = await asyncio.gather(*(search_one(ref) for ref in references))
+        return self._number_unique([r for results in per_reference for r in results])
+
+    async def get_references(self, state: str, model_year: str, brand: str) -> List[dict]:
+        """Referencias disponibles para año y marca ({'text', 'value'})."""
+        endpoint = self.spec.get('references')
+        if not endpoint:
+            raise FasecoldaApiError("El endpoint de referencias no fue aprendido")
+
+        data = await self._fetch(endpoint, self._params(state, model_year, brand))
+        fields = endpoint['fields']
+        references = []
+        for record in _records_at(data, endpoint['list_path']):
+            if fields['text'] not in record:
+                raise FasecoldaApiError("Las referencias cambiaron de forma", shape_changed=True)
+            references.append({'text': str(record[fields['text']]).strip(), 'value': str(record.get(fields['value'], ''))})
+        return references
+
+    async def search(self, state: str, model_year: str, brand: str, reference: dict) -> List[dict]:
+        """Vehículos de una referencia, en el formato de la búsqueda comprehensiva (sin numerar)."""
+        endpoint = self.spec['search']
+        data = await self._fetch(endpoint, self._params(state, model_year, brand, reference['value']))
+        fields = endpoint['fields']
+
+        results = []
+        for record in _records_at(data, endpoint['list_path']):
+            if not record.get(fields['cf_code']) or not record.get(fields['ch_code']):
+                raise FasecoldaApiError("Los resultados cambiaron de forma", shape_changed=True)
+            cf_code = str(record[fields['cf_code']])
+            ch_code = str(record[fields['ch_code']])
+            results.append({
+                'option_number': 0,
+                'cf_code': cf_code,
+                'ch_code': ch_code,
+                'description': str(record.get(fields.get('description'), '') or '').strip(),
+                'insured_value': _format_value(record.get(fields.get('insured_value'))),
+                'reference_group': reference['text']
+            })
+        return results
+
+    def _number_unique(self, results: List[dict]) -> List[dict]:
+        options = []
+        for result in results:
+            if self._helper._is_valid_unique_result(result, options):
+                result['option_number'] = len(options) + 1
+                options.append(result)
+        return options
+
+    def _params(self, state: str, model_year: str, brand: str, reference_value: str = None) -> dict:
+        values = self.spec.get('values', {})
+        model = values.get('model', {}).get(str(model_year))
+        # Marcas comparadas sin tildes, signos ni mayúsculas ("BMW", "Citroën")
+        brands = {FasecoldaMappingStore.normalize(text): value for text, value in values.get('brand', {}).items()}
+        brand_value = brands.get(FasecoldaMappingStore.normalize(brand))
+        if model is None or brand_value is None:
+            raise FasecoldaApiError(f"Año '{model_year}' o marca '{brand}' sin mapear en el API")
+        params = {'category': values.get('category') or '', 'model': model, 'brand': brand_value, 'state': state}
+        if reference_value is not None:
+            params['reference'] = reference_value
+        return params
+
+    async def _fetch(self, endpoint: dict, params: dict) -> Any:
+        url = endpoint['url']
+        for name, value in params.items():
+            url = url.replace('{' + name + '}', quote(str(value), safe=''))
+
+        body = _fill_body(endpoint.get('body'), endpoint.get('body_types', {}), params)
+        headers = {'Content-Type': endpoint['content_type']} if body is not None and endpoint.get('content_type') else None
+
+        last_error = None
+        for attempt in range(1, API_RETRIES + 1):
+            try:
+                response = await self.request.fetch(url, method=endpoint['method'], data=body, headers=headers)
+                if response.ok:
+                    try:
+                        return await response.json()
+                    except Exception:
+                        raise FasecoldaApiError(f"Respuesta no JSON en {url}", shape_changed=True)
+                if response.status < 500 and response.status != 429:
+                    raise FasecoldaApiError(f"HTTP {response.status} en {url}", shape_changed=response.status in (400, 404, 410))
+                last_error = f"HTTP {response.status}"
+            except FasecoldaApiError:
+                raise
+            except Exception as e:
+                last_error = str(e)
+
+            if attempt < API_RETRIES:
+                await asyncio.sleep(0.5 * (2 ** (attempt - 1)))
+
+        raise FasecoldaApiError(f"API de FASECOLDA no disponible: {last_error}")
+
+
+# ---------------------------------------------------------------------------
+# Utilidades de aprendizaje/plantillas
+# ---------------------------------------------------------------------------
+
+def _normalize(text: str) -> str:
+    return ' '.join(text.split()).upper()
+
+
+def _key_matching(record: dict, predicate, exclude: str = None) -> Optional[str]:
+    for key, value in record.items():
+        if key != exclude and not isinstance(value, (dict, list)) and predicate(value):
+            return key
+    return None
+
+
+def _find_record_list(data: Any, predicate, path: Optional[list] = None) -> Optional[Tuple[list, list]]:
+    """Busca (en profundidad) una lista de objetos donde alguno cumpla `predicate`."""
+    path = path or []
+    if isinstance(data, list):
+        records = [item for item in data if isinstance(item, dict)]
+        if records and any(predicate(rec) for rec in records):
+            return path, records
+        for index, item in enumerate(data):
+            found = _find_record_list(item, predicate, path + [index])
+            if found:
+                return found
+    elif isinstance(data, dict):
+        for key, value in data.items():
+            found = _find_record_list(value, predicate, path + [key])
+            if found:
+                return found
+    return None
+
+
+def _records_at(data: Any, path: list) -> List[dict]:
+    node = data
+    try:
+        for key in path:
+            node = node[key]
+    except (KeyError, IndexError, TypeError):
+        raise FasecoldaApiError("La respuesta ya no tiene la ruta aprendida", shape_changed=True)
+    if not isinstance(node, list):
+        raise FasecoldaApiError("La respuesta ya no contiene una lista", shape_changed=True)
+    return [item for item in node if isinstance(item, dict)]
+
+
+def _placeholder_for(value: Any, form_values: dict, params: tuple) -> Optional[str]:
+    text = str(value)
+    for name in params:
+        expected = form_values.get(name)
+        if expected not in (None, '') and text.lower() == str(expected).lower():
+            return name
+    return None
+
+
+def _templatize(response: dict, form_values: dict, params: tuple) -> dict:
+    """Convierte la petición observada en plantilla, reemplazando valores del formulario por {nombre}."""
+    parts = urlsplit(response['url'])
+
+    path_segments = []
+    for segment in parts.path.split('/'):
+        name = _placeholder_for(unquote(segment), form_values, params) if segment else None
+        path_segments.append('{' + name + '}' if name else segment)
+
+    query = []
+    for key, value in parse_qsl(parts.query, keep_blank_values=True):
+        name = _placeholder_for(value, form_values, params)
+        query.append((key, '{' + name + '}' if name else value))
+    query_string = urlencode(query, safe='{}')
+
+    endpoint = {
+        'method': response['method'],
+        'url': urlunsplit((parts.scheme, parts.netloc, '/'.join(path_segments), query_string, '')),
+        'content_type': response.get('content_type'),
+        'body': None,
+        'body_types': {}
+    }
+
+    body = response.get('body')
+    if body:
+        try:
+            body_types: Dict[str, str] = {}
+
+            def walk(node):
+                if isinstance(node, dict):
+                    return {k: walk(v) for k, v in node.items()}
+                if isinstance(node, list):
+                    return [walk(v) for v in node]
+                name = _placeholder_for(node, form_values, params)
+                if name:
+                    body_types[name] = 'number' if isinstance(node, (int, float)) else 'string'
+                    return '{' + name + '}'
+                return node
+
+            endpoint['body'] = json.dumps(walk(json.loads(body)))
+            endpoint['body_types'] = body_types
+        except ValueError:
+            # Cuerpo de formulario (x-www-form-urlencoded)
+            fields = []
+            for key, value in parse_qsl(body, keep_blank_values=True):
+                name = _placeholder_for(value, form_values, params)
+                fields.append((key, '{' + name + '}' if name else value))
+            endpoint['body'] = urlencode(fields, safe='{}')
+            endpoint['body_types'] = {'__form__': 'form'}
+    return endpoint
+
+
+def _fill_body(template: Optional[str], body_types: dict, params: dict) -> Optional[str]:
+    if template is None:
+        return None
+
+    if body_types.get('__form__') == 'form':
+        for name, value in params.items():
+            template = template.replace('{' + name + '}', quote(str(value), safe=''))
+        return template
+
+    def walk(node):
+        if isinstance(node, dict):
+            return {k: walk(v) for k, v in node.items()}
+        if isinstance(node, list):
+            return [walk(v) for v in node]
+        if isinstance(node, str) and node.startswith('{') and node.endswith('}') and node[1:-1] in params:
+            name = node[1:-1]
+            value = params[name]
+            if body_types.get(name) == 'number':
+                try:
+                    return int(value)
+                except (TypeError, ValueError):
+                    return value
+            return value
+        return node
+
+    return json.dumps(walk(json.loads(template)))
+
+
+def _format_value(value: Any) -> str:
+    if value in (None, ''):
+        return "No disponible"
+    if isinstance(value, (int, float)):
+        return f"${value:,.0f}"
+    return str(value).strip()
@@ -0,0 +1,71 @@
+"""Extracción de las tarjetas de resultados de FASECOLDA en un solo page.evaluate."""
+
+from typing import List, Optional, TypedDict
+from playwright.async_api import Page
+
+
+class FasecoldaCard(TypedDict):
+    """Datos de una tarjeta de resultado de FASECOLDA."""
+    index: int                 # Posición de la tarjeta (1..n)
+    cf_code: Optional[str]     # None si la tarjeta no trae código CF
+    ch_code: Optional[str]     # Igual al CF cuando la tarjeta no trae CH
+    description: str           # Nombre completo del vehículo
+    insured_value: str         # Valor asegurado tal como se muestra
+    reference: str             # Referencia seleccionada en el formulario
+
+
+class FasecoldaCardExtractor:
+    """Lee todas las tarjetas de la página en un único round trip (costo constante por página)."""
+
+    CARDS_SCRIPT = """
+        (sel) => {
+            const text = (root, selector) => {
+                const el = selector ? root.querySelector(selector) : root;
+                return el ? (el.textContent || '').trim() : null;
+            };
+            const refSelect = document.querySelector(sel.reference);
+            const reference = refSelect && refSelect.selectedIndex >= 0
+                ? (refSelect.options[refSelect.selectedIndex].text || '').trim()
+                : '';
+
+            return Array.from(document.querySelectorAll(sel.card)).map((card, i) => {
+                // Formato esperado: "CF - 03033048 CH - 03001135"
+                const codes = text(card, sel.codes) || '';
+                const cf = codes.match(/CF\\s*-\\s*(\\d+)/);
+                const ch = codes.match(/CH\\s*-\\s*(\\d+)/);
+                return {
+                    index: i + 1,
+                    cf_code: cf ? cf[1] : null,
+                    ch_code: ch ? ch[1] : (cf ? cf[1] : null),
+                    description: text(card, sel.name) || '',
+                    insured_value: text(card, sel.price),
+                    reference: reference
+                };
+            });
+        }
+    """
+
+    @classmethod
+    async def extract(cls, page: Page, selectors: dict) -> List[FasecoldaCard]:
+        """
+        Extrae CF, CH, descripción, valor y referencia de todas las tarjetas visibles.
+
+        Args:
+            page: Página de FASECOLDA con resultados
+            selectors: Selectores con las llaves vehicle_card, vehicle_codes, vehicle_name,
+                       vehicle_price y reference (o reference_select)
+
+        Returns:
+            Lista de FasecoldaCard en el orden de la página
+        """
+        cards = await page.evaluate(cls.CARDS_SCRIPT, {
+            'card': selectors['vehicle_card'],
+            'codes': selectors['vehicle_codes'],
+            'name': selectors['vehicle_name'],
+            'price': selectors['vehicle_price'],
+            'reference': selectors.get('reference') or selectors.get('reference_select')
+        })
+        for card in cards:
+            if not card['insured_value']:
+                card['insured_value'] = "No disponible"
+        return cards
@@ -2,23 +2,27 @@
 
 import os
 import asyncio
-from typing import Optional, Dict
-from playwright.async_api import async_playwright, Playwright, Browser, Page
+from typing import Optional, Dict, Tuple
+from playwright.async_api import Page
 
 from .fasecolda_service import FasecoldaService, FasecoldaReferenceNotFoundError
+from .fasecolda_api_client import FasecoldaApiClient, FasecoldaApiError, FasecoldaApiSpec
+from .fasecolda_worker import get_fasecolda_worker
+from .fasecolda_prefetch import FasecoldaCandidateCache
+from .fasecolda_resolver import FasecoldaMappingStore
 from ..config.client_config import ClientConfig
 from ..config.base_config import BaseConfig
 from ..core.logger_factory import LoggerFactory
+from ..core.har_archive import HarArchive
 
 
 class FasecoldaExtractor:
     """Extractor independiente de códigos FASECOLDA que funciona en paralelo."""
     
-    def __init__(self, headless: bool = False):
+    def __init__(self, headless: bool = False, client=None):
         self.logger = LoggerFactory.create_logger('fasecolda_extractor')
-        self.playwright: Optional[Playwright] = None
-        self.browser: Optional[Browser] = None
-        self.page: Optional[Page] = None
+        # Cliente cuyos códigos se extraen (ClientConfig o la configuración de una pestaña)
+        self.client = client or ClientConfig
         self.codes: Optional[Dict[str, str]] = None
         self._extraction_task: Optional[asyncio.Task] = None
         self.headless = headless
@@ -33,7 +37,7 @@ class FasecoldaExtractor:
         self.logger.info("🚀 Iniciando extracción de códigos FASECOLDA en paralelo...")
         
         # Verificar si Fasecolda está habilitado globalmente
-        if not ClientConfig.is_fasecolda_enabled():
+        if not self.client.is_fasecolda_enabled():
             self.logger.info("⚙️ Fasecolda deshabilitado - usando código por defecto")
             return asyncio.create_task(self._return_default_codes())
         
@@ -94,20 +98,20 @@ class FasecoldaExtractor:
         """Determina si es necesario extraer códigos FASECOLDA."""
         try:
             # Verificar configuración global de Fasecolda
-            if not ClientConfig.is_fasecolda_enabled():
+            if not self.client.is_fasecolda_enabled():
                 self.logger.info("⏭️ Búsqueda de códigos FASECOLDA deshabilitada globalmente")
                 return False
             
             # Verificar configuración general
-            if ClientConfig.VEHICLE_STATE != 'Nuevo':
-                self.logger.info(f"⏭️ Vehículo '{ClientConfig.VEHICLE_STATE}' - no requiere código FASECOLDA")
+            if self.client.VEHICLE_STATE != 'Nuevo':
+                self.logger.info(f"⏭️ Vehículo '{self.client.VEHICLE_STATE}' - no requiere código FASECOLDA")
                 return False
             
             # Verificar configuración específica de Sura
-            sura_enabled = ClientConfig.should_use_fasecolda_for_company('sura')
+            sura_enabled = self.client.should_use_fasecolda_for_company('sura')
             
             # Verificar configuración específica de Allianz
-            allianz_enabled = ClientConfig.should_use_fasecolda_for_company('allianz')
+            allianz_enabled = self.client.should_use_fasecolda_for_company('allianz')
             
             if not sura_enabled and not allianz_enabled:
                 self.logger.info("⏭️ Búsqueda automática de FASECOLDA deshabilitada para todas las compañías")
@@ -115,7 +119,7 @@ class FasecoldaExtractor:
             
             # Verificar que tengamos los datos mínimos necesarios
             required_fields = ['VEHICLE_CATEGORY', 'VEHICLE_BRAND', 'VEHICLE_REFERENCE']
-            missing_fields = [field for field in required_fields if not getattr(ClientConfig, field, None)]
+            missing_fields = [field for field in required_fields if not getattr(self.client, field, None)]
             
             if missing_fields:
                 self.logger.warning(f"⚠️ Campos faltantes para extracción FASECOLDA: {missing_fields}")
@@ -134,75 +138,148 @@ class FasecoldaExtractor:
     
     async def _return_default_codes(self) -> Dict[str, str]:
         """Retorna códigos manuales cuando Fasecolda está deshabilitado."""
-        manual_codes = ClientConfig.get_manual_fasecolda_codes()
+        manual_codes = self.client.get_manual_fasecolda_codes()
         self.logger.info(f"📋 Usando códigos Fasecolda manuales - CF: {manual_codes['cf_code']}, CH: {manual_codes['ch_code']}")
         return manual_codes
     
+    def _extract_codes_from_mappings(self) -> Optional[Dict[str, str]]:
+        """Códigos que una persona ya eligió para la misma marca, referencia y año, si existen."""
+        # En grabación/replay HAR se busca siempre para que la sesión sea reproducible
+        if HarArchive.is_active():
+            return None
+        
+        mapping = FasecoldaMappingStore.lookup(
+            self.client.VEHICLE_BRAND,
+            self.client.VEHICLE_REFERENCE,
+            self.client.VEHICLE_MODEL_YEAR,
+            self.client.VEHICLE_FULL_REFERENCE
+        )
+        if not mapping:
+            return None
+        
+        # Si el prefetch ya trae las opciones actuales y la elegida no está, la elección quedó vieja
+        candidates = FasecoldaCandidateCache.get(
+            category=self.client.VEHICLE_CATEGORY,
+            state=self.client.VEHICLE_STATE,
+            model_year=self.client.VEHICLE_MODEL_YEAR,
+            brand=self.client.VEHICLE_BRAND,
+            reference=self.client.VEHICLE_REFERENCE
+        )
+        if candidates and str(mapping['cf_code']) not in {str(c['cf_code']) for c in candidates}:
+            self.logger.warning(
+                f"⚠️ La elección aprendida CF {mapping['cf_code']} ya no aparece en FASECOLDA - se olvida y se vuelve a preguntar"
+            )
+            FasecoldaMappingStore.forget(
+                self.client.VEHICLE_BRAND,
+                self.client.VEHICLE_REFERENCE,
+                self.client.VEHICLE_MODEL_YEAR,
+                self.client.VEHICLE_FULL_REFERENCE
+            )
+            return None
+        
+        self.logger.info(f"🧠 Elección aprendida para este vehículo - CF: {mapping['cf_code']} ({mapping.get('description', '')})")
+        return {'cf_code': mapping['cf_code'], 'ch_code': mapping.get('ch_code')}
+    
+    async def _extract_codes_from_prefetch(self) -> Tuple[bool, Optional[Dict[str, str]]]:
+        """
+        Resuelve los códigos con las opciones que dejó el prefetch del editor de clientes.
+        
+        Returns:
+            (resuelto, códigos). Si resuelto es False no hay prefetch vigente para el vehículo.
+        """
+        brand = self.client.VEHICLE_BRAND
+        reference = self.client.VEHICLE_REFERENCE
+        candidates = FasecoldaCandidateCache.get(
+            category=self.client.VEHICLE_CATEGORY,
+            state=self.client.VEHICLE_STATE,
+            model_year=self.client.VEHICLE_MODEL_YEAR,
+            brand=brand,
+            reference=reference
+        )
+        if not candidates:
+            return False, None
+        
+        self.logger.info(f"📦 Usando {len(candidates)} opción(es) FASECOLDA del prefetch (sin buscar de nuevo)")
+        if len(candidates) == 1:
+            return True, {'cf_code': candidates[0]['cf_code'], 'ch_code': candidates[0]['ch_code']}
+        
+        # Reutiliza el diálogo del servicio (no usa la página)
+        helper = FasecoldaService(None, self.logger)
+        helper._current_brand = brand
+        helper._current_reference = reference
+        helper._current_full_reference = self.client.VEHICLE_FULL_REFERENCE
+        helper._current_model_year = self.client.VEHICLE_MODEL_YEAR
+        selected = await helper._show_selection_dialog(candidates, brand, reference)
+        return True, {'cf_code': selected['cf_code'], 'ch_code': selected['ch_code']} if selected else None
+    
+    async def _extract_codes_via_api(self, use_comprehensive: bool) -> Tuple[bool, Optional[Dict[str, str]]]:
+        """
+        Intenta obtener los códigos por HTTP directo (sin navegador).
+        
+        Returns:
+            (resuelto, códigos). Si resuelto es False se debe usar el navegador.
+        """
+        # En grabación/replay HAR se conserva el flujo del navegador para que sea reproducible
+        if HarArchive.is_active() or not FasecoldaApiClient.is_available():
+            return False, None
+        
+        vehicle = dict(
+            category=self.client.VEHICLE_CATEGORY,
+            state=self.client.VEHICLE_STATE,
+            model_year=self.client.VEHICLE_MODEL_YEAR,
+            brand=self.client.VEHICLE_BRAND,
+            reference=self.client.VEHICLE_REFERENCE,
+            full_reference=self.client.VEHICLE_FULL_REFERENCE
+        )
+        
+        try:
+            self.logger.info("⚡ Consultando FASECOLDA por API directo...")
+            async with FasecoldaApiClient(self.logger) as client:
+                if use_comprehensive:
+                    codes = await client.get_cf_code_comprehensive(**vehicle)
+                else:
+                    codes = await client.get_cf_code(**vehicle)
+            return True, codes
+        except FasecoldaApiError as e:
+            if e.shape_changed:
+                # El API cambió: olvidar lo aprendido; la búsqueda en navegador lo reaprende
+                FasecoldaApiSpec.invalidate()
+            self.logger.warning(f"⚠️ API de FASECOLDA no utilizable ({e}) - usando navegador")
+            return False, None
+        except Exception as e:
+            self.logger.warning(f"⚠️ Error en API de FASECOLDA ({e}) - usando navegador")
+            return False, None
+    
     async def _extract_codes_async(self) -> Optional[Dict[str, str]]:
         """Ejecuta la extracción de códigos de forma asíncrona."""
         try:
-            self.logger.info("🌐 Iniciando navegador para extracción FASECOLDA...")
-            
-            # Inicializar Playwright
-            self.playwright = await async_playwright().start()
+            # Siempre usar búsqueda comprehensiva cuando está habilitado
+            use_comprehensive = os.getenv('FASECOLDA_COMPREHENSIVE_SEARCH', 'True').lower() == 'true'
             
-            # Determinar configuración de headless
-            gui_show_browser = os.getenv('GUI_SHOW_BROWSER', 'False').lower() == 'true'
-            should_hide = not gui_show_browser  # Si GUI dice mostrar = False, ocultar = True
+            # Elección aprendida para este vehículo: no hace falta buscar
+            codes = self._extract_codes_from_mappings()
+            if codes:
+                self.codes = codes
+                return codes
             
-            # Configurar argumentos del navegador
-            browser_args = [
-                '--disable-blink-features=AutomationControlled',
-                '--disable-dev-shm-usage',
-                '--no-sandbox'
-            ]
+            # Opciones ya extraídas por el prefetch mientras se editaba el cliente
+            if use_comprehensive:
+                resolved, codes = await self._extract_codes_from_prefetch()
+                if resolved:
+                    self.codes = codes
+                    return codes
             
-            # Si debe estar oculto, usar ventana minimizada en lugar de headless
-            if should_hide:
-                browser_args.extend([
-                    '--start-minimized',
-                    '--window-position=-32000,-32000',  # Mover fuera de la pantalla
-                    '--window-size=1,1',  # Tamaño mínimo
-                    '--disable-background-timer-throttling',  # Evita que se ralenticen los timers
-                    '--disable-renderer-backgrounding',  # Evita que el renderer se pause
-                    '--disable-backgrounding-occluded-windows'  # No pausar ventanas ocultas
-                ])
-                headless_mode = False  # No usar headless real para evitar problemas
-            else:
-                headless_mode = False
+            # Camino rápido: una o dos peticiones HTTP en lugar de una sesión de navegador
+            resolved, codes = await self._extract_codes_via_api(use_comprehensive)
+            if resolved:
+                self.codes = codes
+                return codes
             
-            self.browser = await self.playwright.chromium.launch(
-                headless=headless_mode,
-                args=browser_args
+            # Búsqueda en el navegador residente (se lanza una sola vez por sesión)
+            codes = await get_fasecolda_worker().submit(
+                lambda page: self._search_on_page(page, use_comprehensive),
+                'extracción de códigos'
             )
-            self.page = await self.browser.new_page()
-            
-            # Crear servicio y extraer códigos
-            fasecolda_service = FasecoldaService(self.page, self.logger)
-            
-            # Siempre usar búsqueda comprehensiva cuando está habilitado
-            use_comprehensive = os.getenv('FASECOLDA_COMPREHENSIVE_SEARCH', 'True').lower() == 'true'
-            
-            if use_comprehensive:
-                self.logger.info("🔍 Usando búsqueda comprehensiva de Fasecolda...")
-                codes = await fasecolda_service.get_cf_code_comprehensive(
-                    category=ClientConfig.VEHICLE_CATEGORY,
-                    state=ClientConfig.VEHICLE_STATE,
-                    model_year=ClientConfig.VEHICLE_MODEL_YEAR,
-                    brand=ClientConfig.VEHICLE_BRAND,
-                    reference=ClientConfig.VEHICLE_REFERENCE,
-                    full_reference=ClientConfig.VEHICLE_FULL_REFERENCE
-                )
-            else:
-                self.logger.info("🔍 Usando búsqueda estándar de Fasecolda...")
-                codes = await fasecolda_service.get_cf_code(
-                    category=ClientConfig.VEHICLE_CATEGORY,
-                    state=ClientConfig.VEHICLE_STATE,
-                    model_year=ClientConfig.VEHICLE_MODEL_YEAR,
-                    brand=ClientConfig.VEHICLE_BRAND,
-                    reference=ClientConfig.VEHICLE_REFERENCE,
-                    full_reference=ClientConfig.VEHICLE_FULL_REFERENCE
-                )
             
             self.codes = codes
             return codes
@@ -216,33 +293,31 @@ class FasecoldaExtractor:
         except Exception as e:
             self.logger.error(f"❌ Error en extracción asíncrona FASECOLDA: {e}")
             return None
-        finally:
-            # Solo limpiar navegador, pero mantener códigos disponibles
-            await self._cleanup_browser_only()
     
-    async def _cleanup_browser_only(self):
-        """Limpia solo los recursos del navegador, manteniendo los códigos."""
-        try:
-            if self.page:
-                await self.page.close()
-                self.page = None
-            
-            if self.browser:
-                await self.browser.close()
-                self.browser = None
-            
-            if self.playwright:
-                await self.playwright.stop()
-                self.playwright = None
-                
-            self.logger.info("🧹 Navegador de extracción FASECOLDA cerrado (códigos mantenidos)")
-            
-        except Exception as e:
-            self.logger.warning(f"⚠️ Error limpiando navegador de extracción: {e}")
+    async def _search_on_page(self, page: Page, use_comprehensive: bool) -> Optional[Dict[str, str]]:
+        """Trabajo del worker residente: busca los códigos del cliente actual en la página dada."""
+        fasecolda_service = FasecoldaService(page, self.logger)
+        vehicle = dict(
+            category=self.client.VEHICLE_CATEGORY,
+            state=self.client.VEHICLE_STATE,
+            model_year=self.client.VEHICLE_MODEL_YEAR,
+            brand=self.client.VEHICLE_BRAND,
+            reference=self.client.VEHICLE_REFERENCE,
+            full_reference=self.client.VEHICLE_FULL_REFERENCE
+        )
+        
+        if use_comprehensive:
+            self.logger.info("🔍 Usando búsqueda comprehensiva de Fasecolda...")
+            return await fasecolda_service.get_cf_code_comprehensive(**vehicle)
+        
+        self.logger.info("🔍 Usando búsqueda estándar de Fasecolda...")
+        return await fasecolda_service.get_cf_code(**vehicle)
     
     async def _cleanup_extraction(self):
         """Limpia todos los recursos incluyendo códigos guardados."""
-        await self._cleanup_browser_only()
+        # Cancelar la extracción en curso: el worker residente descarta su trabajo
+        if self._extraction_task and not self._extraction_task.done():
+            self._extraction_task.cancel()
         
         # Limpiar códigos también si hay un error crítico
         self.codes = None
@@ -287,22 +362,54 @@ async def start_global_fasecolda_extraction(headless: bool = False) -> asyncio.T
     return _extraction_task
 
 
-async def get_global_fasecolda_codes(timeout: int = 30) -> Optional[Dict[str, str]]:
+async def get_global_fasecolda_codes(timeout: int = 30, client=None) -> Optional[Dict[str, str]]:
     """
     Obtiene los códigos FASECOLDA de la extracción global.
     
     Args:
         timeout: Tiempo máximo de espera en segundos
+        client: Configuración del cliente de la página; las de ClientConfig.for_client()
+                usan el extractor de resolve_client_fasecolda_codes() en lugar del global
         
     Returns:
         Diccionario con códigos CF y CH, o None si falló
     """
     global _global_extractor
     
-    if _global_extractor is None:
+    extractor = _global_extractor
+    if client is not None and client._isolated:
+        extractor = getattr(client, '_fasecolda_extractor', None)
+    if extractor is None:
         return None
     
-    return await _global_extractor.get_codes(timeout)
+    return await extractor.get_codes(timeout)
+
+
+async def resolve_client_fasecolda_codes(client, headless: bool = False) -> Optional[Dict[str, str]]:
+    """
+    Resuelve los códigos FASECOLDA de la configuración de un cliente (ClientConfig.for_client).
+    
+    Cada pestaña de la cotización multi-pestaña cotiza un vehículo distinto: el extractor queda
+    asociado a la configuración del cliente y las páginas de la pestaña lo consultan con
+    get_global_fasecolda_codes(client=...). Las búsquedas en navegador pasan por el worker
+    residente, una a la vez.
+    
+    Args:
+        client: Configuración del cliente de la pestaña
+        headless: Si ejecutar en modo headless o no
+    
+    Returns:
+        Códigos CF y CH, o None si no hacen falta o no se pudieron obtener
+        
+    Raises:
+        FasecoldaReferenceNotFoundError: Si la referencia del vehículo no existe en FASECOLDA
+    """
+    extractor = FasecoldaExtractor(headless=headless, client=client)
+    client._fasecolda_extractor = extractor
+    task = await extractor.start_extraction()
+    codes = await task
+    extractor.codes = codes if codes and codes.get('cf_code') else None
+    return codes
 
 
 async def cleanup_global_fasecolda_extractor():
@@ -0,0 +1,210 @@
+"""Prefetch especulativo de FASECOLDA mientras el usuario edita el cliente."""
+
+import os
+import json
+import asyncio
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from .fasecolda_worker import get_fasecolda_worker, shutdown_fasecolda_worker
+from ..config.base_config import BaseConfig
+from ..core.logger_factory import LoggerFactory
+from ..core.har_archive import HarArchive
+from ..core.playwright_runtime import shutdown_playwright_runtime
+
+
+class FasecoldaCandidateCache:
+    """
+    Opciones FASECOLDA ya extraídas por vehículo (categoría, estado, año, marca y referencia).
+
+    Se guarda en disco porque el prefetch corre en la GUI y la extracción puede correr
+    en otro proceso.
+    """
+
+    PATH = os.path.join(BaseConfig.CACHE_DIR, 'fasecolda_candidates.json')
+
+    @staticmethod
+    def key(category: str, state: str, model_year: str, brand: str, reference: str) -> str:
+        parts = (category, state, model_year, brand, reference)
+        return '|'.join(str(p or '').strip().lower() for p in parts)
+
+    @classmethod
+    def _load_all(cls) -> Dict[str, dict]:
+        try:
+            with open(cls.PATH, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    @classmethod
+    def get(cls, **vehicle) -> Optional[List[dict]]:
+        """Opciones vigentes del vehículo, o None si no hay prefetch utilizable."""
+        entry = cls._load_all().get(cls.key(**vehicle))
+        if not entry or not cls._is_fresh(entry):
+            return None
+        return entry.get('candidates') or None
+
+    @classmethod
+    def put(cls, candidates: List[dict], **vehicle) -> None:
+        # Se aprovecha la escritura para descartar entradas vencidas
+        data = {k: v for k, v in cls._load_all().items() if cls._is_fresh(v)}
+        data[cls.key(**vehicle)] = {
+            'fetched_at': datetime.now().isoformat(timespec='seconds'),
+            'candidates': candidates
+        }
+        try:
+            os.makedirs(os.path.dirname(cls.PATH), exist_ok=True)
+            tmp_path = f"{cls.PATH}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, cls.PATH)
+        except OSError:
+            pass
+
+    @staticmethod
+    def _is_fresh(entry: dict) -> bool:
+        try:
+            age_hours = (datetime.now() - datetime.fromisoformat(entry['fetched_at'])).total_seconds() / 3600
+        except (KeyError, TypeError, ValueError):
+            return False
+        return age_hours <= BaseConfig.FASECOLDA_CANDIDATES_TTL_HOURS
+
+
+class FasecoldaPrefetcher:
+    """
+    Resuelve en segundo plano las opciones FASECOLDA del vehículo que se está editando.
+
+    Corre su propio event loop en un hilo (la GUI es tkinter). Cada cambio de los campos
+    del vehículo reinicia la espera (debounce); si el vehículo cambia, el prefetch anterior
+    se cancela. El resultado queda en FasecoldaCandidateCache y la extracción lo usa sin
+    volver a buscar.
+    """
+
+    def __init__(self):
+        self.logger = LoggerFactory.create_logger('fasecolda_prefetch')
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._task: Optional[asyncio.Task] = None
+        self._key: Optional[str] = None
+
+    def schedule(self, category: str, state: str, model_year: str, brand: str, reference: str) -> None:
+        """
+        Programa el prefetch del vehículo (seguro de llamar desde el hilo de tkinter).
+
+        Args:
+            category, state, model_year, brand, reference: Datos del vehículo en el editor
+        """
+        vehicle = dict(category=category, state=state, model_year=model_year, brand=brand, reference=reference)
+        if not self._should_prefetch(vehicle):
+            # Vehículo incompleto: el prefetch en curso ya no corresponde
+            if self._key is not None and self._loop:
+                self._key = None
+                self._loop.call_soon_threadsafe(self._restart, None)
+            return
+
+        key = FasecoldaCandidateCache.key(**vehicle)
+        if key == self._key:
+            return
+        self._key = key
+
+        self._ensure_loop()
+        self._loop.call_soon_threadsafe(self._restart, vehicle)
+
+    def _should_prefetch(self, vehicle: dict) -> bool:
+        # Mismas condiciones que FasecoldaExtractor._should_extract_codes; en HAR no se toca la red
+        if not BaseConfig.FASECOLDA_PREFETCH or HarArchive.is_active():
+            return False
+        if str(vehicle['state']).strip().lower() != 'nuevo':
+            return False
+        if not all(str(vehicle[f]).strip() for f in ('category', 'model_year', 'brand', 'reference')):
+            return False
+        return len(str(vehicle['model_year']).strip()) == 4
+
+    def _ensure_loop(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name='fasecolda-prefetch', daemon=True)
+        self._thread.start()
+
+    def _restart(self, vehicle: Optional[dict]) -> None:
+        """Cancela el prefetch obsoleto y arranca el nuevo, si hay (en el hilo del loop)."""
+        if self._task and not self._task.done():
+            self._task.cancel()
+        self._task = self._loop.create_task(self._prefetch(vehicle)) if vehicle else None
+
+    async def _prefetch(self, vehicle: dict) -> None:
+        try:
+            # Debounce: si el usuario sigue escribiendo, esta tarea se cancela aquí
+            await asyncio.sleep(BaseConfig.FASECOLDA_PREFETCH_DEBOUNCE)
+
+            if FasecoldaCandidateCache.get(**vehicle):
+                self.logger.info(f"📦 Opciones FASECOLDA ya en cache para {vehicle['brand']} {vehicle['reference']}")
+                return
+
+            self.logger.info(f"🔮 Prefetch FASECOLDA: {vehicle['brand']} {vehicle['reference']} {vehicle['model_year']}")
+            candidates = await self._collect_via_api(vehicle)
+            if candidates is None:
+                from .fasecolda_service import FasecoldaService
+                candidates = await get_fasecolda_worker().submit(
+                    lambda page: FasecoldaService(page, self.logger).collect_candidates(**vehicle),
+                    'prefetch'
+                )
+
+            if candidates:
+                FasecoldaCandidateCache.put(candidates, **vehicle)
+                self.logger.info(f"✅ Prefetch FASECOLDA listo: {len(candidates)} opción(es) en cache")
+            else:
+                self.logger.info("ℹ️ Prefetch FASECOLDA sin resultados - la extracción buscará normalmente")
+
+        except asyncio.CancelledError:
+            self.logger.debug("Prefetch FASECOLDA cancelado (el vehículo cambió)")
+            raise
+        except Exception as e:
+            self.logger.warning(f"⚠️ Prefetch FASECOLDA falló: {e}")
+
+    async def _collect_via_api(self, vehicle: dict) -> Optional[List[dict]]:
+        """Opciones por HTTP directo, o None si hay que usar el navegador."""
+        from .fasecolda_api_client import FasecoldaApiClient
+        if not FasecoldaApiClient.is_available():
+            return None
+        try:
+            async with FasecoldaApiClient(self.logger) as client:
+                return await client.collect_candidates(**vehicle)
+        except Exception as e:
+            self.logger.debug(f"API de FASECOLDA no utilizable para prefetch: {e}")
+            return None
+
+    def shutdown(self) -> None:
+        """Cancela el prefetch en curso y cierra el navegador del hilo de prefetch."""
+        if not self._loop or not self._thread or not self._thread.is_alive():
+            return
+
+        async def _stop() -> None:
+            if self._task and not self._task.done():
+                self._task.cancel()
+            await shutdown_fasecolda_worker()
+            await shutdown_playwright_runtime()
+
+        try:
+            asyncio.run_coroutine_threadsafe(_stop(), self._loop).result(timeout=15)
+        except Exception as e:
+            self.logger.warning(f"⚠️ Error cerrando prefetch FASECOLDA: {e}")
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+        self._thread = None
+        self._key = None
+
+
+# Instancia única por proceso
+_prefetcher: Optional[FasecoldaPrefetcher] = None
+
+
+def get_fasecolda_prefetcher() -> FasecoldaPrefetcher:
+    """Obtiene (o crea) el prefetcher FASECOLDA del proceso."""
+    global _prefetcher
+
+    if _prefetcher is None:
+        _prefetcher = FasecoldaPrefetcher()
+    return _prefetcher
@@ -0,0 +1,361 @@
+"""Resolución automática de códigos FASECOLDA con puntaje de confianza y cola de revisión."""
+
+import os
+import re
+import json
+import uuid
+import unicodedata
+from datetime import datetime
+from typing import Dict, List, Optional, Any
+
+from .fasecolda_service import FasecoldaService
+from ..config.base_config import BaseConfig
+
+
+def _write_json(path: str, data: Any) -> None:
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+
+
+def _read_json(path: str, default: Any) -> Any:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+class FasecoldaChoiceHistory:
+    """
+    Elecciones hechas por personas en el diálogo, por vehículo.
+
+    Usa la misma clave que FasecoldaMappingStore: (marca, referencia, año) normalizados.
+    """
+
+    PATH = os.path.join(BaseConfig.CACHE_DIR, 'fasecolda_choices.json')
+
+    @staticmethod
+    def key(brand: str, reference: str, model_year: Any, full_reference: Optional[str] = None) -> str:
+        return FasecoldaMappingStore.key(brand, reference, model_year, full_reference)
+
+    @classmethod
+    def record(cls, brand: str, reference: str, model_year: Any, option: Dict,
+               full_reference: Optional[str] = None) -> None:
+        """Registra que una persona eligió esta opción para el vehículo."""
+        if not option or not option.get('cf_code'):
+            return
+        data = _read_json(cls.PATH, {})
+        choices = data.setdefault(cls.key(brand, reference, model_year, full_reference), {})
+        entry = choices.setdefault(str(option['cf_code']), {'count': 0})
+        entry.update({
+            'ch_code': option.get('ch_code'),
+            'description': option.get('description', ''),
+            'count': entry['count'] + 1,
+            'last_chosen_at': datetime.now().isoformat(timespec='seconds')
+        })
+        _write_json(cls.PATH, data)
+
+    @classmethod
+    def counts(cls, brand: str, reference: str, model_year: Any,
+               full_reference: Optional[str] = None) -> Dict[str, int]:
+        """Veces que se eligió cada CF para el vehículo."""
+        choices = _read_json(cls.PATH, {}).get(cls.key(brand, reference, model_year, full_reference), {})
+        return {cf: entry.get('count', 0) for cf, entry in choices.items()}
+
+
+class FasecoldaMappingStore:
+    """
+    Opción FASECOLDA que una persona eligió para un vehículo escrito de cierta forma.
+    
+    La clave es (marca, referencia, año) normalizados: sin tildes, mayúsculas, sin signos
+    ni espacios repetidos, de modo que "Mazda cx-50  Grand Touring" y "MAZDA CX 50 GRAND
+    TOURING" coinciden. Como referencia se usa la completa cuando el cliente la tiene.
+    Se consulta antes de cualquier búsqueda.
+    """
+    
+    PATH = os.path.join(BaseConfig.CACHE_DIR, 'fasecolda_mappings.json')
+    
+    # Índice en memoria; se recarga si otro proceso (GUI/automatizaciones) modificó el archivo
+    _index: Dict[str, Dict] = {}
+    _index_mtime: Optional[float] = None
+    
+    @staticmethod
+    def normalize(text: Any) -> str:
+        text = unicodedata.normalize('NFKD', str(text or ''))
+        text = ''.join(c for c in text if not unicodedata.combining(c)).upper()
+        # Conservar el punto decimal de la cilindrada (2.7) y quitar el resto de signos
+        text = re.sub(r'(?<=\d)\.(?=\d)', '#', text)
+        text = re.sub(r'[^A-Z0-9#]+', ' ', text).replace('#', '.')
+        return ' '.join(text.split())
+    
+    @classmethod
+    def key(cls, brand: str, reference: str, model_year: Any, full_reference: Optional[str] = None) -> str:
+        return '|'.join(cls.normalize(part) for part in (brand, full_reference or reference, model_year))
+    
+    @classmethod
+    def _load_index(cls) -> Dict[str, Dict]:
+        try:
+            mtime = os.path.getmtime(cls.PATH)
+        except OSError:
+            cls._index, cls._index_mtime = {}, None
+            return cls._index
+        if mtime != cls._index_mtime:
+            cls._index, cls._index_mtime = _read_json(cls.PATH, {}), mtime
+        return cls._index
+    
+    @classmethod
+    def lookup(cls, brand: str, reference: str, model_year: Any, full_reference: Optional[str] = None) -> Optional[Dict]:
+        """
+        Busca la elección aprendida para el vehículo.
+        
+        Returns:
+            {'cf_code', 'ch_code', 'description', ...} o None si nunca se eligió
+        """
+        if not BaseConfig.FASECOLDA_LEARNED_MAPPINGS:
+            return None
+        return cls._load_index().get(cls.key(brand, reference, model_year, full_reference))
+    
+    @classmethod
+    def record(cls, brand: str, reference: str, model_year: Any, option: Dict,
+               full_reference: Optional[str] = None) -> None:
+        """Guarda (o corrige) la opción elegida por una persona para el vehículo."""
+        if not option or not option.get('cf_code'):
+            return
+        data = dict(cls._load_index())
+        data[cls.key(brand, reference, model_year, full_reference)] = {
+            'cf_code': option['cf_code'],
+            'ch_code': option.get('ch_code'),
+            'description': option.get('description', ''),
+            'brand': brand,
+            'reference': full_reference or reference,
+            'model_year': model_year,
+            'chosen_at': datetime.now().isoformat(timespec='seconds')
+        }
+        _write_json(cls.PATH, data)
+        cls._index_mtime = None
+    
+    @classmethod
+    def forget(cls, brand: str, reference: str, model_year: Any, full_reference: Optional[str] = None) -> bool:
+        """Elimina una elección aprendida (p. ej. si resultó incorrecta)."""
+        data = dict(cls._load_index())
+        if data.pop(cls.key(brand, reference, model_year, full_reference), None) is None:
+            return False
+        _write_json(cls.PATH, data)
+        cls._index_mtime = None
+        return True
+    
+    @classmethod
+    def find(cls, text: str = '') -> List[Dict]:
+        """
+        Elecciones aprendidas cuyo vehículo contiene el texto (normalizado), más recientes primero.
+        
+        Cada entrada sirve tal cual para `forget(entry['brand'], entry['reference'], entry['model_year'])`.
+        """
+        needle = cls.normalize(text)
+        matches = [entry for key, entry in cls._load_index().items() if needle in key.replace('|', ' ')]
+        return sorted(matches, key=lambda entry: entry.get('chosen_at', ''), reverse=True)
+
+
+class FasecoldaReviewQueue:
+    """Decisiones tomadas sin confianza suficiente en ejecuciones desatendidas, para revisar después."""
+
+    PATH = os.path.join(BaseConfig.CACHE_DIR, 'fasecolda_review.json')
+
+    @classmethod
+    def add(cls, resolution: Dict, options: List[Dict], brand: str, reference: str,
+            full_reference: Optional[str], model_year: Optional[str]) -> str:
+        """
+        Encola una decisión para revisión.
+
+        Returns:
+            Identificador de la decisión
+        """
+        items = _read_json(cls.PATH, [])
+        decision_id = uuid.uuid4().hex[:8]
+        ranked = sorted(options, key=lambda o: o.get('adjusted_score', 0.0), reverse=True)[:10]
+        items.append({
+            'id': decision_id,
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'brand': brand,
+            'reference': reference,
+            'full_reference': full_reference,
+            'model_year': model_year,
+            'chosen': {k: resolution['option'].get(k) for k in ('cf_code', 'ch_code', 'description')},
+            'confidence': round(resolution['confidence'], 3),
+            'reasons': resolution['reasons'],
+            'options': [
+                {k: o.get(k) for k in ('cf_code', 'ch_code', 'description', 'insured_value', 'reference_group', 'adjusted_score')}
+                for o in ranked
+            ],
+            'reviewed': False
+        })
+        _write_json(cls.PATH, items)
+        return decision_id
+
+    @classmethod
+    def pending(cls) -> List[Dict]:
+        return [item for item in _read_json(cls.PATH, []) if not item.get('reviewed')]
+
+    @classmethod
+    def mark_reviewed(cls, decision_id: str, option: Optional[Dict] = None) -> None:
+        """
+        Cierra una decisión. Si se indica la opción correcta, se registra como elección humana.
+
+        Args:
+            decision_id: Identificador de la decisión
+            option: Opción confirmada o corregida por la persona (None = descartar sin registrar)
+        """
+        items = _read_json(cls.PATH, [])
+        for item in items:
+            if item['id'] == decision_id:
+                item['reviewed'] = True
+                item['reviewed_at'] = datetime.now().isoformat(timespec='seconds')
+                if option:
+                    item['final'] = {k: option.get(k) for k in ('cf_code', 'ch_code', 'description')}
+                    FasecoldaChoiceHistory.record(
+                        item['brand'], item['reference'], item.get('model_year'), option, item.get('full_reference')
+                    )
+                    FasecoldaMappingStore.record(
+                        item['brand'], item['reference'], item.get('model_year'), option, item.get('full_reference')
+                    )
+        _write_json(cls.PATH, items)
+
+
+class FasecoldaAutoResolver:
+    """
+    Elige de forma determinista entre varias opciones FASECOLDA y estima qué tan segura es la elección.
+
+    Señales por opción (sobre el score de similitud del servicio):
+        - cilindrada, transmisión y tracción contra la referencia completa
+        - año del modelo mencionado en la descripción
+        - elecciones humanas previas para el mismo vehículo (marca, referencia y año)
+    La confianza combina el score ajustado de la mejor opción con su margen sobre la
+    segunda; si ambas comparten el código CH el empate no resta confianza.
+    """
+
+    TRANSMISSIONS = {'AT', 'MT', 'TP', 'TM', 'CVT', 'AMT', 'DSG'}
+    TRACTIONS = {'4X2', '4X4', 'AWD'}
+    # Margen sobre la segunda opción a partir del cual no se penaliza la confianza
+    FULL_MARGIN = 0.2
+    # Confianza mínima cuando la opción ya fue elegida antes por una persona
+    HISTORY_CONFIDENCE = 0.95
+
+    _scorer = FasecoldaService(None)
+
+    @classmethod
+    def min_confidence(cls) -> float:
+        return BaseConfig.FASECOLDA_MIN_CONFIDENCE
+
+    @classmethod
+    def is_enabled(cls) -> bool:
+        return cls.min_confidence() > 0
+
+    @classmethod
+    def is_unattended(cls) -> bool:
+        return BaseConfig.FASECOLDA_UNATTENDED
+
+    @classmethod
+    def resolve(
+        cls,
+        options: List[Dict],
+        brand: str,
+        reference: str,
+        full_reference: Optional[str] = None,
+        model_year: Optional[str] = None
+    ) -> Optional[Dict]:
+        """
+        Elige la mejor opción.
+
+        Args:
+            options: Opciones (cf_code, ch_code, description, ...); se les agrega 'adjusted_score'
+            brand, reference: Marca y referencia buscadas
+            full_reference: Referencia completa del cliente (la señal más fuerte)
+            model_year: Año del modelo
+
+        Returns:
+            {'option', 'cf_code', 'ch_code', 'confidence', 'reasons'} o None si no hay opciones
+        """
+        options = [o for o in options if o.get('cf_code')]
+        if not options:
+            return None
+
+        target = FasecoldaMappingStore.normalize(full_reference or reference)
+        history = FasecoldaChoiceHistory.counts(brand, reference, model_year, full_reference)
+        total_choices = sum(history.values())
+
+        for option in options:
+            option['adjusted_score'] = cls._adjusted_score(option, target, model_year, history, total_choices)
+
+        ranked = sorted(options, key=lambda o: (-o['adjusted_score'], str(o['cf_code'])))
+        best = ranked[0]
+        reasons = [f"score {best['adjusted_score']:.2f}"]
+
+        if len(ranked) == 1:
+            confidence = max(best['adjusted_score'], 0.9)
+        else:
+            runner_up = ranked[1]
+            margin = best['adjusted_score'] - runner_up['adjusted_score']
+            if best.get('ch_code') and best.get('ch_code') == runner_up.get('ch_code'):
+                margin = max(margin, cls.FULL_MARGIN)
+                reasons.append(f"CH {best['ch_code']} compartido con la segunda opción")
+            reasons.append(f"margen {margin:.2f}")
+            confidence = best['adjusted_score'] * min(1.0, 0.5 + margin / (2 * cls.FULL_MARGIN))
+
+        if history.get(str(best['cf_code'])):
+            confidence = max(confidence, cls.HISTORY_CONFIDENCE)
+            reasons.append(f"elegida antes {history[str(best['cf_code'])]} vez/veces")
+
+        return {
+            'option': best,
+            'cf_code': best['cf_code'],
+            'ch_code': best.get('ch_code'),
+            'confidence': round(min(1.0, confidence), 3),
+            'reasons': reasons
+        }
+
+    @classmethod
+    def _adjusted_score(cls, option: Dict, target: str, model_year: Optional[str],
+                        history: Dict[str, int], total_choices: int) -> float:
+        description = FasecoldaMappingStore.normalize(option.get('description'))
+        score = option.get('score')
+        if score is None:
+            score = cls._scorer._calculate_similarity_score(target, description)
+
+        # Cilindrada: la diferencia casi siempre indica otra versión
+        target_cc, option_cc = cls._displacement(target), cls._displacement(description)
+        if target_cc and option_cc:
+            score += 0.1 if abs(target_cc - option_cc) < 100 else -0.3
+
+        for group, penalty in ((cls.TRANSMISSIONS, 0.15), (cls.TRACTIONS, 0.15)):
+            target_tokens = group & set(target.split())
+            option_tokens = group & set(description.split())
+            if target_tokens and option_tokens:
+                score += 0.05 if target_tokens & option_tokens else -penalty
+
+        # Año del modelo mencionado explícitamente en la descripción o el grupo
+        if model_year:
+            years = set(re.findall(r'\b(?:19|20)\d{2}\b', f"{description} {option.get('reference_group', '')}"))
+            if years:
+                score += 0.05 if str(model_year) in years else -0.2
+
+        chosen = history.get(str(option['cf_code']), 0)
+        if chosen and total_choices:
+            score += 0.3 * chosen / total_choices
+
+        return max(0.0, min(1.0, score))
+
+    @staticmethod
+    def _displacement(text: str) -> Optional[int]:
+        match = re.search(r'\b(\d{3,4})\s*CC\b', text)
+        if match:
+            return int(match.group(1))
+        match = re.search(r'\b(\d\.\d)\s*L\b', text)
+        if match:
+            return int(float(match.group(1)) * 1000)
+        return None
@@ -1,12 +1,16 @@
 """Módulo para automatización de consultas en Fasecolda."""
 
+import os
+import time
 import asyncio
 import logging
 import tkinter as tk
 from tkinter import messagebox
-from typing import Optional
-from playwright.async_api import Page
+from typing import Any, Optional, Callable, List
+from playwright.async_api import Page, TimeoutError as PlaywrightTimeout
+from .fasecolda_cards import FasecoldaCard, FasecoldaCardExtractor
 from ..shared.global_pause_coordinator import request_pause_for_fasecolda_selection
+from ..core.adaptive_timeouts import AdaptiveTimeouts
 
 
 class FasecoldaReferenceNotFoundError(Exception):
@@ -36,6 +40,7 @@ SELECTORS = {
     'vehicle_price': 'p.text-gray-700.text-base.font-bold.mt-1'
 }
 
+# page_load y field_enable son los valores de partida: AdaptiveTimeouts los ajusta con las latencias observadas
 TIMEOUTS = {
     'page_load': 10000,    # Reducido para detección más rápida
     'field_enable': 5000,  # Tiempo para que se habiliten los campos
@@ -45,6 +50,10 @@ TIMEOUTS = {
 }
 
 SCORE_THRESHOLD = 0.3
+# Pestañas simultáneas para la búsqueda comprehensiva (1 = secuencial)
+SEARCH_CONCURRENCY = max(1, int(os.getenv('FASECOLDA_SEARCH_TABS', '3')))
+# Score de similitud desde el cual se elige la mejor opción sin preguntar (0 = siempre preguntar)
+AUTO_ACCEPT_SCORE = float(os.getenv('FASECOLDA_AUTO_ACCEPT_SCORE', '0'))
 SLEEP_DURATION = 1  # seconds
 
 # Marcas disponibles en Fasecolda (extraídas del select)
@@ -86,6 +95,32 @@ class FasecoldaService:
         # Rastrear búsqueda actual para manejo de errores
         self._current_brand = None
         self._current_reference = None
+        self._current_full_reference = None
+        self._current_model_year = None
+        # Diálogo abierto que recibe resultados en vivo de la búsqueda comprehensiva
+        self._live_dialog = None
+        # Aprende los endpoints JSON del SPA mientras no haya un API utilizable (FasecoldaApiClient)
+        self._api_learner = None
+        self._current_state = None
+    
+    async def _adaptive_wait(self, operation: str, default_ms: int, wait: Callable[[int], Any]) -> Any:
+        """
+        Ejecuta una espera con el timeout aprendido para la operación y registra cuánto tardó.
+
+        Args:
+            operation: Operación de FASECOLDA (p. ej. 'carga_pagina')
+            default_ms: Timeout fijo mientras no haya historial
+            wait: Recibe el timeout en ms y devuelve la espera de Playwright
+        """
+        timeout = AdaptiveTimeouts.timeout_ms('fasecolda', operation, default_ms)
+        started = time.perf_counter()
+        try:
+            result = await wait(timeout)
+        except PlaywrightTimeout:
+            AdaptiveTimeouts.observe_timeout('fasecolda', operation, timeout, default_ms)
+            raise
+        AdaptiveTimeouts.observe('fasecolda', operation, time.perf_counter() - started)
+        return result
         
     async def get_cf_code_comprehensive(
         self,
@@ -114,8 +149,12 @@ class FasecoldaService:
             # Rastrear búsqueda actual
             self._current_brand = brand
             self._current_reference = reference
+            self._current_full_reference = full_reference
+            self._current_model_year = model_year
+            self._current_state = state
+            self._start_api_learning()
             
-            await self._navigate_to_fasecolda()
+            await self._ensure_search_form()
             
             # Llenar formulario hasta la marca
             if not await self._fill_vehicle_form_to_brand(category, state, model_year, brand):
@@ -130,17 +169,34 @@ class FasecoldaService:
                 self._show_reference_not_found_popup(brand, reference, "No se encontraron referencias para la marca especificada")
                 raise FasecoldaReferenceNotFoundError(brand, reference)
             
-            # Buscar exhaustivamente en cada referencia
-            all_options = await self._search_all_references(all_references, category, state, model_year, brand)
-            
-            if not all_options:
+            # Buscar exhaustivamente en cada referencia; los resultados se muestran a medida que llegan
+            streamed_options = []
+            first_results = asyncio.Event()
+            
+            def on_results(new_options: list) -> None:
+                self._score_options(new_options)
+                streamed_options.extend(new_options)
+                if self._live_dialog:
+                    self._live_dialog.add_options(new_options)
+                first_results.set()
+            
+            search_task = asyncio.create_task(
+                self._search_all_references(all_references, category, state, model_year, brand, on_results)
+            )
+            first_results_task = asyncio.create_task(first_results.wait())
+            await asyncio.wait([search_task, first_results_task], return_when=asyncio.FIRST_COMPLETED)
+            first_results_task.cancel()
+            
+            if not streamed_options:
+                await search_task  # Propaga errores de la búsqueda
                 self.logger.error("❌ No se encontraron vehículos en ninguna referencia")
                 # Mostrar popup informativo y lanzar excepción
                 self._show_reference_not_found_popup(brand, reference, "No se encontraron vehículos en ninguna referencia")
                 raise FasecoldaReferenceNotFoundError(brand, reference)
             
-            # Mostrar diálogo de selección y obtener la opción elegida
-            selected_option = await self._show_selection_dialog(all_options, brand, reference)
+            # Mostrar diálogo de selección (se sigue llenando mientras la búsqueda continúa)
+            selected_option = await self._show_selection_dialog(streamed_options, brand, reference, search_task)
+            await self._finish_api_learning(streamed_options)
             
             if selected_option:
                 return {
@@ -158,6 +214,37 @@ class FasecoldaService:
             self.logger.error(f"❌ Error en búsqueda exhaustiva de código Fasecolda: {e}")
             return None
 
+    async def collect_candidates(
+        self,
+        category: str,
+        state: str,
+        model_year: str,
+        brand: str,
+        reference: str
+    ) -> list:
+        """
+        Recorre todas las referencias de la marca y retorna las opciones sin mostrar diálogos.
+        
+        Lo usa el prefetch del editor de clientes: la elección (o la resolución automática)
+        se hace después, sobre las opciones ya extraídas.
+        
+        Returns:
+            Opciones únicas numeradas (mismo formato que la búsqueda comprehensiva); vacía si no hay
+        """
+        self._current_brand = brand
+        self._current_reference = reference
+        self._current_state = state
+        
+        await self._ensure_search_form()
+        if not await self._fill_vehicle_form_to_brand(category, state, model_year, brand):
+            return []
+        
+        all_references = await self._get_all_references_for_brand(reference)
+        if not all_references:
+            return []
+        
+        return await self._search_all_references(all_references, category, state, model_year, brand)
+
     async def get_cf_code(
         self,
         category: str,
@@ -186,8 +273,12 @@ class FasecoldaService:
             # Rastrear búsqueda actual
             self._current_brand = brand
             self._current_reference = reference
+            self._current_full_reference = full_reference
+            self._current_model_year = model_year
+            self._current_state = state
+            self._start_api_learning()
             
-            await self._navigate_to_fasecolda()
+            await self._ensure_search_form()
             
             if not await self._fill_vehicle_form(category, state, model_year, brand, reference):
                 return None
@@ -195,7 +286,9 @@ class FasecoldaService:
             if not await self._search_vehicle():
                 return None
                 
-            return await self._extract_codes(full_reference)
+            codes = await self._extract_codes(full_reference)
+            await self._finish_api_learning([codes] if codes else [])
+            return codes
             
         except FasecoldaReferenceNotFoundError:
             # Re-lanzar la excepción específica para que se propague correctamente
@@ -205,6 +298,16 @@ class FasecoldaService:
             self.logger.error(f"❌ Error obteniendo códigos CF/CH: {e}")
             return None
     
+    async def _ensure_search_form(self):
+        """Deja la página en el formulario de búsqueda, reutilizándolo si ya está cargado (sin recargar)."""
+        try:
+            if await self.page.query_selector(SELECTORS['category']):
+                self.logger.info("♻️ Formulario de búsqueda ya cargado - se reutiliza")
+                return
+        except Exception:
+            pass
+        await self._navigate_to_fasecolda()
+    
     async def _navigate_to_fasecolda(self):
         """Navega a la página de Fasecolda con reintentos y accede a búsqueda básica."""
         self.logger.info("🌐 Navegando a Fasecolda...")
@@ -213,8 +316,10 @@ class FasecoldaService:
             try:
                 self.logger.info(f"🔄 Intento {attempt}/{TIMEOUTS['max_retries']} - Navegando a Fasecolda...")
                 
-                await self.page.goto(FASECOLDA_URL, timeout=TIMEOUTS['page_load'])
-                await self.page.wait_for_load_state('networkidle', timeout=TIMEOUTS['page_load'])
+                await self._adaptive_wait('carga_pagina', TIMEOUTS['page_load'],
+                                          lambda t: self.page.goto(FASECOLDA_URL, timeout=t))
+                await self._adaptive_wait('red_inactiva', TIMEOUTS['page_load'],
+                                          lambda t: self.page.wait_for_load_state('networkidle', timeout=t))
                 await asyncio.sleep(1)
                 
                 # Hacer clic en "Búsqueda básica"
@@ -226,11 +331,13 @@ class FasecoldaService:
                 self.logger.info("✅ Clic en búsqueda básica realizado")
                 
                 # Esperar navegación
-                await self.page.wait_for_load_state('networkidle', timeout=TIMEOUTS['page_load'])
+                await self._adaptive_wait('busqueda_basica', TIMEOUTS['page_load'],
+                                          lambda t: self.page.wait_for_load_state('networkidle', timeout=t))
                 await asyncio.sleep(1)
                 
                 # Verificar que el formulario cargó correctamente buscando el selector de categoría
-                await self.page.wait_for_selector(SELECTORS['category'], timeout=10000)
+                await self._adaptive_wait('formulario', 10000,
+                                          lambda t: self.page.wait_for_selector(SELECTORS['category'], timeout=t))
                 
                 self.logger.info("✅ Formulario de búsqueda básica cargado correctamente")
                 return
@@ -332,37 +439,53 @@ class FasecoldaService:
                 }
             """, SELECTORS['reference'])
             
-            if not options:
-                return None
-            
-            # Normalizar el texto de búsqueda
-            ref_lower = reference.lower()
-            
-            # Buscar coincidencia exacta primero
-            for opt in options:
-                if opt['text'].lower() == ref_lower:
-                    return opt['value']
-            
-            # Buscar coincidencia parcial (contiene)
-            for opt in options:
-                if ref_lower in opt['text'].lower():
-                    return opt['value']
-            
-            # Si no se encuentra, retornar la primera opción
-            self.logger.warning(f"⚠️ No se encontró coincidencia para '{reference}', usando primera opción")
-            return options[0]['value'] if options else None
+            return self._pick_reference(options, reference, self.logger)
             
         except Exception as e:
             self.logger.error(f"❌ Error buscando referencia: {e}")
             return None
     
+    @staticmethod
+    def _pick_reference(options: list, reference: str, logger: logging.Logger = None) -> Optional[str]:
+        """
+        Elige la opción de referencia: coincidencia exacta, luego parcial, luego la primera.
+        
+        Args:
+            options: Opciones del select ({'value', 'text'})
+            reference: Texto de referencia a buscar
+            logger: Logger para advertir cuando se usa la primera opción
+            
+        Returns:
+            Value de la opción elegida, o None si no hay opciones
+        """
+        if not options:
+            return None
+        
+        # Normalizar el texto de búsqueda
+        ref_lower = reference.lower()
+        
+        # Buscar coincidencia exacta primero
+        for opt in options:
+            if opt['text'].lower() == ref_lower:
+                return opt['value']
+        
+        # Buscar coincidencia parcial (contiene)
+        for opt in options:
+            if ref_lower in opt['text'].lower():
+                return opt['value']
+        
+        # Si no se encuentra, retornar la primera opción
+        if logger:
+            logger.warning(f"⚠️ No se encontró coincidencia para '{reference}', usando primera opción")
+        return options[0]['value']
+    
     async def _select_field_with_retry(self, selector: str, value: str, field_name: str) -> bool:
         """Selecciona un campo con reintentos."""
         self.logger.info(f"🔽 Seleccionando {field_name}: {value}")
         
         try:
             # Esperar a que el campo esté habilitado
-            await self._wait_for_field_enabled(selector)
+            await self._wait_for_field_enabled(selector, field_name=field_name)
             
             # Obtener el valor para el select
             field_value = await self._get_select_value(selector, value, field_name)
@@ -480,9 +603,9 @@ class FasecoldaService:
             self.logger.error(f"❌ Error buscando valor en {field_type}: {e}")
             return None
     
-    async def _wait_for_field_enabled(self, selector: str, timeout: int = None):
-        """Espera a que un campo se habilite con manejo de errores mejorado y reintentos."""
-        timeout = timeout or TIMEOUTS['field_enable']
+    async def _wait_for_field_enabled(self, selector: str, timeout: int = None, field_name: str = None):
+        """Espera a que un campo se habilite con manejo de errores mejorado y reintentos (aprende el timeout por `field_name`)."""
+        script = f"() => {{ const el = document.querySelector('{selector}'); return el && !el.disabled; }}"
         
         for attempt in range(1, 4):  # 3 intentos máximo para campos
             try:
@@ -491,11 +614,12 @@ class FasecoldaService:
                 # Primero verificar si el elemento existe
                 await self.page.wait_for_selector(selector, timeout=3000)
                 
-                # Luego esperar a que se habilite
-                await self.page.wait_for_function(
-                    f"() => {{ const el = document.querySelector('{selector}'); return el && !el.disabled; }}",
-                    timeout=timeout
-                )
+                # Luego esperar a que se habilite (sin timeout explícito, el aprendido para el campo)
+                if timeout or not field_name:
+                    await self.page.wait_for_function(script, timeout=timeout or TIMEOUTS['field_enable'])
+                else:
+                    await self._adaptive_wait(f"habilitar:{field_name}", TIMEOUTS['field_enable'],
+                                              lambda t: self.page.wait_for_function(script, timeout=t))
                 self.logger.debug(f"✅ Campo {selector} habilitado")
                 return
                 
@@ -535,6 +659,8 @@ class FasecoldaService:
         """Hace clic en el botón de búsqueda."""
         self.logger.info("🔍 Iniciando búsqueda...")
         try:
+            if self._api_learner:
+                await self._api_learner.note_search(self._current_state)
             await self.page.click(SELECTORS['search_button'])
             await self.page.wait_for_load_state('networkidle')
             self.logger.info("✅ Búsqueda completada")
@@ -551,12 +677,12 @@ class FasecoldaService:
             # Esperar a que aparezcan las tarjetas de vehículos
             await asyncio.sleep(2)  # Dar tiempo para que carguen los resultados
             
-            # Buscar todas las tarjetas de vehículos
-            vehicle_cards = await self.page.query_selector_all(SELECTORS['vehicle_card'])
+            # Leer todas las tarjetas de vehículos en un solo evaluate
+            cards = await FasecoldaCardExtractor.extract(self.page, SELECTORS)
             
-            self.logger.info(f"📋 Encontradas {len(vehicle_cards)} tarjetas de vehículos")
+            self.logger.info(f"📋 Encontradas {len(cards)} tarjetas de vehículos")
             
-            if len(vehicle_cards) == 0:
+            if len(cards) == 0:
                 self.logger.error("❌ No se encontraron resultados")
                 # Mostrar popup y lanzar excepción
                 brand = self._current_brand or 'Desconocida'
@@ -564,113 +690,69 @@ class FasecoldaService:
                 self._show_reference_not_found_popup(brand, reference, "No se encontraron resultados para la búsqueda")
                 raise FasecoldaReferenceNotFoundError(brand, reference)
             
-            if len(vehicle_cards) == 1:
+            if len(cards) == 1:
                 # Solo un resultado, extraer ambos códigos directamente
-                codes = await self._extract_codes_from_card(vehicle_cards[0])
+                codes = {'cf_code': cards[0]['cf_code'], 'ch_code': cards[0]['ch_code']}
                 ch_info = f" - CH: {codes['ch_code']}" if codes['ch_code'] else ""
                 self.logger.info(f"✅ Un solo resultado encontrado - CF: {codes['cf_code']}{ch_info}")
                 return codes
             
             # Múltiples resultados, procesar y encontrar la mejor coincidencia
-            return await self._process_multiple_codes_results_new(vehicle_cards, full_reference)
+            return await self._process_multiple_codes_results_new(cards, full_reference)
                 
         except Exception as e:
             self.logger.error(f"❌ Error extrayendo códigos CF/CH: {e}")
             return None
     
-    async def _extract_codes_from_card(self, card_element) -> dict:
-        """Extrae códigos CF y CH de una tarjeta de vehículo de la nueva estructura."""
-        try:
-            import re
-            
-            # Extraer códigos CF y CH del elemento de códigos
-            codes_element = await card_element.query_selector(SELECTORS['vehicle_codes'])
-            if not codes_element:
-                return {'cf_code': None, 'ch_code': None}
-            
-            codes_text = await codes_element.text_content()
-            codes_text = codes_text.strip()
-            
-            # Extraer CF y CH con regex
-            # Formato esperado: "CF - 03033048 CH - 03001135"
-            cf_match = re.search(r'CF\s*-\s*(\d+)', codes_text)
-            ch_match = re.search(r'CH\s*-\s*(\d+)', codes_text)
-            
-            cf_code = cf_match.group(1) if cf_match else None
-            ch_code = ch_match.group(1) if ch_match else cf_code
-            
-            return {
-                'cf_code': cf_code,
-                'ch_code': ch_code
-            }
-        except Exception as e:
-            self.logger.warning(f"⚠️ Error extrayendo códigos de tarjeta: {e}")
-            return {'cf_code': None, 'ch_code': None}
-    
-    async def _extract_result_data_from_card(self, card_element, index: int, full_reference: str = None) -> dict:
-        """Extrae toda la información de una tarjeta de vehículo."""
-        try:
-            import re
-            
-            # Extraer códigos CF y CH
-            codes = await self._extract_codes_from_card(card_element)
-            cf_code = codes['cf_code']
-            ch_code = codes['ch_code']
-            
-            # Extraer nombre del vehículo
-            name_element = await card_element.query_selector(SELECTORS['vehicle_name'])
-            vehicle_name = await name_element.text_content() if name_element else ""
-            vehicle_name = vehicle_name.strip()
-            
-            # Extraer precio
-            price_element = await card_element.query_selector(SELECTORS['vehicle_price'])
-            insured_value = await price_element.text_content() if price_element else "No disponible"
-            insured_value = insured_value.strip()
-            
-            # Calcular score de similitud si tenemos referencia de configuración
-            score = 0
-            if full_reference:
-                score = self._calculate_similarity_score(full_reference, vehicle_name)
-            
-            return {
-                'index': index + 1,
-                'cf_code': cf_code,
-                'ch_code': ch_code,
-                'full_reference': vehicle_name,
-                'insured_value': insured_value,
-                'score': score
-            }
-            
-        except Exception as e:
-            self.logger.warning(f"⚠️ Error procesando tarjeta {index + 1}: {e}")
-            return None
+    def _result_data_from_card(self, card: FasecoldaCard, full_reference: str = None) -> dict:
+        """Convierte una tarjeta extraída al formato de resultado con score de similitud."""
+        # Calcular score de similitud si tenemos referencia de configuración
+        score = 0
+        if full_reference:
+            score = self._calculate_similarity_score(full_reference, card['description'])
+        
+        return {
+            'index': card['index'],
+            'cf_code': card['cf_code'],
+            'ch_code': card['ch_code'],
+            'full_reference': card['description'],
+            'insured_value': card['insured_value'],
+            'score': score
+        }
     
-    async def _process_multiple_codes_results_new(self, vehicle_cards, full_reference: str = None) -> Optional[dict]:
+    async def _process_multiple_codes_results_new(self, cards: List[FasecoldaCard], full_reference: str = None) -> Optional[dict]:
         """Procesa múltiples tarjetas de vehículos con opción de selección manual."""
         self.logger.info(f"🔍 Múltiples resultados, analizando similitudes...")
         
-        # Extraer datos de todas las tarjetas
+        # Convertir todas las tarjetas (ya extraídas, sin más llamadas al navegador)
         all_results = []
         best_match = None
         best_score = -1
         
-        for i, card in enumerate(vehicle_cards):
-            result_data = await self._extract_result_data_from_card(card, i, full_reference)
-            
-            if result_data:
-                all_results.append(result_data)
-                ch_info = f" - CH: {result_data['ch_code']}" if result_data['ch_code'] else ""
-                value_info = f" - Valor: {result_data['insured_value']}" if result_data.get('insured_value') else ""
-                self.logger.info(f"📝 Resultado {result_data['index']}: CF: {result_data['cf_code']}{ch_info}{value_info} - {result_data['full_reference']} (Score: {result_data['score']:.2f})")
-                
-                # Verificar si es la mejor coincidencia hasta ahora
-                if result_data['score'] > best_score:
-                    best_score = result_data['score']
-                    best_match = result_data
+        for card in cards:
+            result_data = self._result_data_from_card(card, full_reference)
+            all_results.append(result_data)
+            ch_info = f" - CH: {result_data['ch_code']}" if result_data['ch_code'] else ""
+            value_info = f" - Valor: {result_data['insured_value']}" if result_data.get('insured_value') else ""
+            self.logger.info(f"📝 Resultado {result_data['index']}: CF: {result_data['cf_code']}{ch_info}{value_info} - {result_data['full_reference']} (Score: {result_data['score']:.2f})")
+            
+            # Verificar si es la mejor coincidencia hasta ahora
+            if result_data['score'] > best_score:
+                best_score = result_data['score']
+                best_match = result_data
         
         # Si hay múltiples resultados, permitir selección manual
         if len(all_results) > 1:
-            return await self._show_selection_dialog(all_results, self._current_brand, self._current_reference)
+            options = [{
+                'option_number': result['index'],
+                'cf_code': result['cf_code'],
+                'ch_code': result['ch_code'],
+                'description': result['full_reference'],
+                'insured_value': result['insured_value'],
+                'reference_group': cards[0]['reference'] or self._current_reference or '',
+                'score': result['score']
+            } for result in all_results]
+            return await self._show_selection_dialog(options, self._current_brand, self._current_reference)
         elif all_results:
             return {
                 'cf_code': all_results[0]['cf_code'],
@@ -943,90 +1025,118 @@ class FasecoldaService:
             self.logger.error(f"❌ Error obteniendo referencias: {e}")
             return []
 
-    async def _search_all_references(self, references: list, category: str, state: str, model_year: str, brand: str) -> list:
-        """Busca exhaustivamente en todas las referencias y recopila todos los resultados."""
-        all_options = []
-        option_counter = 1
+    async def _search_all_references(
+        self,
+        references: list,
+        category: str,
+        state: str,
+        model_year: str,
+        brand: str,
+        on_results: Optional[Callable[[list], None]] = None
+    ) -> list:
+        """
+        Busca exhaustivamente en todas las referencias repartiéndolas entre varias pestañas.
         
-        self.logger.info(f"🔍 Iniciando búsqueda comprensiva en {len(references)} referencias")
+        La pestaña actual arranca de inmediato; las adicionales (hasta SEARCH_CONCURRENCY)
+        se abren en el mismo contexto y llenan su propio formulario hasta la marca.
         
-        for ref_index, reference in enumerate(references):
-            self.logger.info(f"🎯 Procesando referencia {ref_index + 1}/{len(references)}: {reference['text']}")
+        Args:
+            references: Referencias a consultar ({'text', 'value'})
+            category, state, model_year, brand: Datos del formulario hasta la marca
+            on_results: Callback con cada lote de resultados nuevos (para mostrarlos en vivo)
             
-            try:
-                # Seleccionar esta referencia
-                await self.page.select_option(SELECTORS['reference'], value=reference['value'])
-                await asyncio.sleep(0.5)
-                
-                # Hacer clic en buscar
-                self.logger.info(f"🔍 Ejecutando búsqueda para: {reference['text']}")
-                await self.page.click(SELECTORS['search_button'])
-                await asyncio.sleep(2)  # Esperar a que carguen los resultados
-                
-                # Buscar tarjetas de vehículos
-                vehicle_cards = await self.page.query_selector_all(SELECTORS['vehicle_card'])
-                
-                if vehicle_cards:
-                    self.logger.info(f"✅ Encontradas {len(vehicle_cards)} tarjeta(s) en: {reference['text']}")
-                    
-                    # Procesar cada tarjeta
-                    reference_results = []
-                    for card_index, card in enumerate(vehicle_cards):
-                        result_data = await self._extract_complete_result_data_from_card(card, option_counter, reference['text'])
-                        if result_data and self._is_valid_unique_result(result_data, all_options):
-                            reference_results.append(result_data)
-                            all_options.append(result_data)
-                            option_counter += 1
-                            self.logger.info(f"📊 Resultado {card_index + 1}: CF={result_data['cf_code']}, CH={result_data['ch_code']}")
-                    
-                    self.logger.info(f"🎯 Agregados {len(reference_results)} resultados únicos de la referencia: {reference['text']}")
-                else:
-                    self.logger.warning(f"⚠️ No se encontraron tarjetas de vehículos para: {reference['text']}")
+        Returns:
+            Lista de opciones únicas, numeradas en orden de llegada
+        """
+        all_options = []
+        pending = asyncio.Queue()
+        for ref_index, reference in enumerate(references):
+            pending.put_nowait((ref_index, reference))
+        
+        pool_size = max(1, min(SEARCH_CONCURRENCY, len(references)))
+        self.logger.info(f"🔍 Iniciando búsqueda comprensiva en {len(references)} referencias ({pool_size} pestaña(s))")
+        
+        def merge_results(reference: dict, results: list) -> None:
+            added = []
+            for result_data in results:
+                if self._is_valid_unique_result(result_data, all_options):
+                    result_data['option_number'] = len(all_options) + 1
+                    all_options.append(result_data)
+                    added.append(result_data)
+                    self.logger.info(f"📊 Resultado {result_data['option_number']}: CF={result_data['cf_code']}, CH={result_data['ch_code']}")
+            
+            self.logger.info(f"🎯 Agregados {len(added)} resultados únicos de la referencia: {reference['text']}")
+            if added and on_results:
+                on_results(added)
+        
+        async def search_worker(service: 'FasecoldaService') -> None:
+            while True:
+                try:
+                    ref_index, reference = pending.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
                 
+                self.logger.info(f"🎯 Procesando referencia {ref_index + 1}/{len(references)}: {reference['text']}")
+                try:
+                    # Cada pestaña conserva su propio formulario; restaurarlo si se reinició
+                    await service._restore_form_state(category, state, model_year, brand)
+                    merge_results(reference, await service._search_reference(reference))
+                except Exception as e:
+                    self.logger.error(f"❌ Error buscando en referencia {reference['text']}: {e}")
+        
+        async def extra_tab_worker() -> None:
+            tab = await self.page.context.new_page()
+            try:
+                service = FasecoldaService(tab, self.logger)
+                await service._navigate_to_fasecolda()
+                if pending.empty():
+                    return
+                if await service._fill_vehicle_form_to_brand(category, state, model_year, brand):
+                    await search_worker(service)
             except Exception as e:
-                self.logger.error(f"❌ Error buscando en referencia {reference['text']}: {e}")
-                continue
+                self.logger.warning(f"⚠️ Pestaña adicional de búsqueda no disponible: {e}")
+            finally:
+                try:
+                    await tab.close()
+                except Exception:
+                    pass
+        
+        workers = [search_worker(self)] + [extra_tab_worker() for _ in range(pool_size - 1)]
+        await asyncio.gather(*workers)
         
         self.logger.info(f"🎉 Búsqueda comprensiva completada: {len(all_options)} opciones únicas encontradas")
         return all_options
 
-    async def _extract_complete_result_data_from_card(self, card_element, option_number: int, reference_group: str) -> dict:
-        """Extrae datos completos de una tarjeta de vehículo."""
-        try:
-            import re
-            
-            # Extraer códigos CF y CH
-            codes = await self._extract_codes_from_card(card_element)
-            cf_code = codes['cf_code']
-            ch_code = codes['ch_code']
-            
-            # Extraer nombre del vehículo (descripción completa)
-            name_element = await card_element.query_selector(SELECTORS['vehicle_name'])
-            full_description = await name_element.text_content() if name_element else ""
-            full_description = full_description.strip()
-            
-            # Extraer valor asegurado (precio)
-            insured_value = "No disponible"
-            try:
-                price_element = await card_element.query_selector(SELECTORS['vehicle_price'])
-                if price_element:
-                    insured_value = await price_element.text_content()
-                    insured_value = insured_value.strip()
-            except:
-                pass
-            
-            return {
-                'option_number': option_number,
-                'cf_code': cf_code,
-                'ch_code': ch_code,
-                'description': full_description,
-                'insured_value': insured_value,
-                'reference_group': reference_group
-            }
-            
-        except Exception as e:
-            self.logger.error(f"❌ Error extrayendo datos de la tarjeta: {e}")
-            return None
+    async def _search_reference(self, reference: dict) -> list:
+        """Selecciona una referencia, ejecuta la búsqueda y extrae las tarjetas (sin numerar)."""
+        await self.page.select_option(SELECTORS['reference'], value=reference['value'])
+        await asyncio.sleep(0.5)
+        
+        self.logger.info(f"🔍 Ejecutando búsqueda para: {reference['text']}")
+        if self._api_learner:
+            await self._api_learner.note_search(self._current_state)
+        await self.page.click(SELECTORS['search_button'])
+        await asyncio.sleep(2)  # Esperar a que carguen los resultados
+        
+        cards = await FasecoldaCardExtractor.extract(self.page, SELECTORS)
+        if not cards:
+            self.logger.warning(f"⚠️ No se encontraron tarjetas de vehículos para: {reference['text']}")
+            return []
+        
+        self.logger.info(f"✅ Encontradas {len(cards)} tarjeta(s) en: {reference['text']}")
+        return [self._complete_result_data_from_card(card, 0, reference['text']) for card in cards]
+
+    @staticmethod
+    def _complete_result_data_from_card(card: FasecoldaCard, option_number: int, reference_group: str) -> dict:
+        """Convierte una tarjeta extraída al formato de opción del diálogo de selección."""
+        return {
+            'option_number': option_number,
+            'cf_code': card['cf_code'],
+            'ch_code': card['ch_code'],
+            'description': card['description'],
+            'insured_value': card['insured_value'],
+            'reference_group': reference_group
+        }
 
     async def _return_to_search_form(self):
         """Vuelve al formulario de búsqueda de manera optimizada (sin recargar página)."""
@@ -1096,6 +1206,25 @@ class FasecoldaService:
             # Fallback: llenar formulario completo
             await self._fill_vehicle_form_to_brand(category, state, model_year, brand)
 
+    def _start_api_learning(self) -> None:
+        """Observa el tráfico del SPA si todavía no hay endpoints aprendidos para el cliente HTTP."""
+        try:
+            from .fasecolda_api_client import FasecoldaApiLearner, FasecoldaApiSpec
+            if self.page is not None and self._api_learner is None and FasecoldaApiSpec.load() is None:
+                self._api_learner = FasecoldaApiLearner(self.page, self.logger)
+        except Exception as e:
+            self.logger.debug(f"No se pudo observar el tráfico de FASECOLDA: {e}")
+
+    async def _finish_api_learning(self, results: list) -> None:
+        """Guarda los endpoints aprendidos (nunca interrumpe la búsqueda si falla)."""
+        learner, self._api_learner = self._api_learner, None
+        if not learner:
+            return
+        try:
+            await learner.learn(results)
+        except Exception as e:
+            self.logger.debug(f"No se pudo aprender el API de FASECOLDA: {e}")
+
     def _is_valid_unique_result(self, result_data: dict, existing_results: list) -> bool:
         """Verifica que el resultado sea válido y único."""
         if not result_data or not result_data.get('cf_code'):
@@ -1163,16 +1292,88 @@ class FasecoldaService:
         except Exception as e:
             self.logger.warning(f"⚠️ Error mostrando popup de referencia no encontrada: {e}")
 
-    async def _show_selection_dialog(self, all_options: list, brand: str, reference: str) -> dict:
-        """Muestra un diálogo de selección en la interfaz GUI."""
+    def _score_options(self, options: list) -> None:
+        """Agrega el score de similitud contra la referencia completa a las opciones que no lo tienen."""
+        target = self._current_full_reference or self._current_reference
+        for option in options:
+            if option.get('score') is None:
+                option['score'] = self._calculate_similarity_score(target, option.get('description', ''))
+
+    async def _show_selection_dialog(
+        self,
+        all_options: list,
+        brand: str,
+        reference: str,
+        search_task: Optional[asyncio.Task] = None
+    ) -> dict:
+        """
+        Muestra un diálogo de selección en la interfaz GUI.
+        
+        Las opciones se ordenan por similitud con la referencia completa. Con
+        FASECOLDA_AUTO_ACCEPT_SCORE > 0, la mejor opción se elige sin preguntar en cuanto
+        alcanza ese score (antes de abrir el diálogo o mientras llegan resultados).
+        
+        Args:
+            all_options: Opciones disponibles al abrir el diálogo
+            brand: Marca del vehículo
+            reference: Referencia buscada
+            search_task: Búsqueda aún en curso; sus resultados se agregan al diálogo abierto
+                         y se cancela si el usuario elige antes de que termine
+        """
         try:
             # Importar aquí para evitar dependencias circulares
             from ..interfaces.fasecolda_selection_dialog import FasecoldaSelectionDialog
+            from .fasecolda_resolver import FasecoldaAutoResolver, FasecoldaChoiceHistory, FasecoldaMappingStore
+            
+            self._score_options(all_options)
+            best = max(all_options, key=lambda o: o.get('score') or 0.0, default=None)
+            if AUTO_ACCEPT_SCORE > 0 and best and best['score'] >= AUTO_ACCEPT_SCORE:
+                self.logger.info(
+                    f"🤖 Auto-aceptada la opción con score {best['score']:.2f} (≥ {AUTO_ACCEPT_SCORE:.2f}): "
+                    f"CF {best['cf_code']} - {best.get('description', '')}"
+                )
+                await self._stop_search(search_task)
+                return best
+            
+            # Resolución por confianza: con todas las opciones conocidas se decide sin diálogo;
+            # en modo desatendido se espera a que termine la búsqueda en lugar de abrirlo
+            auto_resolve = FasecoldaAutoResolver.is_enabled()
+            if auto_resolve and (search_task is None or FasecoldaAutoResolver.is_unattended()):
+                if search_task is not None:
+                    await self._wait_search(search_task)
+                    self._score_options(all_options)
+                decision = self._auto_resolve(all_options, brand, reference, allow_defer=True)
+                if decision:
+                    return decision
+                search_task = None
             
             # Crear y mostrar el diálogo
-            dialog = FasecoldaSelectionDialog(all_options, brand, reference)
-            selected_option = dialog.show()
-            
+            dialog = FasecoldaSelectionDialog(
+                all_options, brand, reference,
+                auto_accept_score=AUTO_ACCEPT_SCORE,
+                auto_resolve=(lambda options: self._auto_resolve(options, brand, reference)) if auto_resolve else None
+            )
+            
+            if search_task is None:
+                selected_option = dialog.show()
+            else:
+                self._live_dialog = dialog
+                try:
+                    selected_option = await dialog.show_async(search_task)
+                finally:
+                    self._live_dialog = None
+                    await self._stop_search(search_task)
+            
+            if selected_option and dialog.auto_selected:
+                self.logger.info(f"🤖 Opción elegida automáticamente: CF {selected_option['cf_code']} (score {selected_option.get('score') or 0:.2f})")
+            elif selected_option:
+                # La elección de una persona alimenta la resolución automática de próximas búsquedas
+                FasecoldaChoiceHistory.record(
+                    brand, reference, self._current_model_year, selected_option, self._current_full_reference
+                )
+                FasecoldaMappingStore.record(
+                    brand, reference, self._current_model_year, selected_option, self._current_full_reference
+                )
             return selected_option
             
         except Exception as e:
@@ -1180,3 +1381,67 @@ class FasecoldaService:
             import traceback
             traceback.print_exc()
             return None
+
+    def _auto_resolve(self, options: list, brand: str, reference: str, allow_defer: bool = False) -> Optional[dict]:
+        """
+        Intenta elegir sin intervención humana.
+        
+        Args:
+            options: Opciones completas de la búsqueda
+            brand: Marca del vehículo
+            reference: Referencia buscada
+            allow_defer: Si en modo desatendido una decisión con poca confianza se toma igual
+                         y se deja en la cola de revisión (en lugar de preguntar)
+            
+        Returns:
+            La opción elegida, o None si hay que preguntar
+        """
+        from .fasecolda_resolver import FasecoldaAutoResolver, FasecoldaReviewQueue
+        
+        resolution = FasecoldaAutoResolver.resolve(
+            options, brand, reference, self._current_full_reference, self._current_model_year
+        )
+        if not resolution:
+            return None
+        
+        confidence = resolution['confidence']
+        min_confidence = FasecoldaAutoResolver.min_confidence()
+        summary = f"CF {resolution['cf_code']} - {resolution['option'].get('description', '')} ({', '.join(resolution['reasons'])})"
+        
+        if confidence >= min_confidence:
+            self.logger.info(f"🤖 Resuelto automáticamente con confianza {confidence:.2f}: {summary}")
+            return resolution['option']
+        
+        if allow_defer and FasecoldaAutoResolver.is_unattended():
+            decision_id = FasecoldaReviewQueue.add(
+                resolution, options, brand, reference, self._current_full_reference, self._current_model_year
+            )
+            self.logger.warning(
+                f"📝 Confianza {confidence:.2f} < {min_confidence:.2f}: se usa {summary} "
+                f"y queda pendiente de revisión (id {decision_id})"
+            )
+            return resolution['option']
+        
+        self.logger.info(f"🙋 Confianza {confidence:.2f} < {min_confidence:.2f} - se pide elegir al usuario")
+        return None
+
+    async def _wait_search(self, search_task: asyncio.Task) -> None:
+        """Espera a que termine la búsqueda en curso (sus errores solo se registran)."""
+        try:
+            await search_task
+        except Exception as e:
+            self.logger.warning(f"⚠️ La búsqueda terminó con error: {e}")
+
+    async def _stop_search(self, search_task: Optional[asyncio.Task]) -> None:
+        """Cancela la búsqueda si sigue en curso (ya hay opción elegida) o informa si terminó con error."""
+        if search_task is None:
+            return
+        if not search_task.done():
+            self.logger.info("⏹️ Opción elegida antes de terminar la búsqueda - cancelando pestañas restantes")
+            search_task.cancel()
+            try:
+                await search_task
+            except (asyncio.CancelledError, Exception):
+                pass
+        elif not search_task.cancelled() and search_task.exception():
+            self.logger.warning(f"⚠️ La búsqueda terminó con error: {search_task.exception()}")
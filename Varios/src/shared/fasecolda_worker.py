@@ -0,0 +1,193 @@
+"""Navegador FASECOLDA residente que atiende las consultas de la sesión desde una cola."""
+
+import os
+import asyncio
+from typing import Any, Awaitable, Callable, Optional, Tuple
+from playwright.async_api import Playwright, Browser, BrowserContext, Page
+
+from ..core.logger_factory import LoggerFactory
+from ..core.browser_options import BrowserOptions
+from ..core.har_archive import HarArchive
+from ..core.playwright_runtime import get_playwright_runtime
+
+
+# Trabajo que se ejecuta con la página residente (ya ubicada en el formulario de búsqueda)
+FasecoldaJob = Callable[[Page], Awaitable[Any]]
+
+
+class FasecoldaWorker:
+    """
+    Mantiene un solo navegador de FASECOLDA abierto en el formulario de búsqueda.
+
+    El extractor y el selector interactivo encolan trabajos (submit) en lugar de lanzar
+    su propio Chromium; los trabajos se atienden de a uno sobre la misma página. El
+    arranque del navegador y la carga del sitio se pagan una vez por sesión: entre
+    consultas el formulario se vuelve a llenar sin recargar la página.
+    """
+
+    def __init__(self):
+        self.logger = LoggerFactory.create_logger('fasecolda_worker')
+        self.playwright: Optional[Playwright] = None
+        self.browser: Optional[Browser] = None
+        self.context: Optional[BrowserContext] = None
+        self.page: Optional[Page] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._serve_task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # Modo de navegador y HAR con que se lanzó; si cambian se relanza
+        self._launch_key: Optional[Tuple[str, str, str]] = None
+
+    async def submit(self, job: FasecoldaJob, description: str = 'consulta') -> Any:
+        """
+        Encola un trabajo y espera su resultado.
+
+        Args:
+            job: Corrutina que recibe la página residente
+            description: Descripción para los logs
+
+        Returns:
+            Lo que retorne el trabajo (sus excepciones se propagan al llamador)
+        """
+        self._ensure_running()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((job, future, description))
+        if self._queue.qsize() > 1:
+            self.logger.info(f"⏳ '{description}' en cola ({self._queue.qsize()} pendientes)")
+        return await future
+
+    async def warm_up(self) -> None:
+        """Lanza el navegador y deja el formulario cargado antes de la primera consulta."""
+        async def _noop(page: Page) -> None:
+            return None
+        await self.submit(_noop, 'precarga')
+
+    def _ensure_running(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Nuevo event loop (otra ejecución con asyncio.run): lo anterior ya no es utilizable
+            self._forget_browser()
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._serve_task = None
+        if self._serve_task is None or self._serve_task.done():
+            self._serve_task = asyncio.create_task(self._serve())
+
+    async def _serve(self) -> None:
+        """Atiende la cola de a un trabajo a la vez."""
+        while True:
+            job, future, description = await self._queue.get()
+            if future.cancelled():
+                continue
+
+            job_task: Optional[asyncio.Task] = None
+            try:
+                page = await self._ensure_page()
+                self.logger.info(f"🔎 FASECOLDA residente atendiendo: {description}")
+                job_task = asyncio.ensure_future(job(page))
+                # Si el llamador se cancela, se cancela también su trabajo
+                future.add_done_callback(lambda f, t=job_task: t.cancel() if f.cancelled() else None)
+                result = await job_task
+                if not future.done():
+                    future.set_result(result)
+            except asyncio.CancelledError:
+                if future.cancelled():
+                    continue
+                future.cancel()
+                raise
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+
+    async def _ensure_page(self) -> Page:
+        """Devuelve la página residente en el formulario, (re)lanzando el navegador si hace falta."""
+        gui_show_browser = os.getenv('GUI_SHOW_BROWSER', 'False').lower() == 'true'
+        browser_mode = BrowserOptions.resolve_mode('fasecolda', hidden=not gui_show_browser, logger=self.logger)
+        launch_key = (browser_mode, HarArchive.mode(), os.getenv('HAR_RUN_DIR', ''))
+
+        alive = (
+            self.page is not None and not self.page.is_closed()
+            and self.browser is not None and self.browser.is_connected()
+        )
+        if alive and launch_key == self._launch_key:
+            return self.page
+
+        if self.browser is not None:
+            self.logger.info("🔄 Relanzando navegador FASECOLDA residente...")
+            await self._close_browser()
+
+        self.logger.info("🌐 Iniciando navegador FASECOLDA residente...")
+        self.playwright = await get_playwright_runtime().acquire()
+        self.browser = await self.playwright.chromium.launch(**BrowserOptions.launch_kwargs(browser_mode))
+        # Contexto explícito: la búsqueda comprehensiva abre pestañas adicionales en él
+        self.context = await self.browser.new_context(
+            **await BrowserOptions.context_kwargs(browser_mode, self.playwright),
+            **HarArchive.context_kwargs('fasecolda')
+        )
+        await HarArchive.attach(self.context, 'fasecolda', self.logger)
+        self.page = await self.context.new_page()
+        self._launch_key = launch_key
+
+        from .fasecolda_service import FasecoldaService
+        await FasecoldaService(self.page, self.logger)._ensure_search_form()
+        return self.page
+
+    async def _close_browser(self) -> None:
+        try:
+            if self.context:
+                await self.context.close()  # Cierra la página y escribe el HAR si se está grabando
+            if self.browser:
+                await self.browser.close()
+        except Exception as e:
+            self.logger.warning(f"⚠️ Error cerrando navegador FASECOLDA residente: {e}")
+        if self.playwright:
+            await get_playwright_runtime().release()
+        self._forget_browser()
+
+    def _forget_browser(self) -> None:
+        self.playwright = None
+        self.browser = None
+        self.context = None
+        self.page = None
+        self._launch_key = None
+
+    async def shutdown(self) -> None:
+        """Cancela los trabajos pendientes y cierra el navegador residente."""
+        if self._serve_task and not self._serve_task.done():
+            self._serve_task.cancel()
+            try:
+                await self._serve_task
+            except asyncio.CancelledError:
+                pass
+        self._serve_task = None
+
+        if self._queue:
+            while not self._queue.empty():
+                _, future, _ = self._queue.get_nowait()
+                if not future.done():
+                    future.cancel()
+
+        if self.browser is not None:
+            await self._close_browser()
+            self.logger.info("🔒 Navegador FASECOLDA residente cerrado")
+
+
+# Instancia única por proceso
+_worker: Optional[FasecoldaWorker] = None
+
+
+def get_fasecolda_worker() -> FasecoldaWorker:
+    """Obtiene (o crea) el worker FASECOLDA residente del proceso."""
+    global _worker
+
+    if _worker is None:
+        _worker = FasecoldaWorker()
+    return _worker
+
+
+async def shutdown_fasecolda_worker() -> None:
+    """Cierra el worker residente, si existe (fin de la sesión)."""
+    global _worker
+
+    if _worker is not None:
+        await _worker.shutdown()
+        _worker = None
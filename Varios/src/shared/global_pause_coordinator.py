@@ -110,6 +110,19 @@ class GlobalPauseCoordinator:
             if company != requesting_company:
                 print(f"▶️ {company.upper()}: Continuando operaciones...")
     
+    def reset(self) -> None:
+        """
+        Deja el coordinador sin pausa (inicio de una ejecución).
+        
+        En el host residente el singleton sobrevive entre ejecuciones: una pausa que quedó
+        activa porque la ejecución anterior se detuvo a mitad de un MFA o de una selección
+        dejaría esperando para siempre a la siguiente.
+        """
+        self._pause_reason = None
+        self._requesting_company = None
+        self._pause_data = {}
+        self._pause_event.set()
+    
     def is_paused(self) -> bool:
         """Verifica si el sistema está pausado."""
         return not self._pause_event.is_set()
@@ -150,12 +163,11 @@ class GlobalPauseCoordinator:
                 if timeout:
                     print(f"⏰ Timeout: {timeout} segundos")
                 
-                # En un entorno real, aquí usarías input() con timeout
-                # Por simplicidad, usamos input() normal
                 print("👉 Tu respuesta: ", end="", flush=True)
                 
                 try:
-                    response = input().strip()
+                    # input() en un hilo: el loop sigue atendiendo (p. ej. la orden de detener del host)
+                    response = (await asyncio.get_running_loop().run_in_executor(None, input)).strip()
                 except EOFError:
                     # Si se cierra stdin (por ejemplo, al detener la GUI), salir gracefully
                     print("\n⚠️ Proceso detenido - finalizando...")
@@ -221,7 +233,15 @@ async def request_pause_for_fasecolda_selection(
             'message': f'Selección de código Fasecolda requerida para {company}'
         }
     )
-    
+    try:
+        return await _select_fasecolda_option(results)
+    finally:
+        # También si la selección se cancela o falla: las demás automatizaciones no deben quedar pausadas
+        await global_pause_coordinator.resume_global_operations()
+
+
+async def _select_fasecolda_option(results: list) -> int:
+    """Muestra las opciones Fasecolda y retorna el índice que elige el usuario."""
     # Mostrar opciones al usuario con formato limpio
     print(f"\n🔍 SELECCIÓN DE CÓDIGO FASECOLDA")
     print("="*60)
@@ -255,7 +275,6 @@ async def request_pause_for_fasecolda_selection(
     print(f"\n>> Seleccionado: CF: {selected_cf} | CH: {selected_ch}")
     print(f"   Valor: {selected_value}")
     print()
-    await global_pause_coordinator.resume_global_operations()
     
     return selected_index
 
@@ -5,20 +5,21 @@ cuando hay múltiples resultados disponibles.
 
 import asyncio
 from typing import Optional, Dict, List, Tuple
-from playwright.async_api import Page, Browser, async_playwright
+from playwright.async_api import Page, Browser
 
 from ..config.client_config import ClientConfig
 from ..core.logger_factory import LoggerFactory
+from .fasecolda_cards import FasecoldaCardExtractor
+from .fasecolda_worker import get_fasecolda_worker
 
 
 class InteractiveFasecoldaSelector:
     """Servicio interactivo para búsqueda de códigos Fasecolda."""
 
-import os
 import asyncio
 import re
 from typing import Optional, Dict, List, Tuple
-from playwright.async_api import Page, Browser, async_playwright
+from playwright.async_api import Page, Browser
 
 from .fasecolda_service import FasecoldaService
 from ..config.client_config import ClientConfig
@@ -31,8 +32,7 @@ class InteractiveFasecoldaSelector:
     
     def __init__(self, headless: bool = False):
         self.logger = LoggerFactory.create_logger('interactive_fasecolda')
-        self.playwright = None
-        self.browser = None
+        self.worker = None
         self.page = None
         self.headless = headless
         
@@ -64,59 +64,14 @@ class InteractiveFasecoldaSelector:
         await self._cleanup()
     
     async def _initialize_browser(self):
-        """Inicializa el navegador y la página."""
-        try:
-            self.playwright = await async_playwright().start()
-            
-            # Determinar configuración de headless
-            gui_show_browser = os.getenv('GUI_SHOW_BROWSER', 'False').lower() == 'true'
-            should_hide = not gui_show_browser  # Si GUI dice mostrar = False, ocultar = True
-            
-            # Configurar argumentos del navegador
-            browser_args = ['--no-sandbox', '--disable-dev-shm-usage']
-            
-            # Si debe estar oculto, usar ventana minimizada en lugar de headless
-            if should_hide:
-                browser_args.extend([
-                    '--start-minimized',
-                    '--window-position=-32000,-32000',  # Mover fuera de la pantalla
-                    '--window-size=1,1',  # Tamaño mínimo
-                    '--disable-background-timer-throttling',  # Evita que se ralenticen los timers
-                    '--disable-renderer-backgrounding',  # Evita que el renderer se pause
-                    '--disable-backgrounding-occluded-windows'  # No pausar ventanas ocultas
-                ])
-                headless_mode = False  # No usar headless real para evitar problemas
-            else:
-                headless_mode = False
-            
-            self.browser = await self.playwright.chromium.launch(
-                headless=headless_mode,
-                args=browser_args
-            )
-            self.page = await self.browser.new_page()
-            
-            # Configurar timeouts más largos
-            self.page.set_default_timeout(30000)
-            
-            self.logger.info("🌐 Navegador inicializado exitosamente")
-            
-        except Exception as e:
-            self.logger.error(f"❌ Error inicializando navegador: {e}")
-            await self._cleanup()
-            raise
+        """Obtiene el worker FASECOLDA residente (el navegador se lanza una sola vez por sesión)."""
+        self.worker = get_fasecolda_worker()
+        self.logger.info("🌐 Usando navegador FASECOLDA residente")
     
     async def _cleanup(self):
-        """Limpia recursos del navegador."""
-        try:
-            if self.page:
-                await self.page.close()
-            if self.browser:
-                await self.browser.close()
-            if self.playwright:
-                await self.playwright.stop()
-            self.logger.info("🧹 Recursos del navegador liberados")
-        except Exception as e:
-            self.logger.error(f"❌ Error en cleanup: {e}")
+        """Suelta la página residente (el navegador sigue abierto para las siguientes consultas)."""
+        self.page = None
+        self.logger.info("🧹 Página FASECOLDA liberada")
     
     async def search_and_select_vehicle(self) -> Optional[Dict[str, str]]:
         """
@@ -128,14 +83,8 @@ class InteractiveFasecoldaSelector:
         try:
             self.logger.info("🔍 Iniciando búsqueda interactiva en Fasecolda...")
             
-            # Navegar a Fasecolda
-            await self._navigate_to_fasecolda()
-            
-            # Configurar formulario de búsqueda
-            await self._configure_search_form()
-            
-            # Realizar búsqueda
-            await self._perform_search()
+            # Buscar en la página residente; se libera antes de que el usuario elija
+            await self.worker.submit(self._search_on_page, 'búsqueda interactiva')
             
             # Obtener resultados y permitir selección
             selected_codes = await self._get_results_and_select()
@@ -151,6 +100,20 @@ class InteractiveFasecoldaSelector:
             self.logger.error(f"❌ Error en búsqueda interactiva: {e}")
             return None
     
+    async def _search_on_page(self, page: Page) -> None:
+        """Trabajo del worker residente: configura el formulario y recorre las referencias."""
+        self.page = page
+        
+        # El formulario ya cargado se reutiliza; solo se navega si la página no está en él
+        if not await self.page.query_selector(self.selectors['category_select']):
+            await self._navigate_to_fasecolda()
+        
+        # Configurar formulario de búsqueda (reemplaza los valores de la consulta anterior)
+        await self._configure_search_form()
+        
+        # Realizar búsqueda
+        await self._perform_search()
+    
     async def _navigate_to_fasecolda(self):
         """Navega a la página de Fasecolda y accede a búsqueda básica."""
         self.logger.info("🌐 Navegando a Fasecolda...")
@@ -172,7 +135,7 @@ class InteractiveFasecoldaSelector:
         await asyncio.sleep(1)
         
         # Verificar que el formulario cargó
-        await self.page.wait_for_selector(self.selectors['category'], timeout=10000)
+        await self.page.wait_for_selector(self.selectors['category_select'], timeout=10000)
         self.logger.info("✅ Formulario de búsqueda básica cargado")
     
     async def _configure_search_form(self):
@@ -378,24 +341,26 @@ class InteractiveFasecoldaSelector:
             # Esperar a que aparezcan las tarjetas de vehículos
             await asyncio.sleep(1)
             
-            # Buscar todas las tarjetas de vehículos
-            vehicle_cards = await self.page.query_selector_all(self.selectors['vehicle_card'])
+            # Leer todas las tarjetas de vehículos en un solo evaluate
+            cards = await FasecoldaCardExtractor.extract(self.page, self.selectors)
             
-            if not vehicle_cards:
+            if not cards:
                 self.logger.debug("No se encontraron tarjetas de vehículos")
                 return []
             
-            self.logger.debug(f"Encontradas {len(vehicle_cards)} tarjetas de vehículos")
+            self.logger.debug(f"Encontradas {len(cards)} tarjetas de vehículos")
             
-            # Extraer información de cada tarjeta
-            for idx, card in enumerate(vehicle_cards, 1):
-                try:
-                    result_info = await self._extract_vehicle_info_from_card(card, idx)
-                    if result_info:
-                        results.append(result_info)
-                except Exception as e:
-                    self.logger.debug(f"Error extrayendo info de tarjeta {idx}: {e}")
+            for card in cards:
+                if not card['cf_code']:
+                    self.logger.debug(f"No se encontró código CF en la tarjeta {card['index']}")
                     continue
+                results.append({
+                    'cf_code': card['cf_code'],
+                    'ch_code': card['ch_code'],
+                    'name': card['description'] or f"Vehículo {card['index']}",
+                    'price': card['insured_value'],
+                    'index': card['index']
+                })
             
             return results
             
@@ -403,64 +368,6 @@ class InteractiveFasecoldaSelector:
             self.logger.error(f"❌ Error extrayendo resultados: {e}")
             return []
     
-    async def _extract_vehicle_info_from_card(self, card_element, index: int) -> Optional[Dict[str, str]]:
-        """
-        Extrae información de una tarjeta de vehículo de la nueva página.
-        
-        Args:
-            card_element: Elemento DOM de la tarjeta del vehículo
-            index: Índice del vehículo
-            
-        Returns:
-            Dict con información del vehículo
-        """
-        try:
-            import re
-            
-            # Extraer el nombre del vehículo
-            name_element = await card_element.query_selector(self.selectors['vehicle_name'])
-            vehicle_name = await name_element.text_content() if name_element else f"Vehículo {index}"
-            vehicle_name = vehicle_name.strip()
-            
-            # Extraer códigos CF y CH
-            codes_element = await card_element.query_selector(self.selectors['vehicle_codes'])
-            if not codes_element:
-                return None
-            
-            codes_text = await codes_element.text_content()
-            codes_text = codes_text.strip()
-            
-            # Extraer CF y CH con regex
-            # Formato esperado: "CF - 03033048 CH - 03001135"
-            cf_match = re.search(r'CF\s*-\s*(\d+)', codes_text)
-            ch_match = re.search(r'CH\s*-\s*(\d+)', codes_text)
-            
-            if not cf_match:
-                self.logger.debug(f"No se encontró código CF en: {codes_text}")
-                return None
-            
-            cf_code = cf_match.group(1)
-            ch_code = ch_match.group(1) if ch_match else cf_code
-            
-            # Extraer precio
-            price_element = await card_element.query_selector(self.selectors['vehicle_price'])
-            price = await price_element.text_content() if price_element else "Precio no disponible"
-            price = price.strip()
-            
-            return {
-                'cf_code': cf_code,
-                'ch_code': ch_code,
-                'name': vehicle_name,
-                'price': price,
-                'index': index
-            }
-            
-        except Exception as e:
-            self.logger.debug(f"Error extrayendo info de tarjeta {index}: {e}")
-            return None
-    
-
-    
     async def _show_options_and_get_selection(self, results: List[Dict[str, str]]) -> Optional[Dict[str, str]]:
         """
         Muestra las opciones al usuario y obtiene su selección.
@@ -496,7 +403,7 @@ class InteractiveFasecoldaSelector:
             while True:
                 try:
                     print(f"\n👆 Seleccione una opción (1-{len(results)}) o 'q' para cancelar: ", end="", flush=True)
-                    selection = input().strip().lower()
+                    selection = (await asyncio.get_running_loop().run_in_executor(None, input)).strip().lower()
                     
                     if selection == 'q':
                         print("❌ Selección cancelada por el usuario")
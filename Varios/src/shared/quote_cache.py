@@ -0,0 +1,243 @@
+"""
+Caché de resultados de cotización por aseguradora.
+
+Si el mismo cliente/vehículo se vuelve a cotizar el mismo día y dentro de la ventana de
+vigencia de la aseguradora (p. ej. tras un retoque de la plantilla), se reutilizan las
+primas y el PDF de la cotización anterior en lugar de abrir de nuevo el portal. La clave es un hash de
+los datos que definen el precio: documento, placa, vehículo y códigos FASECOLDA, valor
+asegurado, fondo y la póliza de la aseguradora. Los nombres y demás datos de contacto no
+entran en la clave.
+"""
+
+import os
+import re
+import json
+import shutil
+import hashlib
+import unicodedata
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from ..config.base_config import BaseConfig
+from ..config.client_config import ClientConfig
+from ..core.logger_factory import LoggerFactory
+
+
+class QuoteCache:
+    """Primas y PDF de cotizaciones recientes, indexados por los datos que definen el precio."""
+
+    DIR = os.path.join(BaseConfig.CACHE_DIR, 'quotes')
+    INDEX_PATH = os.path.join(DIR, 'index.json')
+
+    # Atributos de ClientConfig que definen el precio en todas las aseguradoras
+    PRICE_FIELDS = (
+        'CLIENT_DOCUMENT_NUMBER', 'CLIENT_BIRTH_DATE', 'CLIENT_GENDER', 'CLIENT_CITY', 'CLIENT_DEPARTMENT',
+        'VEHICLE_PLATE', 'VEHICLE_MODEL_YEAR', 'VEHICLE_BRAND', 'VEHICLE_REFERENCE', 'VEHICLE_FULL_REFERENCE',
+        'VEHICLE_STATE', 'VEHICLE_INSURED_VALUE', 'MANUAL_CF_CODE', 'MANUAL_CH_CODE',
+        'ENABLE_FASECOLDA_SEARCH', 'SELECTED_FONDO'
+    )
+    # Y los propios de cada aseguradora
+    COMPANY_FIELDS = {
+        'sura': ('POLICY_NUMBER',),
+        'allianz': ('POLICY_NUMBER_ALLIANZ',)
+    }
+
+    # Valor que dejan las aseguradoras fallidas en sus planes
+    FAILED_VALUE = 'FALLÓ'
+
+    _logger = None
+
+    @classmethod
+    def _log(cls):
+        if cls._logger is None:
+            cls._logger = LoggerFactory.create_logger('quote_cache')
+        return cls._logger
+
+    # --- Clave ------------------------------------------------------------------------
+
+    @staticmethod
+    def normalize(value: Any) -> str:
+        """Forma canónica de un campo: sin tildes, mayúsculas, solo letras y dígitos."""
+        text = unicodedata.normalize('NFKD', str(value if value is not None else ''))
+        text = ''.join(c for c in text if not unicodedata.combining(c)).upper()
+        return re.sub(r'[^A-Z0-9]', '', text)
+
+    @classmethod
+    def key(cls, company: str) -> str:
+        """
+        Hash de los datos del cliente activo que definen el precio de una aseguradora.
+
+        Args:
+            company: 'sura' o 'allianz'
+
+        Returns:
+            Hash hexadecimal (el mismo para "GEN-294" y "gen 294", "95.000.000" y "95000000")
+        """
+        company = company.lower()
+        ClientConfig.get_vehicle_state()  # Aplica los overrides de la GUI antes de leer los campos
+        fields = cls.PRICE_FIELDS + cls.COMPANY_FIELDS.get(company, ())
+        canonical = {field: cls.normalize(getattr(ClientConfig, field, '')) for field in fields}
+        canonical['company'] = company
+        payload = json.dumps(canonical, sort_keys=True, ensure_ascii=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:32]
+
+    @staticmethod
+    def validity_hours(company: str) -> float:
+        """Ventana de vigencia configurada para la aseguradora (0 = no se reutiliza)."""
+        return float(BaseConfig.get_company_config(company).get('quote_cache_hours', 0) or 0)
+
+    # --- Índice -----------------------------------------------------------------------
+
+    @classmethod
+    def _read_index(cls) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(cls.INDEX_PATH, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    @classmethod
+    def _write_index(cls, index: Dict[str, Dict[str, Any]]) -> None:
+        try:
+            os.makedirs(cls.DIR, exist_ok=True)
+            tmp_path = f"{cls.INDEX_PATH}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(index, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, cls.INDEX_PATH)
+        except OSError as e:
+            cls._log().warning(f"⚠️ No se pudo guardar la caché de cotizaciones: {e}")
+
+    @classmethod
+    def _is_valid(cls, entry: Dict[str, Any], now: Optional[datetime] = None) -> bool:
+        hours = cls.validity_hours(entry.get('company', ''))
+        if hours <= 0:
+            return False
+        try:
+            saved_at = datetime.fromisoformat(entry['saved_at'])
+        except (KeyError, TypeError, ValueError):
+            return False
+        now = now or datetime.now()
+        # Las cotizaciones llevan la fecha del día: la de ayer no sirve aunque esté en la ventana
+        return saved_at.date() == now.date() and now - saved_at < timedelta(hours=hours)
+
+    # --- Consulta y registro ------------------------------------------------------------
+
+    @classmethod
+    def lookup(cls, company: str) -> Optional[Dict[str, Any]]:
+        """
+        Cotización vigente de la aseguradora para el cliente activo.
+
+        Returns:
+            {'company', 'saved_at', 'plans', 'pdf', 'fasecolda', 'client'} o None si no hay
+            una vigente (o su PDF ya no existe)
+        """
+        if cls.validity_hours(company) <= 0:
+            return None
+        entry = cls._read_index().get(cls.key(company))
+        if not entry or not cls._is_valid(entry):
+            return None
+        if entry.get('pdf') and not os.path.exists(entry['pdf']):
+            return None
+        return entry
+
+    @classmethod
+    def store(cls, company: str, plans: Dict[str, str], pdf_path: Optional[str] = None,
+              fasecolda_codes: Optional[Dict[str, str]] = None) -> bool:
+        """
+        Guarda la cotización exitosa de la aseguradora para el cliente activo.
+
+        Args:
+            company: 'sura' o 'allianz'
+            plans: Primas por plan (las mismas que van al consolidado)
+            pdf_path: PDF descargado en esta ejecución (se guarda una copia en la caché)
+            fasecolda_codes: Códigos FASECOLDA usados ({'cf_code', 'ch_code'})
+
+        Returns:
+            True si se guardó (no se guardan planes vacíos o fallidos)
+        """
+        company = company.lower()
+        if cls.validity_hours(company) <= 0:
+            return False
+        if not plans or any(not value or value == cls.FAILED_VALUE for value in plans.values()):
+            return False
+
+        key = cls.key(company)
+        cached_pdf = None
+        if pdf_path and os.path.exists(pdf_path):
+            cached_pdf = os.path.join(cls.DIR, f"{key}.pdf")
+            try:
+                os.makedirs(cls.DIR, exist_ok=True)
+                shutil.copyfile(pdf_path, cached_pdf)
+            except OSError as e:
+                cls._log().warning(f"⚠️ No se pudo copiar el PDF de {company.upper()} a la caché: {e}")
+                cached_pdf = None
+
+        index = cls._purge(cls._read_index())
+        index[key] = {
+            'company': company,
+            'saved_at': datetime.now().isoformat(timespec='seconds'),
+            'plans': dict(plans),
+            'pdf': cached_pdf,
+            'fasecolda': dict(fasecolda_codes) if fasecolda_codes and fasecolda_codes.get('cf_code') else None,
+            'client': f"{ClientConfig.CLIENT_DOCUMENT_NUMBER} / {ClientConfig.VEHICLE_PLATE}"
+        }
+        cls._write_index(index)
+        cls._log().info(f"💾 Cotización de {company.upper()} guardada en caché ({cls.validity_hours(company):g} h)")
+        return True
+
+    @classmethod
+    def _purge(cls, index: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """Quita las entradas vencidas y sus PDF."""
+        now = datetime.now()
+        kept = {}
+        for key, entry in index.items():
+            if cls._is_valid(entry, now):
+                kept[key] = entry
+            elif entry.get('pdf'):
+                try:
+                    os.remove(entry['pdf'])
+                except OSError:
+                    pass
+        return kept
+
+    @classmethod
+    def reattach_pdf(cls, company: str, entry: Dict[str, Any]) -> Optional[str]:
+        """
+        Copia el PDF cacheado a Descargas/<compañía> con un nombre nuevo, como si se hubiera descargado.
+
+        Returns:
+            Ruta del PDF copiado o None si la entrada no tiene PDF
+        """
+        if not entry.get('pdf'):
+            return None
+        from .utils import Utils
+        downloads_dir = Utils.ensure_directory(os.path.join(BaseConfig.DOWNLOADS_DIR, company.lower()))
+        path = os.path.join(downloads_dir, Utils.generate_filename(company.lower(), 'Cotizacion'))
+        try:
+            shutil.copyfile(entry['pdf'], path)
+        except OSError as e:
+            cls._log().warning(f"⚠️ No se pudo copiar el PDF cacheado de {company.upper()}: {e}")
+            return None
+        return path
+
+    @staticmethod
+    def apply_fasecolda_codes(codes: Optional[Dict[str, str]]) -> None:
+        """
+        Deja los códigos FASECOLDA de una cotización cacheada para el consolidado (o los limpia).
+
+        Cuando todas las aseguradoras salen de la caché no se abre FASECOLDA y la plantilla
+        toma los códigos de EXTRACTED_CF_CODE / EXTRACTED_CH_CODE.
+        """
+        if codes and codes.get('cf_code'):
+            os.environ['EXTRACTED_CF_CODE'] = str(codes['cf_code'])
+            os.environ['EXTRACTED_CH_CODE'] = str(codes.get('ch_code') or '')
+        else:
+            os.environ.pop('EXTRACTED_CF_CODE', None)
+            os.environ.pop('EXTRACTED_CH_CODE', None)
+
+    @staticmethod
+    def age_minutes(entry: Dict[str, Any]) -> int:
+        try:
+            return int((datetime.now() - datetime.fromisoformat(entry['saved_at'])).total_seconds() // 60)
+        except (KeyError, TypeError, ValueError):
+            return 0
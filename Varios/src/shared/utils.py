@@ -7,6 +7,9 @@ from typing import Optional
 class Utils:
     """Utilidades generales para el sistema."""
     
+    # Nombres ya entregados en este proceso (pestañas concurrentes pueden pedir nombre en el mismo segundo)
+    _issued_filenames: set = set()
+    
     @staticmethod
     def clean_date(date_str: str) -> str:
         """
@@ -34,7 +37,14 @@ class Utils:
             Nombre de archivo único
         """
         timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
-        return f"{prefix}_{company.title()}_{timestamp}.{extension}"
+        filename = f"{prefix}_{company.title()}_{timestamp}.{extension}"
+        
+        counter = 2
+        while filename in Utils._issued_filenames:
+            filename = f"{prefix}_{company.title()}_{timestamp}_{counter}.{extension}"
+            counter += 1
+        Utils._issued_filenames.add(filename)
+        return filename
     
     @staticmethod
     def ensure_directory(path: str) -> str: